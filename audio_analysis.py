@@ -0,0 +1,213 @@
+import numpy as np
+
+from ring_buffer import AudioRingBuffer
+
+# Форматы захвата: тип сэмплов в кольцевом буфере, значение полной шкалы, байт на сэмпл.
+# 24-битные сэмплы хранятся в int32 (без сдвига, в диапазоне +-2^23)
+SAMPLE_FORMATS = {
+    'int16': (np.int16, float(1 << 15), 2),
+    'int24': (np.int32, float(1 << 23), 3),
+    'float32': (np.float32, 1.0, 4)
+}
+DEFAULT_SAMPLE_FORMAT = 'float32'
+
+def decode_block(data, sample_format, channels=1, channel=0):
+    """
+    Сэмплы одного канала из байтов PortAudio без перевода во float
+
+    Args:
+        data: Байты блока (чередующиеся каналы)
+        sample_format: Ключ SAMPLE_FORMATS
+        channels: Количество каналов в блоке
+        channel: Выбранный канал
+
+    Returns:
+        numpy array типа SAMPLE_FORMATS[sample_format][0]
+    """
+    dtype, _, width = SAMPLE_FORMATS[sample_format]
+    if width == 3:
+        # Упакованные 24 бита: младший и средний байты без знака, старший - со знаком
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, channels, 3)[:, channel]
+        samples = raw[:, 2].astype(np.int8).astype(np.int32) << 16
+        samples |= raw[:, 1].astype(np.int32) << 8
+        samples |= raw[:, 0]
+        return samples
+
+    samples = np.frombuffer(data, dtype=dtype)
+    if channels > 1:
+        samples = samples.reshape(-1, channels)[:, channel]
+    return samples
+
+def encode_block(samples, sample_format, channels=1):
+    """
+    Байты для PortAudio из сэмплов одного канала, продублированных на channels каналов
+
+    Args:
+        samples: Сэмплы типа SAMPLE_FORMATS[sample_format][0]
+        sample_format: Ключ SAMPLE_FORMATS
+        channels: Количество выходных каналов
+    """
+    if channels > 1:
+        samples = np.repeat(samples, channels)
+    if SAMPLE_FORMATS[sample_format][2] == 3:
+        # Из int32 (little-endian) оставляем три младших байта
+        return np.ascontiguousarray(samples, dtype='<i4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return samples.tobytes()
+
+def window_rms(window, full_scale=1.0, scratch=None):
+    """
+    RMS окна с амплитудой в диапазоне [0, 1]
+
+    Целые сэмплы (до 24 бит) точно представимы во float32, поэтому сумма квадратов
+    считается по сырым значениям без масштабирования: они копируются в заранее
+    выделенный scratch, а деление на полную шкалу выполняется один раз для результата.
+    """
+    if window.dtype.kind != 'f':
+        if scratch is None:
+            scratch = np.empty(len(window), dtype=np.float32)
+        scratch = scratch[:len(window)]
+        np.copyto(scratch, window, casting='unsafe')
+        window = scratch
+    return float(np.sqrt(np.dot(window, window) / len(window)) / full_scale)
+
+def block_peak(samples, full_scale=1.0):
+    """Пиковая амплитуда блока (без np.abs, которое переполняется на минимальном целом)"""
+    if len(samples) == 0:
+        return 0.0
+    return max(float(samples.max()), -float(samples.min())) / full_scale
+
+def is_onset(rms, frame_time, last_onset_time, threshold, min_interval):
+    """
+    Правило обнаружения звука (общее для AudioProcessor и пакетного анализа): RMS окна
+    выше порога и с прошлого обнаружения прошло больше min_interval секунд
+    """
+    return rms > threshold and frame_time - last_onset_time > min_interval
+
+def frame_rms(samples, hop_size=256, window_size=1024, full_scale=1.0):
+    """
+    RMS всех окон анализа сигнала целиком (для файлов, без кольцевого буфера)
+
+    Окна те же, что у AnalysisFramer: концы в window_size, window_size + hop_size и т.д.
+    Если окно состоит из целого числа шагов, энергия считается по шагам (одно скалярное
+    произведение на шаг) и складывается в окна; иначе - разностью накопленной суммы
+    квадратов. В обоих случаях время не зависит от размера окна.
+
+    Returns:
+        tuple: (ends, rms) - индексы концов окон и их RMS в диапазоне [0, 1]
+    """
+    hops_per_window, remainder = divmod(window_size, hop_size)
+    if remainder == 0:
+        hops = len(samples) // hop_size
+        if hops < hops_per_window:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        blocks = samples[:hops * hop_size].reshape(hops, hop_size)
+        if blocks.dtype != np.float32:
+            blocks = blocks.astype(np.float32)
+        hop_energy = np.einsum('ij,ij->i', blocks, blocks).astype(np.float64)
+        cumulative = np.concatenate(([0.0], np.cumsum(hop_energy)))
+        energy = np.maximum(cumulative[hops_per_window:] - cumulative[:-hops_per_window], 0.0)
+        ends = np.arange(hops_per_window, hops + 1) * hop_size
+        return ends, np.sqrt(energy / window_size) / full_scale
+
+    squares = np.square(samples, dtype=np.float64)
+    cumulative = np.empty(len(squares) + 1)
+    cumulative[0] = 0.0
+    np.cumsum(squares, out=cumulative[1:])
+    ends = np.arange(window_size, len(samples) + 1, hop_size)
+    energy = np.maximum(cumulative[ends] - cumulative[ends - window_size], 0.0)
+    return ends, np.sqrt(energy / window_size) / full_scale
+
+class AnalysisFramer:
+    """
+    Разбиение входного сигнала на окна анализа фиксированного размера
+
+    Блоки от PortAudio любого размера записываются в кольцевой буфер, а анализ
+    (RMS для обнаружения звука и индикатора уровня) выполняется с постоянным шагом
+    hop_size по окну window_size. Поэтому разрешение и чувствительность детектора
+    не зависят от размера аппаратного буфера.
+    """
+    def __init__(self, sample_rate, hop_size=256, window_size=1024, buffer_seconds=4.0, ring_buffer=None,
+                 sample_format=DEFAULT_SAMPLE_FORMAT):
+        """
+        Args:
+            sample_rate: Частота дискретизации (Гц)
+            hop_size: Шаг анализа (сэмплов)
+            window_size: Размер окна анализа (сэмплов)
+            buffer_seconds: Емкость кольцевого буфера (сек)
+            ring_buffer: Готовый кольцевой буфер (по умолчанию создается новый)
+            sample_format: Формат сэмплов в буфере (ключ SAMPLE_FORMATS)
+        """
+        if hop_size <= 0 or window_size < hop_size:
+            raise ValueError(f"Некорректные параметры анализа: шаг {hop_size}, окно {window_size}")
+
+        self.sample_rate = sample_rate
+        self.hop_size = int(hop_size)
+        self.window_size = int(window_size)
+        if ring_buffer is None:
+            capacity = max(int(buffer_seconds * sample_rate), 2 * self.window_size)
+            dtype, full_scale, _ = SAMPLE_FORMATS[sample_format]
+            ring_buffer = AudioRingBuffer(capacity, dtype, full_scale)
+        self.ring_buffer = ring_buffer
+        # Буфер для перевода целых сэмплов окна во float без выделения памяти
+        self._scratch = np.empty(self.window_size, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """Сброс состояния (при перезапуске потока)"""
+        self.ring_buffer.reset()
+        # Первое окно анализируется, когда накопится полный window_size
+        self.next_frame_end = self.window_size
+        # (абсолютный индекс конца последнего блока, время его последнего сэмпла) или None;
+        # кортеж заменяется целиком, поэтому другие потоки читают согласованную пару
+        self.last_block = None
+
+    def process(self, samples, block_time):
+        """
+        Добавление блока сэмплов и анализ всех окон, которые стали полными
+
+        Args:
+            samples: Сэмплы выбранного канала (numpy array типа кольцевого буфера)
+            block_time: Время последнего сэмпла блока (timestamp)
+
+        Returns:
+            list: Кортежи (end_index, frame_time, rms) для каждого окна,
+                где end_index - абсолютный индекс конца окна, frame_time - его время
+        """
+        ring = self.ring_buffer
+        ring.write(samples)
+        self.last_block = (ring.write_index, block_time)
+
+        # Если анализ отстал больше чем на емкость буфера, пропускаем потерянные окна
+        oldest_end = ring.oldest_index + self.window_size
+        if self.next_frame_end < oldest_end:
+            skipped_hops = -(-(oldest_end - self.next_frame_end) // self.hop_size)
+            self.next_frame_end += skipped_hops * self.hop_size
+
+        frames = []
+        while self.next_frame_end <= ring.write_index:
+            end = self.next_frame_end
+            window = ring.read(end - self.window_size, self.window_size)
+            rms = window_rms(window, ring.full_scale, self._scratch)
+            frame_time = block_time - (ring.write_index - end) / self.sample_rate
+            frames.append((end, frame_time, rms))
+            self.next_frame_end += self.hop_size
+        return frames
+
+    def skip(self, samples, block_time=None):
+        """
+        Запись блока без анализа (режим простоя)
+
+        Буфер продолжает заполняться, поэтому после выхода из простоя анализ
+        возобновляется со следующего окна без ожидания нового полного окна.
+
+        Args:
+            samples: Сэмплы выбранного канала
+            block_time: Время последнего сэмпла блока (для last_block) или None
+        """
+        ring = self.ring_buffer
+        ring.write(samples)
+        if block_time is not None:
+            self.last_block = (ring.write_index, block_time)
+        if self.next_frame_end <= ring.write_index:
+            skipped_hops = (ring.write_index - self.next_frame_end) // self.hop_size + 1
+            self.next_frame_end += skipped_hops * self.hop_size
@@ -0,0 +1,203 @@
+import glob
+import os
+import struct
+import wave
+import numpy as np
+
+# Коды форматов WAV
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Директория для звуков, приведенных к частоте дискретизации движка
+SAMPLE_CACHE_DIR = '.sample_cache'
+
+# Расширения файлов, которые считаются аудио при обходе директорий
+AUDIO_EXTENSIONS = ('.opus', '.ogg', '.mp3', '.wav', '.flac', '.m4a', '.aac', '.aif', '.aiff')
+
+def collect_sources(patterns, extensions=AUDIO_EXTENSIONS):
+    """
+    Собирает список исходных файлов по путям, директориям и glob-шаблонам
+
+    Args:
+        patterns: Список путей к файлам, директориям или glob-шаблонов
+        extensions: Расширения, по которым фильтруются файлы из директорий
+
+    Returns:
+        list: Отсортированный список абсолютных путей без повторов
+    """
+    sources = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            # Рекурсивно обходим директорию
+            for dirpath, _, filenames in os.walk(pattern):
+                for name in filenames:
+                    if name.lower().endswith(extensions):
+                        sources.add(os.path.abspath(os.path.join(dirpath, name)))
+        elif os.path.isfile(pattern):
+            # Явно указанный файл берем независимо от расширения
+            sources.add(os.path.abspath(pattern))
+        else:
+            # Пробуем интерпретировать как glob-шаблон
+            for path in glob.glob(pattern, recursive=True):
+                if os.path.isfile(path) and path.lower().endswith(extensions):
+                    sources.add(os.path.abspath(path))
+    return sorted(sources)
+
+def read_wav(path):
+    """
+    Чтение WAV-файла (PCM 8/16/24/32 бит или float32/float64)
+
+    Returns:
+        tuple: (data, sample_rate), где data - float32 массив формы (frames,)
+            для моно или (frames, channels) для многоканальных файлов
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    if content[:4] != b'RIFF' or content[8:12] != b'WAVE':
+        raise ValueError(f"Файл {path} не является WAV")
+
+    fmt = None
+    data = None
+    position = 12
+    while position + 8 <= len(content):
+        chunk_id = content[position:position + 4]
+        chunk_size = struct.unpack('<I', content[position + 4:position + 8])[0]
+        body = content[position + 8:position + 8 + chunk_size]
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack('<HHIIHH', body[:16])
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                # Настоящий формат - первые два байта GUID подформата
+                fmt = (struct.unpack('<H', body[24:26])[0],) + fmt[1:]
+        elif chunk_id == b'data':
+            data = body
+        # Чанки выравниваются по четной границе
+        position += 8 + chunk_size + (chunk_size & 1)
+
+    if fmt is None or data is None:
+        raise ValueError(f"В файле {path} нет fmt или data")
+
+    format_code, channels, sample_rate, _, _, bits = fmt
+    width = bits // 8
+    frames = len(data) // (width * channels)
+    data = data[:frames * width * channels]
+
+    if format_code == WAVE_FORMAT_IEEE_FLOAT:
+        samples = np.frombuffer(data, dtype='<f4' if width == 4 else '<f8').astype(np.float32)
+    elif format_code == WAVE_FORMAT_PCM:
+        if width == 1:
+            samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif width == 3:
+            # 24 бита: собираем int32 из трех байт со знаком
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+            values = np.where(values >= 1 << 23, values - (1 << 24), values)
+            samples = values.astype(np.float32) / float(1 << 23)
+        else:
+            dtype = {2: '<i2', 4: '<i4'}[width]
+            samples = np.frombuffer(data, dtype=dtype).astype(np.float32) / float(1 << (bits - 1))
+    else:
+        raise ValueError(f"Неподдерживаемый формат WAV: {format_code}")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels)
+    return samples, sample_rate
+
+def read_wav_rate(path):
+    """Частота дискретизации WAV по заголовку, без чтения сэмплов (PCM и float)"""
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            raise ValueError(f"Файл {path} не является WAV")
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"В файле {path} нет fmt")
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+            if chunk_id == b'fmt ':
+                return struct.unpack('<HHI', f.read(8))[2]
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+def write_wav(path, data, sample_rate):
+    """Запись float-сэмплов в 16-битный PCM WAV"""
+    data = np.asarray(data, dtype=np.float32)
+    channels = 1 if data.ndim == 1 else data.shape[1]
+    pcm = (np.clip(data, -1.0, 1.0) * 32767.0).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(int(sample_rate))
+        f.writeframes(pcm.tobytes())
+
+def resample(data, src_rate, dst_rate):
+    """
+    Ресемплирование через спектр (подходит для коротких звуков)
+
+    Args:
+        data: Сэмплы формы (frames,) или (frames, channels)
+        src_rate: Исходная частота дискретизации
+        dst_rate: Целевая частота дискретизации
+
+    Returns:
+        numpy array float32 с числом кадров round(frames * dst_rate / src_rate)
+    """
+    if src_rate == dst_rate:
+        return np.asarray(data, dtype=np.float32)
+
+    data = np.asarray(data, dtype=np.float64)
+    frames = data.shape[0]
+    out_frames = int(round(frames * dst_rate / src_rate))
+
+    # Дополняем тишиной, чтобы конец звука не "заворачивался" в начало
+    pad = max(64, frames // 8)
+    padded_len = frames + pad
+    out_padded_len = int(round(padded_len * dst_rate / src_rate))
+    padded = np.zeros((padded_len,) + data.shape[1:])
+    padded[:frames] = data
+
+    spectrum = np.fft.rfft(padded, axis=0)
+    bins = out_padded_len // 2 + 1
+    resized = np.zeros((bins,) + spectrum.shape[1:], dtype=complex)
+    keep = min(bins, spectrum.shape[0])
+    resized[:keep] = spectrum[:keep]
+
+    result = np.fft.irfft(resized, n=out_padded_len, axis=0) * (out_padded_len / padded_len)
+    return result[:out_frames].astype(np.float32)
+
+def prepare_sample(path, sample_rate, cache_dir=None):
+    """
+    Путь к звуку с нужной частотой дискретизации
+
+    Ресемплирование выполняется один раз, результат кешируется рядом с исходником
+    и пересоздается только при изменении исходного файла. Актуальный кеш и файл с
+    нужной частотой возвращаются без декодирования: сначала проверяется кеш, затем
+    частота читается из заголовка.
+
+    Args:
+        path: Путь к исходному WAV
+        sample_rate: Частота дискретизации аудио-движка
+        cache_dir: Директория кеша (по умолчанию .sample_cache рядом с файлом)
+
+    Returns:
+        str: Путь к подготовленному файлу (исходный, если ресемплирование не нужно или не удалось)
+    """
+    try:
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), SAMPLE_CACHE_DIR)
+        base = os.path.splitext(os.path.basename(path))[0]
+        cached_path = os.path.join(cache_dir, f"{base}_{int(sample_rate)}.wav")
+        if os.path.exists(cached_path) and os.path.getmtime(cached_path) >= os.path.getmtime(path):
+            return cached_path
+
+        if read_wav_rate(path) == sample_rate:
+            return path
+
+        data, source_rate = read_wav(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        write_wav(cached_path, resample(data, source_rate, sample_rate), sample_rate)
+        print(f"Звук {path} приведен к частоте {sample_rate} Гц")
+        return cached_path
+    except Exception as e:
+        print(f"Ошибка подготовки звука {path}: {str(e)}")
+        return path
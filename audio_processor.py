@@ -1,40 +1,122 @@
 import numpy as np
 import pyaudio
 import threading
-import time
 import queue
+import os
+from collections import deque
+
+import instrumentation
+import realtime
+from instrumentation import PipelineMetrics
+from audio_analysis import (
+    AnalysisFramer, SAMPLE_FORMATS, DEFAULT_SAMPLE_FORMAT,
+    decode_block, encode_block, block_peak, is_onset
+)
+from monitoring_bridge import MonitoringBridge
+from monitoring_chain import MonitoringChain, DEFAULT_EFFECTS, MAX_BLOCK_SIZE
+from buffer_tuner import BufferSizeTuner
+from session_recorder import SessionRecorder, DEFAULT_RECORD_MODE
+from clocks import SYSTEM_CLOCK
+from tempo_tracker import TempoTracker
+from pitch import PitchDetector
+from chords import ChordRecognizer, CHORD_DELAY
+
+# Стандартные частоты дискретизации, которые проверяются у устройств
+STANDARD_SAMPLE_RATES = (48000, 44100, 96000, 88200, 32000, 22050)
+
+# Период снимков уровня сигнала для интерфейса (сек)
+LEVEL_CALLBACK_INTERVAL = 0.05
+# Уровень, ниже которого сигнал считается тишиной: в тишине снимки не отправляются
+LEVEL_FLOOR = 1e-3
+
+# Режим простоя: через сколько секунд без сигнала и тренировки переходить в него
+IDLE_TIMEOUT = 10.0
+# Пиковая амплитуда, которая считается сигналом (выход из простоя)
+IDLE_WAKE_LEVEL = 0.02
+# Прореживание огибающей для индикатора в простое (каждый N-й сэмпл)
+IDLE_DECIMATION = 8
+# Период снимков уровня в простое (сек)
+IDLE_LEVEL_INTERVAL = 0.25
+# Таймаут ожидания очереди потоком обработки в простое (сек)
+IDLE_QUEUE_TIMEOUT = 1.0
+# Сколько блоков для индикатора уровня может ждать в очереди; если поток обработки
+# отстает, новые блоки не ставятся в очередь (события onset ставятся всегда)
+AUDIO_QUEUE_LIMIT = 64
+
+# Высота удара: окно начинается через ONSET_PITCH_DELAY после onset (пропуск атаки)
+ONSET_PITCH_DELAY = 0.01
+ONSET_PITCH_WINDOW = 0.03
+# Нижняя частота высоты удара (Гц): чуть ниже открытой шестой струны
+ONSET_PITCH_MIN_FREQ = 75.0
+
+# Форматы сэмплов PortAudio для форматов захвата
+PA_FORMATS = {
+    'int16': pyaudio.paInt16,
+    'int24': pyaudio.paInt24,
+    'float32': pyaudio.paFloat32
+}
 
 class AudioProcessor:
-    def __init__(self, callback=None, threshold=0.1):
+    def __init__(self, callback=None, threshold=0.1, clock=None):
         """
         Инициализация обработчика аудио
         
         Args:
             callback: Функция обратного вызова, вызывается при обнаружении звука
             threshold: Порог громкости для обнаружения звука (0.0 - 1.0)
+            clock: Часы для времени блоков (по умолчанию системные; для моделирования - VirtualClock)
         """
         self.callback = callback
+        self.clock = clock or SYSTEM_CLOCK
+        self.level_callback = None  # callback(timestamp, rms) для индикатора уровня
         self.threshold = threshold
         self.is_running = False
         self.audio_queue = queue.Queue()
         self.thread = None
         
         # Параметры аудио
-        self.sample_rate = 44100  # Частота дискретизации (Гц)
+        self.sample_rate = 44100  # Частота дискретизации (Гц), уточняется по устройству при запуске
         self.block_size = 128     # Еще меньший размер блока для минимальной задержки
         self.channels = 1         # Количество каналов (моно)
         self.input_channel = 0    # Выбранный входной канал (по умолчанию первый)
+        # Формат захвата: целые сэмплы хранятся в буфере как есть и переводятся во float
+        # только там, где это нужно анализу
+        self.sample_format = DEFAULT_SAMPLE_FORMAT
         
         # Информация о последнем обнаруженном звуке
         self.last_onset_time = 0
         self.min_time_between_onsets = 0.1  # Минимальное время между обнаружениями (сек)
         self.last_rms = 0.0  # Последнее значение RMS (уровень сигнала)
+        self.last_peak = 0.0  # Пиковая амплитуда последнего блока
+        self._last_level_time = 0.0
+        self._last_level = 0.0
+        
+        # Режим простоя: без тренировки и сигнала остается только индикатор уровня
+        # по прореженной огибающей, блоки не ставятся в очередь, onset не ищется
+        self.idle = False
+        self.idle_timeout = IDLE_TIMEOUT
+        self.training_active = False
+        self._last_activity = self.clock.time()
+        
+        # Параметры анализа не зависят от размера буфера PortAudio:
+        # сигнал накапливается в кольцевом буфере и анализируется окнами с постоянным шагом
+        self.analysis_hop_size = 256      # Шаг анализа (сэмплов)
+        self.analysis_window_size = 1024  # Окно анализа (сэмплов)
+        self.framer = AnalysisFramer(self.sample_rate, self.analysis_hop_size, self.analysis_window_size,
+                                     sample_format=self.sample_format)
         
         # Параметры воспроизведения
         self.is_monitoring = False
         self.output_device = None
         self.output_stream = None
-        self.monitoring_volume = 1.0  # Громкость мониторинга всегда 100%
+        self.monitoring_volume = 1.0  # Громкость мониторинга (последнее звено цепочки эффектов)
+        # Мост между разными устройствами ввода и вывода (None - общий дуплексный поток)
+        self.monitoring_bridge = None
+        self.output_channels = 2
+        self.monitoring_latency = 0.01  # Целевая задержка моста мониторинга (сек)
+        # Цепочка эффектов мониторинга; буферы и фильтры создаются при запуске потока
+        self.monitoring_effects = dict(DEFAULT_EFFECTS)
+        self.monitoring_chain = None
         
         # Текущее устройство
         self.current_device_info = None
@@ -45,61 +127,119 @@ class AudioProcessor:
         
         # Настройки для минимизации задержки
         self.use_low_latency = True  # Флаг для включения/отключения настроек низкой задержки
+        
+        # Автоподбор размера буфера по нагрузке callback и xrun
+        self.auto_buffer_size = False
+        self.buffer_tuner = BufferSizeTuner()
+        self.on_buffer_size_stable = None  # callback(device_name, block_size) для сохранения
+        self._stable_buffer_size = None
+        
+        # Режим реального времени (Linux): приоритет и привязка потоков аудио к ядрам
+        self.realtime_mode = False
+        self.audio_cpus = None       # Ядро callback PortAudio
+        self.processing_cpus = None  # Ядра потока анализа (общие с интерфейсом)
+        self._configure_audio_thread = False
+        
+        # Запись занятия на диск (None - запись не идет)
+        self.recorder = None
+        self._record_options = None  # (path, mode, all_channels) последнего start_recording
+        self._record_part = 1        # Номер части записи (новая часть - при смене параметров потока)
+        
+        # Оценка темпа свободной игры (None - выключена)
+        self.tempo_tracker = None
+        self.tempo_callback = None  # callback(timestamp, estimate) при каждой новой оценке
+        
+        # Высота каждого удара по короткому окну после onset (None - выключена)
+        self.pitch_detector = None
+        self.pitch_callback = None  # callback(timestamp, frequency или None, clarity) для каждого onset
+        self._pending_pitch = deque()  # (абсолютный индекс начала окна, время onset)
+        
+        # Аккорд каждого удара по хроме окна после onset (None - выключено)
+        self.chord_recognizer = None
+        self.chord_callback = None  # callback(timestamp, chord или None, confidence) для каждого onset
+        self._pending_chords = deque()
+        
+        # Метрики задержек и джиттера конвейера
+        self.metrics = PipelineMetrics()
+        self._last_callback_start = None
     
     def audio_callback(self, in_data, frame_count, time_info, status):
         """Callback для PyAudio, вызывается при получении аудио-данных"""
+        callback_start = self.clock.perf_counter()
+        
+        # Поток callback создает PortAudio, настраиваем его при первом вызове
+        if self._configure_audio_thread:
+            self._configure_audio_thread = False
+            self._configure_thread('audio')
+        
+        # Джиттер: насколько интервал между вызовами отличается от длительности блока
+        if self._last_callback_start is not None:
+            interval = callback_start - self._last_callback_start
+            self.metrics.record(instrumentation.CALLBACK_JITTER, abs(interval - frame_count / self.sample_rate))
+        self._last_callback_start = callback_start
+        
+        # Флаги xrun считаем, а не печатаем из аудио-потока
         if status:
-            print(f"Статус: {status}")
+            self.metrics.record_status(status)
         
-        # Преобразуем байты в numpy array
-        audio_data = np.frombuffer(in_data, dtype=np.float32)
+        result = self._process_block(in_data, frame_count)
         
-        # Отладочная информация о входных данных только при значительном сигнале
-        if len(audio_data) > 0:
-            max_val = np.max(np.abs(audio_data))
-            if max_val > 0.1:  # Выводим только если есть значимый сигнал
-                print(f"Входные данные: мин={np.min(audio_data):.4f}, макс={np.max(audio_data):.4f}, среднее={np.mean(audio_data):.4f}")
+        duration = self.clock.perf_counter() - callback_start
+        self.metrics.record(instrumentation.CALLBACK_DURATION, duration)
+        if self.auto_buffer_size:
+            self.buffer_tuner.record(duration, frame_count / self.sample_rate, status)
+        return result
+    
+    def _process_block(self, in_data, frame_count):
+        """Обработка одного блока аудио-данных (вызывается из audio_callback)"""
+        # Сэмплы выбранного канала в формате захвата (без перевода во float)
+        channel = min(self.input_channel, self.channels - 1)
+        audio_data = decode_block(in_data, self.sample_format, self.channels, channel)
+        full_scale = self.framer.ring_buffer.full_scale
         
-        # Выбираем нужный канал, если устройство многоканальное
-        if self.channels > 1:
-            # Преобразуем одномерный массив в двумерный с каналами
-            audio_data = audio_data.reshape(-1, self.channels)
-            # Проверяем, что выбранный канал существует
-            channel = min(self.input_channel, self.channels - 1)
-            audio_data = audio_data[:, channel]
+        current_time = self.clock.time()
         
-        # Вычисляем RMS (среднеквадратичное значение) как меру громкости
-        rms = np.sqrt(np.mean(np.square(audio_data)))
+        # Запись только копирует блок в буфер, на диск его пишет отдельный поток
+        recorder = self.recorder
+        if recorder is not None:
+            if recorder.channels == 1:
+                recorder.write(audio_data, current_time)
+            else:
+                recorder.write(decode_block(in_data, self.sample_format), current_time)
         
-        # Всегда сохраняем последнее значение RMS
-        self.last_rms = rms
+        # В простое проверяем только прореженную огибающую; при появлении сигнала
+        # или начале тренировки этот же блок обрабатывается полностью
+        if self.idle:
+            envelope = block_peak(audio_data[::IDLE_DECIMATION], full_scale)
+            if envelope > IDLE_WAKE_LEVEL or self.training_active or self.tempo_tracker is not None:
+                self._exit_idle(current_time)
+            else:
+                self.framer.skip(audio_data, current_time)
+                self.last_rms = envelope
+                self._notify_level(current_time, IDLE_LEVEL_INTERVAL)
         
-        # Если громкость превышает порог и прошло достаточно времени с последнего обнаружения
-        current_time = time.time()
-        if rms > self.threshold and (current_time - self.last_onset_time) > self.min_time_between_onsets:
-            self.last_onset_time = current_time
-            # Вместо прямого вызова callback, добавляем событие в очередь
-            if self.callback:
-                self.audio_queue.put(("onset", current_time, rms))
+        if not self.idle:
+            self._analyze_block(audio_data, full_scale, current_time)
         
-        # Помещаем данные в очередь для обработки в отдельном потоке
-        self.audio_queue.put(("audio_data", audio_data, current_time))
+        # Разные устройства: обработанные сэмплы уходят в мост, вывод идет из своего потока
+        bridge = self.monitoring_bridge
+        chain = self.monitoring_chain
+        if bridge is not None:
+            if chain is not None:
+                bridge.write(chain.process(audio_data, full_scale))
+            elif full_scale != 1.0:
+                bridge.write(np.multiply(audio_data, np.float32(1.0 / full_scale), dtype=np.float32))
+            else:
+                bridge.write(audio_data)
         
         # Если включен мониторинг, подготавливаем данные для воспроизведения
-        if self.is_monitoring:
+        if self.is_monitoring and bridge is None:
             try:
-                # Применяем громкость мониторинга (всегда 100%)
-                output_data = audio_data
-                
-                # Определяем количество каналов для вывода
-                output_channels = 2  # По умолчанию стерео
-                
-                # Если выходной поток многоканальный, дублируем сигнал на все каналы
-                if output_channels > 1 and len(output_data.shape) == 1:
-                    output_data = np.tile(output_data.reshape(-1, 1), (1, output_channels)).flatten()
-                
-                # Возвращаем данные для воспроизведения
-                return (output_data.astype(np.float32).tobytes(), pyaudio.paContinue)
+                # Дуплексный поток выводит в формате захвата на столько же каналов,
+                # сколько захватывает
+                if chain is not None:
+                    return (chain.interleave(chain.process(audio_data, full_scale)), pyaudio.paContinue)
+                return (encode_block(audio_data, self.sample_format, self.channels), pyaudio.paContinue)
             except Exception as e:
                 print(f"Ошибка подготовки данных для воспроизведения: {str(e)}")
                 import traceback
@@ -115,30 +255,105 @@ class AudioProcessor:
             output_channels = 2  # По умолчанию стерео
             
         # Возвращаем тишину
-        return (b'\x00' * frame_count * 4 * output_channels, pyaudio.paContinue)
+        sample_width = SAMPLE_FORMATS[self.sample_format][2]
+        return (b'\x00' * frame_count * sample_width * output_channels, pyaudio.paContinue)
+    
+    def _analyze_block(self, audio_data, full_scale, current_time):
+        """Полная обработка блока: окна анализа, onset и очередь событий"""
+        # Пик блока нужен для выхода из простоя; вывода в консоль в потоке аудио нет
+        self.last_peak = block_peak(audio_data, full_scale)
+        
+        # Анализируем все окна, которые стали полными после этого блока
+        tracker = self.tempo_tracker
+        for end_index, frame_time, rms in self.framer.process(audio_data, current_time):
+            # Всегда сохраняем последнее значение RMS
+            self.last_rms = rms
+            
+            # Огибающая для оценки темпа только записывается, считается она в потоке обработки
+            if tracker is not None:
+                tracker.add_frame(rms)
+            
+            # Если громкость превышает порог и прошло достаточно времени с последнего обнаружения
+            if is_onset(rms, frame_time, self.last_onset_time, self.threshold, self.min_time_between_onsets):
+                self.last_onset_time = frame_time
+                # Вместо прямого вызова callback, добавляем событие в очередь
+                if (self.callback or tracker is not None or self.pitch_detector is not None
+                        or self.chord_recognizer is not None):
+                    self.audio_queue.put(("onset", frame_time, rms, end_index))
+        
+        # Помещаем данные в очередь для обработки в отдельном потоке
+        depth = self.audio_queue.qsize()
+        if depth < AUDIO_QUEUE_LIMIT:
+            self.audio_queue.put(("audio_data", audio_data, current_time))
+            depth += 1
+        else:
+            self.metrics.increment(instrumentation.QUEUE_DROPPED)
+        self.metrics.record(instrumentation.QUEUE_DEPTH, depth)
+        
+        # Сигнал, тренировка или свободная игра откладывают переход в простой
+        if self.last_peak > IDLE_WAKE_LEVEL or self.training_active or tracker is not None:
+            self._last_activity = current_time
+        elif current_time - self._last_activity > self.idle_timeout:
+            self._enter_idle()
+    
+    def _enter_idle(self):
+        """Переход в режим простоя (из audio_callback)"""
+        self.idle = True
+        self.metrics.increment('idle.enter')
+        self.metrics.set_gauge('idle', True)
+    
+    def _exit_idle(self, current_time):
+        """Выход из режима простоя (из audio_callback)"""
+        self.idle = False
+        self._last_activity = current_time
+        self.metrics.set_gauge('idle', False)
+    
+    def set_training_active(self, active):
+        """
+        Признак идущей тренировки: во время тренировки простой не наступает,
+        а начало тренировки выводит из простоя со следующего блока
+        """
+        self.training_active = bool(active)
+        self._last_activity = self.clock.time()
+        if active:
+            self.idle = False
+            self.metrics.set_gauge('idle', False)
+    
+    def output_callback(self, in_data, frame_count, time_info, status):
+        """Callback потока вывода при мониторинге через мост"""
+        if status:
+            self.metrics.record_status(status)
+        
+        bridge = self.monitoring_bridge
+        if bridge is None:
+            return (b'\x00' * frame_count * 4 * self.output_channels, pyaudio.paContinue)
+        
+        output_data = bridge.read(frame_count)
+        chain = self.monitoring_chain
+        if chain is not None:
+            output_bytes = chain.interleave(output_data)
+        elif self.output_channels > 1:
+            output_bytes = np.repeat(output_data, self.output_channels).tobytes()
+        else:
+            output_bytes = output_data.tobytes()
+        
+        self.metrics.set_gauge(instrumentation.MONITOR_LATENCY, round(1000.0 * bridge.latency, 2))
+        self.metrics.set_gauge(instrumentation.MONITOR_CORRECTION, round(bridge.correction_ppm, 1))
+        self.metrics.set_gauge(instrumentation.MONITOR_UNDERRUNS, bridge.underruns)
+        self.metrics.set_gauge(instrumentation.MONITOR_OVERRUNS, bridge.overruns)
+        return (output_bytes, pyaudio.paContinue)
     
     def process_audio_thread(self):
         """Поток обработки аудио"""
+        if self.realtime_mode:
+            self._configure_thread('processing')
+        
         while self.is_running:
             try:
-                # Получаем данные из очереди с таймаутом
-                event = self.audio_queue.get(timeout=0.1)
-                
-                # Обрабатываем разные типы событий
-                if event[0] == "onset" and self.callback:
-                    # Событие обнаружения звука
-                    timestamp, rms = event[1], event[2]
-                    try:
-                        self.callback(timestamp, rms)
-                    except Exception as e:
-                        print(f"Ошибка в callback: {str(e)}")
-                        import traceback
-                        traceback.print_exc()
-                elif event[0] == "audio_data":
-                    # Обычные аудио данные
-                    audio_data, timestamp = event[1], event[2]
-                    # Здесь можно выполнить дополнительную обработку аудио
-                
+                # Получаем данные из очереди с таймаутом; в простое очередь пуста,
+                # поэтому поток просыпается редко
+                event = self.audio_queue.get(timeout=IDLE_QUEUE_TIMEOUT if self.idle else 0.1)
+                self._handle_event(event)
                 self.audio_queue.task_done()
             except queue.Empty:
                 pass
@@ -147,6 +362,178 @@ class AudioProcessor:
                 import traceback
                 traceback.print_exc()
     
+    def process_pending(self):
+        """
+        Обработка всех событий очереди в текущем потоке (моделирование без потока обработки)
+        
+        Returns:
+            int: Количество обработанных событий
+        """
+        count = 0
+        while True:
+            try:
+                event = self.audio_queue.get_nowait()
+            except queue.Empty:
+                return count
+            self._handle_event(event)
+            self.audio_queue.task_done()
+            count += 1
+    
+    def _handle_event(self, event):
+        """Обработка одного события очереди"""
+        if event[0] == "onset":
+            # Событие обнаружения звука
+            timestamp, rms = event[1], event[2]
+            self.metrics.record(instrumentation.QUEUE_DWELL, self.clock.time() - timestamp)
+            self.record_event('onset', timestamp, rms)
+            tracker = self.tempo_tracker
+            if tracker is not None:
+                tracker.add_onset(timestamp)
+            # Окна высоты и аккорда отсчитываются от последнего шага анализа, где сработал onset
+            onset_index = event[3] - self.analysis_hop_size
+            if self.pitch_detector is not None:
+                self._pending_pitch.append((onset_index + int(ONSET_PITCH_DELAY * self.sample_rate), timestamp))
+                self._update_pitch()
+            if self.chord_recognizer is not None:
+                self._pending_chords.append((onset_index + int(CHORD_DELAY * self.sample_rate), timestamp))
+            if not self.callback:
+                return
+            try:
+                self.callback(timestamp, rms)
+            except Exception as e:
+                print(f"Ошибка в callback: {str(e)}")
+                import traceback
+                traceback.print_exc()
+        elif event[0] == "audio_data":
+            # Обычные аудио данные
+            audio_data, timestamp = event[1], event[2]
+            self.metrics.record(instrumentation.QUEUE_DWELL, self.clock.time() - timestamp)
+            self._notify_level(timestamp)
+            self._update_tempo(timestamp)
+            self._update_pitch()
+            self._update_chords()
+    
+    def _onset_windows(self, pending, analyze, size, out):
+        """
+        Анализ окон после onset, которые уже целиком записаны в кольцевой буфер
+        
+        Args:
+            pending: Очередь (абсолютный индекс начала окна, время onset)
+            analyze: Функция анализа окна из size сэмплов float
+            size: Длина окна (сэмплов)
+            out: Буфер float32 для чтения окна
+        
+        Yields:
+            tuple: (время onset, результат analyze или None, если окно перезаписано)
+        """
+        ring = self.framer.ring_buffer
+        while pending and pending[0][0] + size <= ring.write_index:
+            start, timestamp = pending.popleft()
+            result = None
+            # Окно, которое аудио-поток успел перезаписать, не анализируется
+            if ring.is_valid(start):
+                result = analyze(ring.read_float(start, size, out=out))
+                if not ring.is_valid(start):
+                    result = None
+            yield timestamp, result
+    
+    def _update_pitch(self):
+        """Высота ударов, окна которых уже записаны"""
+        detector = self.pitch_detector
+        if detector is None or not self._pending_pitch:
+            return
+        for timestamp, result in self._onset_windows(self._pending_pitch, detector.detect,
+                                                     detector.frame_size, detector.frame):
+            if self.pitch_callback is None:
+                continue
+            frequency, clarity = result if result is not None else (None, 0.0)
+            try:
+                self.pitch_callback(timestamp, frequency, clarity)
+            except Exception as e:
+                print(f"Ошибка в pitch_callback: {str(e)}")
+    
+    def _update_chords(self):
+        """Аккорды ударов, окна которых уже записаны"""
+        recognizer = self.chord_recognizer
+        if recognizer is None or not self._pending_chords:
+            return
+        for timestamp, result in self._onset_windows(self._pending_chords, recognizer.recognize,
+                                                     recognizer.frame_size, recognizer.frame):
+            if self.chord_callback is None:
+                continue
+            chord, confidence = result if result is not None else (None, 0.0)
+            try:
+                self.chord_callback(timestamp, chord, confidence)
+            except Exception as e:
+                print(f"Ошибка в chord_callback: {str(e)}")
+    
+    def _update_tempo(self, timestamp):
+        """Обработка накопленной огибающей и отправка новой оценки темпа"""
+        tracker = self.tempo_tracker
+        if tracker is None:
+            return
+        estimate = tracker.update(timestamp)
+        if estimate is not None and self.tempo_callback is not None:
+            try:
+                self.tempo_callback(timestamp, estimate)
+            except Exception as e:
+                print(f"Ошибка в tempo_callback: {str(e)}")
+    
+    def set_tempo_tracking(self, enabled):
+        """
+        Включение оценки темпа свободной игры
+        
+        Пока оценка включена, обработка не уходит в простой.
+        """
+        if enabled:
+            self.tempo_tracker = TempoTracker(self.sample_rate / self.analysis_hop_size)
+            self.idle = False
+            self.metrics.set_gauge('idle', False)
+        else:
+            self.tempo_tracker = None
+        self._last_activity = self.clock.time()
+    
+    def set_pitch_tracking(self, enabled):
+        """
+        Включение определения высоты каждого удара
+        
+        Высота считается в потоке обработки по окну ONSET_PITCH_WINDOW из кольцевого
+        буфера анализа, как только оно записано; результат уходит в pitch_callback.
+        """
+        self._pending_pitch.clear()
+        if enabled:
+            self.pitch_detector = PitchDetector(self.sample_rate, min_freq=ONSET_PITCH_MIN_FREQ,
+                                                window_seconds=ONSET_PITCH_WINDOW)
+        else:
+            self.pitch_detector = None
+    
+    def set_chord_recognition(self, enabled):
+        """
+        Включение определения аккорда каждого удара
+        
+        Хрома считается в потоке обработки по окну CHORD_WINDOW после onset; аккорд
+        и сходство уходят в chord_callback со временем этого onset.
+        """
+        self._pending_chords.clear()
+        self.chord_recognizer = ChordRecognizer(self.sample_rate) if enabled else None
+    
+    def _notify_level(self, timestamp, interval=LEVEL_CALLBACK_INTERVAL):
+        """Снимок уровня сигнала для интерфейса не чаще, чем раз в interval секунд"""
+        if self.level_callback is None or timestamp - self._last_level_time < interval:
+            return
+        
+        # В тишине отправляем только переход к нулю, чтобы интерфейс мог заснуть
+        level = self.last_rms
+        if level < LEVEL_FLOOR and self._last_level < LEVEL_FLOOR:
+            return
+        
+        self._last_level_time = timestamp
+        self._last_level = level
+        try:
+            self.level_callback(timestamp, level)
+        except Exception as e:
+            print(f"Ошибка в level_callback: {str(e)}")
+    
     def detect_onset(self, audio_data, timestamp):
         """
         Обнаружение начала звука (onset detection)
@@ -163,7 +550,7 @@ class AudioProcessor:
         
         # Если громкость превышает порог и прошло достаточно времени с последнего обнаружения
         current_time = timestamp
-        if rms > self.threshold and (current_time - self.last_onset_time) > self.min_time_between_onsets:
+        if is_onset(rms, current_time, self.last_onset_time, self.threshold, self.min_time_between_onsets):
             self.last_onset_time = current_time
             
             # Вызываем callback, если он задан
@@ -177,6 +564,12 @@ class AudioProcessor:
         
         self.is_running = True
         
+        # Ядра для потоков аудио; сами потоки настраиваются при старте
+        if self.realtime_mode:
+            self.audio_cpus, self.processing_cpus = realtime.plan_affinity()
+            self._configure_audio_thread = True
+        self.metrics.set_info('realtime', self.realtime_mode)
+        
         # Запускаем поток обработки
         self.thread = threading.Thread(target=self.process_audio_thread)
         self.thread.daemon = True
@@ -204,9 +597,20 @@ class AudioProcessor:
                 print(f"Предупреждение: канал {self.input_channel} не существует, используем канал 0")
                 self.input_channel = 0
             
+            # Открываем поток на родной частоте устройства, чтобы ОС не вставляла ресемплер
+            self.sample_rate = self.negotiate_sample_rate(self.current_device_info)
+            
+            # Если устройство не поддерживает выбранный формат, захватываем во float32
+            if not self.is_sample_format_supported(self.current_device_info, self.sample_format):
+                print(f"Предупреждение: формат {self.sample_format} не поддерживается устройством, используем float32")
+                self.sample_format = 'float32'
+            
+            # Сбрасываем окна анализа под текущие параметры
+            self._reset_analysis()
+            
             # Базовые параметры для потока
             stream_params = {
-                'format': pyaudio.paFloat32,
+                'format': PA_FORMATS[self.sample_format],
                 'channels': self.channels,
                 'rate': self.sample_rate,
                 'input': True,
@@ -221,11 +625,19 @@ class AudioProcessor:
             self.stream = self.p.open(**stream_params)
             
             self.stream.start_stream()
-            print(f"Захват аудио запущен (устройство: {self.current_device_info['name']}, канал: {self.input_channel}, размер буфера: {self.block_size})")
+            self._last_callback_start = None
+            self._last_activity = self.clock.time()
+            self.idle = False
+            self.buffer_tuner.reset(self.block_size)
+            self._update_metrics_info()
+            print(f"Захват аудио запущен (устройство: {self.current_device_info['name']}, канал: {self.input_channel}, размер буфера: {self.block_size}, частота: {self.sample_rate} Гц)")
             
             # Запускаем поток воспроизведения, если включен мониторинг
             if self.is_monitoring:
                 self.start_monitoring()
+            
+            # Запись продолжается, когда частота уже окончательно согласована с выводом
+            self._resume_recording()
                 
         except Exception as e:
             self.is_running = False
@@ -233,6 +645,47 @@ class AudioProcessor:
             import traceback
             traceback.print_exc()
     
+    def _reset_analysis(self):
+        """Пересоздание окон анализа под текущую частоту дискретизации и размеры окна"""
+        self.framer = AnalysisFramer(self.sample_rate, self.analysis_hop_size, self.analysis_window_size,
+                                     sample_format=self.sample_format)
+        self.last_onset_time = 0
+        if self.tempo_tracker is not None:
+            self.tempo_tracker = TempoTracker(self.sample_rate / self.analysis_hop_size)
+        if self.pitch_detector is not None:
+            self.set_pitch_tracking(True)
+        if self.chord_recognizer is not None:
+            self.set_chord_recognition(True)
+    
+    def _configure_thread(self, role):
+        """
+        Приоритет и привязка к ядрам текущего потока аудио с записью результата в метрики
+        
+        SCHED_FIFO и отдельное ядро получает только callback PortAudio ('audio'): поток
+        анализа ('processing') с БПФ, YIN и хромой работает с пониженным nice на
+        остальных ядрах и не может задержать callback.
+        """
+        if role == 'audio':
+            policy = realtime.set_thread_realtime()
+            cpus = realtime.pin_thread(self.audio_cpus)
+        else:
+            policy = realtime.set_thread_nice()
+            cpus = realtime.pin_thread(self.processing_cpus)
+        self.metrics.set_info(f'realtime.{role}_thread', f'{policy}, ядра: {cpus}')
+    
+    def _update_metrics_info(self):
+        """Сведения о текущей конфигурации для экспорта метрик"""
+        if self.current_device_info:
+            self.metrics.set_info('input_device', self.current_device_info.get('name'))
+        self.metrics.set_info('sample_rate', self.sample_rate)
+        self.metrics.set_info('block_size', self.block_size)
+        self.metrics.set_info('auto_buffer_size', self.auto_buffer_size)
+        self.metrics.set_info('channels', self.channels)
+        self.metrics.set_info('sample_format', self.sample_format)
+        self.metrics.set_info('analysis_hop_size', self.analysis_hop_size)
+        self.metrics.set_info('analysis_window_size', self.analysis_window_size)
+        self.metrics.set_gauge('callback.budget_ms', round(1000.0 * self.block_size / self.sample_rate, 3))
+    
     def stop(self):
         """Остановка обработки аудио"""
         if not self.is_running:
@@ -240,6 +693,9 @@ class AudioProcessor:
         
         self.is_running = False
         
+        # Запись переживает перезапуск потока: пауза станет тишиной (см. _resume_recording)
+        self._pause_recording()
+        
         # Останавливаем поток захвата аудио
         if self.stream:
             self.stream.stop_stream()
@@ -249,12 +705,107 @@ class AudioProcessor:
         # Останавливаем поток воспроизведения
         self.stop_monitoring()
         
-        # Ждем завершения потока обработки
+        # Ждем завершения потока обработки (будим его, если он ждет очередь в простое)
         if self.thread and self.thread.is_alive():
+            self.audio_queue.put(("stop",))
             self.thread.join(timeout=1.0)
         
         print("Захват аудио остановлен")
     
+    def start_recording(self, path, mode=DEFAULT_RECORD_MODE, all_channels=False):
+        """
+        Запуск записи выбранного канала (или всех каналов) и событий в файл
+        
+        Args:
+            path: Путь к WAV-файлу
+            mode: Способ записи ('wav' или 'memmap')
+            all_channels: Записывать все входные каналы, а не только выбранный
+        
+        Returns:
+            SessionRecorder или None, если запись не удалось начать
+        """
+        if not self.is_running:
+            print("Ошибка: запись возможна только при запущенном захвате аудио")
+            return None
+        
+        self.stop_recording()
+        recorder = self._create_recorder(path, mode, all_channels)
+        if recorder is not None:
+            self._record_options = (path, mode, all_channels)
+            self._record_part = 1
+        return recorder
+    
+    def _create_recorder(self, path, mode, all_channels):
+        """Запуск SessionRecorder под текущие частоту, формат и каналы потока"""
+        try:
+            recorder = SessionRecorder(path, self.sample_rate,
+                                       channels=self.channels if all_channels else 1,
+                                       sample_format=self.sample_format, mode=mode)
+            recorder.start()
+        except Exception as e:
+            print(f"Ошибка запуска записи: {str(e)}")
+            return None
+        
+        # С этого блока audio_callback начинает копировать сэмплы в буфер записи
+        self.recorder = recorder
+        print(f"Запись занятия: {path}")
+        return recorder
+    
+    def _pause_recording(self):
+        """Пауза записи перед закрытием потока ввода (блоки до _resume_recording не пишутся)"""
+        if self.recorder is not None:
+            self.recorder.pause()
+    
+    def _resume_recording(self):
+        """
+        Продолжение записи после переоткрытия потока ввода (start, запуск и остановка
+        дуплексного мониторинга)
+        
+        Если частота, формат или количество каналов не изменились, запись продолжается
+        в тот же файл; иначе текущий файл закрывается и запись идет в следующую часть
+        (path_2.wav, path_3.wav, ...) с новыми параметрами.
+        """
+        recorder = self.recorder
+        if recorder is None:
+            return
+        path, mode, all_channels = self._record_options
+        channels = self.channels if all_channels else 1
+        if (recorder.sample_rate == self.sample_rate and recorder.sample_format == self.sample_format
+                and recorder.channels == channels):
+            recorder.resume()
+            return
+        
+        self.stop_recording()
+        self._record_part += 1
+        base, ext = os.path.splitext(path)
+        self._create_recorder(f"{base}_{self._record_part}{ext}", mode, all_channels)
+    
+    def stop_recording(self):
+        """
+        Остановка записи
+        
+        Returns:
+            SessionRecorder или None, если запись не шла
+        """
+        recorder = self.recorder
+        if recorder is None:
+            return None
+        
+        self.recorder = None
+        try:
+            recorder.stop()
+            self.metrics.set_gauge('recorder.dropped_frames', recorder.dropped_frames)
+            print(f"Запись сохранена: {recorder.path} ({recorder.duration:.1f} сек)")
+        except Exception as e:
+            print(f"Ошибка остановки записи: {str(e)}")
+        return recorder
+    
+    def record_event(self, kind, timestamp, value=0.0):
+        """Событие для записи занятия ('onset', 'beat'), если запись идет"""
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.add_event(kind, timestamp, value)
+    
     def set_threshold(self, threshold):
         """Установка порога громкости"""
         self.threshold = max(0.0, min(1.0, threshold))
@@ -277,6 +828,124 @@ class AudioProcessor:
                 devices.append(device_info)
         return devices
     
+    def get_supported_sample_rates(self, device_info, is_input=True):
+        """
+        Частоты дискретизации, поддерживаемые устройством
+        
+        Args:
+            device_info: Информация об устройстве (от PyAudio)
+            is_input: Проверять как устройство ввода (иначе - вывода)
+        
+        Returns:
+            list: Поддерживаемые частоты из STANDARD_SAMPLE_RATES
+        """
+        rates = []
+        for rate in STANDARD_SAMPLE_RATES:
+            if is_input:
+                kwargs = {
+                    'input_device': int(device_info['index']),
+                    'input_channels': max(1, int(device_info.get('maxInputChannels', 1))),
+                    'input_format': PA_FORMATS[self.sample_format]
+                }
+            else:
+                kwargs = {
+                    'output_device': int(device_info['index']),
+                    'output_channels': max(1, min(2, int(device_info.get('maxOutputChannels', 2)))),
+                    'output_format': pyaudio.paFloat32
+                }
+            try:
+                # PyAudio сообщает о неподдерживаемой частоте исключением ValueError
+                if self.p.is_format_supported(rate, **kwargs):
+                    rates.append(rate)
+            except ValueError:
+                pass
+            except Exception as e:
+                print(f"Ошибка проверки частоты {rate} Гц для {device_info.get('name')}: {str(e)}")
+        return rates
+    
+    def negotiate_sample_rate(self, input_device_info, output_device_info=None):
+        """
+        Выбор частоты дискретизации для потока
+        
+        Предпочтение отдается родной частоте устройства ввода (defaultSampleRate),
+        если ее поддерживает и устройство вывода; иначе - первой общей частоте.
+        
+        Returns:
+            int: Частота дискретизации (Гц)
+        """
+        native = int(input_device_info.get('defaultSampleRate') or self.sample_rate)
+        input_rates = self.get_supported_sample_rates(input_device_info, is_input=True)
+        output_rates = None
+        if output_device_info is not None:
+            output_rates = self.get_supported_sample_rates(output_device_info, is_input=False)
+        
+        candidates = [native]
+        if output_device_info is not None and output_device_info.get('defaultSampleRate'):
+            candidates.append(int(output_device_info['defaultSampleRate']))
+        candidates += [rate for rate in STANDARD_SAMPLE_RATES if rate not in candidates]
+        
+        for rate in candidates:
+            if input_rates and rate not in input_rates:
+                continue
+            if output_rates and rate not in output_rates:
+                continue
+            return rate
+        
+        # Если устройство ничего не сообщило, используем его родную частоту
+        return native
+    
+    def is_sample_format_supported(self, device_info, sample_format):
+        """Проверка поддержки формата захвата устройством на текущей частоте"""
+        if sample_format == 'float32':
+            return True
+        try:
+            return bool(self.p.is_format_supported(
+                self.sample_rate,
+                input_device=int(device_info['index']),
+                input_channels=max(1, int(device_info.get('maxInputChannels', 1))),
+                input_format=PA_FORMATS[sample_format]
+            ))
+        except ValueError:
+            return False
+        except Exception as e:
+            print(f"Ошибка проверки формата {sample_format}: {str(e)}")
+            return False
+    
+    def set_sample_format(self, sample_format):
+        """
+        Установка формата захвата (int16, int24 или float32)
+        
+        Args:
+            sample_format: Ключ SAMPLE_FORMATS
+        """
+        if sample_format not in SAMPLE_FORMATS:
+            print(f"Ошибка: неизвестный формат захвата {sample_format}")
+            return False
+        
+        was_running = self.is_running
+        
+        # Останавливаем, если запущено
+        if was_running:
+            self.stop()
+        
+        self.sample_format = sample_format
+        self._reset_analysis()
+        print(f"Установлен формат захвата: {sample_format}")
+        
+        # Перезапускаем, если было запущено
+        if was_running:
+            self.start()
+        
+        return True
+    
+    def _apply_sample_rate(self, sample_rate):
+        """Смена частоты дискретизации с пересозданием окон анализа"""
+        if sample_rate != self.sample_rate:
+            print(f"Частота дискретизации: {self.sample_rate} -> {sample_rate} Гц")
+            self.sample_rate = sample_rate
+            self._reset_analysis()
+            self._update_metrics_info()
+    
     def get_device_channels(self, device_id):
         """Получение количества каналов устройства"""
         try:
@@ -342,8 +1011,26 @@ class AudioProcessor:
     def set_monitoring_volume(self, volume):
         """Установка громкости мониторинга"""
         self.monitoring_volume = max(0.0, min(1.0, volume))
+        if self.monitoring_chain is not None:
+            self.monitoring_chain.volume = self.monitoring_volume
         print(f"Громкость мониторинга установлена на {self.monitoring_volume:.2f}")
     
+    def set_monitoring_effects(self, **effects):
+        """Изменение параметров эффектов мониторинга (ключи DEFAULT_EFFECTS)"""
+        self.monitoring_effects.update(effects)
+        if self.monitoring_chain is not None:
+            self.monitoring_chain.configure(**effects)
+    
+    def _create_monitoring_chain(self, sample_rate, output_channels, sample_format):
+        """Цепочка эффектов под параметры нового потока (буферы выделяются здесь, а не в callback)"""
+        self.monitoring_chain = MonitoringChain(
+            sample_rate, output_channels, sample_format,
+            max_block=max(self.block_size, MAX_BLOCK_SIZE),
+            effects=self.monitoring_effects,
+            volume=self.monitoring_volume,
+            metrics=self.metrics
+        )
+    
     def set_monitoring(self, enabled):
         """Установка мониторинга звука"""
         print(f"Установка мониторинга: {enabled}")
@@ -390,6 +1077,24 @@ class AudioProcessor:
             if output_channels <= 0:
                 print(f"Ошибка: устройство {output_device_info['name']} не имеет выходных каналов")
                 return False
+            self.output_channels = min(2, output_channels)
+        except Exception as e:
+            print(f"Ошибка запуска мониторинга звука: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+        
+        # У разных устройств независимые тактовые генераторы - дуплексный поток
+        # через них либо не откроется, либо будет накапливать xrun
+        if int(output_device_info['index']) != int(self.current_device_info['index']):
+            return self._start_bridged_monitoring(output_device_info)
+        return self._start_duplex_monitoring(output_device_info)
+    
+    def _start_duplex_monitoring(self, output_device_info):
+        """Мониторинг через общий дуплексный поток (одно устройство ввода и вывода)"""
+        try:
+            # Запись приостанавливается, пока поток переоткрывается (частота может измениться)
+            self._pause_recording()
             
             # Закрываем предыдущий поток, если он существует
             if hasattr(self, 'stream') and self.stream:
@@ -397,12 +1102,12 @@ class AudioProcessor:
                 self.stream.close()
                 self.stream = None
             
-            # Создаем поток вывода
-            output_channels = min(2, output_device_info.get('maxOutputChannels', 2))
+            # Общая частота дискретизации для устройств ввода и вывода
+            self._apply_sample_rate(self.negotiate_sample_rate(self.current_device_info, output_device_info))
             
             # Базовые параметры для потока
             stream_params = {
-                'format': pyaudio.paFloat32,
+                'format': PA_FORMATS[self.sample_format],
                 'channels': self.channels,
                 'rate': self.sample_rate,
                 'input': True,
@@ -416,9 +1121,12 @@ class AudioProcessor:
             
             # Создаем новый поток ввода с выводом
             self.stream = self.p.open(**stream_params)
+            self._create_monitoring_chain(self.sample_rate, self.channels, self.sample_format)
             
             self.stream.start_stream()
+            self._last_callback_start = None
             self.is_monitoring = True
+            self._resume_recording()
             print(f"Мониторинг звука запущен (устройство ввода: {self.current_device_info['name']}, устройство вывода: {output_device_info['name']})")
             return True
         except Exception as e:
@@ -426,11 +1134,13 @@ class AudioProcessor:
             import traceback
             traceback.print_exc()
             
+            self.monitoring_chain = None
+            
             # Восстанавливаем поток ввода
             try:
                 # Базовые параметры для потока
                 stream_params = {
-                    'format': pyaudio.paFloat32,
+                    'format': PA_FORMATS[self.sample_format],
                     'channels': self.channels,
                     'rate': self.sample_rate,
                     'input': True,
@@ -443,6 +1153,7 @@ class AudioProcessor:
                 
                 self.stream = self.p.open(**stream_params)
                 self.stream.start_stream()
+                self._resume_recording()
             except Exception as e2:
                 print(f"Ошибка восстановления потока ввода: {str(e2)}")
                 import traceback
@@ -451,26 +1162,100 @@ class AudioProcessor:
             self.is_monitoring = False
             return False
     
+    def _start_bridged_monitoring(self, output_device_info):
+        """
+        Мониторинг через мост: поток ввода продолжает работать как есть,
+        отдельный поток вывода читает сэмплы из моста с подстройкой частоты
+        """
+        try:
+            # Устройство вывода открывается на своей родной частоте, разницу номиналов
+            # и дрейф генераторов компенсирует коэффициент ресемплирования моста
+            output_rate = self.negotiate_output_sample_rate(output_device_info)
+            self.monitoring_bridge = MonitoringBridge(
+                self.sample_rate, output_rate,
+                block_size=self.block_size,
+                target_latency=self.monitoring_latency
+            )
+            # Эффекты считаются на стороне ввода, вывод только раскладывает по каналам
+            self._create_monitoring_chain(self.sample_rate, self.output_channels, 'float32')
+            
+            self.output_stream = self.p.open(
+                format=pyaudio.paFloat32,
+                channels=self.output_channels,
+                rate=output_rate,
+                input=False,
+                output=True,
+                output_device_index=int(output_device_info['index']),
+                frames_per_buffer=self.block_size,
+                stream_callback=self.output_callback,
+                start=False
+            )
+            self.output_stream.start_stream()
+            self.is_monitoring = True
+            self.metrics.set_info('output_device', output_device_info.get('name'))
+            self.metrics.set_info('output_sample_rate', output_rate)
+            print(f"Мониторинг звука запущен через мост (устройство ввода: {self.current_device_info['name']}, {self.sample_rate} Гц; "
+                  f"устройство вывода: {output_device_info['name']}, {output_rate} Гц; "
+                  f"задержка: {1000.0 * self.monitoring_bridge.target_fill / self.sample_rate:.1f} мс)")
+            return True
+        except Exception as e:
+            print(f"Ошибка запуска мониторинга через мост: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            self._close_output_stream()
+            self.monitoring_bridge = None
+            self.monitoring_chain = None
+            self.is_monitoring = False
+            return False
+    
+    def negotiate_output_sample_rate(self, output_device_info):
+        """Частота для отдельного потока вывода: родная частота устройства, если поддерживается"""
+        native = int(output_device_info.get('defaultSampleRate') or self.sample_rate)
+        rates = self.get_supported_sample_rates(output_device_info, is_input=False)
+        if not rates or native in rates:
+            return native
+        # Предпочитаем частоту ввода, чтобы обойтись без изменения номинала
+        return self.sample_rate if self.sample_rate in rates else rates[0]
+    
+    def _close_output_stream(self):
+        """Закрытие отдельного потока вывода"""
+        if self.output_stream:
+            try:
+                self.output_stream.stop_stream()
+                self.output_stream.close()
+            except Exception as e:
+                print(f"Ошибка закрытия потока вывода: {str(e)}")
+            self.output_stream = None
+    
     def stop_monitoring(self):
         """Остановка мониторинга звука"""
         if not self.is_monitoring:
             return False
         
+        # При мониторинге через мост поток ввода не меняется, закрываем только вывод
+        if self.monitoring_bridge is not None:
+            self._close_output_stream()
+            self.monitoring_bridge = None
+            self.monitoring_chain = None
+            self.is_monitoring = False
+            print("Мониторинг звука остановлен")
+            return False
+        
+        self.monitoring_chain = None
+        self._pause_recording()
+        
         # Останавливаем текущий поток
         if self.stream and self.stream.is_active():
             self.stream.stop_stream()
             self.stream.close()
             self.stream = None
         
-        # Закрываем поток вывода, если он существует
-        if hasattr(self, 'output_stream') and self.output_stream:
-            self.output_stream.stop_stream()
-            self.output_stream.close()
-            self.output_stream = None
+        # Без вывода возвращаемся к родной частоте устройства ввода
+        self._apply_sample_rate(self.negotiate_sample_rate(self.current_device_info))
         
         # Базовые параметры для потока
         stream_params = {
-            'format': pyaudio.paFloat32,
+            'format': PA_FORMATS[self.sample_format],
             'channels': self.channels,
             'rate': self.sample_rate,
             'input': True,
@@ -491,6 +1276,10 @@ class AudioProcessor:
             traceback.print_exc()
             self.is_running = False
         
+        # При остановке захвата (из stop) запись продолжится только в start
+        if self.is_running:
+            self._resume_recording()
+        
         self.is_monitoring = False
         print("Мониторинг звука остановлен")
         return False
@@ -498,6 +1287,7 @@ class AudioProcessor:
     def __del__(self):
         """Деструктор класса"""
         self.stop()
+        self.stop_recording()
         if hasattr(self, 'p'):
             self.p.terminate()
 
@@ -523,6 +1313,64 @@ class AudioProcessor:
         
         return True
     
+    def set_auto_buffer_size(self, enabled, start_size=None):
+        """
+        Включение автоподбора размера буфера
+        
+        Args:
+            enabled: True - подбирать размер буфера по нагрузке
+            start_size: Начальный размер (сохраненный для устройства), по умолчанию наименьший
+        """
+        self.auto_buffer_size = bool(enabled)
+        self._stable_buffer_size = None
+        if not enabled:
+            print("Автоподбор размера буфера выключен")
+            return True
+        
+        # Начинаем с наименьшего размера или с сохраненного стабильного
+        if start_size is None:
+            start_size = self.buffer_tuner.sizes[0]
+        self.buffer_tuner = BufferSizeTuner(self.buffer_tuner.sizes)
+        print(f"Автоподбор размера буфера включен (начальный размер: {start_size})")
+        if start_size != self.block_size:
+            self.set_buffer_size(start_size)
+        self.buffer_tuner.reset(self.block_size)
+        return True
+    
+    def poll_auto_buffer_size(self):
+        """
+        Проверка автоподбора (вызывается периодически из основного потока)
+        
+        Смена размера требует перезапуска потока, поэтому выполняется здесь,
+        а не в audio_callback.
+        
+        Returns:
+            int или None: Новый размер буфера, если он был изменен
+        """
+        if not self.auto_buffer_size or not self.is_running:
+            return None
+        
+        tuner = self.buffer_tuner
+        new_size = tuner.evaluate()
+        if new_size is not None and new_size != self.block_size:
+            print(f"Автоподбор: размер буфера {self.block_size} -> {new_size}")
+            was_monitoring = self.is_monitoring
+            self.set_buffer_size(new_size)
+            if was_monitoring:
+                self.start_monitoring()
+            self.metrics.increment('buffer.auto_changes')
+            return new_size
+        
+        # Стабильный размер сохраняется для устройства один раз
+        if tuner.stable and self._stable_buffer_size != self.block_size:
+            self._stable_buffer_size = self.block_size
+            self.metrics.set_gauge('buffer.stable_size', self.block_size)
+            device_name = self.current_device_info['name'] if self.current_device_info else ''
+            print(f"Автоподбор: размер буфера {self.block_size} стабилен для {device_name}")
+            if self.on_buffer_size_stable:
+                self.on_buffer_size_stable(device_name, self.block_size)
+        return None
+    
     def set_low_latency(self, enabled):
         """Установка режима низкой задержки"""
         was_running = self.is_running
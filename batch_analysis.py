@@ -0,0 +1,290 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+
+from audio_assets import read_wav, collect_sources
+from audio_analysis import frame_rms, is_onset
+from rhythm_analyzer import RhythmAnalyzer
+from rhythm_patterns import PATTERNS, DEFAULT_PATTERN, PatternSchedule, get_pattern
+
+# Параметры обнаружения звука - те же, что у AudioProcessor по умолчанию
+DEFAULT_THRESHOLD = 0.1
+DEFAULT_HOP_SIZE = 256
+DEFAULT_WINDOW_SIZE = 1024
+DEFAULT_MIN_INTERVAL = 0.1
+DEFAULT_TOLERANCE = 0.1
+
+# Суффиксы файлов рядом с записью: метаданные и события записи занятия
+METADATA_SUFFIX = '.json'
+EVENTS_SUFFIX = '.events.csv'
+
+# Колонки CSV-отчета по файлам
+REPORT_COLUMNS = ('file', 'bpm', 'pattern', 'start', 'duration', 'total_hits', 'accurate_hits',
+                  'accuracy', 'avg_deviation', 'mean_offset_ms', 'std_offset_ms', 'error')
+
+def read_beat_times(events_path):
+    """Времена долей метронома из CSV событий записи занятия (сек от начала записи)"""
+    beats = []
+    with open(events_path, 'r') as f:
+        for row in csv.DictReader(f):
+            if row['kind'] == 'beat':
+                beats.append(float(row['time']))
+    return beats
+
+def resolve_metadata(path, defaults, manifest=None):
+    """
+    Темп, паттерн и начало первого такта для записи
+
+    Источники по убыванию приоритета: запись в общем манифесте (по имени файла),
+    JSON рядом с записью, доли метронома из CSV событий записи занятия,
+    значения по умолчанию из командной строки.
+
+    Returns:
+        dict: {'bpm', 'pattern', 'start'}; start None - по первому удару
+    """
+    metadata = {'bpm': defaults.get('bpm'), 'pattern': defaults.get('pattern') or DEFAULT_PATTERN,
+                'start': defaults.get('start')}
+    base = os.path.splitext(path)[0]
+
+    events_path = base + EVENTS_SUFFIX
+    if os.path.exists(events_path):
+        beats = read_beat_times(events_path)
+        if beats:
+            metadata['start'] = beats[0]
+        if len(beats) > 1:
+            metadata['bpm'] = 60.0 / float(np.median(np.diff(beats)))
+
+    sidecar_path = base + METADATA_SUFFIX
+    if os.path.exists(sidecar_path):
+        with open(sidecar_path, 'r') as f:
+            metadata.update(json.load(f))
+
+    if manifest:
+        entry = manifest.get(os.path.basename(path)) or manifest.get(path)
+        if entry:
+            metadata.update(entry)
+    return metadata
+
+def detect_onsets(samples, sample_rate, threshold=DEFAULT_THRESHOLD, hop_size=DEFAULT_HOP_SIZE,
+                  window_size=DEFAULT_WINDOW_SIZE, min_interval=DEFAULT_MIN_INTERVAL):
+    """
+    Времена обнаруженных звуков в файле (сек от начала)
+
+    То же правило, что в AudioProcessor (is_onset): окно, RMS которого выше порога, если
+    с прошлого обнаружения прошло больше min_interval. RMS всех окон считается векторно, а
+    последовательно перебираются только громкие окна.
+    """
+    ends, rms = frame_rms(samples, hop_size, window_size)
+    onsets = []
+    last_onset = -np.inf
+    for index in np.flatnonzero(rms > threshold):
+        frame_time = ends[index] / sample_rate
+        if is_onset(rms[index], frame_time, last_onset, threshold, min_interval):
+            onsets.append(frame_time)
+            last_onset = frame_time
+    return onsets
+
+def analyze_file(path, options):
+    """
+    Обнаружение ударов и оценка ритма одной записи
+
+    Функция выполняется в процессах пула, поэтому получает только простые типы.
+
+    Args:
+        path: Путь к WAV
+        options: Словарь параметров (threshold, tolerance, channel, defaults, manifest и т.д.)
+
+    Returns:
+        dict: Строка отчета (колонки REPORT_COLUMNS)
+    """
+    result = dict.fromkeys(REPORT_COLUMNS)
+    result.update({'file': path, 'total_hits': 0, 'accurate_hits': 0})
+    try:
+        metadata = resolve_metadata(path, options.get('defaults', {}), options.get('manifest'))
+        if not metadata['bpm']:
+            raise ValueError("не задан темп (--bpm, JSON рядом с файлом или манифест)")
+        if metadata['pattern'] not in PATTERNS:
+            raise ValueError(f"неизвестный паттерн {metadata['pattern']}")
+
+        data, sample_rate = read_wav(path)
+        if data.ndim > 1:
+            data = data[:, min(options.get('channel', 0), data.shape[1] - 1)]
+        result['duration'] = len(data) / sample_rate
+
+        onsets = detect_onsets(
+            data, sample_rate,
+            threshold=options.get('threshold', DEFAULT_THRESHOLD),
+            hop_size=options.get('hop_size', DEFAULT_HOP_SIZE),
+            window_size=options.get('window_size', DEFAULT_WINDOW_SIZE),
+            min_interval=options.get('min_interval', DEFAULT_MIN_INTERVAL)
+        )
+
+        # Без известного начала сетка выравнивается по первому удару
+        start = metadata['start']
+        if start is None:
+            start = onsets[0] if onsets else 0.0
+
+        analyzer = RhythmAnalyzer(tolerance=options.get('tolerance', DEFAULT_TOLERANCE))
+        analyzer.start()
+        analyzer.set_schedule(PatternSchedule(get_pattern(metadata['pattern']), float(metadata['bpm']), start))
+        offsets = []
+        for onset in onsets:
+            analyzer.analyze_hit(onset)
+            offsets.append(analyzer.last_offset)
+
+        stats = analyzer.get_stats()
+        result.update({
+            'bpm': round(float(metadata['bpm']), 2),
+            'pattern': metadata['pattern'],
+            'start': round(float(start), 4),
+            'total_hits': stats['total_hits'],
+            'accurate_hits': stats['accurate_hits'],
+            'accuracy': round(stats['accuracy'], 4),
+            'avg_deviation': round(float(stats['avg_deviation']), 4),
+            'mean_offset_ms': round(1000.0 * float(np.mean(offsets)), 2) if offsets else 0.0,
+            'std_offset_ms': round(1000.0 * float(np.std(offsets)), 2) if offsets else 0.0
+        })
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def aggregate_results(results):
+    """
+    Сводка по всем записям
+
+    Returns:
+        dict: Количество файлов, общая точность (по всем ударам), средняя и медианная
+            точность файлов и точность по темпам
+    """
+    ok = [result for result in results if result['error'] is None]
+    total_hits = sum(result['total_hits'] for result in ok)
+    accurate_hits = sum(result['accurate_hits'] for result in ok)
+    file_accuracy = [result['accuracy'] for result in ok if result['total_hits']]
+
+    by_bpm = {}
+    for result in ok:
+        entry = by_bpm.setdefault(str(round(result['bpm'])), {'files': 0, 'total_hits': 0, 'accurate_hits': 0})
+        entry['files'] += 1
+        entry['total_hits'] += result['total_hits']
+        entry['accurate_hits'] += result['accurate_hits']
+    for entry in by_bpm.values():
+        entry['accuracy'] = round(entry['accurate_hits'] / max(1, entry['total_hits']), 4)
+
+    return {
+        'files': len(results),
+        'ok': len(ok),
+        'failed': len(results) - len(ok),
+        'total_hits': total_hits,
+        'accurate_hits': accurate_hits,
+        'accuracy': round(accurate_hits / max(1, total_hits), 4),
+        'mean_file_accuracy': round(float(np.mean(file_accuracy)), 4) if file_accuracy else 0.0,
+        'median_file_accuracy': round(float(np.median(file_accuracy)), 4) if file_accuracy else 0.0,
+        'by_bpm': by_bpm
+    }
+
+def analyze_batch(paths, options, workers=None):
+    """
+    Анализ записей в пуле процессов
+
+    Args:
+        paths: Список WAV-файлов
+        options: Параметры analyze_file
+        workers: Количество процессов (по умолчанию - число ядер)
+
+    Returns:
+        tuple: (results, aggregate) - строки отчета по файлам (в порядке paths) и сводка
+    """
+    results = {}
+
+    def record(path, result):
+        results[path] = result
+        if result['error'] is None:
+            print(f"{os.path.basename(path)}: точность {result['accuracy'] * 100:.0f}% "
+                  f"({result['accurate_hits']}/{result['total_hits']}), "
+                  f"среднее отклонение {result['mean_offset_ms']:+.0f} мс")
+        else:
+            print(f"Ошибка анализа {path}: {result['error']}")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        # Без пула - для одиночных файлов и отладки
+        for path in paths:
+            record(path, analyze_file(path, options))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(analyze_file, path, options): path for path in paths}
+            for future in as_completed(futures):
+                record(futures[future], future.result())
+
+    ordered = [results[path] for path in paths]
+    return ordered, aggregate_results(ordered)
+
+def write_reports(results, aggregate, base):
+    """Отчет в base.json (файлы и сводка) и base.csv (по строке на файл)"""
+    directory = os.path.dirname(base)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(base + '.json', 'w') as f:
+        json.dump({'aggregate': aggregate, 'files': results}, f, indent=4, ensure_ascii=False)
+    with open(base + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(results)
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(
+        description='Пакетный анализ записей: обнаружение ударов и оценка ритма без интерфейса'
+    )
+    parser.add_argument('sources', nargs='+', help='WAV-файлы, директории или glob-шаблоны')
+    parser.add_argument('-b', '--bpm', type=float, default=None,
+                        help='Темп по умолчанию (если не задан в метаданных записи)')
+    parser.add_argument('-p', '--pattern', choices=sorted(PATTERNS), default=DEFAULT_PATTERN,
+                        help=f'Паттерн по умолчанию (по умолчанию {DEFAULT_PATTERN})')
+    parser.add_argument('-s', '--start', type=float, default=None,
+                        help='Начало первого такта в записи (сек); по умолчанию - первый удар')
+    parser.add_argument('-m', '--metadata', default=None,
+                        help='JSON-манифест {"файл.wav": {"bpm": ..., "pattern": ..., "start": ...}}')
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Порог RMS обнаружения удара (по умолчанию {DEFAULT_THRESHOLD})')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Допустимое отклонение в долях (по умолчанию {DEFAULT_TOLERANCE})')
+    parser.add_argument('-c', '--channel', type=int, default=0,
+                        help='Канал многоканальных записей (по умолчанию 0)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Количество процессов (по умолчанию - число ядер)')
+    parser.add_argument('-o', '--output', default='analysis_report',
+                        help='Путь к отчету без расширения (создаются .json и .csv)')
+    args = parser.parse_args(argv)
+
+    paths = collect_sources(args.sources, extensions=('.wav',))
+    if not paths:
+        print("Записи для анализа не найдены")
+        return 1
+
+    manifest = None
+    if args.metadata:
+        with open(args.metadata, 'r') as f:
+            manifest = json.load(f)
+
+    options = {
+        'defaults': {'bpm': args.bpm, 'pattern': args.pattern, 'start': args.start},
+        'manifest': manifest,
+        'threshold': args.threshold,
+        'tolerance': args.tolerance,
+        'channel': args.channel
+    }
+    results, aggregate = analyze_batch(paths, options, workers=args.jobs)
+    write_reports(results, aggregate, args.output)
+
+    print(f"Готово: файлов {aggregate['ok']}, ошибок {aggregate['failed']}, "
+          f"общая точность {aggregate['accuracy'] * 100:.1f}%, отчет: {args.output}.json, {args.output}.csv")
+    return 1 if aggregate['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
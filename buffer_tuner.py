@@ -0,0 +1,128 @@
+# Размеры буфера, между которыми переключается автоподбор (как в настройках)
+BUFFER_SIZES = (64, 128, 256, 512, 1024)
+
+class BufferSizeTuner:
+    """
+    Автоподбор размера буфера PortAudio
+
+    Начинает с наименьшего размера и по окнам в несколько секунд сравнивает
+    длительность audio_callback с бюджетом (длительностью блока) и считает флаги xrun.
+    Перегрузка или xrun - шаг вверх сразу; шаг вниз - только после нескольких подряд
+    спокойных окон с большим запасом (гистерезис). Размер, на котором были проблемы,
+    после шага вверх какое-то время не пробуется снова. Когда размер долго не
+    меняется, он считается стабильным и сохраняется для устройства.
+
+    record вызывается из audio_callback (только счетчики), evaluate - из основного потока.
+    """
+    def __init__(self, sizes=BUFFER_SIZES, window_seconds=2.0, warmup_seconds=0.5,
+                 high_load=0.7, low_load=0.25, overload_fraction=0.01,
+                 windows_to_decrease=5, windows_to_stable=10, retry_windows=30):
+        """
+        Args:
+            sizes: Допустимые размеры буфера (по возрастанию)
+            window_seconds: Длительность окна наблюдения (сек аудио)
+            warmup_seconds: Начало после смены размера, которое не учитывается (сек аудио)
+            high_load: Доля бюджета, выше которой вызов считается перегруженным
+            low_load: Доля бюджета, ниже которой окно считается спокойным
+            overload_fraction: Доля перегруженных вызовов в окне для шага вверх
+            windows_to_decrease: Спокойных окон подряд для шага вниз
+            windows_to_stable: Окон без изменений, после которых размер стабилен
+            retry_windows: Сколько окон не пробовать размер, на котором были проблемы
+        """
+        self.sizes = tuple(sorted(sizes))
+        self.window_seconds = window_seconds
+        self.warmup_seconds = warmup_seconds
+        self.high_load = high_load
+        self.low_load = low_load
+        self.overload_fraction = overload_fraction
+        self.windows_to_decrease = windows_to_decrease
+        self.windows_to_stable = windows_to_stable
+        self.retry_windows = retry_windows
+
+        # Номер окна, до которого размер не пробуется снова
+        self.blocked_until = {}
+        self.windows = 0
+        self.changes = 0
+        self.reset(self.sizes[0])
+
+    def reset(self, block_size):
+        """Начало наблюдения за новым размером буфера"""
+        self.block_size = min(self.sizes, key=lambda size: abs(size - block_size))
+        self.calm_windows = 0
+        self.unchanged_windows = 0
+        self.stable = False
+        self._clear_window()
+        self._warmup_left = self.warmup_seconds
+
+    def _clear_window(self):
+        """Сброс счетчиков текущего окна"""
+        self.window_audio = 0.0
+        self.window_calls = 0
+        self.window_overloads = 0
+        self.window_xruns = 0
+        self.window_max_load = 0.0
+
+    def record(self, duration, budget, status=0):
+        """
+        Учет одного вызова audio_callback
+
+        Args:
+            duration: Длительность обработки блока (сек)
+            budget: Длительность блока (сек)
+            status: Флаги статуса PortAudio
+        """
+        if self._warmup_left > 0:
+            self._warmup_left -= budget
+            return
+
+        load = duration / budget if budget > 0 else 0.0
+        self.window_audio += budget
+        self.window_calls += 1
+        if load > self.high_load:
+            self.window_overloads += 1
+        if load > self.window_max_load:
+            self.window_max_load = load
+        if status:
+            self.window_xruns += 1
+
+    def evaluate(self):
+        """
+        Решение по завершенному окну
+
+        Returns:
+            int или None: Новый размер буфера, если его нужно сменить
+        """
+        if self.window_audio < self.window_seconds:
+            return None
+
+        self.windows += 1
+        overloaded = (self.window_xruns > 0 or
+                      self.window_overloads > self.overload_fraction * self.window_calls)
+        calm = not overloaded and self.window_max_load < self.low_load
+        self._clear_window()
+
+        index = self.sizes.index(self.block_size)
+        if overloaded:
+            if index + 1 < len(self.sizes):
+                # Текущий размер не справляется - не возвращаемся к нему какое-то время
+                self.blocked_until[self.block_size] = self.windows + self.retry_windows
+                return self._change(self.sizes[index + 1])
+            self.calm_windows = 0
+            return None
+
+        self.calm_windows = self.calm_windows + 1 if calm else 0
+        if self.calm_windows >= self.windows_to_decrease and index > 0:
+            smaller = self.sizes[index - 1]
+            if self.blocked_until.get(smaller, 0) <= self.windows:
+                return self._change(smaller)
+
+        self.unchanged_windows += 1
+        if self.unchanged_windows >= self.windows_to_stable:
+            self.stable = True
+        return None
+
+    def _change(self, block_size):
+        """Переход к новому размеру"""
+        self.changes += 1
+        self.reset(block_size)
+        return block_size
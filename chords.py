@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+
+from pitch import NOTE_NAMES, REFERENCE_A4
+
+# Окно хромы после onset (сек): атака боя пропускается, затем звучат все струны
+CHORD_DELAY = 0.03
+CHORD_WINDOW = 0.15
+# Диапазон частот хромы (Гц): от шестой струны до высоких обертонов
+CHORD_MIN_FREQ = 75.0
+CHORD_MAX_FREQ = 2500.0
+# Ниже этого RMS окна аккорд не определяется
+CHORD_MIN_LEVEL = 0.005
+
+# Ступени аккордов (полутоны от тоники) и суффиксы названий
+CHORD_QUALITIES = (
+    ('', (0, 4, 7)),        # Мажор
+    ('m', (0, 3, 7)),       # Минор
+    ('7', (0, 4, 7, 10))    # Доминантсептаккорд
+)
+
+def build_templates():
+    """
+    Нормированные шаблоны хромы всех аккордов
+
+    Returns:
+        tuple: (names, templates) - названия (C, Cm, C7, ...) и матрица (аккордов, 12)
+            с единичной нормой строк
+    """
+    names = []
+    rows = []
+    for suffix, intervals in CHORD_QUALITIES:
+        for root in range(12):
+            template = np.zeros(12)
+            template[[(root + interval) % 12 for interval in intervals]] = 1.0
+            names.append(NOTE_NAMES[root] + suffix)
+            rows.append(template / np.linalg.norm(template))
+    return tuple(names), np.array(rows, dtype=np.float32)
+
+CHORD_NAMES, CHORD_TEMPLATES = build_templates()
+
+class ChordRecognizer:
+    """
+    Определение аккорда по хроме окна после удара
+
+    Амплитудный спектр окна Ханна суммируется по 12 классам высоты (номер класса
+    каждого бина БПФ считается один раз), хрома нормируется, и сходство со всеми
+    шаблонами считается одним матричным умножением. Буферы выделяются заранее;
+    вызывается из потока обработки, а не из callback PortAudio.
+    """
+    def __init__(self, sample_rate, window_seconds=CHORD_WINDOW, min_freq=CHORD_MIN_FREQ,
+                 max_freq=CHORD_MAX_FREQ, reference=REFERENCE_A4):
+        """
+        Args:
+            sample_rate: Частота дискретизации (Гц)
+            window_seconds: Длина окна (сек)
+            min_freq: Нижняя частота хромы (Гц)
+            max_freq: Верхняя частота хромы (Гц), не выше частоты Найквиста
+            reference: Частота ноты ля первой октавы (Гц)
+        """
+        self.sample_rate = float(sample_rate)
+        self.frame_size = int(window_seconds * self.sample_rate)
+        # Дополнение нулями вдвое уточняет положение пиков между бинами
+        self.fft_size = 1 << (2 * self.frame_size - 1).bit_length()
+        self.window = np.hanning(self.frame_size).astype(np.float32)
+
+        # Бины диапазона идут подряд: срез и номер класса высоты каждого бина
+        freqs = np.fft.rfftfreq(self.fft_size, 1.0 / self.sample_rate)
+        band = np.flatnonzero((freqs >= min_freq) & (freqs <= min(max_freq, self.sample_rate / 2.0)))
+        self._band = slice(int(band[0]), int(band[-1]) + 1)
+        midi = 69.0 + 12.0 * np.log2(freqs[self._band] / reference)
+        self._classes = (np.round(midi).astype(np.intp) % 12)
+
+        self.frame = np.empty(self.frame_size, dtype=np.float32)  # Буфер чтения кадра из кольцевого буфера
+        self._padded = np.zeros(self.fft_size, dtype=np.float32)
+        self.chroma = np.zeros(12)  # Хрома последнего окна (единичная норма)
+        self.scores = np.zeros(len(CHORD_NAMES), dtype=np.float32)  # Сходство со всеми шаблонами
+
+    def recognize(self, samples):
+        """
+        Аккорд окна из frame_size сэмплов float
+
+        Returns:
+            tuple или None: (name, confidence) - название аккорда и косинусное сходство
+                хромы с его шаблоном (0.0 - 1.0); None для тишины
+        """
+        frame = self._padded[:self.frame_size]
+        np.multiply(samples, self.window, out=frame)
+        if math.sqrt(float(np.dot(samples, samples)) / self.frame_size) < CHORD_MIN_LEVEL:
+            return None
+
+        magnitude = np.abs(np.fft.rfft(self._padded)[self._band])
+        chroma = np.bincount(self._classes, weights=magnitude, minlength=12)
+        norm = np.linalg.norm(chroma)
+        if norm == 0.0:
+            return None
+        np.divide(chroma, norm, out=self.chroma)
+
+        np.dot(CHORD_TEMPLATES, self.chroma.astype(np.float32), out=self.scores)
+        best = int(np.argmax(self.scores))
+        return CHORD_NAMES[best], float(self.scores[best])
@@ -0,0 +1,188 @@
+import heapq
+import threading
+import time
+
+# Период кадра виртуальных часов по умолчанию (сек), как у интерфейса при 60 FPS
+VIRTUAL_FRAME_INTERVAL = 1.0 / 60.0
+
+class SystemClock:
+    """
+    Реальные часы: время системы и планирование через часы Kivy
+
+    Kivy импортируется только при первом планировании, поэтому обработка аудио
+    и пакетные инструменты могут брать время из этих часов без интерфейса.
+    """
+    def time(self):
+        """Текущее время (timestamp)"""
+        return time.time()
+
+    def perf_counter(self):
+        """Счетчик для измерения длительностей"""
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        """Ожидание"""
+        time.sleep(seconds)
+
+    def _scheduler(self):
+        from kivy.clock import Clock
+        return Clock
+
+    def create_trigger(self, callback, timeout=0, interval=False):
+        """Триггер: вызов планирует callback(dt), повторный вызов до срабатывания ничего не делает"""
+        return self._scheduler().create_trigger(callback, timeout, interval=interval)
+
+    def schedule_once(self, callback, timeout=0):
+        """Однократный вызов callback(dt) через timeout секунд (0 - в следующем кадре)"""
+        return self._scheduler().schedule_once(callback, timeout)
+
+    def schedule_interval(self, callback, timeout):
+        """Вызов callback(dt) каждые timeout секунд, пока он не вернет False"""
+        return self._scheduler().schedule_interval(callback, timeout)
+
+    def unschedule(self, callback):
+        """Отмена событий по callback или по самому событию"""
+        self._scheduler().unschedule(callback)
+
+# Общие реальные часы (по умолчанию для всех компонентов)
+SYSTEM_CLOCK = SystemClock()
+
+class VirtualEvent:
+    """Запланированное событие виртуальных часов (аналог ClockEvent Kivy)"""
+    def __init__(self, clock, callback, timeout, interval):
+        self.clock = clock
+        self.callback = callback
+        self.timeout = timeout
+        self.interval = interval
+        self.due = None        # Время срабатывания; None - не запланировано
+        self.last_time = 0.0   # Время планирования или прошлого срабатывания (для dt)
+        self._sequence = None  # Номер записи в очереди; отмененные записи пропускаются
+
+    def __call__(self):
+        """Планирование, если событие еще не запланировано (как вызов триггера Kivy)"""
+        if self.due is None:
+            self.clock._schedule(self)
+
+    @property
+    def is_triggered(self):
+        return self.due is not None
+
+    def cancel(self):
+        """Отмена события"""
+        self.clock._cancel(self)
+
+class VirtualClock:
+    """
+    Виртуальные часы для моделирования занятий быстрее реального времени
+
+    Время стоит на месте, пока его не продвинут advance(); при этом по порядку
+    срабатывают все запланированные события, а часы показывают время каждого из них.
+    Событие с нулевым таймаутом, как в Kivy, срабатывает в следующем кадре -
+    через frame_interval. Моделируется только время событий: perf_counter остается
+    реальным, чтобы метрики показывали настоящую длительность обработки.
+    """
+    def __init__(self, start=0.0, frame_interval=VIRTUAL_FRAME_INTERVAL):
+        """
+        Args:
+            start: Начальное время (timestamp)
+            frame_interval: Период кадра (сек)
+        """
+        self.now = float(start)
+        self.frame_interval = frame_interval
+        self._queue = []  # (due, sequence, event)
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.fired = 0  # Количество сработавших событий
+
+    def time(self):
+        """Текущее виртуальное время"""
+        return self.now
+
+    def perf_counter(self):
+        """Счетчик для измерения длительностей (реальный)"""
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        """Ожидание - продвижение времени"""
+        self.advance(seconds)
+
+    def create_trigger(self, callback, timeout=0, interval=False):
+        """Триггер: вызов планирует callback(dt), повторный вызов до срабатывания ничего не делает"""
+        return VirtualEvent(self, callback, timeout, interval)
+
+    def schedule_once(self, callback, timeout=0):
+        """Однократный вызов callback(dt) через timeout секунд (0 - в следующем кадре)"""
+        event = VirtualEvent(self, callback, timeout, False)
+        event()
+        return event
+
+    def schedule_interval(self, callback, timeout):
+        """Вызов callback(dt) каждые timeout секунд, пока он не вернет False"""
+        event = VirtualEvent(self, callback, timeout, True)
+        event()
+        return event
+
+    def unschedule(self, callback):
+        """Отмена событий по callback или по самому событию"""
+        if isinstance(callback, VirtualEvent):
+            callback.cancel()
+            return
+        with self._lock:
+            events = [event for _, _, event in self._queue if event.callback == callback]
+        for event in events:
+            event.cancel()
+
+    @property
+    def pending(self):
+        """Количество запланированных событий"""
+        with self._lock:
+            return sum(1 for _, sequence, event in self._queue if event._sequence == sequence)
+
+    def _schedule(self, event, last_time=None):
+        with self._lock:
+            event.last_time = self.now if last_time is None else last_time
+            event.due = event.last_time + max(event.timeout, self.frame_interval)
+            self._sequence += 1
+            event._sequence = self._sequence
+            heapq.heappush(self._queue, (event.due, self._sequence, event))
+
+    def _cancel(self, event):
+        with self._lock:
+            event.due = None
+            event._sequence = None
+
+    def advance(self, seconds):
+        """
+        Продвижение времени на seconds секунд с вызовом всех событий по порядку
+
+        Returns:
+            int: Количество сработавших событий
+        """
+        end = self.now + seconds
+        fired = 0
+        while True:
+            with self._lock:
+                if not self._queue or self._queue[0][0] > end:
+                    break
+                due, sequence, event = heapq.heappop(self._queue)
+                if event._sequence != sequence:
+                    continue  # Отмененная или перепланированная запись
+                self.now = max(self.now, due)
+                dt = self.now - event.last_time
+                event.due = None
+                event._sequence = None
+
+            # Повторяющееся событие планируется до вызова, чтобы callback мог его отменить
+            if event.interval:
+                self._schedule(event, self.now)
+            fired += 1
+            if event.callback(dt) is False and event.interval:
+                event.cancel()
+
+        self.now = max(self.now, end)
+        self.fired += fired
+        return fired
+
+    def advance_to(self, timestamp):
+        """Продвижение времени до момента timestamp"""
+        return self.advance(max(0.0, timestamp - self.now))
@@ -1,32 +1,290 @@
 from pydub import AudioSegment
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import hashlib
+import json
 import os
+import sys
 
-def convert_opus_to_wav(opus_file, wav_file):
-    """Конвертирует файл .opus в .wav"""
+import numpy as np
+
+from audio_assets import collect_sources
+
+# Частота результата, если родную частоту устройства ввода узнать не удалось
+FALLBACK_SAMPLE_RATE = 48000
+
+# Имя файла манифеста с хешами уже сконвертированных файлов
+MANIFEST_NAME = '.convert_manifest.json'
+
+# Форматы результата
+OUTPUT_FORMATS = ('wav', 'npy')
+
+def default_sample_rate():
+    """
+    Родная частота устройства ввода по умолчанию
+
+    На ней движок открывает поток (AudioProcessor.negotiate_sample_rate), поэтому
+    звуки с этой частотой не ресемплируются при загрузке. Без PyAudio или устройства -
+    FALLBACK_SAMPLE_RATE.
+    """
+    try:
+        import pyaudio
+        p = pyaudio.PyAudio()
+        try:
+            return int(p.get_default_input_device_info()['defaultSampleRate'])
+        finally:
+            p.terminate()
+    except Exception as e:
+        print(f"Не удалось узнать частоту устройства ввода ({str(e)}), используем {FALLBACK_SAMPLE_RATE} Гц")
+        return FALLBACK_SAMPLE_RATE
+
+def file_hash(path, chunk_size=1 << 20):
+    """Вычисляет SHA-256 содержимого файла, читая его блоками"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_root(sources):
+    """Общая директория исходных файлов - относительно нее раскладываются результаты"""
+    if not sources:
+        return None
+    return os.path.commonpath([os.path.dirname(os.path.abspath(source)) for source in sources])
+
+def target_path(source, output_format, output_dir=None, root=None):
+    """
+    Путь к результату конвертации для исходного файла
+
+    Args:
+        source: Исходный файл
+        output_format: Формат результата ('wav' или 'npy')
+        output_dir: Директория для результатов (None - рядом с исходником)
+        root: Корень исходных файлов: в output_dir повторяется путь относительно него
+            (None - только имя файла)
+    """
+    if not output_dir:
+        name = os.path.splitext(source)[0] + '.' + output_format
+        return os.path.abspath(name)
+    relative = os.path.relpath(source, root) if root else os.path.basename(source)
+    name = os.path.splitext(relative)[0] + '.' + output_format
+    return os.path.abspath(os.path.join(output_dir, name))
+
+def load_manifest(manifest_path):
+    """Загрузка манифеста конвертации (пустой, если файла нет или он поврежден)"""
     try:
-        # Проверяем, существует ли файл .opus
-        if not os.path.exists(opus_file):
-            print(f"Файл {opus_file} не найден")
-            return False
-        
-        # Загружаем файл .opus
-        print(f"Загружаем файл {opus_file}...")
-        sound = AudioSegment.from_file(opus_file)
-        
-        # Сохраняем в формате .wav
-        print(f"Сохраняем в формате .wav: {wav_file}")
-        sound.export(wav_file, format="wav")
-        
-        print(f"Конвертация завершена: {opus_file} -> {wav_file}")
-        return True
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"Ошибка загрузки манифеста {manifest_path}: {str(e)}")
+    return {}
+
+def save_manifest(manifest_path, manifest):
+    """Сохранение манифеста конвертации (через временный файл)"""
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def segment_to_float32(sound):
+    """
+    Преобразует AudioSegment в массив float32 в диапазоне [-1.0, 1.0]
+
+    Returns:
+        numpy array формы (frames,) для моно или (frames, channels) для многоканальных файлов
+    """
+    samples = np.array(sound.get_array_of_samples())
+    full_scale = float(1 << (8 * sound.sample_width - 1))
+    data = samples.astype(np.float32) / full_scale
+    if sound.channels > 1:
+        data = data.reshape(-1, sound.channels)
+    return data
+
+def convert_file(source, target, output_format, sample_rate):
+    """
+    Конвертирует один файл: декодирует, ресемплирует и сохраняет в wav или npy
+
+    Функция выполняется в процессах пула, поэтому не пишет в манифест сама.
+
+    Returns:
+        dict: Результат конвертации (source, target, ok, error, frames)
+    """
+    result = {'source': source, 'target': target, 'ok': False, 'error': None, 'frames': 0}
+    try:
+        sound = AudioSegment.from_file(source)
+
+        # Приводим частоту дискретизации к целевой
+        if sound.frame_rate != sample_rate:
+            sound = sound.set_frame_rate(sample_rate)
+
+        target_dir = os.path.dirname(target)
+        if target_dir:
+            os.makedirs(target_dir, exist_ok=True)
+
+        if output_format == 'npy':
+            # Сырые float32 сэмплы для анализа в numpy: np.load(..., mmap_mode='r').
+            # Приложение воспроизводит звуки через Kivy и загружает только wav
+            data = segment_to_float32(sound)
+            np.save(target, np.ascontiguousarray(data))
+            result['frames'] = int(data.shape[0])
+        else:
+            sound.export(target, format='wav')
+            result['frames'] = int(sound.frame_count())
+
+        result['ok'] = True
     except Exception as e:
-        print(f"Ошибка при конвертации: {str(e)}")
-        return False
+        result['error'] = str(e)
+    return result
+
+def convert_batch(sources, output_format='wav', sample_rate=None,
+                  output_dir=None, manifest_path=None, workers=None, force=False):
+    """
+    Пакетная конвертация файлов в пуле процессов
+
+    Args:
+        sources: Список исходных файлов
+        output_format: Формат результата ('wav' или 'npy')
+        sample_rate: Целевая частота дискретизации (Гц), по умолчанию - default_sample_rate()
+        output_dir: Директория для результатов с той же структурой поддиректорий,
+            что и у исходников (по умолчанию рядом с исходником)
+        manifest_path: Путь к манифесту с хешами (None - без манифеста)
+        workers: Количество процессов (по умолчанию - число ядер)
+        force: Конвертировать даже неизмененные файлы
+
+    Returns:
+        dict: Статистика {'converted', 'skipped', 'failed', 'results'}
+
+    Raises:
+        ValueError: Неизвестный формат или несколько исходников с одним результатом
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Неизвестный формат: {output_format}")
+    if sample_rate is None:
+        sample_rate = default_sample_rate()
+
+    # Структура поддиректорий сохраняется, поэтому одноименные файлы из разных
+    # директорий не перезаписывают друг друга; оставшиеся совпадения - ошибка
+    root = source_root(sources) if output_dir else None
+    targets = {}
+    for source in sources:
+        target = target_path(source, output_format, output_dir, root)
+        if target in targets:
+            raise ValueError(f"Файлы {targets[target]} и {source} конвертируются в один и тот же {target}")
+        targets[target] = source
+
+    manifest = load_manifest(manifest_path) if manifest_path else {}
+    stats = {'converted': 0, 'skipped': 0, 'failed': 0, 'results': []}
+
+    # Отбираем файлы, которые действительно нужно конвертировать
+    tasks = []
+    for target, source in targets.items():
+        if target == os.path.abspath(source):
+            print(f"Пропускаем {source}: результат совпадает с исходным файлом")
+            stats['skipped'] += 1
+            continue
+
+        digest = file_hash(source)
+        entry = manifest.get(source)
+        unchanged = (
+            entry is not None
+            and entry.get('hash') == digest
+            and entry.get('sample_rate') == sample_rate
+            and entry.get('format') == output_format
+            and entry.get('target') == target
+            and os.path.exists(target)
+        )
+        if unchanged and not force:
+            stats['skipped'] += 1
+            continue
+
+        tasks.append((source, target, digest))
+
+    def record(task, result):
+        source, target, digest = task
+        stats['results'].append(result)
+        if result['ok']:
+            stats['converted'] += 1
+            manifest[source] = {
+                'hash': digest,
+                'sample_rate': sample_rate,
+                'format': output_format,
+                'target': target
+            }
+            print(f"Конвертация завершена: {source} -> {target}")
+        else:
+            stats['failed'] += 1
+            print(f"Ошибка при конвертации {source}: {result['error']}")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        # Без пула - для одиночных файлов и отладки
+        for task in tasks:
+            record(task, convert_file(task[0], task[1], output_format, sample_rate))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(convert_file, task[0], task[1], output_format, sample_rate): task
+                for task in tasks
+            }
+            for future in as_completed(futures):
+                record(futures[future], future.result())
+
+    if manifest_path and stats['converted']:
+        save_manifest(manifest_path, manifest)
+
+    return stats
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(
+        description='Пакетная конвертация звуков метронома и минусовок в формат движка'
+    )
+    parser.add_argument('sources', nargs='*', default=['tack.opus'],
+                        help='Файлы, директории или glob-шаблоны (по умолчанию tack.opus)')
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='wav',
+                        help='Формат результата: wav (звуки приложения) или npy (сырые float32 '
+                             'для анализа в numpy через memory-mapping; приложение их не загружает)')
+    parser.add_argument('-r', '--sample-rate', type=int, default=None,
+                        help='Целевая частота дискретизации (по умолчанию - родная частота устройства '
+                             f'ввода по умолчанию или {FALLBACK_SAMPLE_RATE}); движок работает на частоте '
+                             'выбранного устройства, звуки с другой частотой он ресемплирует при загрузке')
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help='Директория для результатов (по умолчанию рядом с исходником)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Количество процессов (по умолчанию - число ядер)')
+    parser.add_argument('--manifest', default=None,
+                        help=f'Путь к манифесту (по умолчанию {MANIFEST_NAME} в директории результатов)')
+    parser.add_argument('--force', action='store_true',
+                        help='Конвертировать все файлы, даже неизмененные')
+    args = parser.parse_args(argv)
+
+    sources = collect_sources(args.sources)
+    if not sources:
+        print("Файлы для конвертации не найдены")
+        return 1
+
+    manifest_path = args.manifest
+    if manifest_path is None:
+        manifest_dir = args.output_dir or os.getcwd()
+        manifest_path = os.path.join(manifest_dir, MANIFEST_NAME)
+
+    try:
+        stats = convert_batch(
+            sources,
+            output_format=args.format,
+            sample_rate=args.sample_rate,
+            output_dir=args.output_dir,
+            manifest_path=manifest_path,
+            workers=args.jobs,
+            force=args.force
+        )
+    except ValueError as e:
+        print(f"Ошибка: {str(e)}")
+        return 1
+
+    print(f"Готово: сконвертировано {stats['converted']}, пропущено {stats['skipped']}, ошибок {stats['failed']}")
+    return 1 if stats['failed'] else 0
 
 if __name__ == "__main__":
-    # Пути к файлам
-    opus_file = "tack.opus"
-    wav_file = "tack.wav"
-    
-    # Конвертируем файл
-    convert_opus_to_wav(opus_file, wav_file) 
\ No newline at end of file
+    sys.exit(main())
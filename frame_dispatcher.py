@@ -0,0 +1,143 @@
+import threading
+
+from kivy.clock import Clock
+
+# Типы событий интерфейса
+EVENT_ONSET = 0   # Обнаружен звук: (timestamp, amplitude)
+EVENT_LEVEL = 1   # Снимок уровня сигнала: (timestamp, rms)
+EVENT_TEMPO = 2   # Новая оценка темпа свободной игры: (timestamp, bpm)
+EVENT_PITCH = 3   # Высота удара: (timestamp, frequency; 0.0 - не определена)
+EVENT_CHORD = 4   # Аккорд удара: (timestamp, (chord или None, confidence))
+EVENT_KINDS = 5
+
+# Емкость буфера событий; при переполнении старые события теряются
+EVENT_BUFFER_SIZE = 256
+
+class FrameDispatcher:
+    """
+    Единый покадровый диспетчер интерфейса
+
+    Вместо отдельных часов Kivy для каждого виджета и schedule_once с замыканием на
+    каждое событие потоки аудио кладут события в заранее выделенный кольцевой буфер,
+    а один раз за кадр диспетчер разбирает его и вызывает обработчики, после чего
+    выполняет покадровые обновления (движение нот, окончание подсветки и т.д.).
+    Для событий уровня сигнала применяется только последнее значение за кадр.
+
+    Когда покадровым обновлениям нечего анимировать и событий нет, часы диспетчера
+    останавливаются полностью; post или wake из любого потока будят его.
+    """
+    def __init__(self, capacity=EVENT_BUFFER_SIZE, clock=None):
+        """
+        Args:
+            capacity: Емкость буфера событий
+            clock: Часы Kivy (для тестов можно передать свои)
+        """
+        self.capacity = capacity
+        self._kinds = [0] * capacity
+        self._times = [0.0] * capacity
+        self._values = [0.0] * capacity
+        self._write = 0  # Абсолютный номер следующего записываемого события
+        self._read = 0   # Абсолютный номер следующего разбираемого события
+        self._lock = threading.Lock()
+
+        self._handlers = [None] * EVENT_KINDS
+        self._coalesced = [False] * EVENT_KINDS
+        self._frame_callbacks = []
+
+        self.dropped = 0  # Количество потерянных при переполнении событий
+        self.frames = 0   # Количество выполненных кадров
+        self.is_awake = False
+
+        clock = clock or Clock
+        # Триггер с interval=True вызывается каждый кадр, пока его не отменят;
+        # вызов триггера потокобезопасен и не создает новых объектов
+        self._frame_trigger = clock.create_trigger(self._on_frame, 0, interval=True)
+
+    def register(self, kind, handler, coalesce=False):
+        """
+        Обработчик событий типа kind: handler(timestamp, value)
+
+        Args:
+            coalesce: Вызывать обработчик только для последнего события за кадр
+        """
+        self._handlers[kind] = handler
+        self._coalesced[kind] = coalesce
+
+    def add_frame_callback(self, callback):
+        """
+        Покадровое обновление: callback(dt) -> bool
+
+        Возвращает True, пока ему есть что анимировать (диспетчер не засыпает).
+        """
+        self._frame_callbacks.append(callback)
+
+    def post(self, kind, timestamp, value=0.0):
+        """Добавление события (из любого потока)"""
+        with self._lock:
+            if self._write - self._read >= self.capacity:
+                # Интерфейс не успевает - теряем самое старое событие
+                self._read += 1
+                self.dropped += 1
+            slot = self._write % self.capacity
+            self._kinds[slot] = kind
+            self._times[slot] = timestamp
+            self._values[slot] = value
+            self._write += 1
+        self.wake()
+
+    def wake(self):
+        """Запуск покадровых обновлений (из любого потока)"""
+        if not self.is_awake:
+            self.is_awake = True
+            self._frame_trigger()
+
+    def sleep(self):
+        """Остановка часов диспетчера до следующего события"""
+        self._frame_trigger.cancel()
+        self.is_awake = False
+
+    @property
+    def pending(self):
+        """Количество неразобранных событий"""
+        return self._write - self._read
+
+    def drain(self):
+        """Разбор всех накопленных событий"""
+        with self._lock:
+            start, end = self._read, self._write
+            self._read = end
+        if start == end:
+            return 0
+
+        latest = [None] * EVENT_KINDS
+        handlers = self._handlers
+        coalesced = self._coalesced
+        for number in range(start, end):
+            slot = number % self.capacity
+            kind = self._kinds[slot]
+            if coalesced[kind]:
+                latest[kind] = slot
+            elif handlers[kind] is not None:
+                handlers[kind](self._times[slot], self._values[slot])
+
+        for kind, slot in enumerate(latest):
+            if slot is not None and handlers[kind] is not None:
+                handlers[kind](self._times[slot], self._values[slot])
+        return end - start
+
+    def _on_frame(self, dt):
+        """Один кадр: события, затем покадровые обновления"""
+        self.frames += 1
+        self.drain()
+
+        animating = False
+        for callback in self._frame_callbacks:
+            if callback(dt):
+                animating = True
+
+        # Засыпаем, только если за время кадра не пришли новые события
+        if not animating and self.pending == 0:
+            self.sleep()
+            # Событие могло прийти между проверкой и остановкой часов
+            if self.pending:
+                self.wake()
@@ -0,0 +1,216 @@
+import math
+
+import numpy as np
+
+# Диапазон гистограммы отклонений (в долях, в обе стороны); крайние корзины собирают все дальше
+GROOVE_RANGE = 0.25
+GROOVE_BINS = 25
+# Среднее отклонение позиции (в долях), начиная с которого оно считается смещением
+GROOVE_BIAS = 0.03
+# Смещение считается систематическим, если среднее дальше от нуля, чем столько стандартных ошибок
+GROOVE_CONFIDENCE = 2.0
+# Сколько ударов по позиции нужно, чтобы показывать ее смещение
+GROOVE_MIN_HITS = 4
+
+def histogram_bins(deviations):
+    """Номера корзин гистограммы для массива отклонений (в долях)"""
+    scaled = (np.asarray(deviations, dtype=np.float64) + GROOVE_RANGE) * (GROOVE_BINS / (2.0 * GROOVE_RANGE))
+    return np.clip(np.floor(scaled), 0, GROOVE_BINS - 1).astype(np.int64)
+
+def histogram_edges():
+    """Границы корзин гистограммы (в долях)"""
+    return np.linspace(-GROOVE_RANGE, GROOVE_RANGE, GROOVE_BINS + 1)
+
+class GrooveProfile:
+    """
+    Отклонения ударов со знаком по позициям в такте
+
+    Для каждой ноты такта (позиции) копятся количество ударов, среднее и сумма
+    квадратов отклонений по Уэлфорду и гистограмма - обновление за O(1) на удар,
+    без хранения самих ударов. По средним видно систематическое смещение
+    (например, "всегда торопится на четвертую долю") и реальный свинг.
+
+    Отклонения - в долях (четвертях), отрицательные - раньше ноты.
+    """
+    def __init__(self, slot_offsets, bar_beats=None):
+        """
+        Args:
+            slot_offsets: Позиции нот внутри такта (в четвертях), как CompiledPattern.offsets
+            bar_beats: Длина такта в четвертях (по умолчанию - до целой доли после последней ноты)
+        """
+        self.slot_offsets = np.asarray(slot_offsets, dtype=np.float64)
+        if bar_beats is None:
+            bar_beats = math.floor(self.slot_offsets[-1]) + 1 if len(self.slot_offsets) else 1
+        self.bar_beats = float(bar_beats)
+        self.slot_count = len(self.slot_offsets)
+        self.counts = np.zeros(self.slot_count, dtype=np.int64)
+        self.means = np.zeros(self.slot_count)
+        self.m2 = np.zeros(self.slot_count)
+        self.histogram = np.zeros((self.slot_count, GROOVE_BINS), dtype=np.int64)
+
+    def reset(self):
+        """Сброс накопленной статистики"""
+        self.counts[:] = 0
+        self.means[:] = 0.0
+        self.m2[:] = 0.0
+        self.histogram[:] = 0
+
+    def add(self, slot, deviation):
+        """
+        Учет одного удара
+
+        Args:
+            slot: Номер ноты в такте
+            deviation: Отклонение от ноты со знаком (в долях)
+        """
+        count = self.counts[slot] + 1
+        delta = deviation - self.means[slot]
+        mean = self.means[slot] + delta / count
+        self.counts[slot] = count
+        self.means[slot] = mean
+        self.m2[slot] += delta * (deviation - mean)
+
+        scaled = (deviation + GROOVE_RANGE) * (GROOVE_BINS / (2.0 * GROOVE_RANGE))
+        self.histogram[slot, min(GROOVE_BINS - 1, max(0, math.floor(scaled)))] += 1
+
+    @classmethod
+    def from_hits(cls, slot_offsets, slots, deviations, bar_beats=None):
+        """
+        Векторный пересчет по всем ударам сразу (для записанных занятий)
+
+        Args:
+            slot_offsets: Позиции нот внутри такта (в четвертях)
+            slots: Номера нот в такте для каждого удара
+            deviations: Отклонения со знаком (в долях)
+            bar_beats: Длина такта в четвертях
+
+        Returns:
+            GrooveProfile: Профиль, совпадающий с поочередным add()
+        """
+        profile = cls(slot_offsets, bar_beats)
+        slots = np.asarray(slots, dtype=np.int64)
+        deviations = np.asarray(deviations, dtype=np.float64)
+        if len(slots) == 0:
+            return profile
+
+        length = profile.slot_count
+        profile.counts[:] = np.bincount(slots, minlength=length)
+        sums = np.bincount(slots, weights=deviations, minlength=length)
+        np.divide(sums, profile.counts, out=profile.means, where=profile.counts > 0)
+        # Двухпроходная дисперсия: отклонения от уже известных средних
+        centered = deviations - profile.means[slots]
+        profile.m2[:] = np.bincount(slots, weights=centered * centered, minlength=length)
+        profile.histogram[:] = np.bincount(slots * GROOVE_BINS + histogram_bins(deviations),
+                                           minlength=length * GROOVE_BINS).reshape(length, GROOVE_BINS)
+        return profile
+
+    @classmethod
+    def from_schedule(cls, schedule, hit_times):
+        """Профиль ударов hit_times относительно расписания PatternSchedule"""
+        pattern = schedule.pattern
+        indices, _, offsets = schedule.nearest_notes(hit_times)
+        return cls.from_hits(pattern.offsets, indices % pattern.notes_per_bar,
+                             offsets / schedule.beat_duration, pattern.bar_beats)
+
+    @property
+    def total_hits(self):
+        """Количество учтенных ударов"""
+        return int(self.counts.sum())
+
+    @property
+    def deviations_std(self):
+        """Стандартное отклонение по позициям (0 для позиций меньше чем с двумя ударами)"""
+        std = np.zeros(self.slot_count)
+        np.divide(self.m2, self.counts - 1, out=std, where=self.counts > 1)
+        return np.sqrt(std)
+
+    def swing_ratio(self):
+        """
+        Фактическое отношение свинга по средним отклонениям
+
+        Для каждой доли ровно с одной нотой между нотами на ней и на следующей доле берется
+        отношение сыгранных длительностей (до ноты и после нее); результат - среднее,
+        взвешенное по числу ударов. 1.0 - ровные восьмые, 2.0 - триольный свинг.
+
+        Returns:
+            float или None: Отношение, если в паттерне есть такие пары и по ним были удары
+        """
+        played = self.slot_offsets + self.means
+        slot_by_offset = {round(float(offset), 6): slot for slot, offset in enumerate(self.slot_offsets)}
+        beats = np.floor(self.slot_offsets + 1e-6)
+
+        ratios = []
+        weights = []
+        for slot, offset in enumerate(self.slot_offsets):
+            beat = beats[slot]
+            if offset - beat < 1e-6 or np.count_nonzero(beats == beat) != 2:
+                continue
+            next_beat = beat + 1 if beat + 1 < self.bar_beats - 1e-6 else 0.0
+            first = slot_by_offset.get(round(float(beat), 6))
+            second = slot_by_offset.get(round(float(next_beat), 6))
+            if first is None or second is None:
+                continue
+            weight = min(self.counts[first], self.counts[slot], self.counts[second])
+            if weight == 0:
+                continue
+            long_part = played[slot] - played[first]
+            short_part = beat + 1 + self.means[second] - played[slot]
+            if long_part <= 0 or short_part <= 0:
+                continue
+            ratios.append(long_part / short_part)
+            weights.append(weight)
+
+        if not ratios:
+            return None
+        return float(np.average(ratios, weights=weights))
+
+    def view(self, min_hits=GROOVE_MIN_HITS):
+        """
+        Смещение по позициям в такте
+
+        Returns:
+            list: Словари {'slot', 'offset', 'hits', 'mean', 'std', 'bias'} по порядку нот,
+                bias - 'early', 'late' или None (нет систематического смещения или мало ударов)
+        """
+        std = self.deviations_std
+        rows = []
+        for slot in range(self.slot_count):
+            count = int(self.counts[slot])
+            mean = float(self.means[slot])
+            bias = None
+            if count >= min_hits and abs(mean) >= GROOVE_BIAS:
+                # Смещение должно быть больше случайного разброса среднего
+                if abs(mean) > GROOVE_CONFIDENCE * std[slot] / math.sqrt(count):
+                    bias = 'early' if mean < 0 else 'late'
+            rows.append({
+                'slot': slot,
+                'offset': float(self.slot_offsets[slot]),
+                'hits': count,
+                'mean': mean,
+                'std': float(std[slot]),
+                'bias': bias
+            })
+        return rows
+
+    def summary_lines(self, beat_duration):
+        """
+        Текстовый вид профиля для панели
+
+        Args:
+            beat_duration: Длительность доли (сек) для перевода отклонений в миллисекунды
+        """
+        if not self.total_hits:
+            return []
+
+        marks = {'early': '<< РАНО', 'late': 'ПОЗДНО >>', None: ''}
+        lines = ['Позиция   Ударов   Среднее     Разброс']
+        for row in self.view():
+            beat, part = divmod(row['offset'], 1.0)
+            position = f"{int(beat) + 1}" if part < 1e-6 else f"{int(beat) + 1}+{part:.2f}"
+            lines.append(f"{position:<9} {row['hits']:>6}   {row['mean'] * beat_duration * 1000:+6.0f} мс"
+                         f"   {row['std'] * beat_duration * 1000:5.0f} мс  {marks[row['bias']]}")
+
+        swing = self.swing_ratio()
+        if swing is not None:
+            lines.append(f"Свинг: {swing:.2f} : 1")
+        return lines
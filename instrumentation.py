@@ -0,0 +1,225 @@
+import csv
+import json
+import math
+import platform
+import threading
+import time
+import numpy as np
+
+# Имена метрик конвейера
+CALLBACK_DURATION = 'callback.duration'      # Длительность audio_callback (сек)
+CALLBACK_JITTER = 'callback.jitter'          # Отклонение интервала между вызовами от длительности блока (сек)
+QUEUE_DEPTH = 'queue.depth'                  # Глубина очереди событий при добавлении блока
+QUEUE_DWELL = 'queue.dwell'                  # Время ожидания события в очереди (сек)
+QUEUE_DROPPED = 'queue.dropped'              # Блоки уровня, не поставленные в очередь из-за отставания обработки
+UI_UPDATE = 'ui.update'                      # Длительность кадра тренажера (сек)
+UI_DRAW_NOTES = 'ui.draw_notes'              # Длительность отрисовки нот (сек)
+UI_SPECTRUM = 'ui.spectrum'                  # Длительность кадра анализатора спектра (сек)
+ONSET_TO_JUDGEMENT = 'latency.judgement'     # От onset до оценки попадания (сек)
+ONSET_TO_DISPLAY = 'latency.display'         # От onset до подсветки линии (сек)
+MONITOR_LATENCY = 'monitor.latency_ms'       # Задержка моста мониторинга (мс)
+MONITOR_CORRECTION = 'monitor.correction_ppm'  # Подстройка коэффициента ресемплирования (ppm)
+MONITOR_UNDERRUNS = 'monitor.underruns'      # Опустошения моста мониторинга
+MONITOR_OVERRUNS = 'monitor.overruns'        # Переполнения моста мониторинга
+MONITOR_DSP = 'monitor.dsp'                  # Длительность обработки блока цепочкой эффектов (сек)
+MONITOR_DSP_LOAD = 'monitor.dsp_load_pct'    # Доля бюджета блока, занятая цепочкой эффектов (%)
+
+# Флаги статуса PortAudio (значения совпадают с pyaudio.paInputUnderflow и т.д.)
+STATUS_FLAGS = {
+    1: 'xrun.input_underflow',
+    2: 'xrun.input_overflow',
+    4: 'xrun.output_underflow',
+    8: 'xrun.output_overflow',
+    16: 'xrun.priming_output'
+}
+
+# Метрики, которые измеряют количество элементов, а не время
+COUNT_METRICS = (QUEUE_DEPTH,)
+
+class LatencyHistogram:
+    """Гистограмма с логарифмическими корзинами и записью за O(1)"""
+    def __init__(self, min_value=1e-6, max_value=10.0, bins_per_decade=20):
+        """
+        Args:
+            min_value: Нижняя граница первой корзины
+            max_value: Верхняя граница последней корзины
+            bins_per_decade: Количество корзин на порядок величины
+        """
+        self.min_value = min_value
+        self.max_value = max_value
+        self.bins_per_decade = bins_per_decade
+        self._log_min = math.log10(min_value)
+        self.num_bins = int(math.ceil((math.log10(max_value) - self._log_min) * bins_per_decade))
+
+        # Нулевая корзина - значения ниже min_value, последняя - выше max_value
+        self.edges = 10.0 ** (self._log_min + np.arange(self.num_bins + 1) / bins_per_decade)
+        self.counts = [0] * (self.num_bins + 2)
+        self.reset()
+
+    def reset(self):
+        """Сброс накопленных значений"""
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value):
+        """Добавление значения"""
+        if value < self.min_value:
+            index = 0
+        elif value >= self.max_value:
+            index = self.num_bins + 1
+        else:
+            index = int((math.log10(value) - self._log_min) * self.bins_per_decade) + 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """
+        Оценка перцентиля по корзинам (верхняя граница корзины)
+
+        Args:
+            q: Перцентиль (0 - 100)
+        """
+        if self.count == 0:
+            return 0.0
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, q / 100.0 * self.count))
+        if index == 0:
+            return self.min_value
+        if index > self.num_bins:
+            return self.max
+        return min(float(self.edges[index]), self.max)
+
+    @property
+    def mean(self):
+        """Среднее значение"""
+        return self.total / self.count if self.count else 0.0
+
+    def snapshot(self):
+        """Сводка по гистограмме"""
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.min if self.count else 0.0,
+            'max': self.max if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'edges': self.edges.tolist(),
+            'counts': list(self.counts)
+        }
+
+class PipelineMetrics:
+    """Набор метрик конвейера: гистограммы, счетчики, значения и сведения о конфигурации"""
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.info = {
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'python': platform.python_version()
+        }
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        """Получение (или создание) гистограммы по имени"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    if name in COUNT_METRICS:
+                        histogram = LatencyHistogram(min_value=1, max_value=100000, bins_per_decade=10)
+                    else:
+                        histogram = LatencyHistogram()
+                    self.histograms[name] = histogram
+        return histogram
+
+    def record(self, name, value):
+        """Добавление значения в гистограмму"""
+        self.histogram(name).record(value)
+
+    def increment(self, name, amount=1):
+        """Увеличение счетчика"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        """Установка текущего значения"""
+        self.gauges[name] = value
+
+    def set_info(self, key, value):
+        """Сведения о конфигурации (устройство, размер буфера и т.д.)"""
+        self.info[key] = value
+
+    def record_status(self, status):
+        """Подсчет флагов статуса PortAudio (xrun)"""
+        for flag, name in STATUS_FLAGS.items():
+            if status & flag:
+                self.increment(name)
+
+    def reset(self):
+        """Сброс накопленных значений"""
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.reset()
+            self.counters.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """Полная сводка по всем метрикам"""
+        return {
+            'timestamp': time.time(),
+            'duration': time.time() - self.started_at,
+            'info': dict(self.info),
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'histograms': {name: h.snapshot() for name, h in list(self.histograms.items())}
+        }
+
+    def summary_lines(self):
+        """Краткая сводка для отображения поверх интерфейса"""
+        lines = []
+        for name in sorted(self.histograms):
+            h = self.histograms[name]
+            if not h.count:
+                continue
+            if name in COUNT_METRICS:
+                lines.append(f"{name}: ср {h.mean:.1f}  p99 {h.percentile(99):.0f}  макс {h.max:.0f}")
+            else:
+                lines.append(
+                    f"{name}: ср {h.mean * 1000:.2f}  p99 {h.percentile(99) * 1000:.2f}  "
+                    f"макс {h.max * 1000:.2f} мс"
+                )
+        for name in sorted(self.gauges):
+            lines.append(f"{name}: {self.gauges[name]}")
+        for name in sorted(self.counters):
+            lines.append(f"{name}: {self.counters[name]}")
+        return lines
+
+    def export_json(self, path):
+        """Экспорт полной сводки в JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=4, default=str)
+
+    def export_csv(self, path):
+        """Экспорт сводки гистограмм и счетчиков в CSV (по строке на метрику)"""
+        snapshot = self.snapshot()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['metric', 'count', 'mean', 'min', 'max', 'p50', 'p90', 'p99'])
+            for name, h in sorted(snapshot['histograms'].items()):
+                writer.writerow([name, h['count'], h['mean'], h['min'], h['max'],
+                                 h['p50'], h['p90'], h['p99']])
+            for name, value in sorted(snapshot['counters'].items()):
+                writer.writerow([name, value, '', '', '', '', '', ''])
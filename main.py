@@ -13,7 +13,8 @@ from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.relativelayout import RelativeLayout
 from kivy.uix.widget import Widget
 from kivy.clock import Clock
-from kivy.graphics import Color, Rectangle, Line, Ellipse, RoundedRectangle
+from kivy.graphics import Color, Rectangle, Line, Ellipse, RoundedRectangle, Mesh
+from kivy.graphics.texture import Texture
 from kivy.core.audio import SoundLoader
 import os
 import time
@@ -24,6 +25,21 @@ import json
 
 # Импортируем наш модуль
 from audio_processor import AudioProcessor
+from monitoring_chain import DEFAULT_EFFECTS, GATE_OFF_DB
+from audio_assets import prepare_sample
+from rhythm_patterns import PATTERNS, DEFAULT_PATTERN, PatternSchedule, get_pattern
+from rhythm_analyzer import RhythmAnalyzer
+from session_history import SessionHistory
+import instrumentation
+from instrumentation import PipelineMetrics
+import realtime
+from realtime import GCController
+from frame_dispatcher import FrameDispatcher, EVENT_ONSET, EVENT_LEVEL, EVENT_TEMPO, EVENT_PITCH, EVENT_CHORD
+from clocks import SYSTEM_CLOCK
+from waveform import WaveformPyramid, MarkerTrack, markers_between, load_recording
+from pitch import PitchDetector, note_from_frequency, REFERENCE_A4, NOTE_NAMES
+from pentatonic import PentatonicTrainer, BOX_COUNT
+from spectrum import SpectrumAnalyzer, SPECTRUM_BANDS, SPECTRUM_MIN_DB, SPECTRUM_MAX_DB, SPECTROGRAM_HISTORY
 
 # Определяем цветовую схему в рок-стиле
 COLORS = {
@@ -39,6 +55,74 @@ COLORS = {
     'miss': (1.0, 0.0, 0.0, 1)   # Красный для промахов
 }
 
+# Количество светлых точек "шума" на фоне приложения
+BACKGROUND_NOISE_SPECKS = 100
+
+# Задержка перегенерации фона после изменения размера окна (сек)
+BACKGROUND_RESIZE_DEBOUNCE = 0.25
+
+# Значение в списке размеров буфера для автоподбора
+BUFFER_SIZE_AUTO = 'АВТО'
+
+# Период проверки автоподбора размера буфера (сек)
+BUFFER_TUNER_POLL_INTERVAL = 0.5
+
+# Окно живой волны входа (сек), пределы масштаба и период ее обновления (сек)
+WAVEFORM_SECONDS = 5.0
+WAVEFORM_MIN_SECONDS = 0.25
+WAVEFORM_REFRESH_INTERVAL = 1.0 / 30.0
+
+# Период обновления анализатора спектра (сек)
+SPECTRUM_REFRESH_INTERVAL = 1.0 / 30.0
+
+# Период обновления тюнера (сек), сглаживание частоты (последних оценок)
+# и допуск "строит" (центов)
+TUNER_REFRESH_INTERVAL = 1.0 / 30.0
+TUNER_SMOOTHING = 5
+TUNER_IN_TUNE_CENTS = 5.0
+# Сходство хромы с шаблоном, начиная с которого аккорд считается уверенно определенным
+CHORD_CONFIDENT = 0.8
+
+# Ползунки эффектов мониторинга: ключ настройки, подпись, минимум, максимум (дБ)
+MONITOR_EFFECT_SLIDERS = (
+    ('gain_db', 'УСИЛЕНИЕ:', -12.0, 24.0),
+    ('gate_threshold_db', 'ГЕЙТ:', -90.0, -20.0),
+    ('bass_db', 'НИЗ:', -12.0, 12.0),
+    ('mid_db', 'СЕРЕДИНА:', -12.0, 12.0),
+    ('treble_db', 'ВЕРХ:', -12.0, 12.0),
+)
+
+def make_noise_background(width, height, base_color=COLORS['dark'], specks=BACKGROUND_NOISE_SPECKS, seed=None):
+    """
+    Генерация изображения фона с эффектом "шума"
+    
+    Args:
+        width: Ширина изображения (пикселей)
+        height: Высота изображения (пикселей)
+        base_color: Цвет фона (RGBA, 0.0 - 1.0)
+        specks: Количество светлых точек
+        seed: Зерно генератора случайных чисел
+    
+    Returns:
+        numpy array формы (height, width, 3) с типом uint8
+    """
+    rng = np.random.default_rng(seed)
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[:] = base_color[:3]
+    
+    # Параметры точек как в прежней отрисовке прямоугольниками
+    xs = (rng.integers(0, 101, specks) / 100.0 * (width - 1)).astype(int)
+    ys = (rng.integers(0, 101, specks) / 100.0 * (height - 1)).astype(int)
+    sizes = rng.integers(1, 4, specks)
+    alphas = rng.integers(1, 11, specks) / 20.0
+    
+    # Накладываем белые точки с прозрачностью поверх фона
+    for x, y, size, alpha in zip(xs, ys, sizes, alphas):
+        patch = image[y:y + size, x:x + size]
+        patch += (1.0 - patch) * alpha
+    
+    return (image * 255.0 + 0.5).astype(np.uint8)
+
 class RockButton(Button):
     """Стилизованная кнопка в рок-стиле"""
     def __init__(self, **kwargs):
@@ -188,6 +272,563 @@ class SignalLevelIndicator(BoxLayout):
             # Красный для высокого уровня
             self.indicator_color.rgb = (0.7, 0.0, 0.0)
 
+class WaveformView(Widget):
+    """
+    Прокручиваемая волна входа или записи с отметками onset и долей метронома
+    
+    Волна строится из WaveformPyramid: по столбцу на пиксель ширины одним Mesh из
+    вертикальных отрезков min-max, поэтому отрисовка не зависит от масштаба и длины
+    записи. Отметки берутся бинарным поиском из отсортированных массивов: живые -
+    из кольцевых MarkerTrack, отметки записи - из ее массивов целиком.
+    """
+    def __init__(self, clock=None, **kwargs):
+        super(WaveformView, self).__init__(**kwargs)
+        self.clock = clock or SYSTEM_CLOCK
+        self.size_hint_y = None
+        self.height = 80
+        
+        self.seconds = WAVEFORM_SECONDS  # Ширина окна (сек)
+        self.pyramid = None
+        self.ring_source = None   # Живой вход: функция -> (AudioRingBuffer, частота дискретизации)
+        self.block_source = None  # Функция -> (индекс конца последнего блока, его время) или None
+        self.beat_source = None   # Функция (start, end) -> отсортированные времена долей или None
+        self.onsets = MarkerTrack()
+        self.beats = MarkerTrack()
+        self.recorded_onsets = None  # Отметки показанной записи (секунды от начала)
+        self.recorded_beats = None
+        self.view_end = None      # Время правого края; None - живой вход (правый край - последний сэмпл)
+        self.record_length = 0.0  # Длительность показанной записи (сек)
+        
+        self._columns = 0
+        self._vertices = None
+        
+        with self.canvas:
+            Color(0.08, 0.08, 0.08, 1)
+            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
+            Color(*COLORS['secondary'])
+            self.beat_mesh = Mesh(mode='lines')
+            Color(*COLORS['primary'])
+            self.wave_mesh = Mesh(mode='lines')
+            Color(*COLORS['highlight'])
+            self.onset_mesh = Mesh(mode='lines')
+        self.bind(pos=self._update_canvas, size=self._update_canvas)
+    
+    def _update_canvas(self, instance, value):
+        """Обновление canvas при изменении размера"""
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+        self.refresh(0)
+    
+    def show_live(self):
+        """Возврат к живому входу"""
+        self.view_end = None
+        self.seconds = WAVEFORM_SECONDS
+        self.pyramid = None
+        self.recorded_onsets = None
+        self.recorded_beats = None
+        self.onsets.reset()
+        self.beats.reset()
+    
+    def add_onset(self, timestamp):
+        """Отметка живого удара; пока показана запись, живые удары не отмечаются"""
+        if self.view_end is None:
+            self.onsets.add(timestamp)
+    
+    def show_recording(self, pyramid, onsets, beats):
+        """
+        Показ записанного занятия целиком
+        
+        Args:
+            pyramid: WaveformPyramid записи (время - секунды от начала)
+            onsets: Отсортированные времена ударов
+            beats: Отсортированные времена долей метронома
+        """
+        self.pyramid = pyramid
+        self.recorded_onsets = np.asarray(onsets, dtype=np.float64)
+        self.recorded_beats = np.asarray(beats, dtype=np.float64)
+        self.record_length = pyramid.position / pyramid.sample_rate
+        self.view_end = pyramid.anchor_time + self.record_length
+        self.seconds = max(WAVEFORM_MIN_SECONDS, self.record_length)
+        self.refresh(0)
+    
+    def zoom(self, factor):
+        """Изменение масштаба (factor < 1 - приближение) вокруг правого края"""
+        longest = self.record_length if self.view_end is not None else WAVEFORM_SECONDS * 4
+        self.seconds = min(max(WAVEFORM_MIN_SECONDS, self.seconds * factor), max(longest, WAVEFORM_MIN_SECONDS))
+        self.refresh(0)
+    
+    def on_touch_down(self, touch):
+        """Колесо - масштаб, двойное касание - возврат к живому входу"""
+        if not self.collide_point(*touch.pos):
+            return super(WaveformView, self).on_touch_down(touch)
+        if touch.is_mouse_scrolling:
+            self.zoom(0.8 if touch.button == 'scrolldown' else 1.25)
+        elif touch.is_double_tap and self.view_end is not None:
+            self.show_live()
+        return True
+    
+    def refresh(self, dt):
+        """Перестроение волны и отметок для текущего окна"""
+        if self.view_end is None and self.ring_source is not None:
+            ring, sample_rate = self.ring_source()
+            if self.pyramid is None or self.pyramid.sample_rate != sample_rate:
+                self.pyramid = WaveformPyramid(sample_rate)
+            # Правый край - время последнего записанного блока, а не текущее:
+            # иначе живые отметки смещаются на задержку обработки
+            block = self.block_source() if self.block_source is not None else None
+            if block is None:
+                self.pyramid.update_from_ring(ring, self.clock.time())
+            else:
+                self.pyramid.update_from_ring(ring, block[1], block[0])
+        
+        pyramid = self.pyramid
+        columns = int(self.width)
+        if pyramid is None or pyramid.anchor_time is None or columns <= 0:
+            return
+        
+        end_time = self.view_end if self.view_end is not None else pyramid.anchor_time
+        start_time = end_time - self.seconds
+        minimums, maximums = pyramid.envelope(pyramid.time_to_index(start_time),
+                                              pyramid.time_to_index(end_time), columns)
+        
+        # Вершины (x, y, u, v): по два на столбец; x меняется только с шириной
+        if columns != self._columns:
+            self._columns = columns
+            self._vertices = np.zeros((columns, 2, 4), dtype=np.float32)
+            self.wave_mesh.indices = list(range(2 * columns))
+        vertices = self._vertices
+        vertices[:, :, 0] = (self.x + np.arange(columns, dtype=np.float32) + 0.5)[:, None]
+        half = self.height / 2.0
+        vertices[:, 0, 1] = self.center_y + minimums * half
+        vertices[:, 1, 1] = self.center_y + np.maximum(maximums, minimums + 1.0 / half) * half
+        self.wave_mesh.vertices = vertices.ravel().tolist()
+        
+        if self.view_end is not None:
+            beats = markers_between(self.recorded_beats, start_time, end_time)
+            onsets = markers_between(self.recorded_onsets, start_time, end_time)
+        else:
+            beats = self.beat_source(start_time, end_time) if self.beat_source is not None else None
+            if beats is None:
+                beats = self.beats.between(start_time, end_time)
+            onsets = self.onsets.between(start_time, end_time)
+        self._set_markers(self.beat_mesh, beats, start_time)
+        self._set_markers(self.onset_mesh, onsets, start_time)
+    
+    def _set_markers(self, mesh, times, start_time):
+        """Вертикальные отметки для отсортированных времен в окне"""
+        count = len(times)
+        markers = np.zeros((count, 2, 4), dtype=np.float32)
+        markers[:, :, 0] = (self.x + (np.asarray(times) - start_time) * (self.width / self.seconds))[:, None]
+        markers[:, 0, 1] = self.y
+        markers[:, 1, 1] = self.top
+        mesh.vertices = markers.ravel().tolist()
+        mesh.indices = list(range(2 * count))
+
+class SpectrumView(Widget):
+    """
+    Спектр и спектрограмма входа поверх тренажера
+    
+    Спектрограмма - текстура-кольцо: за кадр в нее загружается один столбец через
+    blit_buffer, а прокрутка делается сдвигом координат текстуры, без копирования
+    остальных столбцов. Спектр считается только когда панель видна, с частотой
+    кадров интерфейса.
+    """
+    def __init__(self, metrics=None, **kwargs):
+        super(SpectrumView, self).__init__(**kwargs)
+        self.metrics = metrics
+        self.is_visible = False
+        self.ring_source = None  # Функция -> (AudioRingBuffer, частота дискретизации)
+        self.analyzer = None
+        
+        self.size_hint = (None, None)
+        self.size = (460, 220)
+        self.pos_hint = {'x': 0.02, 'y': 0.02}
+        self.opacity = 0
+        
+        self.texture = Texture.create(size=(SPECTROGRAM_HISTORY, SPECTRUM_BANDS), colorfmt='rgba')
+        self.texture.wrap = 'repeat'
+        self.texture.blit_buffer(bytes(SPECTROGRAM_HISTORY * SPECTRUM_BANDS * 4), colorfmt='rgba', bufferfmt='ubyte')
+        self._column = 0  # Столбец текстуры для следующего спектра
+        self._points = np.zeros((SPECTRUM_BANDS, 2), dtype=np.float32)
+        
+        with self.canvas:
+            Color(0, 0, 0, 0.7)
+            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
+            Color(1, 1, 1, 1)
+            self.image = Rectangle(pos=self.pos, size=self.size, texture=self.texture)
+            Color(*COLORS['highlight'])
+            self.line = Line(points=[], width=1)
+        self.bind(pos=self._update_canvas, size=self._update_canvas)
+    
+    def _update_canvas(self, instance, value):
+        """Обновление canvas при изменении размера"""
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+        self.image.pos = self.pos
+        self.image.size = self.size
+    
+    def toggle(self):
+        """Показать/скрыть панель"""
+        self.is_visible = not self.is_visible
+        self.opacity = 1 if self.is_visible else 0
+        if self.is_visible:
+            Clock.schedule_interval(self.refresh, SPECTRUM_REFRESH_INTERVAL)
+        else:
+            Clock.unschedule(self.refresh)
+        return self.is_visible
+    
+    def refresh(self, dt):
+        """Новый спектр последнего окна входа (если пришли новые сэмплы)"""
+        if self.ring_source is None:
+            return
+        frame_start = time.perf_counter()
+        ring, sample_rate = self.ring_source()
+        if self.analyzer is None or self.analyzer.sample_rate != sample_rate:
+            self.analyzer = SpectrumAnalyzer(sample_rate)
+        analyzer = self.analyzer
+        if not analyzer.update(ring):
+            return
+        
+        # Один столбец в кольцо текстуры; самый новый столбец - у правого края
+        self.texture.blit_buffer(analyzer.column.tobytes(), pos=(self._column, 0), size=(1, SPECTRUM_BANDS),
+                                 colorfmt='rgba', bufferfmt='ubyte')
+        self._column = (self._column + 1) % SPECTROGRAM_HISTORY
+        offset = self._column / SPECTROGRAM_HISTORY
+        self.image.tex_coords = (offset, 0, offset + 1, 0, offset + 1, 1, offset, 1)
+        
+        # Текущий спектр линией поверх спектрограммы
+        points = self._points
+        points[:, 0] = self.x + np.linspace(0.0, self.width, SPECTRUM_BANDS)
+        np.clip(analyzer.levels, SPECTRUM_MIN_DB, SPECTRUM_MAX_DB, out=points[:, 1])
+        points[:, 1] -= SPECTRUM_MIN_DB
+        points[:, 1] *= self.height / (SPECTRUM_MAX_DB - SPECTRUM_MIN_DB)
+        points[:, 1] += self.y
+        self.line.points = points.ravel().tolist()
+        
+        if self.metrics is not None:
+            self.metrics.record(instrumentation.UI_SPECTRUM, time.perf_counter() - frame_start)
+
+class MetricsOverlay(Label):
+    """Панель с метриками задержек и джиттера поверх тренажера"""
+    def __init__(self, metrics, **kwargs):
+        super(MetricsOverlay, self).__init__(**kwargs)
+        self.metrics = metrics
+        self.refresh_interval = 0.5  # Период обновления текста (сек)
+        self.is_visible = False
+        
+        self.font_size = '11sp'
+        self.color = COLORS['text']
+        self.halign = 'left'
+        self.valign = 'top'
+        self.size_hint = (None, None)
+        self.size = (460, 320)
+        self.pos_hint = {'x': 0.02, 'top': 0.98}
+        self.padding = (10, 10)
+        self.opacity = 0
+        self.bind(size=self.setter('text_size'))
+        
+        # Полупрозрачный фон
+        with self.canvas.before:
+            Color(0, 0, 0, 0.7)
+            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_canvas, size=self._update_canvas)
+    
+    def _update_canvas(self, instance, value):
+        """Обновление canvas при изменении размера"""
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+    
+    def toggle(self):
+        """Показать/скрыть панель"""
+        self.is_visible = not self.is_visible
+        self.opacity = 1 if self.is_visible else 0
+        if self.is_visible:
+            self.refresh(0)
+            Clock.schedule_interval(self.refresh, self.refresh_interval)
+        else:
+            Clock.unschedule(self.refresh)
+        return self.is_visible
+    
+    def refresh(self, dt):
+        """Обновление текста панели"""
+        lines = self.metrics.summary_lines()
+        self.text = '\n'.join(lines) if lines else 'Нет данных'
+
+class GrooveOverlay(Label):
+    """Панель со смещением ударов по позициям в такте поверх тренажера"""
+    def __init__(self, trainer, **kwargs):
+        super(GrooveOverlay, self).__init__(**kwargs)
+        self.trainer = trainer
+        self.refresh_interval = 0.5  # Период обновления текста (сек)
+        self.is_visible = False
+        
+        self.font_size = '11sp'
+        self.color = COLORS['text']
+        self.halign = 'left'
+        self.valign = 'top'
+        self.size_hint = (None, None)
+        self.size = (420, 320)
+        self.pos_hint = {'center_x': 0.5, 'top': 0.98}
+        self.padding = (10, 10)
+        self.opacity = 0
+        self.bind(size=self.setter('text_size'))
+        
+        # Полупрозрачный фон
+        with self.canvas.before:
+            Color(0, 0, 0, 0.7)
+            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_canvas, size=self._update_canvas)
+    
+    def _update_canvas(self, instance, value):
+        """Обновление canvas при изменении размера"""
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+    
+    def toggle(self):
+        """Показать/скрыть панель"""
+        self.is_visible = not self.is_visible
+        self.opacity = 1 if self.is_visible else 0
+        if self.is_visible:
+            self.refresh(0)
+            Clock.schedule_interval(self.refresh, self.refresh_interval)
+        else:
+            Clock.unschedule(self.refresh)
+        return self.is_visible
+    
+    def refresh(self, dt):
+        """Обновление текста панели"""
+        analyzer = self.trainer.rhythm_analyzer
+        lines = analyzer.groove.summary_lines(60.0 / analyzer.tempo)
+        self.text = '\n'.join(lines) if lines else 'Нет данных'
+
+class TunerDisplay(Label):
+    """
+    Тюнер поверх тренажера: нота, отклонение в центах и стрелка
+    
+    Высота определяется по кольцевому буферу уже открытого входа с частотой кадров
+    интерфейса, пока тюнер включен; поток и устройство не переоткрываются.
+    """
+    def __init__(self, **kwargs):
+        super(TunerDisplay, self).__init__(**kwargs)
+        self.is_visible = False
+        self.ring_source = None  # Функция -> (AudioRingBuffer, частота дискретизации)
+        self.detector = None
+        self.reference = REFERENCE_A4
+        self._frequencies = []   # Последние оценки для медианного сглаживания
+        
+        self.font_size = '28sp'
+        self.bold = True
+        self.markup = True
+        self.color = COLORS['text']
+        self.halign = 'center'
+        self.valign = 'top'
+        self.size_hint = (None, None)
+        self.size = (320, 170)
+        self.pos_hint = {'center_x': 0.5, 'center_y': 0.55}
+        self.padding = (10, 10)
+        self.opacity = 0
+        self.bind(size=self.setter('text_size'))
+        
+        # Полупрозрачный фон, шкала от -50 до +50 центов и стрелка
+        with self.canvas.before:
+            Color(0, 0, 0, 0.7)
+            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
+        with self.canvas.after:
+            Color(*COLORS['text'])
+            self.scale = Rectangle()
+            self.center_mark = Rectangle()
+            self.needle_color = Color(*COLORS['highlight'])
+            self.needle = Rectangle()
+        self.bind(pos=self._update_canvas, size=self._update_canvas)
+        self.cents = 0.0
+    
+    def _update_canvas(self, instance, value):
+        """Обновление canvas при изменении размера"""
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+        self.scale.pos = (self.x + 20, self.y + 28)
+        self.scale.size = (self.width - 40, 2)
+        self.center_mark.pos = (self.center_x - 1, self.y + 18)
+        self.center_mark.size = (2, 22)
+        self._place_needle()
+    
+    def _place_needle(self):
+        """Положение стрелки по отклонению в центах"""
+        offset = max(-50.0, min(50.0, self.cents)) / 50.0 * (self.width - 40) / 2.0
+        self.needle.pos = (self.center_x + offset - 3, self.y + 12)
+        self.needle.size = (6, 34)
+    
+    def toggle(self):
+        """Показать/скрыть тюнер"""
+        self.is_visible = not self.is_visible
+        self.opacity = 1 if self.is_visible else 0
+        self._frequencies = []
+        if self.is_visible:
+            self.text = 'Сыграйте открытую струну'
+            Clock.schedule_interval(self.refresh, TUNER_REFRESH_INTERVAL)
+        else:
+            Clock.unschedule(self.refresh)
+        return self.is_visible
+    
+    def refresh(self, dt):
+        """Новая оценка высоты (если пришли новые сэмплы)"""
+        if self.ring_source is None:
+            return
+        ring, sample_rate = self.ring_source()
+        if self.detector is None or self.detector.sample_rate != sample_rate:
+            self.detector = PitchDetector(sample_rate)
+        result = self.detector.update(ring)
+        if result is None:
+            return
+        
+        # Медиана последних оценок убирает одиночные срывы на октаву при атаке
+        self._frequencies.append(result[0])
+        del self._frequencies[:-TUNER_SMOOTHING]
+        frequency = float(np.median(self._frequencies))
+        name, octave, cents = note_from_frequency(frequency, self.reference)
+        
+        self.cents = cents
+        if abs(cents) <= TUNER_IN_TUNE_CENTS:
+            self.needle_color.rgba = (0.2, 0.9, 0.2, 1)
+        else:
+            self.needle_color.rgba = COLORS['highlight'] if abs(cents) <= 3 * TUNER_IN_TUNE_CENTS else COLORS['accent']
+        self._place_needle()
+        self.text = f"{name}{octave}  {cents:+.0f} ц\n[size=14sp]{frequency:.1f} Гц[/size]"
+
+class PentatonicDisplay(Label):
+    """Упражнение по пентатонике поверх тренажера: следующая нота, результат удара и статистика"""
+    def __init__(self, exercise, **kwargs):
+        super(PentatonicDisplay, self).__init__(**kwargs)
+        self.exercise = exercise
+        self.font_size = '15sp'
+        self.bold = True
+        self.color = COLORS['text']
+        self.halign = 'left'
+        self.valign = 'top'
+        self.size_hint = (None, None)
+        self.size = (380, 130)
+        self.pos_hint = {'x': 0.02, 'top': 0.98}
+        self.padding = (10, 10)
+        self.opacity = 0
+        self.bind(size=self.setter('text_size'))
+        
+        # Полупрозрачный фон
+        with self.canvas.before:
+            Color(0, 0, 0, 0.7)
+            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_canvas, size=self._update_canvas)
+    
+    def _update_canvas(self, instance, value):
+        """Обновление canvas при изменении размера"""
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+    
+    def set_active(self, active):
+        """Показать/скрыть панель"""
+        self.opacity = 1 if active else 0
+        self.refresh()
+    
+    def refresh(self):
+        """Обновление текста по состоянию упражнения"""
+        result = self.exercise.last_result
+        if result is None:
+            self.color = COLORS['text']
+        elif result['correct'] and result['on_time']:
+            self.color = (0.2, 0.9, 0.2, 1)
+        else:
+            self.color = COLORS['highlight'] if result['correct'] else COLORS['accent']
+        self.text = '\n'.join(self.exercise.summary_lines())
+
+class ChordDisplay(Label):
+    """Аккорд последнего удара и сходство с шаблоном поверх тренажера"""
+    def __init__(self, **kwargs):
+        super(ChordDisplay, self).__init__(**kwargs)
+        self.font_size = '32sp'
+        self.bold = True
+        self.markup = True
+        self.color = COLORS['text']
+        self.halign = 'center'
+        self.valign = 'middle'
+        self.size_hint = (None, None)
+        self.size = (200, 100)
+        self.pos_hint = {'right': 0.98, 'y': 0.02}
+        self.padding = (10, 10)
+        self.opacity = 0
+        self.bind(size=self.setter('text_size'))
+        
+        # Полупрозрачный фон
+        with self.canvas.before:
+            Color(0, 0, 0, 0.7)
+            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_canvas, size=self._update_canvas)
+    
+    def _update_canvas(self, instance, value):
+        """Обновление canvas при изменении размера"""
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+    
+    def set_active(self, active):
+        """Показать/скрыть панель"""
+        self.opacity = 1 if active else 0
+        self.color = COLORS['text']
+        self.text = '[size=16sp]Ударьте аккорд[/size]' if active else ''
+    
+    def set_chord(self, chord, confidence):
+        """Отображение аккорда удара"""
+        if chord is None:
+            self.color = COLORS['accent']
+            self.text = '?'
+            return
+        self.color = COLORS['text'] if confidence >= CHORD_CONFIDENT else COLORS['accent']
+        self.text = f"{chord}\n[size=14sp]сходство {confidence * 100:.0f}%[/size]"
+
+class TempoDisplay(Label):
+    """Темп свободной игры, стабильность и торопливость поверх тренажера"""
+    STATUS_TEXT = {
+        'rushing': ('ТОРОПИТЕСЬ', COLORS['highlight']),
+        'dragging': ('ТЯНЕТЕ', COLORS['accent']),
+        'steady': ('РОВНО', COLORS['text'])
+    }
+    
+    def __init__(self, **kwargs):
+        super(TempoDisplay, self).__init__(**kwargs)
+        self.font_size = '16sp'
+        self.bold = True
+        self.color = COLORS['text']
+        self.halign = 'right'
+        self.valign = 'top'
+        self.size_hint = (None, None)
+        self.size = (260, 120)
+        self.pos_hint = {'right': 0.98, 'top': 0.98}
+        self.padding = (10, 10)
+        self.opacity = 0
+        self.bind(size=self.setter('text_size'))
+        
+        # Полупрозрачный фон
+        with self.canvas.before:
+            Color(0, 0, 0, 0.7)
+            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_canvas, size=self._update_canvas)
+    
+    def _update_canvas(self, instance, value):
+        """Обновление canvas при изменении размера"""
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+    
+    def set_active(self, active):
+        """Показать/скрыть панель"""
+        self.opacity = 1 if active else 0
+        self.color = COLORS['text']
+        self.text = 'СВОБОДНАЯ ИГРА\nИграйте ровными долями...' if active else ''
+    
+    def set_estimate(self, estimate):
+        """Отображение оценки TempoTracker"""
+        status, color = self.STATUS_TEXT.get(estimate['status'], ('...', COLORS['text']))
+        self.color = color
+        self.text = (f"{estimate['bpm']:.1f} BPM\n"
+                     f"Стабильность: {estimate['stability'] * 100:.0f}%\n"
+                     f"{status} ({estimate['deviation'] * 100:+.0f}% доли)")
+
 class GuitarMonitorWidget(BoxLayout):
     def __init__(self, **kwargs):
         super(GuitarMonitorWidget, self).__init__(**kwargs)
@@ -626,7 +1267,7 @@ class SettingsPopup(Popup):
         
         self.buffer_size_spinner = Spinner(
             text='128',
-            values=['64', '128', '256', '512', '1024'],
+            values=[BUFFER_SIZE_AUTO, '64', '128', '256', '512', '1024'],
             size_hint_x=0.7,
             background_color=COLORS['background'],
             color=COLORS['text']
@@ -636,6 +1277,27 @@ class SettingsPopup(Popup):
         
         settings_container.add_widget(buffer_size_layout)
         
+        # Формат захвата (целые форматы уменьшают объем данных и преобразования в драйвере)
+        sample_format_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=50)
+        sample_format_layout.add_widget(Label(
+            text='ФОРМАТ:',
+            font_size='14sp',
+            color=COLORS['text'],
+            size_hint_x=0.3
+        ))
+        
+        self.sample_format_spinner = Spinner(
+            text='float32',
+            values=['int16', 'int24', 'float32'],
+            size_hint_x=0.7,
+            background_color=COLORS['background'],
+            color=COLORS['text']
+        )
+        self.sample_format_spinner.bind(text=self.on_sample_format_selected)
+        sample_format_layout.add_widget(self.sample_format_spinner)
+        
+        settings_container.add_widget(sample_format_layout)
+        
         # Режим низкой задержки
         low_latency_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=50)
         low_latency_layout.add_widget(Label(
@@ -651,6 +1313,63 @@ class SettingsPopup(Popup):
         
         settings_container.add_widget(low_latency_layout)
         
+        # Режим реального времени (приоритет потоков аудио, привязка к ядрам, управление GC)
+        realtime_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=50)
+        realtime_layout.add_widget(Label(
+            text='РЕАЛЬНОЕ ВРЕМЯ:',
+            font_size='14sp',
+            color=COLORS['text'],
+            size_hint_x=0.7
+        ))
+        
+        self.realtime_switch = Switch(active=False, size_hint_x=0.3, disabled=not realtime.is_supported())
+        realtime_layout.add_widget(self.realtime_switch)
+        
+        settings_container.add_widget(realtime_layout)
+        
+        # Эффекты мониторинга применяются сразу, без перезапуска мониторинга
+        settings_container.add_widget(Label(
+            text='ЭФФЕКТЫ МОНИТОРИНГА',
+            font_size='14sp',
+            bold=True,
+            color=COLORS['primary'],
+            size_hint_y=None,
+            height=40
+        ))
+        
+        self.effect_sliders = {}
+        self.effect_labels = {}
+        for key, title, minimum, maximum in (('volume', 'ГРОМКОСТЬ:', 0.0, 1.0),) + MONITOR_EFFECT_SLIDERS:
+            effect_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=40)
+            effect_layout.add_widget(Label(
+                text=title,
+                font_size='14sp',
+                color=COLORS['text'],
+                size_hint_x=0.3
+            ))
+            slider = Slider(min=minimum, max=maximum, value=minimum, size_hint_x=0.5)
+            slider.bind(value=lambda instance, value, key=key: self.on_effect_change(key, value))
+            effect_layout.add_widget(slider)
+            value_label = Label(text='', font_size='14sp', color=COLORS['text'], size_hint_x=0.2)
+            effect_layout.add_widget(value_label)
+            self.effect_sliders[key] = slider
+            self.effect_labels[key] = value_label
+            settings_container.add_widget(effect_layout)
+        
+        soft_clip_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=50)
+        soft_clip_layout.add_widget(Label(
+            text='МЯГКОЕ ОГРАНИЧЕНИЕ:',
+            font_size='14sp',
+            color=COLORS['text'],
+            size_hint_x=0.7
+        ))
+        
+        self.soft_clip_switch = Switch(active=DEFAULT_EFFECTS['soft_clip'], size_hint_x=0.3)
+        self.soft_clip_switch.bind(active=lambda instance, value: self.app.audio_processor.set_monitoring_effects(soft_clip=value))
+        soft_clip_layout.add_widget(self.soft_clip_switch)
+        
+        settings_container.add_widget(soft_clip_layout)
+        
         # Информация о необходимости перезапуска мониторинга
         restart_info = Label(
             text='После изменения настроек необходимо\nперезапустить мониторинг',
@@ -824,6 +1543,9 @@ class SettingsPopup(Popup):
     
     def on_buffer_size_selected(self, spinner, text):
         """Обработчик выбора размера буфера"""
+        if text == BUFFER_SIZE_AUTO:
+            self.status_label.text = 'Размер буфера подбирается автоматически'
+            return
         try:
             # Преобразуем текст в число
             buffer_size = int(text)
@@ -833,6 +1555,10 @@ class SettingsPopup(Popup):
         except Exception as e:
             self.status_label.text = f'Ошибка установки размера буфера: {str(e)}'
     
+    def on_sample_format_selected(self, spinner, text):
+        """Обработчик выбора формата захвата"""
+        self.status_label.text = f'Формат захвата: {text}'
+    
     def on_low_latency_toggle(self, switch, value):
         """Обработчик переключения режима низкой задержки"""
         try:
@@ -847,8 +1573,40 @@ class SettingsPopup(Popup):
         if 'buffer_size' in self.app.settings:
             self.buffer_size_spinner.text = str(self.app.settings['buffer_size'])
         
+        if self.app.settings.get('auto_buffer_size'):
+            self.buffer_size_spinner.text = BUFFER_SIZE_AUTO
+        
         if 'low_latency' in self.app.settings:
             self.low_latency_switch.active = self.app.settings['low_latency']
+        
+        if 'sample_format' in self.app.settings:
+            self.sample_format_spinner.text = self.app.settings['sample_format']
+        
+        if 'realtime_mode' in self.app.settings:
+            self.realtime_switch.active = self.app.settings['realtime_mode']
+        
+        effects = {**DEFAULT_EFFECTS, **self.app.settings.get('monitoring_effects', {})}
+        for key, slider in self.effect_sliders.items():
+            slider.value = self.app.settings.get('monitoring_volume', 1.0) if key == 'volume' else effects[key]
+            self.update_effect_label(key, slider.value)
+        self.soft_clip_switch.active = effects['soft_clip']
+    
+    def update_effect_label(self, key, value):
+        """Подпись значения ползунка эффекта"""
+        if key == 'volume':
+            self.effect_labels[key].text = f'{int(value * 100)}%'
+        elif key == 'gate_threshold_db' and value <= GATE_OFF_DB:
+            self.effect_labels[key].text = 'ВЫКЛ'
+        else:
+            self.effect_labels[key].text = f'{value:+.0f} дБ'
+    
+    def on_effect_change(self, key, value):
+        """Изменение параметра эффектов мониторинга"""
+        self.update_effect_label(key, value)
+        if key == 'volume':
+            self.app.audio_processor.set_monitoring_volume(value)
+        else:
+            self.app.audio_processor.set_monitoring_effects(**{key: value})
     
     def save_settings(self, instance):
         """Сохранение настроек"""
@@ -870,8 +1628,12 @@ class SettingsPopup(Popup):
             # Получаем выбранный канал
             channel = int(self.input_channel_spinner.text.split(' ')[1]) - 1
             
-            # Получаем размер буфера
-            buffer_size = int(self.buffer_size_spinner.text)
+            # Получаем размер буфера (при автоподборе остается последний выбранный вручную)
+            auto_buffer_size = self.buffer_size_spinner.text == BUFFER_SIZE_AUTO
+            if auto_buffer_size:
+                buffer_size = self.app.settings.get('buffer_size', 128)
+            else:
+                buffer_size = int(self.buffer_size_spinner.text)
             
             # Получаем режим низкой задержки
             low_latency = self.low_latency_switch.active
@@ -884,7 +1646,15 @@ class SettingsPopup(Popup):
                 'output_device_index': output_device['index'] if output_device else 0,
                 'input_channel': channel,
                 'buffer_size': buffer_size,
-                'low_latency': low_latency
+                'auto_buffer_size': auto_buffer_size,
+                'low_latency': low_latency,
+                'sample_format': self.sample_format_spinner.text,
+                'realtime_mode': self.realtime_switch.active,
+                'monitoring_volume': self.effect_sliders['volume'].value,
+                'monitoring_effects': {
+                    **{key: round(self.effect_sliders[key].value, 1) for key, _, _, _ in MONITOR_EFFECT_SLIDERS},
+                    'soft_clip': self.soft_clip_switch.active
+                }
             })
             
             # Применяем настройки
@@ -900,30 +1670,19 @@ class SettingsPopup(Popup):
 
 class RhythmTrainerWidget(FloatLayout):
     """Виджет для тренировки ритма в стиле Guitar Hero"""
-    def __init__(self, **kwargs):
+    def __init__(self, clock=None, **kwargs):
         super(RhythmTrainerWidget, self).__init__(**kwargs)
         
-        # Загружаем звук для попадания
-        self.hit_sound = SoundLoader.load('metronome.wav')
-        if not self.hit_sound:
-            print("Ошибка: не удалось загрузить звук метронома")
-            # Пробуем загрузить альтернативный звук
-            self.hit_sound = SoundLoader.load('hit.wav')
-            if not self.hit_sound:
-                print("Ошибка: не удалось загрузить альтернативный звук")
-                # Пробуем загрузить еще один альтернативный звук
-                self.hit_sound = SoundLoader.load('click.wav')
-                if not self.hit_sound:
-                    print("Ошибка: не удалось загрузить звуки")
-        
-        # Загружаем звук метронома для генерации нот
-        self.metronome_sound = SoundLoader.load('tack.wav')
-        if not self.metronome_sound:
-            print("Ошибка: не удалось загрузить звук такта")
-            # Пробуем загрузить альтернативный звук
-            self.metronome_sound = SoundLoader.load('click.wav')
-            if not self.metronome_sound:
-                print("Ошибка: не удалось загрузить альтернативный звук для метронома")
+        # Часы для времени нот и кадров (VirtualClock - моделирование быстрее реального времени)
+        self.clock = clock or SYSTEM_CLOCK
+        
+        # Загружаем звуки попадания и метронома
+        self.sample_rate = None
+        self.gc_controller = None  # Управление GC в режиме реального времени (задается приложением)
+        self.audio_processor = None  # Обработчик аудио для выхода из режима простоя (задается приложением)
+        self.hit_sound = None
+        self.metronome_sound = None
+        self.load_sounds()
         
         # Флаги для включения/выключения звуков
         self.hit_sound_enabled = True
@@ -937,6 +1696,31 @@ class RhythmTrainerWidget(FloatLayout):
         self.hit_line_height = 100  # Высота горизонтальной линии от низа
         self.line_flash_duration = 0.2  # Длительность подсветки линии в секундах
         self.is_line_flashing = False  # Флаг мигания линии
+        self.hit_window = 20  # Полуширина зоны попадания (пикселей)
+        
+        # Ритмический паттерн и его расписание - общие для отрисовки нот и оценки попаданий
+        self.pattern_key = DEFAULT_PATTERN
+        self.pattern = get_pattern(self.pattern_key)
+        self.schedule = None
+        self.generated_until = 0.0  # До какого момента ноты уже сгенерированы
+        self.last_click_time = 0.0  # До какого момента уже отыграны доли метронома
+        
+        # Оценка ударов по расписанию и история занятий (база задается приложением)
+        self.rhythm_analyzer = RhythmAnalyzer(clock=self.clock)
+        self.history = None
+        self.session_started = 0.0
+        self.session_hits = []  # Удары занятия: (timestamp, отклонение со знаком, точный, темп)
+        self.session_chords = {}  # Аккорды ударов занятия для истории: время onset -> (аккорд, сходство)
+        
+        # Метрики кадра и задержек (приложение подставляет общие метрики конвейера)
+        self.metrics = PipelineMetrics()
+        self.flash_until = 0.0  # Время окончания подсветки линии
+        
+        # Один покадровый диспетчер на все обновления интерфейса: события от аудио
+        # разбираются раз за кадр, часы останавливаются, когда анимировать нечего
+        self.frame_dispatcher = FrameDispatcher(clock=self.clock)
+        self.frame_dispatcher.register(EVENT_ONSET, self._process_audio_hit)
+        self.frame_dispatcher.add_frame_callback(self.on_frame)
         
         # Обновляем canvas при изменении размера
         self.bind(size=self._update_canvas, pos=self._update_canvas)
@@ -977,6 +1761,46 @@ class RhythmTrainerWidget(FloatLayout):
                 width=8
             )
     
+    def load_sounds(self, sample_rate=None):
+        """
+        Загрузка звуков попадания и метронома
+        
+        Args:
+            sample_rate: Частота дискретизации аудио-движка; звуки приводятся
+                к ней один раз при загрузке (None - загрузить как есть)
+        """
+        self.sample_rate = sample_rate
+        
+        # Сохраняем громкость, выставленную до перезагрузки
+        hit_volume = self.hit_sound.volume if self.hit_sound else None
+        metronome_volume = self.metronome_sound.volume if self.metronome_sound else None
+        
+        # Звук попадания с запасными вариантами
+        self.hit_sound = self._load_sound(['metronome.wav', 'hit.wav', 'click.wav'])
+        if not self.hit_sound:
+            print("Ошибка: не удалось загрузить звуки")
+        elif hit_volume is not None:
+            self.hit_sound.volume = hit_volume
+        
+        # Звук метронома для долей
+        self.metronome_sound = self._load_sound(['tack.wav', 'click.wav'])
+        if not self.metronome_sound:
+            print("Ошибка: не удалось загрузить звук для метронома")
+        elif metronome_volume is not None:
+            self.metronome_sound.volume = metronome_volume
+    
+    def _load_sound(self, filenames):
+        """Загрузка первого доступного звука из списка"""
+        for filename in filenames:
+            path = filename
+            if self.sample_rate:
+                path = prepare_sample(filename, self.sample_rate)
+            sound = SoundLoader.load(path)
+            if sound:
+                return sound
+            print(f"Ошибка: не удалось загрузить звук {filename}")
+        return None
+    
     def _update_canvas(self, instance, value):
         """Обновление canvas при изменении размера"""
         # Обновляем фон
@@ -995,18 +1819,15 @@ class RhythmTrainerWidget(FloatLayout):
         self.hit_line_glow.points = [self.pos[0], self.pos[1] + self.hit_line_height, 
                                     self.pos[0] + self.width, self.pos[1] + self.hit_line_height]
     
-    def flash_line(self):
-        """Подсветка вертикальной линии зеленым цветом"""
+    def flash_line(self, onset_time=None):
+        """Подсветка вертикальной линии зеленым цветом (в главном потоке, в кадре диспетчера)"""
+        now = self.clock.time()
+        self.flash_until = now + self.line_flash_duration
         if self.is_line_flashing:
             return
-            
+        
         self.is_line_flashing = True
         
-        # Используем Clock.schedule_once для выполнения в главном потоке
-        Clock.schedule_once(self._do_flash_line)
-    
-    def _do_flash_line(self, dt):
-        """Выполнение подсветки линии в главном потоке"""
         # Меняем цвет линии на яркий зеленый
         self.track_color.rgb = (0.0, 1.0, 0.0)  # Яркий зеленый
         self.track_glow_color.rgba = (0.0, 1.0, 0.0, 0.8)  # Яркий зеленый с высокой прозрачностью
@@ -1015,10 +1836,14 @@ class RhythmTrainerWidget(FloatLayout):
         self.track_line.width = 8
         self.track_glow.width = 15
         
-        # Планируем возврат к исходному цвету
-        Clock.schedule_once(self.reset_line_color, self.line_flash_duration)
+        # Задержка от обнаружения звука до его отображения
+        if onset_time is not None:
+            self.metrics.record(instrumentation.ONSET_TO_DISPLAY, now - onset_time)
+        
+        # Возврат к исходному цвету выполняет покадровое обновление
+        self.frame_dispatcher.wake()
     
-    def reset_line_color(self, dt):
+    def reset_line_color(self):
         """Возврат цвета линии к исходному"""
         self.track_color.rgb = COLORS['primary'][:3]
         self.track_glow_color.rgba = (*COLORS['accent'][:3], 0.5)
@@ -1026,6 +1851,19 @@ class RhythmTrainerWidget(FloatLayout):
         self.track_glow.width = 10
         self.is_line_flashing = False
     
+    def on_frame(self, dt):
+        """
+        Покадровое обновление тренажера (вызывается диспетчером)
+        
+        Returns:
+            bool: True, пока идет тренировка или подсветка линии
+        """
+        if self.is_line_flashing and self.clock.time() >= self.flash_until:
+            self.reset_line_color()
+        if self.is_running:
+            self.update(dt)
+        return self.is_running or self.is_line_flashing
+    
     def toggle_training(self):
         """Переключение тренировки"""
         if self.is_running:
@@ -1033,39 +1871,118 @@ class RhythmTrainerWidget(FloatLayout):
         else:
             self.start_training()
     
+    def set_pattern(self, key):
+        """Выбор ритмического паттерна"""
+        self.pattern_key = key
+        self.pattern = get_pattern(key)
+        
+        # Во время тренировки начинаем новый паттерн с верхней границы
+        if self.is_running:
+            self._reset_schedule(self.clock.time())
+    
+    def get_travel_time(self):
+        """Время движения ноты от верхней границы до линии удара (сек)"""
+        return max(0.0, self.height - self.hit_line_height) / self.note_speed
+    
+    def _reset_schedule(self, now):
+        """Создание расписания: первая нота появляется у верхней границы сразу"""
+        self.schedule = PatternSchedule(self.pattern, self.bpm, now + self.get_travel_time())
+        self.rhythm_analyzer.set_schedule(self.schedule)
+        self.notes = [note for note in self.notes if note['time'] <= now]
+        self.generated_until = now
+        self.last_click_time = now
+    
     def start_training(self):
         """Запуск тренировки"""
         self.is_running = True
         self.notes = []
+        self.session_started = self.clock.time()
+        self.session_hits = []
+        self.session_chords = {}
+        self.rhythm_analyzer.start()
+        self._reset_schedule(self.session_started)
         
-        # Запускаем обновление
-        Clock.schedule_interval(self.update, 1/60)
+        # Полные сборки мусора откладываются до паузы
+        if self.gc_controller:
+            self.gc_controller.begin_run()
         
-        # Запускаем генерацию нот
-        # Создаем первую ноту сразу
-        self.generate_note(0)
+        # Обработка аудио выходит из простоя со следующего блока
+        if self.audio_processor:
+            self.audio_processor.set_training_active(True)
+        
+        # Запускаем покадровое обновление
+        self.frame_dispatcher.wake()
         
-        # Планируем следующую ноту
-        self.schedule_next_note()
+        # Создаем первые ноты сразу
+        self.generate_note(0)
     
     def stop_training(self):
         """Остановка тренировки"""
+        # Диспетчер заснет сам, когда закончится подсветка линии
         self.is_running = False
         
-        # Останавливаем обновление
-        Clock.unschedule(self.update)
-        Clock.unschedule(self.generate_note)
+        # Без тренировки и сигнала обработка аудио через некоторое время уйдет в простой
+        if self.audio_processor:
+            self.audio_processor.set_training_active(False)
+        
+        # Удары занятия записываются в историю одной транзакцией
+        self.rhythm_analyzer.stop()
+        self.save_session()
+        
+        # Пауза между подходами - время для отложенной сборки мусора
+        if self.gc_controller:
+            self.gc_controller.end_run()
+    
+    def save_session(self):
+        """Сохранение завершенного занятия в историю"""
+        if self.history is None or not self.session_hits:
+            return
+        
+        stats = self.rhythm_analyzer.get_stats()
+        try:
+            session_id = self.history.save_session(self.session_started, self.clock.time(), self.pattern_key,
+                                                   self.bpm, self.session_hits, self.session_chords)
+            print(f"Занятие сохранено: ударов {stats['total_hits']}, точность {stats['accuracy'] * 100:.0f}%")
+            chords = self.history.session_chords(session_id)
+            if chords:
+                print("Аккорды: " + ', '.join(f"{row['chord']} x{row['hits']}" for row in chords))
+        except Exception as e:
+            print(f"Ошибка сохранения занятия: {str(e)}")
+        self.session_hits = []
+        self.session_chords = {}
     
     def update(self, dt):
         """Обновление состояния тренировки"""
         if not self.is_running:
             return
         
-        # Обновляем позиции нот
+        frame_start = self.clock.perf_counter()
+        now = self.clock.time()
+        
+        # При смене темпа пересобираем еще не прошедшие ноты в новом темпе
+        if self.schedule.bpm != self.bpm:
+            self.schedule.set_tempo(self.bpm, now)
+            self.notes = [note for note in self.notes if note['time'] <= now]
+            self.generated_until = now
+        
+        # Добавляем ноты, вошедшие в окно упреждения
+        self.generate_note(dt)
+        
+        # Звук метронома на долях, которые прошли линию удара с прошлого кадра
+        beats = self.schedule.beats_between(self.last_click_time, now)
+        self.last_click_time = now
+        if len(beats) and self.metronome_sound_enabled and self.metronome_sound:
+            self.metronome_sound.play()
+        
+        # Доли метронома попадают в запись занятия рядом с onset
+        if len(beats) and self.audio_processor and self.audio_processor.recorder is not None:
+            for beat_time in beats:
+                self.audio_processor.record_event('beat', float(beat_time))
+        
+        # Обновляем позиции нот по их времени в расписании
         notes_to_remove = []
         for note in self.notes:
-            # Перемещаем ноту вниз
-            note['y'] -= self.note_speed * dt
+            note['y'] = self.hit_line_height + (note['time'] - now) * self.note_speed
             
             # Удаляем ноты, которые вышли за пределы экрана
             if note['y'] < -50:
@@ -1077,9 +1994,13 @@ class RhythmTrainerWidget(FloatLayout):
         
         # Перерисовываем
         self.draw_notes()
+        
+        self.metrics.record(instrumentation.UI_UPDATE, self.clock.perf_counter() - frame_start)
     
     def draw_notes(self):
         """Отрисовка нот"""
+        draw_start = self.clock.perf_counter()
+        
         # Очищаем предыдущие ноты
         try:
             self.canvas.remove_group('notes')
@@ -1089,64 +2010,92 @@ class RhythmTrainerWidget(FloatLayout):
         # Рисуем ноты
         with self.canvas:
             for note in self.notes:
-                Color(*COLORS['note'], group='notes')
+                # Акцентированные ноты крупнее и другого цвета
+                Color(*COLORS['accent' if note['accent'] else 'note'], group='notes')
+                radius = 24 if note['accent'] else 20
                 
                 # Рисуем ноту (круг) по центру вертикальной линии
                 # Учитываем позицию виджета
                 center_x = self.pos[0] + self.width / 2
                 Ellipse(
-                    pos=(center_x - 20, self.pos[1] + note['y'] - 20),
-                    size=(40, 40),
+                    pos=(center_x - radius, self.pos[1] + note['y'] - radius),
+                    size=(radius * 2, radius * 2),
                     group='notes'
                 )
+        
+        self.metrics.record(instrumentation.UI_DRAW_NOTES, self.clock.perf_counter() - draw_start)
     
     def generate_note(self, dt):
-        """Генерация новой ноты"""
-        if not self.is_running:
+        """Генерация нот расписания, попадающих в окно упреждения"""
+        if not self.is_running or self.schedule is None:
             return
         
-        # Воспроизводим звук метронома при генерации ноты
-        if self.metronome_sound_enabled and hasattr(self, 'metronome_sound') and self.metronome_sound:
-            self.metronome_sound.play()
-        
-        # Создаем новую ноту
-        note = {'y': self.height}  # Начальная позиция у верхней границы
-        self.notes.append(note)
+        # Окно упреждения - ноты, которые успеют долететь до линии удара
+        now = self.clock.time()
+        horizon = now + self.get_travel_time() + 1e-6
+        if horizon <= self.generated_until:
+            return
         
-        # Перерисовываем ноты
-        self.draw_notes()
+        times, accents, indices = self.schedule.notes_between(self.generated_until, horizon)
+        self.generated_until = horizon
         
-        # Планируем следующую ноту
-        self.schedule_next_note()
-    
-    def schedule_next_note(self):
-        """Планирование следующей ноты"""
-        # Вычисляем интервал между нотами (в секундах)
-        interval = 60.0 / self.bpm
+        for note_time, accent, index in zip(times.tolist(), accents.tolist(), indices.tolist()):
+            self.notes.append({
+                'time': note_time,
+                'accent': accent,
+                'index': index,
+                'y': self.hit_line_height + (note_time - now) * self.note_speed
+            })
         
-        # Планируем генерацию следующей ноты
-        Clock.schedule_once(self.generate_note, interval)
+        if len(times):
+            self.draw_notes()
     
     def on_audio_detected(self, timestamp, amplitude):
-        """Обработчик обнаружения звука с гитары"""
+        """Обработчик обнаружения звука с гитары (из потока обработки аудио)"""
         if not self.is_running:
             return
         
-        # Используем Clock.schedule_once для выполнения в главном потоке
-        Clock.schedule_once(lambda dt: self._process_audio_hit(timestamp, amplitude))
+        # Событие разбирается в главном потоке в ближайшем кадре диспетчера
+        self.frame_dispatcher.post(EVENT_ONSET, timestamp, amplitude)
+    
+    def attach_chord(self, timestamp, chord, confidence):
+        """
+        Аккорд удара (в главном потоке, после его onset)
+        
+        Args:
+            timestamp: Время onset, к которому относится аккорд
+            chord: Название аккорда или None, если он не определен
+            confidence: Сходство хромы с шаблоном аккорда (0.0 - 1.0)
+        """
+        if self.is_running:
+            self.session_chords[timestamp] = (chord, confidence)
     
     def _process_audio_hit(self, timestamp, amplitude):
         """Обработка обнаружения звука в главном потоке"""
+        if not self.is_running:
+            return
+        
+        # Задержка от обнаружения звука до его оценки
+        self.metrics.record(instrumentation.ONSET_TO_JUDGEMENT, self.clock.time() - timestamp)
+        
         # Подсвечиваем вертикальную линию
-        self.flash_line()
-            
-        # Проверяем, есть ли ноты рядом с линией удара
-        hit_zone_top = self.hit_line_height + 20
-        hit_zone_bottom = self.hit_line_height - 20
+        self.flash_line(timestamp)
+        
+        if self.schedule is None:
+            return
+        
+        # Каждый удар во время тренировки учитывается в статистике и истории
+        is_accurate, _ = self.rhythm_analyzer.analyze_hit(timestamp)
+        self.session_hits.append((timestamp, self.rhythm_analyzer.last_offset, is_accurate, self.schedule.bpm))
+        
+        # Ближайшая нота расписания; зона удара переводится из пикселей во время
+        index, note_time, deviation = self.schedule.nearest_note(timestamp)
+        if abs(deviation) > self.hit_window / self.note_speed:
+            return
         
         for note in list(self.notes):
-            # Если нота находится в зоне удара
-            if hit_zone_bottom <= note['y'] <= hit_zone_top:
+            # Если это та самая нота и по ней еще не попадали
+            if note['index'] == index:
                 # Отмечаем ноту как "попадание"
                 note['hit'] = True
                 
@@ -1155,7 +2104,7 @@ class RhythmTrainerWidget(FloatLayout):
                     self.hit_sound.play()
                 
                 # Выводим сообщение о попадании
-                print(f"Попадание! Время: {timestamp:.2f}")
+                print(f"Попадание! Время: {timestamp:.2f}, отклонение: {deviation * 1000:+.0f} мс")
                 
                 # Удаляем ноту из списка
                 self.notes.remove(note)
@@ -1222,6 +2171,27 @@ class ControlPanel(BoxLayout):
         )
         self.add_widget(self.bpm_label)
         
+        # Выбор ритмического паттерна
+        pattern_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=40)
+        pattern_layout.add_widget(Label(
+            text='Паттерн:',
+            size_hint_x=0.3,
+            color=COLORS['text']
+        ))
+        
+        self.pattern_keys = {pattern['name']: key for key, pattern in PATTERNS.items()}
+        self.pattern_spinner = Spinner(
+            text=PATTERNS[DEFAULT_PATTERN]['name'],
+            values=list(self.pattern_keys),
+            size_hint_x=0.7,
+            background_color=COLORS['background'],
+            color=COLORS['text']
+        )
+        self.pattern_spinner.bind(text=self.on_pattern_selected)
+        pattern_layout.add_widget(self.pattern_spinner)
+        
+        self.add_widget(pattern_layout)
+        
         # Настройка скорости нот
         speed_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=40)
         speed_layout.add_widget(Label(
@@ -1316,6 +2286,43 @@ class ControlPanel(BoxLayout):
         # Добавляем пустое пространство (растягивающийся виджет)
         self.add_widget(Widget())
         
+        # Метрики задержек: показ поверх тренажера и экспорт в файл
+        metrics_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=50, spacing=10)
+        
+        metrics_btn = RockButton(
+            text='МЕТРИКИ',
+            font_size='16sp',
+            bold=True
+        )
+        metrics_btn.bind(on_press=self.app.toggle_metrics_overlay)
+        metrics_layout.add_widget(metrics_btn)
+        
+        groove_btn = RockButton(
+            text='ГРУВ',
+            font_size='16sp',
+            bold=True
+        )
+        groove_btn.bind(on_press=self.app.toggle_groove_overlay)
+        metrics_layout.add_widget(groove_btn)
+        
+        spectrum_btn = RockButton(
+            text='СПЕКТР',
+            font_size='16sp',
+            bold=True
+        )
+        spectrum_btn.bind(on_press=self.app.toggle_spectrum_view)
+        metrics_layout.add_widget(spectrum_btn)
+        
+        export_btn = RockButton(
+            text='ЭКСПОРТ',
+            font_size='16sp',
+            bold=True
+        )
+        export_btn.bind(on_press=self.app.export_metrics)
+        metrics_layout.add_widget(export_btn)
+        
+        self.add_widget(metrics_layout)
+        
         # Кнопка настроек
         settings_btn = RockButton(
             text='НАСТРОЙКИ',
@@ -1337,6 +2344,82 @@ class ControlPanel(BoxLayout):
         )
         self.monitoring_btn.bind(on_press=self.toggle_monitoring)
         self.add_widget(self.monitoring_btn)
+        
+        # Кнопка записи занятия
+        self.record_btn = RockButton(
+            text='ЗАПИСЬ ВЫКЛ',
+            size_hint_y=None,
+            height=50,
+            font_size='16sp',
+            bold=True
+        )
+        self.record_btn.bind(on_press=self.toggle_recording)
+        self.add_widget(self.record_btn)
+        
+        # Кнопка свободной игры: темп и ровность игры без метронома
+        self.free_play_btn = RockButton(
+            text='СВОБОДНАЯ ИГРА ВЫКЛ',
+            size_hint_y=None,
+            height=50,
+            font_size='16sp',
+            bold=True
+        )
+        self.free_play_btn.bind(on_press=self.toggle_free_play)
+        self.add_widget(self.free_play_btn)
+        
+        # Тюнер на том же входе
+        self.tuner_btn = RockButton(
+            text='ТЮНЕР ВЫКЛ',
+            size_hint_y=None,
+            height=50,
+            font_size='16sp',
+            bold=True
+        )
+        self.tuner_btn.bind(on_press=self.toggle_tuner)
+        self.add_widget(self.tuner_btn)
+        
+        # Распознавание аккордов ударов
+        self.chord_btn = RockButton(
+            text='АККОРДЫ ВЫКЛ',
+            size_hint_y=None,
+            height=50,
+            font_size='16sp',
+            bold=True
+        )
+        self.chord_btn.bind(on_press=self.toggle_chords)
+        self.add_widget(self.chord_btn)
+        
+        # Тренажер пентатоники: тональность, позиция и включение
+        pentatonic_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=50, spacing=5)
+        self.key_spinner = Spinner(
+            text='Am',
+            values=[f'{name}m' for name in NOTE_NAMES],
+            size_hint_x=0.25,
+            background_color=COLORS['background'],
+            color=COLORS['text']
+        )
+        self.key_spinner.bind(text=self.on_pentatonic_position)
+        pentatonic_layout.add_widget(self.key_spinner)
+        
+        self.box_spinner = Spinner(
+            text='Позиция 1',
+            values=[f'Позиция {box + 1}' for box in range(BOX_COUNT)],
+            size_hint_x=0.3,
+            background_color=COLORS['background'],
+            color=COLORS['text']
+        )
+        self.box_spinner.bind(text=self.on_pentatonic_position)
+        pentatonic_layout.add_widget(self.box_spinner)
+        
+        self.pentatonic_btn = RockButton(
+            text='ПЕНТАТОНИКА ВЫКЛ',
+            size_hint_x=0.45,
+            font_size='14sp',
+            bold=True
+        )
+        self.pentatonic_btn.bind(on_press=self.toggle_pentatonic)
+        pentatonic_layout.add_widget(self.pentatonic_btn)
+        self.add_widget(pentatonic_layout)
     
     def toggle_training(self, instance):
         """Переключение тренировки"""
@@ -1353,6 +2436,11 @@ class ControlPanel(BoxLayout):
         self.rhythm_trainer.bpm = bpm
         self.bpm_label.text = f'{bpm} BPM'
     
+    def on_pattern_selected(self, spinner, text):
+        """Выбор ритмического паттерна"""
+        if text in self.pattern_keys:
+            self.rhythm_trainer.set_pattern(self.pattern_keys[text])
+    
     def on_speed_change(self, instance, value):
         """Изменение скорости нот"""
         speed = int(value)
@@ -1372,6 +2460,50 @@ class ControlPanel(BoxLayout):
             else:
                 # Если не удалось включить мониторинг
                 self.monitoring_btn.text = 'ОШИБКА МОНИТОРИНГА'
+        
+        # Мониторинг мог изменить частоту дискретизации потока
+        self.app.sync_sample_rate()
+    
+    def toggle_recording(self, instance):
+        """Переключение записи занятия"""
+        if self.app.toggle_recording():
+            self.record_btn.text = 'ЗАПИСЬ ВКЛ'
+        else:
+            self.record_btn.text = 'ЗАПИСЬ ВЫКЛ'
+    
+    def toggle_free_play(self, instance):
+        """Переключение оценки темпа свободной игры"""
+        if self.app.toggle_free_play():
+            self.free_play_btn.text = 'СВОБОДНАЯ ИГРА ВКЛ'
+        else:
+            self.free_play_btn.text = 'СВОБОДНАЯ ИГРА ВЫКЛ'
+    
+    def toggle_tuner(self, instance):
+        """Переключение тюнера"""
+        if self.app.toggle_tuner():
+            self.tuner_btn.text = 'ТЮНЕР ВКЛ'
+        else:
+            self.tuner_btn.text = 'ТЮНЕР ВЫКЛ'
+    
+    def toggle_chords(self, instance):
+        """Переключение распознавания аккордов"""
+        if self.app.toggle_chords():
+            self.chord_btn.text = 'АККОРДЫ ВКЛ'
+        else:
+            self.chord_btn.text = 'АККОРДЫ ВЫКЛ'
+    
+    def on_pentatonic_position(self, spinner, text):
+        """Выбор тональности или позиции пентатоники"""
+        key = [f'{name}m' for name in NOTE_NAMES].index(self.key_spinner.text)
+        box = int(self.box_spinner.text.split()[-1]) - 1
+        self.app.set_pentatonic_position(key, box)
+    
+    def toggle_pentatonic(self, instance):
+        """Переключение тренажера пентатоники"""
+        if self.app.toggle_pentatonic():
+            self.pentatonic_btn.text = 'ПЕНТАТОНИКА ВКЛ'
+        else:
+            self.pentatonic_btn.text = 'ПЕНТАТОНИКА ВЫКЛ'
     
     def on_sound_volume_change(self, instance, value):
         """Обработчик изменения громкости звуков"""
@@ -1405,20 +2537,19 @@ class GuitarTrainerApp(App):
         # Создаем основной контейнер
         root = BoxLayout(orientation='vertical', padding=10, spacing=10)
         
-        # Добавляем фоновое изображение
+        # Добавляем фоновое изображение: темный фон с "шумом" рисуется
+        # один раз в текстуру, на canvas остается один прямоугольник
         with root.canvas.before:
-            # Темный фон
-            Color(0.1, 0.1, 0.12, 1)
+            Color(1, 1, 1, 1)
             self.bg_rect = Rectangle(pos=root.pos, size=root.size)
-            
-            # Добавляем эффект "шума" для текстуры
-            for _ in range(100):
-                x = random.randint(0, 100) / 100.0 * root.width
-                y = random.randint(0, 100) / 100.0 * root.height
-                size = random.randint(1, 3)
-                alpha = random.randint(1, 10) / 20.0
-                Color(1, 1, 1, alpha)
-                Rectangle(pos=(x, y), size=(size, size))
+        self.bg_texture_size = None
+        self._regenerate_bg_texture(0, root)
+        
+        # Перегенерация текстуры после того, как размер окна перестал меняться
+        self._bg_texture_trigger = Clock.create_trigger(
+            lambda dt: self._regenerate_bg_texture(dt, root),
+            BACKGROUND_RESIZE_DEBOUNCE
+        )
         
         # Обновляем размер фона при изменении размера окна
         root.bind(size=self._update_bg_rect, pos=self._update_bg_rect)
@@ -1451,6 +2582,10 @@ class GuitarTrainerApp(App):
         self.signal_indicator = SignalLevelIndicator()
         root.add_widget(self.signal_indicator)
         
+        # Волна входа с ударами и долями; после записи - волна записи
+        self.waveform = WaveformView()
+        root.add_widget(self.waveform)
+        
         # Основной контент - двухколоночный макет
         main_content = BoxLayout(orientation='horizontal', spacing=10)
         
@@ -1482,14 +2617,88 @@ class GuitarTrainerApp(App):
         # Инициализация аудио процессора
         self.audio_processor = AudioProcessor(callback=self.on_audio_detected)
         
+        # Общие метрики конвейера и панель для их отображения
+        self.rhythm_trainer.audio_processor = self.audio_processor
+        self.rhythm_trainer.metrics = self.audio_processor.metrics
+        self.metrics_overlay = MetricsOverlay(self.audio_processor.metrics)
+        self.rhythm_trainer.add_widget(self.metrics_overlay)
+        
+        # Смещение ударов по позициям в такте
+        self.groove_overlay = GrooveOverlay(self.rhythm_trainer)
+        self.rhythm_trainer.add_widget(self.groove_overlay)
+        
+        # Спектр входа
+        self.spectrum_view = SpectrumView(self.audio_processor.metrics)
+        self.rhythm_trainer.add_widget(self.spectrum_view)
+        
+        # Тюнер
+        self.tuner_display = TunerDisplay()
+        self.rhythm_trainer.add_widget(self.tuner_display)
+        
+        # Темп свободной игры
+        self.tempo_display = TempoDisplay()
+        self.rhythm_trainer.add_widget(self.tempo_display)
+        
+        # Аккорд последнего удара
+        self.chord_display = ChordDisplay()
+        self.rhythm_trainer.add_widget(self.chord_display)
+        
+        # Пентатоника: время удара по тем же часам, что у тренажера, высота - по onset
+        self.pentatonic = PentatonicTrainer(clock=self.rhythm_trainer.clock)
+        self.pentatonic_display = PentatonicDisplay(self.pentatonic)
+        self.rhythm_trainer.add_widget(self.pentatonic_display)
+        
+        # Сборщик мусора в режиме реального времени
+        self.gc_controller = GCController(self.audio_processor.metrics)
+        self.ui_thread_pinned = False
+        
+        # История занятий
+        try:
+            self.history = SessionHistory(os.path.join(os.path.dirname(__file__), 'history.db'))
+        except Exception as e:
+            print(f"Ошибка открытия истории занятий: {str(e)}")
+            self.history = None
+        self.rhythm_trainer.history = self.history
+        
+        # Стабильный размер буфера из автоподбора сохраняется для устройства
+        self.audio_processor.on_buffer_size_stable = self.on_buffer_size_stable
+        
         # Применяем настройки
         self.apply_settings()
         
         # Запускаем обработчик аудио
         self.audio_processor.start()
         
-        # Запускаем обновление уровня сигнала
-        Clock.schedule_interval(self.update_signal_level, 0.05)
+        # Приводим звуки к частоте, на которой открыто устройство
+        self.sync_sample_rate()
+        
+        # Уровень сигнала приходит событиями в общий диспетчер кадров
+        self.frame_dispatcher = self.rhythm_trainer.frame_dispatcher
+        self.frame_dispatcher.register(EVENT_LEVEL, self.apply_signal_level, coalesce=True)
+        self.audio_processor.level_callback = self.on_signal_level
+        
+        # Оценки темпа свободной игры - так же, последняя за кадр
+        self.frame_dispatcher.register(EVENT_TEMPO, self.apply_tempo_estimate, coalesce=True)
+        self.audio_processor.tempo_callback = self.on_tempo_estimate
+        
+        # Высота ударов - каждое событие, без объединения
+        self.frame_dispatcher.register(EVENT_PITCH, self.apply_pitch)
+        self.audio_processor.pitch_callback = self.on_pitch_detected
+        
+        # Аккорды ударов - тоже каждое событие: аккорд привязывается к своему onset
+        self.frame_dispatcher.register(EVENT_CHORD, self.apply_chord)
+        self.audio_processor.chord_callback = self.on_chord_detected
+        
+        # Волна читает кольцевой буфер анализа (он пересоздается при смене частоты)
+        self.waveform.ring_source = lambda: (self.audio_processor.framer.ring_buffer, self.audio_processor.sample_rate)
+        self.spectrum_view.ring_source = self.waveform.ring_source
+        self.tuner_display.ring_source = self.waveform.ring_source
+        self.waveform.block_source = lambda: self.audio_processor.framer.last_block
+        self.waveform.beat_source = self.visible_beats
+        Clock.schedule_interval(self.waveform.refresh, WAVEFORM_REFRESH_INTERVAL)
+        
+        # Автоподбор размера буфера проверяется в основном потоке
+        Clock.schedule_interval(self.poll_buffer_size, BUFFER_TUNER_POLL_INTERVAL)
         
         return root
     
@@ -1498,6 +2707,24 @@ class GuitarTrainerApp(App):
         if hasattr(self, 'bg_rect'):
             self.bg_rect.pos = instance.pos
             self.bg_rect.size = instance.size
+        
+        # Откладываем перегенерацию текстуры, пока размер продолжает меняться
+        if hasattr(self, '_bg_texture_trigger'):
+            self._bg_texture_trigger.cancel()
+            self._bg_texture_trigger()
+    
+    def _regenerate_bg_texture(self, dt, root):
+        """Генерация текстуры фона под текущий размер корневого виджета"""
+        size = (max(1, int(root.width)), max(1, int(root.height)))
+        if size == self.bg_texture_size:
+            return
+        
+        image = make_noise_background(size[0], size[1])
+        texture = Texture.create(size=size, colorfmt='rgb')
+        texture.blit_buffer(image.tobytes(), colorfmt='rgb', bufferfmt='ubyte')
+        
+        self.bg_rect.texture = texture
+        self.bg_texture_size = size
     
     def _update_left_bg(self, instance, value):
         """Обновление фона левой колонки"""
@@ -1505,18 +2732,190 @@ class GuitarTrainerApp(App):
             self.left_bg.pos = instance.pos
             self.left_bg.size = instance.size
     
-    def update_signal_level(self, dt):
-        """Обновление уровня сигнала"""
-        # Получаем текущий уровень сигнала от аудио процессора
-        if hasattr(self.audio_processor, 'last_rms'):
-            level = self.audio_processor.last_rms
-            self.signal_indicator.set_level(level)
+    def on_signal_level(self, timestamp, level):
+        """Снимок уровня сигнала (из потока обработки аудио)"""
+        self.frame_dispatcher.post(EVENT_LEVEL, timestamp, level)
+    
+    def apply_signal_level(self, timestamp, level):
+        """Обновление индикатора уровня (последний снимок за кадр)"""
+        self.signal_indicator.set_level(level)
+    
+    def on_tempo_estimate(self, timestamp, estimate):
+        """Новая оценка темпа (из потока обработки аудио)"""
+        self.frame_dispatcher.post(EVENT_TEMPO, timestamp, estimate['bpm'])
+    
+    def apply_tempo_estimate(self, timestamp, bpm):
+        """Обновление панели темпа (последняя оценка за кадр)"""
+        tracker = self.audio_processor.tempo_tracker
+        if tracker is not None and tracker.estimate is not None:
+            self.tempo_display.set_estimate(tracker.estimate)
+    
+    def toggle_free_play(self):
+        """
+        Включение или выключение оценки темпа свободной игры
+        
+        Returns:
+            bool: True, если оценка включена
+        """
+        enabled = self.audio_processor.tempo_tracker is None
+        self.audio_processor.set_tempo_tracking(enabled)
+        self.tempo_display.set_active(enabled)
+        return enabled
+    
+    def on_pitch_detected(self, timestamp, frequency, clarity):
+        """Высота удара (из потока обработки аудио)"""
+        self.frame_dispatcher.post(EVENT_PITCH, timestamp, frequency or 0.0)
+    
+    def apply_pitch(self, timestamp, frequency):
+        """Оценка удара упражнением по пентатонике"""
+        if self.pentatonic.judge(timestamp, frequency or None) is not None:
+            self.pentatonic_display.refresh()
+    
+    def on_chord_detected(self, timestamp, chord, confidence):
+        """Аккорд удара (из потока обработки аудио)"""
+        self.frame_dispatcher.post(EVENT_CHORD, timestamp, (chord, confidence))
+    
+    def apply_chord(self, timestamp, value):
+        """Привязка аккорда к удару тренажера и обновление панели"""
+        chord, confidence = value
+        self.rhythm_trainer.attach_chord(timestamp, chord, confidence)
+        self.chord_display.set_chord(chord, confidence)
+    
+    def toggle_chords(self):
+        """
+        Включение или выключение распознавания аккордов
+        
+        Returns:
+            bool: True, если распознавание включено
+        """
+        enabled = self.audio_processor.chord_recognizer is None
+        self.audio_processor.set_chord_recognition(enabled)
+        self.chord_display.set_active(enabled)
+        return enabled
+    
+    def set_pentatonic_position(self, key, box):
+        """Смена тональности или позиции пентатоники (упражнение начинается сначала)"""
+        self.pentatonic.set_position(key, box)
+        self.pentatonic_display.refresh()
+    
+    def toggle_pentatonic(self):
+        """
+        Включение или выключение тренажера пентатоники
+        
+        Во время тренировки удары оцениваются по нотам паттерна, иначе - по долям темпа.
+        
+        Returns:
+            bool: True, если тренажер включен
+        """
+        enabled = not self.pentatonic.is_running
+        if enabled:
+            trainer = self.rhythm_trainer
+            self.pentatonic.start(trainer.bpm, trainer.schedule if trainer.is_running else None)
+        else:
+            self.pentatonic.stop()
+        self.audio_processor.set_pitch_tracking(enabled)
+        self.pentatonic_display.set_active(enabled)
+        return enabled
+    
+    def poll_buffer_size(self, dt):
+        """Периодическая проверка автоподбора размера буфера"""
+        if self.audio_processor.poll_auto_buffer_size() is not None:
+            # После перезапуска поток может открыться на другой частоте
+            self.sync_sample_rate()
+    
+    def on_buffer_size_stable(self, device_name, block_size):
+        """Сохранение стабильного размера буфера для устройства"""
+        self.settings.setdefault('buffer_sizes', {})[device_name] = block_size
+        self.save_settings()
+    
+    def sync_sample_rate(self):
+        """Перезагрузка звуков тренажера, если изменилась частота аудио-движка"""
+        sample_rate = self.audio_processor.sample_rate
+        if self.rhythm_trainer.sample_rate != sample_rate:
+            self.rhythm_trainer.load_sounds(sample_rate)
     
     def on_audio_detected(self, timestamp, amplitude):
         """Обработчик обнаружения звука с гитары"""
-        # Передаем событие в тренажер ритма через Clock.schedule_once
+        # Тренажер кладет событие в буфер диспетчера кадров, без промежуточного schedule_once
         if hasattr(self, 'rhythm_trainer'):
-            Clock.schedule_once(lambda dt: self.rhythm_trainer.on_audio_detected(timestamp, amplitude))
+            self.rhythm_trainer.on_audio_detected(timestamp, amplitude)
+        if hasattr(self, 'waveform'):
+            self.waveform.add_onset(timestamp)
+    
+    def visible_beats(self, start, end):
+        """Доли метронома для живой волны (None вне тренировки)"""
+        trainer = self.rhythm_trainer
+        if not trainer.is_running or trainer.schedule is None or self.waveform.view_end is not None:
+            return None
+        return trainer.schedule.beats_between(start, end)
+    
+    def toggle_metrics_overlay(self, instance):
+        """Показать/скрыть панель метрик"""
+        self.metrics_overlay.toggle()
+    
+    def toggle_groove_overlay(self, instance):
+        """Показать/скрыть панель смещения по позициям"""
+        self.groove_overlay.toggle()
+    
+    def toggle_tuner(self):
+        """
+        Включение или выключение тюнера
+        
+        Returns:
+            bool: True, если тюнер включен
+        """
+        return self.tuner_display.toggle()
+    
+    def toggle_spectrum_view(self, instance):
+        """Показать/скрыть спектр входа"""
+        self.spectrum_view.toggle()
+    
+    def export_metrics(self, instance):
+        """Экспорт метрик в JSON и CSV для сравнения между машинами"""
+        metrics_dir = os.path.join(os.path.dirname(__file__), 'metrics')
+        try:
+            os.makedirs(metrics_dir, exist_ok=True)
+            base = os.path.join(metrics_dir, time.strftime('metrics_%Y%m%d_%H%M%S'))
+            self.audio_processor.metrics.export_json(base + '.json')
+            self.audio_processor.metrics.export_csv(base + '.csv')
+            print(f"Метрики сохранены: {base}.json, {base}.csv")
+        except Exception as e:
+            print(f"Ошибка экспорта метрик: {str(e)}")
+    
+    def toggle_recording(self):
+        """
+        Запуск или остановка записи занятия в recordings/
+        
+        Returns:
+            bool: True, если запись идет
+        """
+        if self.audio_processor.recorder is not None:
+            recorder = self.audio_processor.stop_recording()
+            # Записанное занятие целиком на волне (двойное касание - назад к входу)
+            try:
+                self.waveform.show_recording(*load_recording(recorder.path))
+            except Exception as e:
+                print(f"Ошибка загрузки записи для просмотра: {str(e)}")
+            return False
+        
+        self.waveform.show_live()
+        
+        recordings_dir = os.path.join(os.path.dirname(__file__), 'recordings')
+        path = os.path.join(recordings_dir, time.strftime('session_%Y%m%d_%H%M%S.wav'))
+        recorder = self.audio_processor.start_recording(
+            path,
+            mode=self.settings.get('record_mode', 'wav'),
+            all_channels=self.settings.get('record_all_channels', False)
+        )
+        return recorder is not None
+    
+    def on_stop(self):
+        """Закрытие приложения: запись и текущее занятие дописываются и закрываются"""
+        self.audio_processor.stop_recording()
+        if self.rhythm_trainer.is_running:
+            self.rhythm_trainer.stop_training()
+        if self.history is not None:
+            self.history.close()
     
     def show_settings(self, instance):
         """Показать настройки"""
@@ -1547,7 +2946,18 @@ class GuitarTrainerApp(App):
             'output_device_index': 0,
             'input_channel': 0,
             'buffer_size': 128,
-            'low_latency': True
+            'low_latency': True,
+            'analysis_hop_size': 256,
+            'analysis_window_size': 1024,
+            'sample_format': 'float32',
+            'realtime_mode': False,
+            'auto_buffer_size': False,
+            'buffer_sizes': {},
+            'idle_timeout': 10.0,
+            'record_mode': 'wav',
+            'record_all_channels': False,
+            'monitoring_volume': 1.0,
+            'monitoring_effects': dict(DEFAULT_EFFECTS)
         }
         
         try:
@@ -1586,6 +2996,15 @@ class GuitarTrainerApp(App):
             if 'input_channel' in self.settings:
                 self.audio_processor.set_input_channel(self.settings['input_channel'])
             
+            # Автоподбор начинается с размера, сохраненного для устройства (или с наименьшего);
+            # он выбирается до перезапуска, чтобы поток перезапускался один раз
+            auto_start_size = None
+            if self.settings.get('auto_buffer_size'):
+                device_info = self.audio_processor.current_device_info
+                device_name = device_info['name'] if device_info else ''
+                auto_start_size = (self.settings.get('buffer_sizes', {}).get(device_name)
+                                   or self.audio_processor.buffer_tuner.sizes[0])
+            
             # Устанавливаем размер буфера
             if 'buffer_size' in self.settings:
                 was_monitoring = self.audio_processor.is_monitoring
@@ -1594,19 +3013,65 @@ class GuitarTrainerApp(App):
                 self.audio_processor.stop()
                 
                 # Устанавливаем новый размер буфера
-                self.audio_processor.block_size = self.settings['buffer_size']
+                self.audio_processor.block_size = auto_start_size or self.settings['buffer_size']
                 
                 # Устанавливаем режим низкой задержки
                 self.audio_processor.use_low_latency = self.settings.get('low_latency', True)
                 
+                # Шаг и окно анализа не зависят от размера буфера
+                self.audio_processor.analysis_hop_size = self.settings.get('analysis_hop_size', 256)
+                self.audio_processor.analysis_window_size = self.settings.get('analysis_window_size', 1024)
+                
+                # Формат захвата
+                self.audio_processor.sample_format = self.settings.get('sample_format', 'float32')
+                
+                # Через сколько секунд без сигнала и тренировки переходить в простой
+                self.audio_processor.idle_timeout = self.settings.get('idle_timeout', 10.0)
+                
+                # Режим реального времени для потоков аудио
+                self.audio_processor.realtime_mode = self.settings.get('realtime_mode', False) and realtime.is_supported()
+                
                 # Перезапускаем аудиопроцессор
                 self.audio_processor.start()
                 
                 # Мониторинг не восстанавливаем автоматически - пользователь должен включить его вручную
                 if was_monitoring:
                     print("Мониторинг был включен. Пожалуйста, включите его снова после изменения настроек.")
+            
+            # Эффекты мониторинга (цепочка пересоздается с ними при запуске мониторинга)
+            self.audio_processor.set_monitoring_effects(**self.settings.get('monitoring_effects', {}))
+            self.audio_processor.set_monitoring_volume(self.settings.get('monitoring_volume', 1.0))
+            
+            # Поток уже открыт с начальным размером - повторного перезапуска нет
+            if auto_start_size is not None:
+                self.audio_processor.set_auto_buffer_size(True, auto_start_size)
+            elif self.audio_processor.auto_buffer_size:
+                self.audio_processor.set_auto_buffer_size(False)
+            
+            # Новое устройство может работать на другой частоте
+            if hasattr(self, 'rhythm_trainer'):
+                self.sync_sample_rate()
+            
+            self.apply_realtime_mode()
         except Exception as e:
             print(f"Ошибка применения настроек: {str(e)}")
+    
+    def apply_realtime_mode(self):
+        """Привязка потока интерфейса к ядрам, свободным от аудио, и управление GC"""
+        enabled = self.audio_processor.realtime_mode
+        if enabled:
+            _, ui_cpus = realtime.plan_affinity()
+            self.audio_processor.metrics.set_info('realtime.ui_thread', f'ядра: {realtime.pin_thread(ui_cpus)}')
+            self.ui_thread_pinned = True
+            self.gc_controller.enable()
+            self.rhythm_trainer.gc_controller = self.gc_controller
+        else:
+            # Привязку снимаем только при выключении режима, а не при каждом применении настроек
+            if self.ui_thread_pinned:
+                realtime.unpin_thread()
+                self.ui_thread_pinned = False
+            self.gc_controller.disable()
+            self.rhythm_trainer.gc_controller = None
 
 if __name__ == '__main__':
     GuitarTrainerApp().run() 
\ No newline at end of file
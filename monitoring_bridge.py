@@ -0,0 +1,186 @@
+import numpy as np
+
+from ring_buffer import AudioRingBuffer
+
+class MonitoringBridge:
+    """
+    Мост мониторинга между разными устройствами ввода и вывода
+
+    У разных звуковых карт независимые тактовые генераторы: даже при одинаковой
+    номинальной частоте одна из них чуть быстрее другой, и в дуплексном потоке
+    это приводит к постепенному накоплению опустошений или переполнений буфера.
+    Поток ввода пишет сэмплы в кольцевой буфер, поток вывода читает их с дробным
+    шагом (коэффициентом ресемплирования). Коэффициент подстраивается по уровню
+    заполнения буфера (ПИ-регулятор), поэтому задержка мониторинга остается
+    ограниченной и постоянной на длинных сессиях.
+
+    Пишет в мост один поток (callback ввода), читает один поток (callback вывода).
+    Позицию чтения и регулятор меняет только поток вывода: при переполнении поток
+    ввода лишь увеличивает счетчик overruns, а сброс к целевой задержке делает
+    следующий read.
+    """
+    def __init__(self, input_rate, output_rate=None, block_size=128, target_latency=0.01, max_adjust=0.002,
+                 buffer_seconds=1.0, kp=0.002, ki=0.0005, smoothing=0.02):
+        """
+        Args:
+            input_rate: Частота дискретизации устройства ввода (Гц)
+            output_rate: Частота дискретизации устройства вывода (по умолчанию равна входной)
+            block_size: Размер блока потоков ввода и вывода (сэмплов)
+            target_latency: Целевое заполнение буфера (сек), не меньше трех блоков
+            max_adjust: Максимальное отклонение коэффициента от номинала (доля)
+            buffer_seconds: Емкость кольцевого буфера (сек)
+            kp: Пропорциональный коэффициент регулятора
+            ki: Интегральный коэффициент регулятора (на секунду)
+            smoothing: Коэффициент сглаживания уровня заполнения
+        """
+        self.input_rate = input_rate
+        self.output_rate = output_rate or input_rate
+        # Номинальное число входных сэмплов на один выходной
+        self.nominal_ratio = self.input_rate / self.output_rate
+        # Блоки ввода и вывода приходят в произвольной фазе друг к другу,
+        # поэтому в буфере должен помещаться запас хотя бы на три блока
+        self.target_fill = max(3.0 * block_size * self.nominal_ratio, target_latency * self.input_rate)
+        self.max_adjust = max_adjust
+        self.kp = kp
+        self.ki = ki
+        self.smoothing = smoothing
+
+        capacity = max(int(buffer_seconds * self.input_rate), int(4 * self.target_fill))
+        self.ring_buffer = AudioRingBuffer(capacity)
+
+        # Буферы для чтения выделяются заранее и растут только при увеличении блока
+        self._ramp = np.zeros(0)
+        self._positions = np.zeros(0)
+        self._indices = np.zeros(0, dtype=np.intp)
+        self._next = np.zeros(0, dtype=np.intp)
+        self._left = np.zeros(0, dtype=np.float32)
+        self._output = np.zeros(0, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """Сброс состояния (при перезапуске потоков)"""
+        self.ring_buffer.reset()
+        self.read_position = 0.0   # Абсолютная дробная позиция чтения (в сэмплах ввода)
+        self.ratio = self.nominal_ratio
+        self.smoothed_fill = self.target_fill
+        self.integral = 0.0
+        self.primed = False        # Вывод начинается, когда буфер заполнится до цели
+        self.underruns = 0
+        self.overruns = 0           # Меняет только поток ввода
+        self._overruns_handled = 0  # Меняет только поток вывода
+
+    @property
+    def fill(self):
+        """Текущее заполнение буфера (сэмплов ввода)"""
+        return self.ring_buffer.write_index - self.read_position
+
+    @property
+    def latency(self):
+        """Сглаженная задержка мониторинга (сек)"""
+        return self.smoothed_fill / self.input_rate
+
+    @property
+    def correction_ppm(self):
+        """Текущая подстройка коэффициента относительно номинала (ppm)"""
+        return (self.ratio / self.nominal_ratio - 1.0) * 1e6
+
+    def write(self, samples):
+        """Добавление сэмплов ввода (из callback ввода)"""
+        self.ring_buffer.write(samples)
+
+        # Поток вывода не успевает: лишнее отбросит следующий read
+        if self.fill > self.ring_buffer.capacity - len(samples):
+            self.overruns += 1
+
+    def _resync(self):
+        """Переход к целевой задержке от последнего записанного сэмпла (из потока вывода)"""
+        self.read_position = self.ring_buffer.write_index - self.target_fill
+        self.smoothed_fill = self.target_fill
+
+    def _ensure_capacity(self, frame_count):
+        """Увеличение заранее выделенных буферов под размер блока"""
+        if len(self._ramp) < frame_count:
+            self._ramp = np.arange(frame_count, dtype=np.float64)
+            self._positions = np.zeros(frame_count)
+            self._indices = np.zeros(frame_count, dtype=np.intp)
+            self._next = np.zeros(frame_count, dtype=np.intp)
+            self._left = np.zeros(frame_count, dtype=np.float32)
+            self._output = np.zeros(frame_count, dtype=np.float32)
+
+    def _update_ratio(self, frame_count):
+        """Подстройка коэффициента ресемплирования по уровню заполнения"""
+        self.smoothed_fill += self.smoothing * (self.fill - self.smoothed_fill)
+        error = (self.smoothed_fill - self.target_fill) / self.target_fill
+
+        # Интеграл ограничен, чтобы после долгого опустошения регулятор не "раскачивался"
+        limit = self.max_adjust / self.ki if self.ki else 0.0
+        self.integral = min(limit, max(-limit, self.integral + error * frame_count / self.output_rate))
+
+        adjust = self.kp * error + self.ki * self.integral
+        adjust = min(self.max_adjust, max(-self.max_adjust, adjust))
+        self.ratio = self.nominal_ratio * (1.0 + adjust)
+
+    def read(self, frame_count):
+        """
+        Чтение блока для вывода (из callback вывода)
+
+        Args:
+            frame_count: Количество выходных сэмплов
+
+        Returns:
+            numpy array float32 длиной frame_count - представление внутреннего буфера,
+                действительное до следующего вызова read
+        """
+        self._ensure_capacity(frame_count)
+        output = self._output[:frame_count]
+
+        # Переполнение, отмеченное потоком ввода: отбрасываем лишнее до целевой задержки
+        overruns = self.overruns
+        if overruns != self._overruns_handled:
+            self._overruns_handled = overruns
+            if self.primed:
+                self._resync()
+
+        if not self.primed:
+            if self.fill < self.target_fill:
+                output[:] = 0.0
+                return output
+            # Начинаем ровно с целевой задержки
+            self._resync()
+            self.primed = True
+
+        self._update_ratio(frame_count)
+
+        # Нужны сэмплы до последней позиции и следующий за ней для интерполяции
+        base = int(self.read_position)
+        last = self.read_position + self.ratio * (frame_count - 1)
+        needed = int(last) + 2 - base
+        ring = self.ring_buffer
+        if base + needed > ring.write_index or not ring.is_valid(base):
+            # Опустошение: выводим тишину и ждем повторного заполнения
+            self.underruns += 1
+            self.primed = False
+            self.integral = 0.0
+            output[:] = 0.0
+            return output
+
+        window = ring.read(base, needed)
+
+        # Линейная интерполяция по дробным позициям
+        positions = self._positions[:frame_count]
+        np.multiply(self._ramp[:frame_count], self.ratio, out=positions)
+        positions += self.read_position - base
+        indices = self._indices[:frame_count]
+        np.copyto(indices, positions, casting='unsafe')
+        positions -= indices
+        following = self._next[:frame_count]
+        np.add(indices, 1, out=following)
+        left = self._left[:frame_count]
+        np.take(window, indices, out=left)
+        np.take(window, following, out=output)
+        output -= left
+        output *= positions
+        output += left
+
+        self.read_position += self.ratio * frame_count
+        return output
@@ -0,0 +1,334 @@
+import math
+import time
+
+import numpy as np
+
+import instrumentation
+from audio_analysis import SAMPLE_FORMATS
+
+# Наибольший блок, под который заранее выделяются буферы
+# (как наибольший размер буфера в настройках)
+MAX_BLOCK_SIZE = 1024
+# Кусок блока, который фильтр эквалайзера обрабатывает одним матричным умножением
+BIQUAD_CHUNK = 64
+
+# Полосы эквалайзера: ключ настройки, тип фильтра, частота (Гц), добротность
+EQ_BANDS = (
+    ('bass_db', 'lowshelf', 120.0, 0.707),
+    ('mid_db', 'peaking', 800.0, 0.9),
+    ('treble_db', 'highshelf', 4000.0, 0.707),
+)
+
+# Параметры цепочки по умолчанию (совпадают с настройками приложения)
+DEFAULT_EFFECTS = {
+    'gain_db': 0.0,             # Входное усиление
+    'gate_threshold_db': -90.0,  # Порог открытия гейта; GATE_OFF_DB и ниже - гейт выключен
+    'bass_db': 0.0,
+    'mid_db': 0.0,
+    'treble_db': 0.0,
+    'soft_clip': True            # Мягкое ограничение вместо жесткого клиппинга
+}
+
+GATE_OFF_DB = -90.0
+GATE_HYSTERESIS_DB = 6.0  # Гейт закрывается на столько ниже порога открытия
+GATE_HOLD = 0.05          # Сколько держать гейт открытым после спада сигнала (сек)
+GATE_RELEASE = 0.05       # Время плавного закрытия гейта (сек)
+
+def db_to_gain(db):
+    """Перевод децибел в линейный коэффициент"""
+    return 10.0 ** (db / 20.0)
+
+def biquad_coefficients(kind, frequency, q, gain_db, sample_rate):
+    """
+    Коэффициенты биквадратного фильтра по формулам RBJ Audio EQ Cookbook
+
+    Returns:
+        tuple: (b0, b1, b2, a1, a2), нормированные на a0
+    """
+    a = 10.0 ** (gain_db / 40.0)
+    w0 = 2.0 * math.pi * min(frequency, 0.45 * sample_rate) / sample_rate
+    cos_w0 = math.cos(w0)
+    alpha = math.sin(w0) / (2.0 * q)
+
+    if kind == 'peaking':
+        b = (1 + alpha * a, -2 * cos_w0, 1 - alpha * a)
+        a_coef = (1 + alpha / a, -2 * cos_w0, 1 - alpha / a)
+    elif kind in ('lowshelf', 'highshelf'):
+        sign = 1 if kind == 'lowshelf' else -1
+        root = 2 * math.sqrt(a) * alpha
+        b = (a * ((a + 1) - sign * (a - 1) * cos_w0 + root),
+             sign * 2 * a * ((a - 1) - sign * (a + 1) * cos_w0),
+             a * ((a + 1) - sign * (a - 1) * cos_w0 - root))
+        a_coef = ((a + 1) + sign * (a - 1) * cos_w0 + root,
+                  -sign * 2 * ((a - 1) + sign * (a + 1) * cos_w0),
+                  (a + 1) + sign * (a - 1) * cos_w0 - root)
+    else:
+        raise ValueError(f"Неизвестный тип фильтра: {kind}")
+
+    a0 = a_coef[0]
+    return (b[0] / a0, b[1] / a0, b[2] / a0, a_coef[1] / a0, a_coef[2] / a0)
+
+def allpole_impulse(a1, a2, length):
+    """
+    Импульсная характеристика 1 / (1 + a1 z^-1 + a2 z^-2) на length сэмплах без цикла по сэмплам
+
+    g[n] - левый верхний элемент n-й степени матрицы-компаньона рекурсии; степени
+    считаются удвоением: за шаг блок уже посчитанных степеней умножается на M^k.
+    """
+    powers = np.empty((length, 2, 2))
+    powers[0] = np.eye(2)
+    step = np.array([[-a1, -a2], [1.0, 0.0]])  # M^filled
+    filled = 1
+    while filled < length:
+        count = min(filled, length - filled)
+        np.matmul(powers[:count], step, out=powers[filled:filled + count])
+        filled += count
+        step = step @ step
+    return powers[:, 0, 0]
+
+class BlockBiquad:
+    """
+    Биквадратный фильтр, обрабатывающий блок кусками без цикла по сэмплам
+
+    Выход куска длины n - сумма отклика на входной кусок (нижнетреугольная матрица
+    Теплица из импульсной характеристики) и отклика на состояние фильтра с прошлого
+    куска (x[-1], x[-2], y[-1], y[-2]). Матрицы размера chunk не зависят от размера
+    блока и считаются при создании через характеристику рекурсии (allpole_impulse),
+    поэтому пересоздание фильтра при движении ползунка эквалайзера дешевое.
+    """
+    def __init__(self, coefficients, chunk=BIQUAD_CHUNK):
+        """
+        Args:
+            coefficients: (b0, b1, b2, a1, a2)
+            chunk: Длина куска, обрабатываемого одним матричным умножением
+        """
+        self.coefficients = coefficients
+        self.chunk = chunk
+        b0, b1, b2, a1, a2 = coefficients
+
+        # g[n] и g[n - 1], g[n - 2] с нулями слева
+        g = allpole_impulse(a1, a2, chunk + 1)
+        g_prev = np.concatenate(([0.0], g[:chunk]))
+        g_prev2 = np.concatenate(([0.0, 0.0], g[:chunk - 1]))
+        impulse = b0 * g[:chunk] + b1 * g_prev[:chunk] + b2 * g_prev2[:chunk]
+
+        # Отклики на единичные x[-1], x[-2], y[-1], y[-2] (прямая форма I)
+        responses = np.stack((b1 * g[:chunk] + b2 * g_prev[:chunk],
+                              b2 * g[:chunk],
+                              g[1:],
+                              -a2 * g[:chunk]), axis=1)
+
+        lag = np.arange(chunk)[:, None] - np.arange(chunk)[None, :]
+        self.toeplitz = np.where(lag >= 0, impulse[np.maximum(lag, 0)], 0.0).astype(np.float32)
+        self.state_response = np.ascontiguousarray(responses, dtype=np.float32)
+        self.state = np.zeros(4, dtype=np.float32)  # x[-1], x[-2], y[-1], y[-2]
+        self._from_state = np.empty(chunk, dtype=np.float32)
+
+    def reset(self):
+        """Сброс состояния фильтра"""
+        self.state[:] = 0.0
+
+    def process(self, x, out):
+        """
+        Фильтрация блока x в out (x и out не должны пересекаться)
+
+        Returns:
+            out[:len(x)]
+        """
+        n = len(x)
+        out = out[:n]
+        for start in range(0, n, self.chunk):
+            end = min(start + self.chunk, n)
+            self._process_chunk(x[start:end], out[start:end])
+        return out
+
+    def _process_chunk(self, x, out):
+        """Один кусок не длиннее chunk с обновлением состояния"""
+        n = len(x)
+        np.matmul(self.toeplitz[:n, :n], x, out=out)
+        from_state = self._from_state[:n]
+        np.matmul(self.state_response[:n], self.state, out=from_state)
+        out += from_state
+
+        state = self.state
+        if n >= 2:
+            state[0], state[1] = x[n - 1], x[n - 2]
+            state[2], state[3] = out[n - 1], out[n - 2]
+        else:
+            state[1], state[0] = state[0], x[0]
+            state[3], state[2] = state[2], out[0]
+
+class MonitoringChain:
+    """
+    Цепочка эффектов мониторинга: входное усиление, гейт, эквалайзер, мягкое
+    ограничение, громкость
+
+    Все буферы и матрицы фильтров выделяются при создании (при запуске потока),
+    блок обрабатывается векторно на месте без выделения памяти. Изменение параметров
+    из потока интерфейса собирает новые фильтры и подменяет список целиком.
+    Длительность обработки каждого блока пишется в метрики вместе с долей бюджета
+    (длительности блока).
+    """
+    def __init__(self, sample_rate, output_channels=2, sample_format='float32',
+                 max_block=MAX_BLOCK_SIZE, effects=None, volume=1.0, metrics=None):
+        """
+        Args:
+            sample_rate: Частота дискретизации (Гц)
+            output_channels: Количество каналов вывода (моно сигнал дублируется)
+            sample_format: Формат сэмплов вывода (ключ SAMPLE_FORMATS)
+            max_block: Наибольший размер блока (не меньше frames_per_buffer потоков:
+                PortAudio передает в callback ровно столько кадров)
+            effects: Параметры эффектов (ключи DEFAULT_EFFECTS)
+            volume: Громкость мониторинга (0.0 - 1.0)
+            metrics: PipelineMetrics для длительности обработки
+        """
+        self.sample_rate = sample_rate
+        self.output_channels = output_channels
+        self.sample_format = sample_format
+        self.max_block = max_block
+        self.volume = volume
+        self.metrics = metrics
+
+        self._buffer = np.zeros(max_block, dtype=np.float32)
+        self._spare = np.zeros(max_block, dtype=np.float32)
+        self._ramp = np.arange(1, max_block + 1, dtype=np.float32)
+        self._gate_gains = np.zeros(max_block, dtype=np.float32)
+        dtype, self._output_scale, _ = SAMPLE_FORMATS[sample_format]
+        self._output = np.zeros((max_block, output_channels), dtype=dtype)
+        self._output_scratch = np.zeros(max_block, dtype=np.float32)
+
+        self._gate_gain = 1.0
+        self._gate_open = True
+        self._gate_hold_left = 0.0
+
+        self.effects = dict(DEFAULT_EFFECTS)
+        self.bands = []
+        self._band_keys = []  # Ключи настроек полос в self.bands
+        self.configure(**(effects or {}))
+
+    def configure(self, **effects):
+        """Изменение параметров эффектов (из потока интерфейса)"""
+        self.effects.update(effects)
+        self.input_gain = db_to_gain(self.effects['gain_db'])
+        self.gate_open_level = db_to_gain(self.effects['gate_threshold_db'])
+        self.gate_close_level = db_to_gain(self.effects['gate_threshold_db'] - GATE_HYSTERESIS_DB)
+        self.gate_enabled = self.effects['gate_threshold_db'] > GATE_OFF_DB
+        self.soft_clip = bool(self.effects['soft_clip'])
+
+        # Полосы без усиления пропускаются; неизменные полосы остаются как есть, а
+        # измененная получает новый фильтр с состоянием прежнего (без щелчка)
+        current = {band.coefficients: band for band in self.bands}
+        previous = dict(zip(self._band_keys, self.bands))
+        bands = []
+        keys = []
+        for key, kind, frequency, q in EQ_BANDS:
+            gain_db = self.effects[key]
+            if abs(gain_db) < 0.05:
+                continue
+            coefficients = biquad_coefficients(kind, frequency, q, gain_db, self.sample_rate)
+            band = current.get(coefficients)
+            if band is None:
+                band = BlockBiquad(coefficients)
+                if key in previous:
+                    band.state[:] = previous[key].state
+            bands.append(band)
+            keys.append(key)
+        self._band_keys = keys
+        self.bands = bands
+
+    def process(self, samples, full_scale=1.0):
+        """
+        Обработка блока одного канала
+
+        Args:
+            samples: Сэмплы в формате захвата (без перевода во float)
+            full_scale: Значение сэмпла, соответствующее амплитуде 1.0
+
+        Returns:
+            numpy array float32 - обработанный блок (срез внутреннего буфера)
+        """
+        start = time.perf_counter()
+        n = len(samples)
+
+        # Перевод во float вместе с входным усилением - одна операция
+        x = self._buffer[:n]
+        np.multiply(samples, np.float32(self.input_gain / full_scale), out=x, casting='unsafe')
+
+        if self.gate_enabled:
+            self._apply_gate(x)
+
+        # Буферы меняются ролями, чтобы вход и выход фильтра не пересекались
+        target = self._spare
+        for band in self.bands:
+            x = band.process(x, target)
+            target = self._buffer if target is self._spare else self._spare
+
+        if self.soft_clip:
+            np.tanh(x, out=x)
+        if self.volume != 1.0:
+            x *= np.float32(self.volume)
+
+        if self.metrics is not None:
+            duration = time.perf_counter() - start
+            self.metrics.record(instrumentation.MONITOR_DSP, duration)
+            self.metrics.set_gauge(instrumentation.MONITOR_DSP_LOAD,
+                                   round(100.0 * duration * self.sample_rate / n, 2))
+        return x
+
+    def _apply_gate(self, x):
+        """Гейт по пиковому уровню блока с гистерезисом, удержанием и плавным закрытием"""
+        n = len(x)
+        block_duration = n / self.sample_rate
+        peak = max(float(x.max()), -float(x.min()))
+
+        if peak >= self.gate_open_level:
+            self._gate_open = True
+            self._gate_hold_left = GATE_HOLD
+        elif peak < self.gate_close_level and self._gate_open:
+            self._gate_hold_left -= block_duration
+            if self._gate_hold_left <= 0:
+                self._gate_open = False
+
+        start_gain = self._gate_gain
+        if self._gate_open:
+            # Открывается за один блок, чтобы не срезать атаку удара
+            target = 1.0
+        else:
+            target = max(0.0, start_gain - block_duration / GATE_RELEASE)
+        self._gate_gain = target
+
+        if start_gain == target:
+            if target == 0.0:
+                x.fill(0.0)
+            elif target != 1.0:
+                x *= np.float32(target)
+            return
+
+        # Линейный переход коэффициента внутри блока без щелчков
+        gains = self._gate_gains[:n]
+        np.multiply(self._ramp[:n], np.float32((target - start_gain) / n), out=gains)
+        gains += np.float32(start_gain)
+        x *= gains
+
+    def interleave(self, samples):
+        """
+        Байты для PortAudio: моно блок, продублированный на каналы вывода в формате вывода
+
+        Args:
+            samples: Сэмплы float32 в диапазоне [-1, 1]
+        """
+        n = len(samples)
+        output = self._output[:n]
+        if self.sample_format == 'float32':
+            np.copyto(output, samples[:, None])
+            return output.tobytes()
+
+        # Целые форматы: масштаб и ограничение в float, затем приведение типа
+        scaled = self._output_scratch[:n]
+        np.multiply(samples, np.float32(self._output_scale), out=scaled)
+        np.clip(scaled, -self._output_scale, self._output_scale - 1, out=scaled)
+        np.copyto(output, scaled[:, None], casting='unsafe')
+        if SAMPLE_FORMATS[self.sample_format][2] == 3:
+            # Из int32 (little-endian) оставляем три младших байта
+            return output.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+        return output.tobytes()
@@ -0,0 +1,259 @@
+import math
+
+import numpy as np
+
+from pitch import NOTE_NAMES, REFERENCE_A4
+from rhythm_analyzer import RhythmAnalyzer
+
+# Стандартный строй: MIDI открытых струн от шестой (низкой ми) к первой
+STANDARD_TUNING = (40, 45, 50, 55, 59, 64)
+# Последний лад грифа
+MAX_FRET = 24
+# Ступени минорной пентатоники (полутоны от тоники) и их обозначения
+PENTATONIC_INTERVALS = (0, 3, 5, 7, 10)
+DEGREE_NAMES = ('1', 'b3', '4', '5', 'b7')
+# Количество позиций (боксов) пентатоники
+BOX_COUNT = 5
+# Нот на струну в позиции пентатоники
+NOTES_PER_STRING = 2
+
+def build_boxes(tuning=STANDARD_TUNING):
+    """
+    Ноты пяти позиций минорной пентатоники во всех тональностях
+
+    Позиция n начинается с n-й ступени на шестой струне не выше 11 лада и
+    берет по две соседние ноты гаммы на каждую струну снизу вверх - так
+    получаются стандартные боксы, включая сдвиг на второй струне.
+
+    Returns:
+        list: boxes[key][box] - список (midi, string, fret) по возрастанию высоты,
+            string - номер струны от шестой (0) до первой (5)
+    """
+    boxes = []
+    for key in range(12):
+        # Тоника на шестой струне: лад 0..11
+        root_fret = (key - tuning[0]) % 12
+        key_boxes = []
+        for box in range(BOX_COUNT):
+            start = tuning[0] + (root_fret + PENTATONIC_INTERVALS[box]) % 12
+            # Ноты гаммы подряд, начиная со стартовой
+            octave, degree = 0, box
+            notes = []
+            for string in range(len(tuning)):
+                for _ in range(NOTES_PER_STRING):
+                    midi = start - PENTATONIC_INTERVALS[box] + 12 * octave + PENTATONIC_INTERVALS[degree]
+                    notes.append((midi, string, midi - tuning[string]))
+                    degree += 1
+                    if degree == len(PENTATONIC_INTERVALS):
+                        degree, octave = 0, octave + 1
+            # Позиция у порожка с отрицательным ладом переносится на октаву выше
+            if min(fret for _, _, fret in notes) < 0:
+                notes = [(midi + 12, string, fret + 12) for midi, string, fret in notes]
+            key_boxes.append(notes)
+        boxes.append(key_boxes)
+    return boxes
+
+def build_tables(tuning=STANDARD_TUNING):
+    """
+    Таблицы поиска для всех тональностей и позиций
+
+    Returns:
+        tuple: (degrees, positions, boxes)
+            degrees: numpy массив (12, 128) - индекс ступени ноты MIDI в тональности или -1
+            positions: positions[key][box][midi] - кортеж (string, fret) мест ноты в позиции
+            boxes: результат build_boxes
+    """
+    degrees = np.full((12, 128), -1, dtype=np.int8)
+    midi = np.arange(128)
+    for key in range(12):
+        for index, interval in enumerate(PENTATONIC_INTERVALS):
+            degrees[key, (midi - key - interval) % 12 == 0] = index
+
+    boxes = build_boxes(tuning)
+    positions = []
+    for key_boxes in boxes:
+        key_positions = []
+        for notes in key_boxes:
+            table = [()] * 128
+            for note, string, fret in notes:
+                table[note] = table[note] + ((string, fret),)
+            key_positions.append(table)
+        positions.append(key_positions)
+    return degrees, positions, boxes
+
+# Таблицы считаются один раз при импорте: поиск ступени и ладов - O(1)
+DEGREES, POSITIONS, BOXES = build_tables()
+
+def frequency_to_midi(frequency, reference=REFERENCE_A4):
+    """Ближайшая нота MIDI для частоты"""
+    return int(round(69.0 + 12.0 * math.log2(frequency / reference)))
+
+def midi_name(midi):
+    """Название ноты MIDI с октавой (например, A2)"""
+    return f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}"
+
+class PentatonicTrainer:
+    """
+    Упражнение по позиции минорной пентатоники
+
+    Игрок проходит позицию вверх и вниз; каждый удар оценивается по времени
+    (собственный RhythmAnalyzer по долям темпа или по расписанию паттерна) и по
+    высоте: нота MIDI, определенная по короткому окну после onset, сравнивается с
+    ожидаемой, а ступень и место на грифе берутся из заранее построенных таблиц.
+    """
+    def __init__(self, key=9, box=0, tolerance=0.1, clock=None):
+        """
+        Args:
+            key: Тональность (класс высоты тоники: 0 - до, 9 - ля)
+            box: Номер позиции (0 - 4)
+            tolerance: Допустимое отклонение по времени (в долях)
+            clock: Часы (по умолчанию системные)
+        """
+        self.analyzer = RhythmAnalyzer(tolerance=tolerance, clock=clock)
+        self.is_running = False
+        self.set_position(key, box)
+
+    def set_position(self, key, box):
+        """Выбор тональности и позиции; упражнение начинается сначала"""
+        self.key = key % 12
+        self.box = box % BOX_COUNT
+        notes = [note for note, _, _ in BOXES[self.key][self.box]]
+        # Вверх по позиции и обратно без повтора крайних нот
+        self.sequence = notes + notes[-2:0:-1]
+        self.step = 0
+        self.last_result = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.total_hits = 0
+        self.correct_notes = 0
+        self.in_scale_notes = 0
+        self.accurate_hits = 0
+        self.perfect_hits = 0  # Верная нота вовремя
+
+    @property
+    def key_name(self):
+        """Название тональности (например, Am)"""
+        return f"{NOTE_NAMES[self.key]}m"
+
+    @property
+    def expected(self):
+        """Ожидаемая нота: (midi, позиции (string, fret))"""
+        midi = self.sequence[self.step]
+        return midi, POSITIONS[self.key][self.box][midi]
+
+    def start(self, bpm, schedule=None):
+        """
+        Начало упражнения
+
+        Args:
+            bpm: Темп для оценки по долям
+            schedule: PatternSchedule тренажера (если идет тренировка) или None
+        """
+        self.step = 0
+        self.last_result = None
+        self._reset_stats()
+        self.analyzer.set_tempo(bpm)
+        self.analyzer.start()
+        self.analyzer.set_schedule(schedule)
+        self.is_running = True
+
+    def stop(self):
+        """Остановка упражнения"""
+        self.is_running = False
+        self.analyzer.stop()
+
+    def lookup(self, midi):
+        """
+        Ступень ноты в тональности и ее места в текущей позиции
+
+        Returns:
+            tuple: (degree, positions) - индекс ступени (-1 - не из гаммы) и кортеж (string, fret)
+        """
+        if not 0 <= midi < 128:
+            return -1, ()
+        return int(DEGREES[self.key, midi]), POSITIONS[self.key][self.box][midi]
+
+    def judge(self, timestamp, frequency):
+        """
+        Оценка удара
+
+        Args:
+            timestamp: Время onset
+            frequency: Основная частота удара (Гц) или None, если высота не определена
+
+        Returns:
+            dict или None: Результат {'time', 'expected', 'played', 'degree', 'positions',
+                'correct', 'in_scale', 'on_time', 'deviation'}; None, если упражнение не идет
+        """
+        if not self.is_running:
+            return None
+
+        on_time, deviation = self.analyzer.analyze_hit(timestamp)
+        expected, _ = self.expected
+        played = frequency_to_midi(frequency) if frequency else None
+        degree, positions = self.lookup(played) if played is not None else (-1, ())
+        correct = played == expected
+
+        self.total_hits += 1
+        self.correct_notes += correct
+        self.in_scale_notes += degree >= 0
+        self.accurate_hits += on_time
+        self.perfect_hits += correct and on_time
+
+        # Верная нота продвигает упражнение, ошибка оставляет ту же ноту
+        if correct:
+            self.step = (self.step + 1) % len(self.sequence)
+
+        self.last_result = {
+            'time': timestamp,
+            'expected': expected,
+            'played': played,
+            'degree': degree,
+            'positions': positions,
+            'correct': correct,
+            'in_scale': degree >= 0,
+            'on_time': on_time,
+            'deviation': deviation
+        }
+        return self.last_result
+
+    def get_stats(self):
+        """
+        Статистика упражнения
+
+        Returns:
+            dict: Удары, доли верных нот, нот из гаммы, ударов вовремя и идеальных ударов
+        """
+        total = max(1, self.total_hits)
+        return {
+            'total_hits': self.total_hits,
+            'note_accuracy': self.correct_notes / total,
+            'in_scale': self.in_scale_notes / total,
+            'timing_accuracy': self.accurate_hits / total,
+            'perfect': self.perfect_hits / total
+        }
+
+    def summary_lines(self):
+        """Текстовый вид упражнения для панели"""
+        midi, positions = self.expected
+        string, fret = positions[0]
+        lines = [f"Пентатоника {self.key_name}, позиция {self.box + 1}",
+                 f"Следующая: {midi_name(midi)} - струна {6 - string}, лад {fret}"]
+
+        result = self.last_result
+        if result is not None:
+            if result['played'] is None:
+                played = 'высота не определена'
+            else:
+                degree = DEGREE_NAMES[result['degree']] if result['in_scale'] else 'вне гаммы'
+                played = f"{midi_name(result['played'])} ({degree})"
+            verdict = 'ВЕРНО' if result['correct'] else 'МИМО'
+            timing = 'вовремя' if result['on_time'] else f"мимо доли на {result['deviation'] * 100:.0f}%"
+            lines.append(f"{verdict}: {played}, {timing}")
+
+        if self.total_hits:
+            stats = self.get_stats()
+            lines.append(f"Ноты: {stats['note_accuracy'] * 100:.0f}%  Ритм: {stats['timing_accuracy'] * 100:.0f}%  "
+                         f"Идеально: {stats['perfect'] * 100:.0f}%")
+        return lines
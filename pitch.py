@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+
+# Диапазон частот тюнера (Гц): от си семиструнной гитары до высоких ладов первой струны
+TUNER_MIN_FREQ = 55.0
+TUNER_MAX_FREQ = 1400.0
+# Длина окна разностной функции (сек)
+TUNER_WINDOW = 0.04
+# Порог нормированной разностной функции YIN: первый минимум ниже него - период
+YIN_THRESHOLD = 0.15
+# Ниже этого RMS окна высота не определяется (тишина и шум)
+TUNER_MIN_LEVEL = 0.005
+# Частота ноты ля первой октавы по умолчанию (Гц)
+REFERENCE_A4 = 440.0
+
+NOTE_NAMES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+
+def note_from_frequency(frequency, reference=REFERENCE_A4):
+    """
+    Ближайшая нота равномерной темперации
+
+    Returns:
+        tuple: (name, octave, cents) - название ноты, октава (научная нотация)
+            и отклонение от нее в центах (> 0 - выше)
+    """
+    midi = 69.0 + 12.0 * math.log2(frequency / reference)
+    nearest = int(round(midi))
+    return NOTE_NAMES[nearest % 12], nearest // 12 - 1, 100.0 * (midi - nearest)
+
+class PitchDetector:
+    """
+    Определение основной частоты по алгоритму YIN
+
+    Разностная функция d(tau) = sum (x[j] - x[j + tau])^2 раскладывается на две
+    энергии окна (кумулятивные суммы) и взаимную корреляцию, которая считается
+    через БПФ - O(n log n) вместо O(n^2) для всех задержек сразу. Размеры и буферы
+    кадра выделяются один раз; читается последний кадр кольцевого буфера входа,
+    поэтому тюнер использует уже открытый поток.
+    """
+    def __init__(self, sample_rate, min_freq=TUNER_MIN_FREQ, max_freq=TUNER_MAX_FREQ,
+                 window_seconds=TUNER_WINDOW, threshold=YIN_THRESHOLD):
+        """
+        Args:
+            sample_rate: Частота дискретизации (Гц)
+            min_freq: Нижняя частота (Гц)
+            max_freq: Верхняя частота (Гц)
+            window_seconds: Длина окна разностной функции (сек)
+            threshold: Порог YIN
+        """
+        self.sample_rate = float(sample_rate)
+        self.threshold = threshold
+        self.min_lag = max(2, int(self.sample_rate / max_freq))
+        self.max_lag = int(math.ceil(self.sample_rate / min_freq)) + 1
+        self.window = max(int(window_seconds * self.sample_rate), self.max_lag)
+        # Кадр: окно и его сдвиг на наибольшую задержку
+        self.frame_size = self.window + self.max_lag
+        self.fft_size = 1 << (self.frame_size - 1).bit_length()
+
+        self.frame = np.empty(self.frame_size, dtype=np.float32)  # Буфер чтения кадра из кольцевого буфера
+        self._padded = np.zeros(self.fft_size)
+        self._head = np.zeros(self.fft_size)
+        self._squares = np.empty(self.frame_size + 1)
+        self._difference = np.empty(self.max_lag + 1)
+        self._normalized = np.empty(self.max_lag + 1)
+        self._lags = np.arange(1, self.max_lag + 1)
+        self.last_index = None
+
+    def update(self, ring):
+        """
+        Частота последнего кадра кольцевого буфера
+
+        Returns:
+            tuple или None: (frequency, clarity), если за время с прошлого вызова
+                пришли сэмплы и в кадре есть периодический сигнал; clarity - 1 минус
+                значение нормированной разностной функции в минимуме (0.0 - 1.0)
+        """
+        end = ring.write_index
+        if end < self.frame_size or end == self.last_index:
+            return None
+        self.last_index = end
+        return self.detect(ring.read_float(end - self.frame_size, self.frame_size, out=self.frame))
+
+    def detect(self, samples):
+        """Частота кадра из frame_size сэмплов float (см. update)"""
+        window = self.window
+        x = self._padded
+        x[:self.frame_size] = samples
+        if math.sqrt(np.dot(x[:window], x[:window]) / window) < TUNER_MIN_LEVEL:
+            return None
+
+        # Взаимная корреляция окна с кадром через БПФ: r(tau) = sum x[j] x[j + tau], j < window
+        self._head[:window] = x[:window]
+        spectrum = np.fft.rfft(x)
+        spectrum *= np.conj(np.fft.rfft(self._head))
+        correlation = np.fft.irfft(spectrum, self.fft_size)[:self.max_lag + 1]
+
+        # Энергии окна при каждой задержке по кумулятивной сумме квадратов
+        squares = self._squares
+        squares[0] = 0.0
+        np.cumsum(x[:self.frame_size] ** 2, out=squares[1:])
+        shifted_energy = squares[window:window + self.max_lag + 1] - squares[:self.max_lag + 1]
+        difference = self._difference
+        np.subtract(squares[window] + shifted_energy, 2.0 * correlation, out=difference)
+        np.maximum(difference, 0.0, out=difference)
+
+        # Нормировка накопленным средним: d'(tau) = d(tau) * tau / sum d(1..tau)
+        normalized = self._normalized
+        normalized[0] = 1.0
+        np.cumsum(difference[1:], out=normalized[1:])
+        np.divide(difference[1:] * self._lags, normalized[1:], out=normalized[1:], where=normalized[1:] > 0)
+
+        # Первая задержка ниже порога, затем спуск до локального минимума
+        search = normalized[self.min_lag:self.max_lag]
+        below = np.flatnonzero(search < self.threshold)
+        if len(below) == 0:
+            return None
+        lag = self.min_lag + int(below[0])
+        while lag + 1 < self.max_lag and normalized[lag + 1] < normalized[lag]:
+            lag += 1
+
+        # Дробная задержка по параболе через соседей
+        left, center, right = normalized[lag - 1], normalized[lag], normalized[lag + 1]
+        denominator = left - 2.0 * center + right
+        refined = lag + (0.5 * (left - right) / denominator if denominator > 0 else 0.0)
+        return float(self.sample_rate / refined), max(0.0, 1.0 - float(center))
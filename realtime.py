@@ -0,0 +1,181 @@
+import gc
+import os
+import sys
+import threading
+import time
+
+# Приоритет SCHED_FIFO для потоков аудио (ниже приоритетов ядра и JACK/PipeWire)
+REALTIME_PRIORITY = 70
+# Уменьшение nice, если реального времени не разрешено (работает при RLIMIT_NICE)
+FALLBACK_NICE = -10
+# Порог третьего поколения GC во время тренировки: полная сборка фактически откладывается до паузы
+DEFERRED_GEN2_THRESHOLD = 1000000
+
+# Ядра, доступные процессу при запуске (до привязки потоков)
+INITIAL_CPUS = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else []
+
+def is_supported():
+    """Режим реального времени поддерживается только в Linux"""
+    return sys.platform.startswith('linux') and hasattr(os, 'sched_setscheduler')
+
+def set_thread_realtime(priority=REALTIME_PRIORITY):
+    """
+    Повышение приоритета текущего потока
+
+    Сначала пробует SCHED_FIFO, при отсутствии прав - уменьшает nice потока,
+    иначе оставляет обычное планирование.
+
+    Returns:
+        str: Достигнутая конфигурация ('SCHED_FIFO:70', 'nice:-10' или 'SCHED_OTHER')
+    """
+    if not is_supported():
+        return 'SCHED_OTHER'
+
+    try:
+        # В Linux pid 0 для sched_* означает вызывающий поток, а не процесс
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        return f'SCHED_FIFO:{priority}'
+    except (PermissionError, OSError):
+        pass
+
+    return set_thread_nice()
+
+def set_thread_nice(nice=FALLBACK_NICE):
+    """
+    Повышение приоритета текущего потока без реального времени (уменьшение nice)
+
+    Для потоков, которые не должны вытеснять callback PortAudio (например, анализ).
+
+    Returns:
+        str: Достигнутая конфигурация ('nice:-10' или 'SCHED_OTHER')
+    """
+    if not is_supported():
+        return 'SCHED_OTHER'
+
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+        return f'nice:{nice}'
+    except (PermissionError, OSError):
+        return 'SCHED_OTHER'
+
+def plan_affinity():
+    """
+    Разделение доступных ядер между аудио и интерфейсом
+
+    Callback PortAudio получает последнее ядро (реже занято системой) в одиночку;
+    интерфейс и поток анализа - остальные.
+
+    Returns:
+        tuple: (audio_cpus, ui_cpus) или (None, None), если ядро одно или affinity недоступна
+    """
+    cpus = INITIAL_CPUS
+    if len(cpus) < 2:
+        return None, None
+    return {cpus[-1]}, set(cpus[:-1])
+
+def pin_thread(cpus):
+    """
+    Привязка текущего потока к ядрам
+
+    Returns:
+        str: Список ядер через запятую или 'нет', если привязка не выполнена
+    """
+    if not cpus or not hasattr(os, 'sched_setaffinity'):
+        return 'нет'
+    try:
+        os.sched_setaffinity(0, cpus)
+        return ','.join(str(cpu) for cpu in sorted(cpus))
+    except OSError:
+        return 'нет'
+
+def unpin_thread():
+    """Возврат текущего потока на все ядра, доступные процессу при запуске"""
+    return pin_thread(set(INITIAL_CPUS))
+
+class GCController:
+    """
+    Управление сборщиком мусора на время тренировки
+
+    Долгоживущие объекты (Kivy, numpy, звуки) один раз при включении замораживаются
+    gc.freeze() и больше не просматриваются сборщиком. Во время тренировки полные сборки откладываются
+    (порог третьего поколения очень большой), а выполняются в паузах между подходами.
+    Молодые поколения собираются как обычно - эти сборки короткие.
+    """
+    def __init__(self, metrics=None):
+        """
+        Args:
+            metrics: PipelineMetrics для паузы GC и сведений о конфигурации
+        """
+        self.metrics = metrics
+        self.enabled = False
+        self.in_run = False
+        self._saved_threshold = gc.get_threshold()
+        self._collect_start = None
+
+    def enable(self):
+        """Включение: полная сборка и заморозка всего, что создано при запуске"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._saved_threshold = gc.get_threshold()
+        self._collect(freeze=True)
+        gc.callbacks.append(self._on_gc)
+        self._report()
+
+    def disable(self):
+        """Выключение: возврат обычного поведения сборщика"""
+        if not self.enabled:
+            return
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        gc.set_threshold(*self._saved_threshold)
+        gc.unfreeze()
+        self.enabled = False
+        self.in_run = False
+        self._report()
+
+    def begin_run(self):
+        """Начало подхода: полные сборки откладываются"""
+        if not self.enabled:
+            return
+        self.in_run = True
+        gen0, gen1, _ = self._saved_threshold
+        gc.set_threshold(gen0, gen1, DEFERRED_GEN2_THRESHOLD)
+
+    def end_run(self):
+        """
+        Пауза между подходами: отложенная полная сборка
+
+        Повторно не замораживает: объекты занятия, которые станут мусором позже,
+        должны собираться обычным образом.
+        """
+        if not self.enabled:
+            return
+        self.in_run = False
+        gc.set_threshold(*self._saved_threshold)
+        self._collect()
+        self._report()
+
+    def _collect(self, freeze=False):
+        """Полная сборка; freeze - заморозка переживших ее объектов (только при включении)"""
+        start = time.perf_counter()
+        gc.collect()
+        if freeze:
+            gc.freeze()
+        if self.metrics:
+            self.metrics.set_gauge('gc.idle_collect_ms', round(1000.0 * (time.perf_counter() - start), 2))
+
+    def _on_gc(self, phase, info):
+        """Учет длительности сборок во время тренировки (из gc.callbacks)"""
+        if phase == 'start':
+            self._collect_start = time.perf_counter()
+        elif self._collect_start is not None and self.metrics:
+            if self.in_run:
+                self.metrics.record(f"gc.pause.gen{info['generation']}", time.perf_counter() - self._collect_start)
+            self._collect_start = None
+
+    def _report(self):
+        """Сведения о конфигурации GC для экспорта метрик"""
+        if self.metrics:
+            self.metrics.set_info('realtime.gc', 'freeze+deferred' if self.enabled else 'default')
+            self.metrics.set_gauge('gc.frozen_objects', gc.get_freeze_count())
@@ -1,15 +1,24 @@
-import time
+from collections import deque
+
 import numpy as np
 
+from clocks import SYSTEM_CLOCK
+from groove_analysis import GrooveProfile
+
+# Сколько последних отклонений хранить; среднее считается по всем ударам накопленной суммой
+DEVIATION_HISTORY = 1024
+
 class RhythmAnalyzer:
-    def __init__(self, tolerance=0.1):
+    def __init__(self, tolerance=0.1, clock=None):
         """
         Инициализация анализатора ритма
         
         Args:
             tolerance: Допустимое отклонение от идеального ритма (в долях)
+            clock: Часы (по умолчанию системные; для моделирования - VirtualClock)
         """
         self.tolerance = tolerance
+        self.clock = clock or SYSTEM_CLOCK
         self.is_running = False
         
         # Параметры ритма
@@ -17,20 +26,30 @@ class RhythmAnalyzer:
         self.beat_interval = 60.0 / self.tempo  # Интервал между ударами (сек)
         self.last_beat_time = 0
         
+        # Расписание нот паттерна (PatternSchedule); без него анализ идет по долям
+        self.schedule = None
+        
         # Статистика
         self.total_hits = 0
         self.accurate_hits = 0
-        self.deviations = []
+        self.deviations = deque(maxlen=DEVIATION_HISTORY)  # Последние отклонения (в долях)
+        self.deviation_sum = 0.0
+        self.last_offset = 0.0  # Отклонение последнего удара со знаком (сек), > 0 - опоздание
+        
+        # Отклонения со знаком по позициям в такте; без расписания - одна позиция (доля)
+        self.groove = GrooveProfile([0.0])
     
     def start(self):
         """Запуск анализатора ритма"""
         self.is_running = True
-        self.last_beat_time = time.time()
+        self.last_beat_time = self.clock.time()
         
         # Сбрасываем статистику
         self.total_hits = 0
         self.accurate_hits = 0
-        self.deviations = []
+        self.deviations.clear()
+        self.deviation_sum = 0.0
+        self.groove.reset()
     
     def stop(self):
         """Остановка анализатора ритма"""
@@ -46,6 +65,23 @@ class RhythmAnalyzer:
         self.tempo = max(40, min(220, tempo))  # Ограничиваем темп в разумных пределах
         self.beat_interval = 60.0 / self.tempo
     
+    def set_schedule(self, schedule):
+        """
+        Установка расписания нот паттерна
+        
+        Args:
+            schedule: PatternSchedule или None для анализа по долям метронома
+        """
+        self.schedule = schedule
+        if schedule is not None:
+            self.set_tempo(schedule.bpm)
+        
+        # Профиль пересоздается только при смене нот такта (новое расписание того же паттерна его сохраняет)
+        offsets = schedule.pattern.offsets if schedule is not None else np.zeros(1)
+        bar_beats = schedule.pattern.bar_beats if schedule is not None else 1.0
+        if bar_beats != self.groove.bar_beats or not np.array_equal(offsets, self.groove.slot_offsets):
+            self.groove = GrooveProfile(offsets, bar_beats)
+    
     def analyze_hit(self, hit_time):
         """
         Анализ попадания в ритм
@@ -61,15 +97,24 @@ class RhythmAnalyzer:
         if not self.is_running:
             return False, 0.0
         
-        # Вычисляем, сколько ударов должно было пройти с начала
-        elapsed_time = hit_time - self.last_beat_time
-        expected_beats = elapsed_time / self.beat_interval
-        
-        # Ближайший целый удар
-        nearest_beat = round(expected_beats)
-        
-        # Отклонение от идеального ритма (в долях)
-        deviation = abs(expected_beats - nearest_beat)
+        if self.schedule is not None:
+            # Отклонение от ближайшей ноты паттерна (в долях)
+            index, _, offset = self.schedule.nearest_note(hit_time)
+            deviation = abs(offset) / self.schedule.beat_duration
+            self.last_offset = offset
+            self.groove.add(index % self.schedule.pattern.notes_per_bar, offset / self.schedule.beat_duration)
+        else:
+            # Вычисляем, сколько ударов должно было пройти с начала
+            elapsed_time = hit_time - self.last_beat_time
+            expected_beats = elapsed_time / self.beat_interval
+            
+            # Ближайший целый удар
+            nearest_beat = round(expected_beats)
+            
+            # Отклонение от идеального ритма (в долях)
+            deviation = abs(expected_beats - nearest_beat)
+            self.last_offset = (expected_beats - nearest_beat) * self.beat_interval
+            self.groove.add(0, expected_beats - nearest_beat)
         
         # Определяем, точное ли попадание
         is_accurate = deviation <= self.tolerance
@@ -79,6 +124,7 @@ class RhythmAnalyzer:
         if is_accurate:
             self.accurate_hits += 1
         self.deviations.append(deviation)
+        self.deviation_sum += deviation
         
         return is_accurate, deviation
     
@@ -90,7 +136,7 @@ class RhythmAnalyzer:
             dict: Статистика анализа ритма
         """
         accuracy = self.accurate_hits / max(1, self.total_hits)
-        avg_deviation = np.mean(self.deviations) if self.deviations else 0.0
+        avg_deviation = self.deviation_sum / self.total_hits if self.total_hits else 0.0
         
         return {
             'total_hits': self.total_hits,
@@ -0,0 +1,292 @@
+import math
+import numpy as np
+
+# Символы в строке шагов паттерна
+STEP_NOTE = 'x'     # Нота
+STEP_ACCENT = 'X'   # Нота с акцентом
+STEP_RESTS = '.-'   # Пауза
+
+# Встроенные паттерны для тренировки.
+# Каждый слой - строка шагов, равномерно разбивающих такт; несколько слоев
+# накладываются друг на друга (полиритмы), swing сдвигает каждый второй шаг слоя.
+PATTERNS = {
+    'quarters': {
+        'name': 'Четверти',
+        'meter': (4, 4),
+        'layers': [{'steps': 'Xxxx'}]
+    },
+    'eighths': {
+        'name': 'Восьмые',
+        'meter': (4, 4),
+        'layers': [{'steps': 'XxXxXxXx'}]
+    },
+    'swing_eighths': {
+        'name': 'Восьмые со свингом',
+        'meter': (4, 4),
+        'layers': [{'steps': 'XxXxXxXx', 'swing': 2.0 / 3.0}]
+    },
+    'sixteenths': {
+        'name': 'Шестнадцатые',
+        'meter': (4, 4),
+        'layers': [{'steps': 'XxxxXxxxXxxxXxxx'}]
+    },
+    'triplets': {
+        'name': 'Триоли',
+        'meter': (4, 4),
+        'layers': [{'steps': 'XxxXxxXxxXxx'}]
+    },
+    'offbeats': {
+        'name': 'Слабые доли',
+        'meter': (4, 4),
+        'layers': [{'steps': '.x.x.x.x'}]
+    },
+    'syncopation': {
+        'name': 'Синкопы',
+        'meter': (4, 4),
+        'layers': [{'steps': 'X..x..x.X.x.x...'}]
+    },
+    'waltz': {
+        'name': 'Вальс 3/4',
+        'meter': (3, 4),
+        'layers': [{'steps': 'Xxx'}]
+    },
+    'seven_eight': {
+        'name': 'Размер 7/8 (2+2+3)',
+        'meter': (7, 8),
+        'layers': [{'steps': 'XxXxXxx'}]
+    },
+    'polyrhythm_3_2': {
+        'name': 'Полиритм 3 на 2',
+        'meter': (2, 4),
+        'layers': [{'steps': 'Xx'}, {'steps': 'xxx'}]
+    },
+    'polyrhythm_4_3': {
+        'name': 'Полиритм 4 на 3',
+        'meter': (3, 4),
+        'layers': [{'steps': 'Xxx'}, {'steps': 'xxxx'}]
+    }
+}
+
+DEFAULT_PATTERN = 'quarters'
+
+class CompiledPattern:
+    """Паттерн, скомпилированный в отсортированный массив нот внутри такта"""
+    def __init__(self, name, bar_beats, beat_offsets, offsets, accents, layers):
+        """
+        Args:
+            name: Отображаемое название паттерна
+            bar_beats: Длина такта в четвертях
+            beat_offsets: Позиции долей метронома внутри такта (в четвертях)
+            offsets: Позиции нот внутри такта (в четвертях, по возрастанию)
+            accents: Флаги акцентов для каждой ноты
+            layers: Номер слоя каждой ноты
+        """
+        self.name = name
+        self.bar_beats = float(bar_beats)
+        self.beat_offsets = np.asarray(beat_offsets, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        self.accents = np.asarray(accents, dtype=bool)
+        self.layers = np.asarray(layers, dtype=np.int8)
+
+    @property
+    def notes_per_bar(self):
+        """Количество нот в такте"""
+        return len(self.offsets)
+
+def compile_pattern(description):
+    """
+    Компиляция описания паттерна
+
+    Args:
+        description: Словарь с ключами:
+            name: Название паттерна
+            meter: Размер (долей в такте, длительность доли), например (7, 8)
+            layers: Список слоев {'steps': 'Xx.x', 'swing': 0.5}
+
+    Returns:
+        CompiledPattern: Скомпилированный паттерн
+    """
+    beats, beat_unit = description.get('meter', (4, 4))
+    if beats <= 0 or beat_unit <= 0:
+        raise ValueError(f"Некорректный размер: {beats}/{beat_unit}")
+
+    # Длина такта и долей метронома в четвертях
+    beat_length = 4.0 / beat_unit
+    bar_beats = beats * beat_length
+    beat_offsets = np.arange(beats) * beat_length
+
+    offsets = []
+    accents = []
+    layers = []
+    for layer_index, layer in enumerate(description.get('layers', [])):
+        steps = layer['steps']
+        if not steps:
+            continue
+
+        step_length = bar_beats / len(steps)
+        positions = np.arange(len(steps)) * step_length
+
+        # Свинг: каждый второй шаг пары сдвигается к swing * длина пары
+        swing = float(layer.get('swing', 0.5))
+        if not 0.0 < swing < 1.0:
+            raise ValueError(f"Некорректный свинг: {swing}")
+        if swing != 0.5:
+            positions[1::2] += (2.0 * swing - 1.0) * step_length
+
+        for step, position in zip(steps, positions):
+            if step in STEP_RESTS:
+                continue
+            if step not in (STEP_NOTE, STEP_ACCENT):
+                raise ValueError(f"Неизвестный символ шага: {step!r}")
+            offsets.append(position)
+            accents.append(step == STEP_ACCENT)
+            layers.append(layer_index)
+
+    if not offsets:
+        raise ValueError("Паттерн не содержит нот")
+
+    offsets = np.array(offsets)
+    accents = np.array(accents)
+    layers = np.array(layers)
+
+    # Сортируем и объединяем совпадающие ноты разных слоев (акцент сохраняется)
+    order = np.lexsort((layers, offsets))
+    offsets, accents, layers = offsets[order], accents[order], layers[order]
+    unique_offsets, first, inverse = np.unique(np.round(offsets, 9), return_index=True, return_inverse=True)
+    merged_accents = np.zeros(len(unique_offsets), dtype=bool)
+    np.logical_or.at(merged_accents, inverse, accents)
+
+    return CompiledPattern(
+        description.get('name', ''),
+        bar_beats,
+        beat_offsets,
+        offsets[first],
+        merged_accents,
+        layers[first]
+    )
+
+def get_pattern(key):
+    """Скомпилированный встроенный паттерн по ключу"""
+    return compile_pattern(PATTERNS[key])
+
+class PatternSchedule:
+    """Расписание нот паттерна во времени для заданного темпа"""
+    def __init__(self, pattern, bpm, start_time):
+        """
+        Args:
+            pattern: CompiledPattern
+            bpm: Темп (четвертей в минуту)
+            start_time: Время начала первого такта (timestamp)
+        """
+        self.pattern = pattern
+        self.start_time = start_time
+        self.bpm = bpm
+        self._update_durations()
+
+    def _update_durations(self):
+        """Пересчет длительностей такта и нот в секундах"""
+        self.beat_duration = 60.0 / self.bpm
+        self.bar_duration = self.pattern.bar_beats * self.beat_duration
+        self.offsets_sec = self.pattern.offsets * self.beat_duration
+        self.beat_offsets_sec = self.pattern.beat_offsets * self.beat_duration
+
+    def set_tempo(self, bpm, now):
+        """
+        Смена темпа с сохранением текущей позиции в такте
+
+        Args:
+            bpm: Новый темп
+            now: Момент смены темпа (timestamp)
+        """
+        position = (now - self.start_time) / self.beat_duration
+        self.bpm = bpm
+        self._update_durations()
+        self.start_time = now - position * self.beat_duration
+
+    def _grid_between(self, offsets_sec, start, end):
+        """Времена и глобальные индексы точек сетки в интервале [start, end)"""
+        count = len(offsets_sec)
+        first_bar = max(0, math.floor((start - self.start_time) / self.bar_duration))
+        last_bar = math.floor((end - self.start_time) / self.bar_duration)
+        if last_bar < first_bar:
+            empty = np.empty(0)
+            return empty, empty.astype(np.int64)
+
+        bars = np.arange(first_bar, last_bar + 1)
+        times = self.start_time + bars[:, None] * self.bar_duration + offsets_sec[None, :]
+        indices = bars[:, None] * count + np.arange(count)[None, :]
+        mask = (times >= start) & (times < end)
+        return times[mask], indices[mask]
+
+    def notes_between(self, start, end):
+        """
+        Ноты паттерна в интервале времени [start, end)
+
+        Returns:
+            tuple: (times, accents, indices) - numpy массивы, отсортированные по времени
+        """
+        times, indices = self._grid_between(self.offsets_sec, start, end)
+        accents = self.pattern.accents[indices % self.pattern.notes_per_bar]
+        return times, accents, indices
+
+    def beats_between(self, start, end):
+        """Времена долей метронома в интервале [start, end)"""
+        times, _ = self._grid_between(self.beat_offsets_sec, start, end)
+        return times
+
+    def note_time(self, index):
+        """Время ноты по глобальному индексу"""
+        bar, slot = divmod(index, self.pattern.notes_per_bar)
+        return self.start_time + bar * self.bar_duration + self.offsets_sec[slot]
+
+    def nearest_note(self, timestamp):
+        """
+        Ближайшая к моменту времени нота паттерна
+
+        Returns:
+            tuple: (index, note_time, deviation) - глобальный индекс ноты, ее время
+                и отклонение timestamp от нее в секундах (отрицательное - раньше)
+        """
+        count = self.pattern.notes_per_bar
+        bar = max(0, math.floor((timestamp - self.start_time) / self.bar_duration))
+
+        # Кандидаты: соседние ноты по обе стороны от позиции в такте
+        position = timestamp - self.start_time - bar * self.bar_duration
+        slot = int(np.searchsorted(self.offsets_sec, position))
+        candidates = [bar * count + slot - 1, bar * count + slot]
+
+        best = None
+        for index in candidates:
+            if index < 0:
+                continue
+            note_time = self.note_time(index)
+            if best is None or abs(timestamp - note_time) < abs(timestamp - best[1]):
+                best = (index, note_time)
+
+        return best[0], best[1], timestamp - best[1]
+
+    def nearest_notes(self, timestamps):
+        """
+        Векторный вариант nearest_note для массива моментов времени
+
+        Returns:
+            tuple: (indices, note_times, deviations) - numpy массивы той же длины
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        count = self.pattern.notes_per_bar
+        bars = np.maximum(0, np.floor((timestamps - self.start_time) / self.bar_duration)).astype(np.int64)
+        positions = timestamps - self.start_time - bars * self.bar_duration
+        slots = np.searchsorted(self.offsets_sec, positions)
+
+        before = bars * count + slots - 1
+        after = before + 1
+        before_bars, before_slots = np.divmod(np.maximum(before, 0), count)
+        after_bars, after_slots = np.divmod(after, count)
+        before_times = self.start_time + before_bars * self.bar_duration + self.offsets_sec[before_slots]
+        after_times = self.start_time + after_bars * self.bar_duration + self.offsets_sec[after_slots]
+
+        # Как в nearest_note: при равенстве выбирается более ранняя нота
+        use_after = (before < 0) | (np.abs(timestamps - after_times) < np.abs(timestamps - before_times))
+        indices = np.where(use_after, after, before)
+        note_times = np.where(use_after, after_times, before_times)
+        return indices, note_times, timestamps - note_times
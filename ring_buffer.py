@@ -0,0 +1,105 @@
+import numpy as np
+
+class AudioRingBuffer:
+    """
+    Кольцевой буфер аудио-сэмплов
+
+    Данные хранятся дважды подряд (зеркальная копия), поэтому любое окно длиной
+    до capacity сэмплов доступно как непрерывный срез numpy без копирования.
+    Позиции адресуются абсолютным индексом сэмпла с момента сброса буфера.
+    Пишет в буфер один поток (audio_callback), читать можно из любых потоков.
+    Целочисленные сэмплы хранятся как есть и переводятся во float только при чтении
+    через read_float.
+    """
+    def __init__(self, capacity, dtype=np.float32, full_scale=1.0):
+        """
+        Args:
+            capacity: Емкость буфера в сэмплах
+            dtype: Тип сэмплов
+            full_scale: Значение сэмпла, соответствующее амплитуде 1.0
+        """
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self.full_scale = float(full_scale)
+        self.data = np.zeros(2 * self.capacity, dtype=self.dtype)
+        self.write_index = 0  # Абсолютный индекс следующего записываемого сэмпла
+
+    def reset(self):
+        """Сброс буфера"""
+        self.data[:] = 0
+        self.write_index = 0
+
+    @property
+    def oldest_index(self):
+        """Абсолютный индекс самого старого сэмпла, доступного для чтения"""
+        return max(0, self.write_index - self.capacity)
+
+    def write(self, samples):
+        """Добавление сэмплов в буфер"""
+        count = len(samples)
+        if count == 0:
+            return
+
+        # Если блок больше буфера, сохраняем только его конец
+        skipped = 0
+        if count > self.capacity:
+            skipped = count - self.capacity
+            samples = samples[skipped:]
+            count = self.capacity
+
+        position = (self.write_index + skipped) % self.capacity
+        first = min(count, self.capacity - position)
+        rest = count - first
+
+        # Основная и зеркальная копии
+        self.data[position:position + first] = samples[:first]
+        self.data[position + self.capacity:position + self.capacity + first] = samples[:first]
+        if rest:
+            self.data[:rest] = samples[first:]
+            self.data[self.capacity:self.capacity + rest] = samples[first:]
+
+        self.write_index += skipped + count
+
+    def read(self, start, count):
+        """
+        Окно сэмплов [start, start + count) без копирования
+
+        Args:
+            start: Абсолютный индекс первого сэмпла
+            count: Количество сэмплов (не больше capacity)
+
+        Returns:
+            numpy array - срез внутреннего буфера (только для чтения по смыслу)
+        """
+        if count > self.capacity:
+            raise ValueError(f"Окно {count} больше емкости буфера {self.capacity}")
+        if start < self.oldest_index or start + count > self.write_index:
+            raise IndexError(f"Сэмплы [{start}, {start + count}) недоступны в буфере")
+        position = start % self.capacity
+        return self.data[position:position + count]
+
+    def read_float(self, start, count, out=None):
+        """
+        Окно сэмплов [start, start + count) в float32 с амплитудой в диапазоне [-1, 1]
+
+        Для буфера float32 возвращается срез без копирования, для целочисленного -
+        преобразованная копия (в out, если передан).
+        """
+        window = self.read(start, count)
+        if self.dtype == np.float32 and self.full_scale == 1.0:
+            return window
+        if out is None:
+            out = np.empty(count, dtype=np.float32)
+        else:
+            out = out[:count]
+        np.multiply(window, np.float32(1.0 / self.full_scale), out=out, casting='unsafe')
+        return out
+
+    def latest(self, count):
+        """Последние count сэмплов без копирования"""
+        count = min(count, self.write_index, self.capacity)
+        return self.read(self.write_index - count, count)
+
+    def is_valid(self, start):
+        """Проверка, что сэмплы начиная с start еще не перезаписаны"""
+        return start >= self.oldest_index
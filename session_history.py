@@ -0,0 +1,203 @@
+import sqlite3
+import time
+
+# Версия схемы базы истории (PRAGMA user_version); 2 - аккорд удара
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    bpm INTEGER NOT NULL,
+    pattern TEXT NOT NULL,
+    total_hits INTEGER NOT NULL,
+    accurate_hits INTEGER NOT NULL,
+    avg_deviation REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_day_bpm ON sessions (day, bpm);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started_at);
+
+CREATE TABLE IF NOT EXISTS hits (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    time REAL NOT NULL,
+    deviation REAL NOT NULL,
+    accurate INTEGER NOT NULL,
+    bpm INTEGER NOT NULL,
+    chord TEXT,
+    chord_confidence REAL
+);
+CREATE INDEX IF NOT EXISTS hits_session ON hits (session_id);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    day TEXT NOT NULL,
+    bpm INTEGER NOT NULL,
+    sessions INTEGER NOT NULL,
+    total_hits INTEGER NOT NULL,
+    accurate_hits INTEGER NOT NULL,
+    deviation_sum REAL NOT NULL,
+    abs_deviation_sum REAL NOT NULL,
+    PRIMARY KEY (day, bpm)
+) WITHOUT ROWID;
+"""
+
+def session_day(timestamp):
+    """Локальная дата занятия в формате YYYY-MM-DD"""
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+class SessionHistory:
+    """
+    История занятий в локальной базе SQLite
+
+    Удары занятия копятся в памяти тренажера и записываются одной транзакцией при
+    остановке (save_session). В той же транзакции обновляются сводки по дням и темпам
+    (rollups), поэтому запросы трендов читают несколько строк на день из первичного
+    ключа сводок, а не миллионы ударов.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path: Путь к файлу базы (':memory:' для временной базы)
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # WAL: запись в конце занятия не блокирует чтение истории
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        # База первой версии: у ударов еще нет столбцов аккорда
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(hits)')}
+        if 'chord' not in columns:
+            with self.connection:
+                self.connection.execute('ALTER TABLE hits ADD COLUMN chord TEXT')
+                self.connection.execute('ALTER TABLE hits ADD COLUMN chord_confidence REAL')
+        self.connection.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+
+    def close(self):
+        """Закрытие базы"""
+        self.connection.close()
+
+    def save_session(self, started_at, ended_at, pattern, bpm, hits, chords=None):
+        """
+        Сохранение занятия, его ударов и обновление сводок одной транзакцией
+
+        Args:
+            started_at: Время начала занятия (timestamp)
+            ended_at: Время окончания занятия (timestamp)
+            pattern: Ключ ритмического паттерна
+            bpm: Темп в начале занятия
+            hits: Удары [(timestamp, offset, accurate, bpm)], offset - отклонение
+                от ближайшей ноты со знаком (сек)
+            chords: Аккорды ударов {timestamp: (chord, confidence)} или None
+
+        Returns:
+            int: Идентификатор занятия
+        """
+        day = session_day(started_at)
+        total_hits = len(hits)
+        accurate_hits = sum(1 for hit in hits if hit[2])
+        avg_deviation = sum(abs(hit[1]) for hit in hits) / total_hits if total_hits else 0.0
+
+        # Сводки по темпам: удары одного занятия могут идти в разных темпах
+        rollups = {}
+        for _, offset, accurate, hit_bpm in hits:
+            rollup = rollups.setdefault(int(hit_bpm), [0, 0, 0.0, 0.0])
+            rollup[0] += 1
+            rollup[1] += 1 if accurate else 0
+            rollup[2] += offset
+            rollup[3] += abs(offset)
+
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO sessions (started_at, ended_at, day, bpm, pattern, total_hits, '
+                'accurate_hits, avg_deviation) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (started_at, ended_at, day, int(bpm), pattern, total_hits, accurate_hits, avg_deviation))
+            session_id = cursor.lastrowid
+            chords = chords or {}
+            self.connection.executemany(
+                'INSERT INTO hits (session_id, time, deviation, accurate, bpm, chord, chord_confidence) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((session_id, hit_time - started_at, offset, int(bool(accurate)), int(hit_bpm),
+                  *chords.get(hit_time, (None, None)))
+                 for hit_time, offset, accurate, hit_bpm in hits))
+            self.connection.executemany(
+                'INSERT INTO rollups (day, bpm, sessions, total_hits, accurate_hits, deviation_sum, abs_deviation_sum) '
+                'VALUES (?, ?, 1, ?, ?, ?, ?) '
+                'ON CONFLICT (day, bpm) DO UPDATE SET '
+                'sessions = sessions + 1, '
+                'total_hits = total_hits + excluded.total_hits, '
+                'accurate_hits = accurate_hits + excluded.accurate_hits, '
+                'deviation_sum = deviation_sum + excluded.deviation_sum, '
+                'abs_deviation_sum = abs_deviation_sum + excluded.abs_deviation_sum',
+                ((day, hit_bpm, *rollup) for hit_bpm, rollup in rollups.items()))
+        return session_id
+
+    def accuracy_trend(self, days=90, min_bpm=None, max_bpm=None, now=None):
+        """
+        Точность по дням за последние days дней в диапазоне темпов
+
+        Args:
+            days: Глубина истории (дней, включая сегодняшний)
+            min_bpm: Минимальный темп (включительно) или None
+            max_bpm: Максимальный темп (включительно) или None
+            now: Текущее время (timestamp), по умолчанию time.time()
+
+        Returns:
+            list: Словари {'day', 'total_hits', 'accuracy', 'avg_deviation', 'avg_offset'}
+                по возрастанию даты; avg_offset > 0 - игра с опозданием
+        """
+        now = time.time() if now is None else now
+        first_day = session_day(now - (days - 1) * 86400)
+        query = ('SELECT day, SUM(total_hits), SUM(accurate_hits), SUM(abs_deviation_sum), SUM(deviation_sum) '
+                 'FROM rollups WHERE day >= ?')
+        params = [first_day]
+        if min_bpm is not None:
+            query += ' AND bpm >= ?'
+            params.append(int(min_bpm))
+        if max_bpm is not None:
+            query += ' AND bpm <= ?'
+            params.append(int(max_bpm))
+        query += ' GROUP BY day ORDER BY day'
+
+        trend = []
+        for day, total_hits, accurate_hits, abs_deviation_sum, deviation_sum in self.connection.execute(query, params):
+            trend.append({
+                'day': day,
+                'total_hits': total_hits,
+                'accuracy': accurate_hits / max(1, total_hits),
+                'avg_deviation': abs_deviation_sum / max(1, total_hits),
+                'avg_offset': deviation_sum / max(1, total_hits)
+            })
+        return trend
+
+    def recent_sessions(self, limit=20):
+        """Последние занятия (новые первыми)"""
+        rows = self.connection.execute(
+            'SELECT id, started_at, ended_at, bpm, pattern, total_hits, accurate_hits, avg_deviation '
+            'FROM sessions ORDER BY started_at DESC LIMIT ?', (limit,))
+        keys = ('id', 'started_at', 'ended_at', 'bpm', 'pattern', 'total_hits', 'accurate_hits', 'avg_deviation')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def session_chords(self, session_id):
+        """
+        Распознанные аккорды ударов занятия
+
+        Returns:
+            list: Словари {'chord', 'hits', 'avg_confidence'} по убыванию числа ударов
+        """
+        rows = self.connection.execute(
+            'SELECT chord, COUNT(*), AVG(chord_confidence) FROM hits '
+            'WHERE session_id = ? AND chord IS NOT NULL GROUP BY chord ORDER BY COUNT(*) DESC, chord',
+            (session_id,))
+        return [{'chord': chord, 'hits': count, 'avg_confidence': confidence} for chord, count, confidence in rows]
+
+    def rebuild_rollups(self):
+        """Пересчет сводок по таблице ударов (после ручной правки базы или смены схемы сводок)"""
+        with self.connection:
+            self.connection.execute('DELETE FROM rollups')
+            self.connection.execute(
+                'INSERT INTO rollups (day, bpm, sessions, total_hits, accurate_hits, deviation_sum, abs_deviation_sum) '
+                'SELECT s.day, h.bpm, COUNT(DISTINCT s.id), COUNT(*), SUM(h.accurate), '
+                'SUM(h.deviation), SUM(ABS(h.deviation)) '
+                'FROM hits h JOIN sessions s ON s.id = h.session_id GROUP BY s.day, h.bpm')
@@ -0,0 +1,283 @@
+import os
+import struct
+import threading
+import collections
+
+import numpy as np
+
+from ring_buffer import AudioRingBuffer
+from audio_analysis import SAMPLE_FORMATS, DEFAULT_SAMPLE_FORMAT
+
+# Способы записи: последовательная запись в WAV или копирование в заранее выделенный
+# файл, отображенный в память (тоже WAV, заголовок дописывается при остановке)
+RECORD_MODES = ('wav', 'memmap')
+DEFAULT_RECORD_MODE = 'wav'
+
+# Емкость буфера записи (сек): сколько может отстать поток записи без потери сэмплов
+RECORDER_BUFFER_SECONDS = 4.0
+# Период, с которым поток записи забирает накопленные сэмплы (сек)
+WRITER_INTERVAL = 0.25
+# Максимальная длительность записи в режиме memmap (размер выделяемого файла, сек)
+MEMMAP_MAX_SECONDS = 3600.0
+
+WAV_HEADER_SIZE = 44
+WAV_FORMAT_PCM = 1
+WAV_FORMAT_FLOAT = 3
+
+def wav_header(sample_rate, channels, sample_format, frames):
+    """Заголовок WAV (PCM для целых форматов, IEEE float для float32)"""
+    _, _, width = SAMPLE_FORMATS[sample_format]
+    format_tag = WAV_FORMAT_FLOAT if sample_format == 'float32' else WAV_FORMAT_PCM
+    data_size = frames * channels * width
+    return struct.pack('<4sI4s4sIHHIIHH4sI',
+                       b'RIFF', WAV_HEADER_SIZE - 8 + data_size, b'WAVE',
+                       b'fmt ', 16, format_tag, channels, sample_rate,
+                       sample_rate * channels * width, channels * width, 8 * width,
+                       b'data', data_size)
+
+def sample_bytes(samples, sample_format):
+    """Байты сэмплов в формате файла (24 бита - три младших байта int32)"""
+    if SAMPLE_FORMATS[sample_format][2] == 3:
+        return np.ascontiguousarray(samples, dtype='<i4').view(np.uint8).reshape(-1, 4)[:, :3]
+    return np.ascontiguousarray(samples).view(np.uint8)
+
+class SessionRecorder:
+    """
+    Запись занятия на диск без файлового ввода-вывода в audio_callback
+
+    audio_callback только копирует блок в кольцевой буфер записи (write), а отдельный
+    поток раз в WRITER_INTERVAL забирает накопленное большими кусками и пишет в WAV
+    или в заранее выделенный файл, отображенный в память. Память не растет с
+    длительностью записи: буфер фиксированного размера, события сбрасываются в
+    файл вместе со звуком.
+
+    Рядом с WAV пишется CSV событий (onset, доли метронома) со временем в секундах
+    от начала записи. Если поток записи отстал больше чем на емкость буфера,
+    потерянные сэмплы заменяются тишиной, чтобы время событий не сдвигалось; так же
+    заполняется пауза входа при перезапуске потока (см. pause и resume).
+    """
+    def __init__(self, path, sample_rate, channels=1, sample_format=DEFAULT_SAMPLE_FORMAT,
+                 mode=DEFAULT_RECORD_MODE, buffer_seconds=RECORDER_BUFFER_SECONDS,
+                 max_seconds=MEMMAP_MAX_SECONDS, writer_interval=WRITER_INTERVAL):
+        """
+        Args:
+            path: Путь к WAV-файлу (события пишутся в path без расширения + '.events.csv')
+            sample_rate: Частота дискретизации (Гц)
+            channels: Количество записываемых каналов (сэмплы чередуются)
+            sample_format: Формат сэмплов (ключ SAMPLE_FORMATS)
+            mode: Способ записи (ключ RECORD_MODES)
+            buffer_seconds: Емкость буфера записи (сек)
+            max_seconds: Размер выделяемого файла в режиме memmap (сек)
+            writer_interval: Период работы потока записи (сек)
+        """
+        if mode not in RECORD_MODES:
+            raise ValueError(f"Неизвестный способ записи: {mode}")
+
+        self.path = path
+        self.events_path = os.path.splitext(path)[0] + '.events.csv'
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        self.sample_format = sample_format
+        self.mode = mode
+        self.max_frames = int(max_seconds * self.sample_rate)
+        self.writer_interval = writer_interval
+
+        dtype, full_scale, self.sample_width = SAMPLE_FORMATS[sample_format]
+        capacity = int(buffer_seconds * self.sample_rate) * self.channels
+        self.ring_buffer = AudioRingBuffer(capacity, dtype, full_scale)
+        # Кусок, который поток записи забирает за один раз
+        self.chunk_samples = max(self.channels, capacity // 4 // self.channels * self.channels)
+
+        # События из любых потоков: append у deque потокобезопасен
+        self.events = collections.deque()
+        self.start_time = None  # Время первого записанного сэмпла
+        # Паузы входа: (индекс буфера, с которого продолжился вход, кадров тишины перед ним)
+        self._gaps = collections.deque()
+        self._gap_frames = 0  # Всего кадров тишины, вставленных за паузы
+        self._paused = False
+        self._resumed = False
+
+        self.frames_written = 0
+        self.dropped_frames = 0  # Кадры, замененные тишиной или не поместившиеся в файл
+        self.is_recording = False
+
+        self._read_index = 0
+        self._file = None
+        self._events_file = None
+        self._memmap = None
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def duration(self):
+        """Длительность записанного звука (сек)"""
+        return self.frames_written / self.sample_rate
+
+    def start(self):
+        """Открытие файлов и запуск потока записи"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._file = open(self.path, 'wb+')
+        self._file.write(wav_header(self.sample_rate, self.channels, self.sample_format, 0))
+        if self.mode == 'memmap':
+            data_size = self.max_frames * self.channels * self.sample_width
+            self._file.truncate(WAV_HEADER_SIZE + data_size)
+            if hasattr(os, 'posix_fallocate'):
+                # Место на диске выделяется сразу, а не при первой записи в страницу
+                os.posix_fallocate(self._file.fileno(), 0, WAV_HEADER_SIZE + data_size)
+            self._file.flush()
+            self._memmap = np.memmap(self._file, dtype=np.uint8, mode='r+',
+                                     offset=WAV_HEADER_SIZE, shape=(data_size,))
+
+        self._events_file = open(self.events_path, 'w')
+        self._events_file.write('kind,time,value\n')
+
+        self.is_recording = True
+        self._thread = threading.Thread(target=self._writer_thread)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, samples, block_time):
+        """
+        Добавление блока сэмплов (из audio_callback, без ввода-вывода)
+
+        Args:
+            samples: Чередующиеся сэмплы всех записываемых каналов (тип буфера записи)
+            block_time: Время последнего сэмпла блока (timestamp)
+        """
+        if not self.is_recording or self._paused:
+            return
+        frames = len(samples) // self.channels
+        if self.start_time is None:
+            self.start_time = block_time - frames / self.sample_rate
+        elif self._resumed:
+            # Первый блок после перезапуска потока: пропущенное время станет тишиной
+            self._resumed = False
+            ring = self.ring_buffer
+            recorded = ring.write_index // self.channels + self._gap_frames
+            expected = self.start_time + recorded / self.sample_rate
+            gap = int(round((block_time - frames / self.sample_rate - expected) * self.sample_rate))
+            if gap > 0:
+                self._gaps.append((ring.write_index, gap))
+                self._gap_frames += gap
+        self.ring_buffer.write(samples)
+
+    def pause(self):
+        """
+        Пауза входа (поток захвата перезапускается): блоки до resume не записываются,
+        а пропущенное время заполнится тишиной
+        """
+        self._paused = True
+
+    def resume(self):
+        """Продолжение записи после pause со следующего блока"""
+        if self._paused:
+            self._paused = False
+            self._resumed = True
+
+    def add_event(self, kind, timestamp, value=0.0):
+        """Событие для записи (из любого потока): kind - 'onset', 'beat' и т.д."""
+        if self.is_recording:
+            self.events.append((kind, timestamp, value))
+
+    def stop(self):
+        """Остановка записи: дописывание остатка, заголовок WAV и закрытие файлов"""
+        if not self.is_recording:
+            return
+        self.is_recording = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        # Поток уже остановлен, поэтому остаток можно дописать отсюда
+        self._drain()
+
+        if self._memmap is not None:
+            self._memmap.flush()
+            self._memmap = None
+            # Обрезаем заранее выделенный файл до записанной длительности
+            self._file.truncate(WAV_HEADER_SIZE + self.frames_written * self.channels * self.sample_width)
+        self._file.seek(0)
+        self._file.write(wav_header(self.sample_rate, self.channels, self.sample_format, self.frames_written))
+        self._file.close()
+        self._file = None
+        self._events_file.close()
+        self._events_file = None
+
+    def _writer_thread(self):
+        """Поток записи: периодически забирает накопленные сэмплы и события"""
+        while self.is_recording:
+            self._wakeup.wait(self.writer_interval)
+            self._wakeup.clear()
+            try:
+                self._drain()
+            except Exception as e:
+                print(f"Ошибка записи сессии: {str(e)}")
+                import traceback
+                traceback.print_exc()
+
+    def _drain(self):
+        """Запись всего, что накопилось в буфере, и событий"""
+        ring = self.ring_buffer
+        end = ring.write_index
+        while self._read_index < end:
+            # Поток записи отстал: потерянное заменяем тишиной
+            oldest = ring.oldest_index
+            if self._read_index < oldest:
+                self._write_silence(oldest - self._read_index)
+                self._read_index = oldest
+
+            start = self._read_index
+            while self._gaps and self._gaps[0][0] <= start:
+                self._write_silence(self._gaps.popleft()[1] * self.channels, dropped=False)
+            count = min(end - start, self.chunk_samples)
+            if self._gaps:
+                count = min(count, self._gaps[0][0] - start)
+            self._write_samples(ring.read(start, count))
+            # Сэмплы могли быть перезаписаны, пока их копировали
+            if not ring.is_valid(start):
+                self.dropped_frames += count // self.channels
+            self._read_index = start + count
+
+        self._write_events()
+
+    def _write_samples(self, samples):
+        """Запись куска сэмплов в файл"""
+        frames = len(samples) // self.channels
+        if self._memmap is not None:
+            # Файл выделен заранее: лишнее не записывается
+            frames = min(frames, self.max_frames - self.frames_written)
+            self.dropped_frames += len(samples) // self.channels - frames
+            if frames <= 0:
+                return
+            position = self.frames_written * self.channels * self.sample_width
+            data = sample_bytes(samples[:frames * self.channels], self.sample_format)
+            self._memmap[position:position + data.size] = data.reshape(-1)
+        else:
+            self._file.write(sample_bytes(samples, self.sample_format).tobytes())
+        self.frames_written += frames
+
+    def _write_silence(self, count, dropped=True):
+        """Тишина вместо потерянных сэмплов (dropped=False - пауза входа, а не потеря)"""
+        if dropped:
+            self.dropped_frames += count // self.channels
+        zeros = np.zeros(min(count, self.chunk_samples), dtype=self.ring_buffer.dtype)
+        while count > 0:
+            part = min(count, len(zeros))
+            self._write_samples(zeros[:part])
+            count -= part
+
+    def _write_events(self):
+        """Запись накопленных событий со временем от начала записи"""
+        if self.start_time is None or not self.events:
+            return
+        events = self.events
+        lines = []
+        while events:
+            kind, timestamp, value = events.popleft()
+            lines.append(f'{kind},{timestamp - self.start_time:.6f},{value:.6f}\n')
+        self._events_file.write(''.join(lines))
+        self._events_file.flush()
@@ -0,0 +1,323 @@
+from collections import deque
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from clocks import VirtualClock, VIRTUAL_FRAME_INTERVAL
+from rhythm_patterns import PATTERNS, DEFAULT_PATTERN
+
+# Границы по умолчанию; превышение любой из них - провал прогона
+DEFAULT_LIMITS = {
+    'rss_growth_mb': 64.0,        # Рост RSS после прогрева (МБ)
+    'object_growth': 5000,        # Рост числа объектов, отслеживаемых GC, после прогрева
+    'queue_depth': 96,            # Глубина очереди обработки (AUDIO_QUEUE_LIMIT плюс события onset)
+    'canvas_instructions': 400,   # Инструкций на canvas тренажера
+    'metronome_drift_ms': 25.0    # Отклонение щелчка метронома от сетки долей с начала занятия (мс)
+}
+
+# Колонки снимков состояния
+SAMPLE_COLUMNS = ('time', 'rss_mb', 'objects', 'queue_depth', 'canvas_instructions', 'notes',
+                  'metronome_drift_ms', 'total_hits', 'accuracy')
+
+# Параметры синтетического сигнала
+CLICK_AMPLITUDE = 0.5
+CLICK_DECAY = 0.004   # Постоянная затухания щелчка (сек)
+CLICK_LENGTH = 0.03   # Длина щелчка (сек)
+NOISE_LEVEL = 0.003   # Уровень шума между ударами
+HIT_LOOKAHEAD = 1.0   # Насколько вперед по расписанию планируются удары (сек)
+
+def current_rss_mb():
+    """Текущий RSS процесса (МБ); без /proc - пиковый по getrusage"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / float(1 << 20)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return peak / float(1 << 20) if sys.platform == 'darwin' else peak / 1024.0
+
+class SyntheticGuitar:
+    """Синтетический сигнал с гитары: затухающие щелчки на заданных моментах поверх шума"""
+    def __init__(self, sample_rate, block_size, start_time, seed=0):
+        """
+        Args:
+            sample_rate: Частота дискретизации (Гц)
+            block_size: Размер блока (сэмплов)
+            start_time: Время первого сэмпла (timestamp)
+            seed: Зерно генератора шума
+        """
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.start_time = start_time
+        self.position = 0  # Абсолютный индекс первого сэмпла следующего блока
+        rng = np.random.default_rng(seed)
+        length = int(CLICK_LENGTH * sample_rate)
+        self.click = (CLICK_AMPLITUDE * np.exp(-np.arange(length) / (CLICK_DECAY * sample_rate))).astype(np.float32)
+        # Секунда шума, повторяемая по кругу
+        self.noise = (NOISE_LEVEL * rng.standard_normal(sample_rate)).astype(np.float32)
+        self.block = np.empty(block_size, dtype=np.float32)
+        self.hits = deque()  # Абсолютные индексы начала запланированных щелчков
+
+    def add_hit(self, hit_time):
+        """Щелчок в момент hit_time (timestamp)"""
+        self.hits.append(int(round((hit_time - self.start_time) * self.sample_rate)))
+
+    def next_block(self):
+        """Следующий блок сигнала (заранее выделенный буфер)"""
+        start, end = self.position, self.position + self.block_size
+        noise_start = start % len(self.noise)
+        head = min(self.block_size, len(self.noise) - noise_start)
+        self.block[:head] = self.noise[noise_start:noise_start + head]
+        self.block[head:] = self.noise[:self.block_size - head]
+
+        # Щелчки, пересекающие блок; закончившиеся удаляются
+        while self.hits and self.hits[0] + len(self.click) <= start:
+            self.hits.popleft()
+        for hit in self.hits:
+            if hit >= end:
+                break
+            click_start = max(start, hit)
+            click_end = min(end, hit + len(self.click))
+            self.block[click_start - start:click_end - start] += self.click[click_start - hit:click_end - hit]
+
+        self.position = end
+        return self.block
+
+class MetronomeProbe:
+    """
+    Замена звука метронома: отклонение каждого щелчка от сетки долей,
+    построенной один раз от начала занятия
+    """
+    def __init__(self, clock):
+        self.clock = clock
+        self.volume = 1.0
+        self.grid_start = None
+        self.beat_duration = None
+        self.clicks = 0
+        self.max_drift = 0.0  # Наибольшее отклонение с прошлого снимка (сек)
+
+    def set_grid(self, start_time, beat_duration):
+        """Сетка долей: start_time + k * beat_duration"""
+        self.grid_start = start_time
+        self.beat_duration = beat_duration
+
+    def play(self):
+        """Щелчок метронома (вызывается тренажером в кадре)"""
+        self.clicks += 1
+        if self.grid_start is None:
+            return
+        # Щелчок звучит в кадре, где доля прошла линию удара: отклонение - до последней доли
+        now = self.clock.time()
+        position = (now - self.grid_start) / self.beat_duration
+        drift = (position - np.floor(position + 1e-9)) * self.beat_duration
+        self.max_drift = max(self.max_drift, drift)
+
+    def take_drift(self):
+        """Наибольшее отклонение с прошлого вызова (сек)"""
+        drift, self.max_drift = self.max_drift, 0.0
+        return drift
+
+def check_limits(samples, limits, warmup=0.0):
+    """
+    Проверка снимков на превышение границ
+
+    Рост RSS и числа объектов считается от первого снимка после прогрева,
+    остальные величины сравниваются с границами напрямую.
+
+    Returns:
+        tuple: (peaks, violations) - наибольшие значения и список нарушений (строки)
+    """
+    peaks = {name: 0.0 for name in limits}
+    if not samples:
+        return peaks, []
+
+    baseline = next((sample for sample in samples if sample['time'] >= warmup), samples[-1])
+    after = [sample for sample in samples if sample['time'] >= baseline['time']]
+    peaks['rss_growth_mb'] = max(sample['rss_mb'] for sample in after) - baseline['rss_mb']
+    peaks['object_growth'] = max(sample['objects'] for sample in after) - baseline['objects']
+    for name in ('queue_depth', 'canvas_instructions', 'metronome_drift_ms'):
+        peaks[name] = max(sample[name] for sample in samples)
+
+    violations = []
+    for name, limit in limits.items():
+        if limit is not None and peaks.get(name, 0.0) > limit:
+            violations.append(f"{name}: {peaks[name]:.2f} > {limit}")
+    return peaks, violations
+
+def run_soak(hours=2.0, bpm=120, pattern=DEFAULT_PATTERN, sample_interval=60.0, warmup=60.0,
+             sample_rate=48000, block_size=512, frame_interval=VIRTUAL_FRAME_INTERVAL,
+             processing_interval=0.1, jitter=0.01, limits=None, seed=0, progress=None):
+    """
+    Прогон занятия на виртуальных часах: конвейер аудио и тренажер целиком
+
+    Синтетические удары по расписанию тренажера (с разбросом jitter) подаются блоками
+    в audio_callback, очередь разбирается каждые processing_interval секунд (большое
+    значение моделирует отстающий поток обработки), кадры интерфейса идут с периодом
+    frame_interval. Каждые sample_interval секунд снимается состояние.
+
+    Args:
+        hours: Длительность занятия (часы виртуального времени)
+        limits: Границы (по умолчанию DEFAULT_LIMITS; None в значении - не проверять)
+        progress: callback(sample) после каждого снимка
+
+    Returns:
+        dict: Снимки, наибольшие значения, нарушения, статистика занятия и счетчики метрик
+    """
+    # Интерфейс и аудио нужны только для прогона; проверку границ можно использовать без них
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    from audio_processor import AudioProcessor
+    from main import RhythmTrainerWidget
+
+    limits = dict(DEFAULT_LIMITS, **(limits or {}))
+    clock = VirtualClock(start=time.time(), frame_interval=frame_interval)
+    rng = np.random.default_rng(seed)
+
+    trainer = RhythmTrainerWidget(clock=clock, size=(400, 600))
+    trainer.hit_sound_enabled = False
+    probe = MetronomeProbe(clock)
+    trainer.metronome_sound = probe
+    trainer.bpm = bpm
+    trainer.set_pattern(pattern)
+
+    processor = AudioProcessor(callback=trainer.on_audio_detected, clock=clock)
+    processor.sample_rate = sample_rate
+    processor.block_size = block_size
+    processor.channels = 1
+    processor.sample_format = 'float32'
+    processor._reset_analysis()
+    trainer.metrics = processor.metrics
+    trainer.audio_processor = processor
+
+    guitar = SyntheticGuitar(sample_rate, block_size, clock.time(), seed)
+    trainer.start_training()
+    probe.set_grid(trainer.schedule.start_time, trainer.schedule.beat_duration)
+
+    session_start = clock.time()
+    end = session_start + hours * 3600.0
+    block_duration = block_size / sample_rate
+    planned_until = session_start
+    next_processing = session_start + processing_interval
+    next_sample = session_start + sample_interval
+    samples = []
+    wall_start = time.perf_counter()
+    stdout = sys.stdout
+
+    def take_sample():
+        gc.collect()
+        stats = trainer.rhythm_analyzer.get_stats()
+        sample = {
+            'time': round(clock.time() - session_start, 3),
+            'rss_mb': round(current_rss_mb(), 2),
+            'objects': len(gc.get_objects()),
+            'queue_depth': processor.audio_queue.qsize(),
+            'canvas_instructions': len(trainer.canvas.children),
+            'notes': len(trainer.notes),
+            'metronome_drift_ms': round(1000.0 * probe.take_drift(), 3),
+            'total_hits': stats['total_hits'],
+            'accuracy': round(stats['accuracy'], 4)
+        }
+        samples.append(sample)
+        if progress:
+            with contextlib.redirect_stdout(stdout):
+                progress(sample)
+
+    # Вывод тренажера на каждое попадание не нужен
+    with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink):
+        while clock.time() < end:
+            # Удары на нотах расписания, которые скоро прозвучат
+            horizon = clock.time() + HIT_LOOKAHEAD
+            if horizon > planned_until:
+                times, _, _ = trainer.schedule.notes_between(planned_until, horizon)
+                for note_time in times.tolist():
+                    guitar.add_hit(note_time + rng.normal(0.0, jitter))
+                planned_until = horizon
+
+            # Кадры интерфейса срабатывают внутри advance
+            clock.advance(block_duration)
+            block = guitar.next_block()
+            processor.audio_callback(block.tobytes(), block_size, {}, 0)
+
+            now = clock.time()
+            if now >= next_processing:
+                processor.process_pending()
+                next_processing = now + processing_interval
+            if now >= next_sample:
+                take_sample()
+                next_sample += sample_interval
+
+    trainer.stop_training()
+    processor.process_pending()
+    peaks, violations = check_limits(samples, limits, warmup)
+    return {
+        'hours': hours,
+        'bpm': bpm,
+        'pattern': pattern,
+        'wall_time': round(time.perf_counter() - wall_start, 2),
+        'limits': limits,
+        'peaks': peaks,
+        'violations': violations,
+        'stats': {key: float(value) for key, value in trainer.rhythm_analyzer.get_stats().items()},
+        'metronome_clicks': probe.clicks,
+        'counters': dict(processor.metrics.counters),
+        'samples': samples
+    }
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(
+        description='Длительный прогон конвейера и тренажера на виртуальных часах с проверкой роста памяти'
+    )
+    parser.add_argument('--hours', type=float, default=2.0, help='Длительность занятия (по умолчанию 2 часа)')
+    parser.add_argument('-b', '--bpm', type=int, default=120, help='Темп (по умолчанию 120)')
+    parser.add_argument('-p', '--pattern', choices=sorted(PATTERNS), default=DEFAULT_PATTERN,
+                        help=f'Паттерн (по умолчанию {DEFAULT_PATTERN})')
+    parser.add_argument('--interval', type=float, default=60.0,
+                        help='Период снимков состояния (сек виртуального времени)')
+    parser.add_argument('--fps', type=float, default=1.0 / VIRTUAL_FRAME_INTERVAL,
+                        help='Частота кадров интерфейса')
+    parser.add_argument('--block-size', type=int, default=512, help='Размер блока аудио (сэмплов)')
+    parser.add_argument('--processing-interval', type=float, default=0.1,
+                        help='Период разбора очереди (сек); большое значение - отстающий поток обработки')
+    parser.add_argument('--jitter', type=float, default=0.01, help='Разброс ударов (сек)')
+    for name, value in DEFAULT_LIMITS.items():
+        parser.add_argument('--max-' + name.replace('_', '-'), dest=name, type=float, default=value,
+                            help=f'Граница {name} (по умолчанию {value})')
+    parser.add_argument('-o', '--output', default=None, help='JSON-отчет со снимками')
+    args = parser.parse_args(argv)
+
+    def show(sample):
+        print(f"{sample['time'] / 60:7.1f} мин  RSS {sample['rss_mb']:7.1f} МБ  объектов {sample['objects']:7d}  "
+              f"очередь {sample['queue_depth']:3d}  canvas {sample['canvas_instructions']:4d}  "
+              f"дрейф {sample['metronome_drift_ms']:6.2f} мс  ударов {sample['total_hits']}")
+
+    report = run_soak(hours=args.hours, bpm=args.bpm, pattern=args.pattern, sample_interval=args.interval,
+                      warmup=args.interval, block_size=args.block_size, frame_interval=1.0 / args.fps,
+                      processing_interval=args.processing_interval, jitter=args.jitter,
+                      limits={name: getattr(args, name) for name in DEFAULT_LIMITS}, progress=show)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+    print(f"Прогон {args.hours} ч занял {report['wall_time']} сек, точность {report['stats']['accuracy'] * 100:.1f}%")
+    if report['violations']:
+        for violation in report['violations']:
+            print(f"Превышена граница: {violation}")
+        return 1
+    print("Все величины в пределах границ")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
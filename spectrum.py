@@ -0,0 +1,114 @@
+import numpy as np
+
+# Размер окна БПФ (сэмплов)
+SPECTRUM_SIZE = 4096
+# Диапазон частот отображения (Гц) и количество полос (строк спектрограммы)
+SPECTRUM_MIN_FREQ = 40.0
+SPECTRUM_MAX_FREQ = 8000.0
+SPECTRUM_BANDS = 128
+# Диапазон уровней (дБ относительно полной шкалы синусоиды)
+SPECTRUM_MIN_DB = -96.0
+SPECTRUM_MAX_DB = 0.0
+# Сколько последних спектров (столбцов) показывает спектрограмма
+SPECTROGRAM_HISTORY = 256
+
+# numpy до 2.0 не умеет писать результат rfft в готовый массив
+RFFT_OUT = np.lib.NumpyVersion(np.__version__) >= '2.0.0'
+
+def spectrogram_palette():
+    """Таблица цветов уровня 0..255 (черный - пурпурный - оранжевый - желтый) в RGBA"""
+    stops = np.array([0.0, 0.35, 0.7, 1.0])
+    colors = np.array([(0, 0, 0), (128, 25, 128), (230, 76, 25), (255, 204, 0)], dtype=np.float64)
+    levels = np.linspace(0.0, 1.0, 256)
+    palette = np.full((256, 4), 255, dtype=np.uint8)
+    for channel in range(3):
+        palette[:, channel] = np.interp(levels, stops, colors[:, channel])
+    return palette
+
+class SpectrumAnalyzer:
+    """
+    Спектр последнего окна входа в логарифмических полосах и столбцы спектрограммы
+
+    Окно Ханна, нормировка, границы полос и палитра считаются один раз, все
+    промежуточные массивы выделяются заранее - update() не создает новых массивов
+    numpy (кроме rfft на numpy < 2.0). Считается с частотой кадров интерфейса, а не
+    на каждый аудио-блок, и пропускается, если новых сэмплов не было.
+    """
+    def __init__(self, sample_rate, size=SPECTRUM_SIZE, bands=SPECTRUM_BANDS,
+                 min_freq=SPECTRUM_MIN_FREQ, max_freq=SPECTRUM_MAX_FREQ):
+        """
+        Args:
+            sample_rate: Частота дискретизации (Гц)
+            size: Размер окна БПФ (сэмплов)
+            bands: Количество полос
+            min_freq: Нижняя частота (Гц)
+            max_freq: Верхняя частота (Гц), не выше частоты Найквиста
+        """
+        self.sample_rate = float(sample_rate)
+        self.size = int(size)
+        self.bands = int(bands)
+        bins = self.size // 2 + 1
+        bin_width = self.sample_rate / self.size
+        max_freq = min(max_freq, self.sample_rate / 2.0)
+
+        # Окно с нормировкой: синусоида полной шкалы дает 0 дБ
+        window = np.hanning(self.size)
+        self.window = (window * (2.0 / window.sum())).astype(np.float32)
+
+        # Логарифмические полосы: первый бин каждой полосы; узкая полоса берет один бин
+        edges = np.geomspace(min_freq, max_freq, self.bands + 1)
+        self.band_freqs = np.sqrt(edges[:-1] * edges[1:])
+        self._band_starts = np.minimum(np.floor(edges[:-1] / bin_width + 0.5), bins - 1).astype(np.intp)
+        self._band_stop = int(min(bins, max(self._band_starts[-1] + 1, np.ceil(edges[-1] / bin_width))))
+
+        self._frame = np.empty(self.size, dtype=np.float32)
+        self._windowed = np.empty(self.size, dtype=np.float32)
+        self._spectrum = np.empty(bins, dtype=np.complex64 if RFFT_OUT else np.complex128)
+        self._magnitude = np.empty(bins, dtype=np.float32)
+        self.levels = np.full(self.bands, SPECTRUM_MIN_DB, dtype=np.float32)  # Уровни полос (дБ)
+        self._scaled = np.empty(self.bands, dtype=np.float32)
+        self._indices = np.empty(self.bands, dtype=np.uint8)
+        # Столбец спектрограммы (RGBA снизу вверх; 4 байта на пиксель - без выравнивания строк текстуры)
+        self.column = np.empty((self.bands, 4), dtype=np.uint8)
+        self._palette = spectrogram_palette()
+        self.last_index = None  # Абсолютный индекс конца последнего проанализированного окна
+
+    def update(self, ring):
+        """
+        Спектр последних size сэмплов кольцевого буфера
+
+        Args:
+            ring: AudioRingBuffer входа (float32-буфер читается без копирования)
+
+        Returns:
+            bool: True, если спектр пересчитан (levels и column обновлены)
+        """
+        end = ring.write_index
+        if end < self.size or end == self.last_index:
+            return False
+        self.last_index = end
+        self.analyze(ring.read_float(end - self.size, self.size, out=self._frame))
+        return True
+
+    def analyze(self, samples):
+        """Спектр окна из size сэмплов float"""
+        np.multiply(samples, self.window, out=self._windowed)
+        if RFFT_OUT:
+            np.fft.rfft(self._windowed, out=self._spectrum)
+        else:
+            self._spectrum[:] = np.fft.rfft(self._windowed)
+        np.abs(self._spectrum, out=self._magnitude)
+
+        # Максимум по бинам каждой полосы и перевод в дБ
+        np.maximum.reduceat(self._magnitude[:self._band_stop], self._band_starts, out=self.levels)
+        np.maximum(self.levels, 1e-9, out=self.levels)
+        np.log10(self.levels, out=self.levels)
+        self.levels *= 20.0
+
+        # Цвет столбца спектрограммы по палитре
+        np.subtract(self.levels, SPECTRUM_MIN_DB, out=self._scaled)
+        self._scaled *= 255.0 / (SPECTRUM_MAX_DB - SPECTRUM_MIN_DB)
+        np.clip(self._scaled, 0.0, 255.0, out=self._scaled)
+        self._indices[:] = self._scaled
+        np.take(self._palette, self._indices, axis=0, out=self.column)
+        return self.levels
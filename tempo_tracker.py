@@ -0,0 +1,247 @@
+from collections import deque
+import math
+
+import numpy as np
+
+from ring_buffer import AudioRingBuffer
+
+# Диапазон оцениваемого темпа (BPM)
+MIN_BPM = 40.0
+MAX_BPM = 220.0
+# Окно автокорреляции огибающей (сек)
+TEMPO_WINDOW = 8.0
+# Период пересчета темпа по автокорреляции (сек)
+ESTIMATE_INTERVAL = 0.25
+# Априорное распределение темпа: логнормальное вокруг PRIOR_BPM шириной PRIOR_OCTAVES октав
+# (подавляет ошибки на октаву - половинный и двойной темп)
+PRIOR_BPM = 120.0
+PRIOR_OCTAVES = 1.0
+# Доля энергии огибающей, приходящаяся на период, ниже которой темп не сообщается
+MIN_CONFIDENCE = 0.1
+
+# Удары дальше этой доли от ближайшей доли считаются дроблением и не оцениваются
+BEAT_CAPTURE = 0.25
+# Подстройка фазы сетки по каждому удару (доля отклонения)
+PHASE_GAIN = 0.2
+# Сглаживание отклонения ударов от сетки
+DEVIATION_SMOOTHING = 0.3
+# Среднее отклонение (в долях), после которого игра считается торопливой или тянущей
+RUSH_THRESHOLD = 0.03
+# Сколько последних ударов учитывается в стабильности
+STABILITY_HITS = 16
+# Разброс отклонений (в долях), при котором стабильность равна нулю
+STABILITY_SPREAD = 0.125
+# Емкость буфера кадров между audio_callback и потоком обработки
+PENDING_FRAMES = 1024
+
+class TempoTracker:
+    """
+    Оценка темпа и фазы долей свободной игры по потоку onset
+
+    Огибающая силы атаки (положительный прирост RMS окон анализа) пишется в
+    кольцевой буфер, а автокорреляция по скользящему окну обновляется на каждом
+    кадре прибавлением нового произведения и вычитанием вышедшего из окна -
+    два векторных умножения на кадр вместо пересчета по всей истории. Раз в
+    ESTIMATE_INTERVAL секунд период выбирается гребенчатым фильтром (период и его
+    удвоение) с логнормальным весом темпа.
+
+    Фаза сетки долей подстраивается по каждому удару; среднее отклонение ударов от
+    сетки со знаком показывает, торопится (< 0) или тянет (> 0) игрок, а разброс
+    отклонений за последние удары - стабильность.
+
+    Кадры добавляет audio_callback (add_frame только пишет значение), остальное
+    выполняется в потоке обработки (add_onset, update).
+    """
+    def __init__(self, frame_rate, window_seconds=TEMPO_WINDOW, min_bpm=MIN_BPM, max_bpm=MAX_BPM):
+        """
+        Args:
+            frame_rate: Частота кадров анализа (частота дискретизации / шаг анализа)
+            window_seconds: Окно автокорреляции (сек)
+            min_bpm: Наименьший оцениваемый темп
+            max_bpm: Наибольший оцениваемый темп
+        """
+        self.frame_rate = float(frame_rate)
+        self.min_lag = max(1, int(math.floor(self.frame_rate * 60.0 / max_bpm)))
+        self.max_lag = int(math.ceil(self.frame_rate * 60.0 / min_bpm))
+        # Автокорреляция нужна до удвоенного наибольшего периода (гребенка)
+        self.lag_count = 2 * self.max_lag + 2
+        self.window = max(int(window_seconds * self.frame_rate), self.lag_count)
+        self.estimate_frames = max(1, int(ESTIMATE_INTERVAL * self.frame_rate))
+
+        # Проверяемые периоды, их удвоения и вес темпа считаются один раз
+        self._lags = np.arange(self.min_lag, self.max_lag + 1)
+        self._double_lags = 2 * self._lags
+        bpm = 60.0 * self.frame_rate / self._lags
+        self._prior = np.exp(-0.5 * (np.log2(bpm / PRIOR_BPM) / PRIOR_OCTAVES) ** 2)
+        self._scores = np.empty(len(self._lags))
+
+        self._envelope = AudioRingBuffer(self.window + self.lag_count, dtype=np.float64)
+        self._acf = np.zeros(self.lag_count)
+        self._product = np.empty(self.lag_count)
+        self._value = np.empty(1)
+        self._pending = np.zeros(PENDING_FRAMES)
+        self.reset()
+
+    def reset(self):
+        """Сброс истории (при перезапуске потока или смене частоты)"""
+        # Буфер заполнен тишиной, чтобы окна в начале читались без проверок
+        self._envelope.reset()
+        self._envelope.write(np.zeros(self._envelope.capacity))
+        self._acf[:] = 0.0
+        self._window_sum = 0.0
+        self._pending_write = 0
+        self._pending_read = 0
+        self._previous_rms = 0.0
+        self._frames = 0
+        self._last_estimate_frame = 0
+
+        self.beat_duration = None   # Период долей (сек); None - темп еще не найден
+        self.beat_time = None       # Время опорной доли сетки
+        self.deviation = 0.0        # Сглаженное отклонение ударов от сетки (доли, со знаком)
+        self._deviations = deque(maxlen=STABILITY_HITS)
+        self._deviation_sum = 0.0
+        self._deviation_square_sum = 0.0
+        self.estimate = None        # Последняя оценка (словарь, заменяется целиком)
+
+    def add_frame(self, rms):
+        """RMS очередного окна анализа (из audio_callback, без вычислений)"""
+        self._pending[self._pending_write % PENDING_FRAMES] = rms
+        self._pending_write += 1
+
+    def add_onset(self, timestamp):
+        """
+        Удар игрока: отклонение от сетки долей и подстройка ее фазы
+
+        Returns:
+            float или None: Отклонение удара от ближайшей доли (в долях, со знаком)
+        """
+        period = self.beat_duration
+        if period is None:
+            return None
+        if self.beat_time is None:
+            self.beat_time = timestamp
+            return None
+
+        beats = round((timestamp - self.beat_time) / period)
+        nearest = self.beat_time + beats * period
+        deviation = (timestamp - nearest) / period
+        if abs(deviation) > BEAT_CAPTURE:
+            return None
+
+        # Сетка догоняет игрока медленно, поэтому постоянное ускорение дает отрицательное отклонение
+        self.beat_time = nearest + PHASE_GAIN * deviation * period
+        self.deviation += DEVIATION_SMOOTHING * (deviation - self.deviation)
+
+        if len(self._deviations) == self._deviations.maxlen:
+            oldest = self._deviations[0]
+            self._deviation_sum -= oldest
+            self._deviation_square_sum -= oldest * oldest
+        self._deviations.append(deviation)
+        self._deviation_sum += deviation
+        self._deviation_square_sum += deviation * deviation
+        return deviation
+
+    @property
+    def stability(self):
+        """Стабильность по разбросу отклонений последних ударов (0.0 - 1.0)"""
+        count = len(self._deviations)
+        if count < 2:
+            return 0.0
+        mean = self._deviation_sum / count
+        variance = max(0.0, self._deviation_square_sum / count - mean * mean)
+        return max(0.0, 1.0 - math.sqrt(variance) / STABILITY_SPREAD)
+
+    @property
+    def status(self):
+        """'rushing', 'dragging' или 'steady' по сглаженному отклонению"""
+        if not self._deviations:
+            return None
+        if self.deviation < -RUSH_THRESHOLD:
+            return 'rushing'
+        if self.deviation > RUSH_THRESHOLD:
+            return 'dragging'
+        return 'steady'
+
+    def update(self, timestamp):
+        """
+        Обработка накопленных кадров (в потоке обработки)
+
+        Args:
+            timestamp: Текущее время (для оценки)
+
+        Returns:
+            dict или None: Новая оценка, если темп пересчитан
+        """
+        end = self._pending_write
+        start = max(self._pending_read, end - PENDING_FRAMES)
+        for number in range(start, end):
+            self._push(self._pending[number % PENDING_FRAMES])
+        self._pending_read = end
+
+        if self._frames - self._last_estimate_frame < self.estimate_frames:
+            return None
+        self._last_estimate_frame = self._frames
+        return self._estimate(timestamp)
+
+    def _push(self, rms):
+        """Новое значение огибающей и инкрементальное обновление автокорреляции"""
+        strength = max(0.0, rms - self._previous_rms)
+        self._previous_rms = rms
+
+        ring = self._envelope
+        self._value[0] = strength
+        ring.write(self._value)
+        newest = ring.write_index - 1
+        count = self.lag_count
+
+        # Новое произведение x[n] * x[n - k] для всех задержек k
+        recent = ring.read(newest - count + 1, count)[::-1]
+        np.multiply(recent, strength, out=self._product)
+        self._acf += self._product
+
+        # Вышедшее из окна значение x[n - W] и его произведения
+        expired = newest - self.window
+        old = ring.read(expired - count + 1, count)[::-1]
+        np.multiply(old, old[0], out=self._product)
+        self._acf -= self._product
+
+        self._window_sum += strength - old[0]
+        self._frames += 1
+
+    def _estimate(self, timestamp):
+        """Выбор периода гребенчатым фильтром по текущей автокорреляции"""
+        # Автоковариация: постоянная составляющая одинакова для всех задержек
+        mean_product = self._window_sum * self._window_sum / self.window
+        energy = self._acf[0] - mean_product
+        if energy <= 1e-12:
+            return None
+
+        scores = self._scores
+        np.add(self._acf[self._lags], 0.5 * self._acf[self._double_lags], out=scores)
+        scores -= 1.5 * mean_product
+        scores *= self._prior
+        best = int(np.argmax(scores))
+        confidence = float(scores[best] / (1.5 * energy))
+        if confidence < MIN_CONFIDENCE:
+            return None
+
+        # Дробный период по параболе через соседние значения
+        lag = float(self._lags[best])
+        if 0 < best < len(scores) - 1:
+            left, center, right = scores[best - 1], scores[best], scores[best + 1]
+            denominator = left - 2.0 * center + right
+            if denominator < 0:
+                lag += 0.5 * (left - right) / denominator
+
+        self.beat_duration = lag / self.frame_rate
+        self.estimate = {
+            'time': timestamp,
+            'bpm': 60.0 / self.beat_duration,
+            'confidence': min(1.0, confidence),
+            'beat_duration': self.beat_duration,
+            'beat_time': self.beat_time,
+            'deviation': self.deviation,
+            'stability': self.stability,
+            'status': self.status
+        }
+        return self.estimate
@@ -0,0 +1,137 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ring_buffer import AudioRingBuffer
+from audio_analysis import AnalysisFramer, SAMPLE_FORMATS, decode_block, encode_block, block_peak
+
+class TestAudioRingBuffer(unittest.TestCase):
+    """Тесты для кольцевого буфера сэмплов."""
+
+    def test_wraparound_read_is_contiguous_view(self):
+        """Тест чтения окна через границу буфера без копирования."""
+        ring = AudioRingBuffer(8)
+        ring.write(np.arange(6, dtype=np.float32))
+        ring.write(np.arange(6, 11, dtype=np.float32))
+
+        window = ring.read(4, 6)
+        np.testing.assert_array_equal(window, np.arange(4, 10))
+        self.assertTrue(np.shares_memory(window, ring.data))
+        np.testing.assert_array_equal(ring.latest(3), [8, 9, 10])
+
+    def test_overwritten_samples_are_unavailable(self):
+        """Тест недоступности перезаписанных сэмплов."""
+        ring = AudioRingBuffer(8)
+        ring.write(np.arange(20, dtype=np.float32))
+        self.assertEqual(ring.write_index, 20)
+        self.assertEqual(ring.oldest_index, 12)
+        np.testing.assert_array_equal(ring.latest(8), np.arange(12, 20))
+        with self.assertRaises(IndexError):
+            ring.read(10, 4)
+
+class TestAnalysisFramer(unittest.TestCase):
+    """Тесты для анализа окнами фиксированного размера."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.sample_rate = 48000
+        rng = np.random.default_rng(0)
+        self.signal = (0.01 * rng.standard_normal(self.sample_rate)).astype(np.float32)
+        # Удар гитары на 0.5 секунде
+        self.signal[24000:26000] += 0.5
+
+    def run_blocks(self, block_size):
+        """Прогон сигнала блоками заданного размера"""
+        framer = AnalysisFramer(self.sample_rate, hop_size=256, window_size=1024)
+        frames = []
+        for start in range(0, len(self.signal), block_size):
+            block = self.signal[start:start + block_size]
+            # Время конца блока в секундах от начала сигнала
+            block_time = (start + len(block)) / self.sample_rate
+            frames.extend(framer.process(block, block_time))
+        return frames
+
+    def test_frames_do_not_depend_on_block_size(self):
+        """Тест независимости окон анализа от размера буфера PortAudio."""
+        small = self.run_blocks(64)
+        large = self.run_blocks(512)
+
+        self.assertEqual(len(small), len(large))
+        ends_small, times_small, rms_small = map(np.array, zip(*small))
+        ends_large, times_large, rms_large = map(np.array, zip(*large))
+        np.testing.assert_array_equal(ends_small, ends_large)
+        np.testing.assert_allclose(times_small, times_large)
+        np.testing.assert_allclose(rms_small, rms_large, rtol=1e-5)
+
+        # Окна идут с шагом 256 сэмплов, время окна - время его последнего сэмпла
+        self.assertTrue(np.all(np.diff(ends_small) == 256))
+        np.testing.assert_allclose(times_small, ends_small / self.sample_rate)
+
+    def test_onset_resolution_with_large_buffer(self):
+        """Тест разрешения по времени при большом буфере."""
+        frames = self.run_blocks(2048)
+        first_loud = next(frame for frame in frames if frame[2] > 0.2)
+        # Громкое окно обнаруживается с точностью до шага, а не до буфера
+        self.assertLess(abs(first_loud[1] - 24000 / self.sample_rate), 1024 / self.sample_rate)
+
+    def test_skip_resumes_on_hop_grid(self):
+        """Тест возобновления анализа после простоя без отставания."""
+        framer = AnalysisFramer(self.sample_rate, hop_size=256, window_size=1024)
+        # Простой: блоки только пишутся в буфер
+        for start in range(0, 24000, 500):
+            framer.skip(self.signal[start:start + 500])
+        self.assertGreater(framer.next_frame_end, framer.ring_buffer.write_index)
+
+        block = self.signal[24000:24512]
+        frames = framer.process(block, 24512 / self.sample_rate)
+        # Анализируются только окна, ставшие полными в этом блоке, на той же сетке шагов
+        self.assertEqual(len(frames), 2)
+        self.assertTrue(all(end % 256 == 0 for end, _, _ in frames))
+        self.assertGreater(frames[-1][2], 0.2)
+
+class TestSampleFormats(unittest.TestCase):
+    """Тесты для целочисленных форматов захвата."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.signal = (0.5 * np.sin(np.arange(2048) * 0.05)).astype(np.float32)
+
+    def test_decode_selected_channel(self):
+        """Тест выбора канала из чередующихся int16 и упакованных int24 сэмплов."""
+        for sample_format in ('int16', 'int24'):
+            dtype, full_scale, _ = SAMPLE_FORMATS[sample_format]
+            samples = np.round(self.signal * (full_scale - 1)).astype(dtype)
+            interleaved = np.stack([samples, -samples], axis=1).ravel()
+            data = encode_block(interleaved, sample_format)
+            self.assertEqual(len(data), len(interleaved) * SAMPLE_FORMATS[sample_format][2])
+
+            decoded = decode_block(data, sample_format, channels=2, channel=1)
+            self.assertEqual(decoded.dtype, dtype)
+            np.testing.assert_array_equal(decoded, -samples)
+            self.assertAlmostEqual(block_peak(decoded, full_scale), 0.5, places=3)
+
+    def test_integer_analysis_matches_float(self):
+        """Тест совпадения RMS и float-окон для целых сэмплов с float32."""
+        float_framer = AnalysisFramer(48000, 256, 1024)
+        float_frames = float_framer.process(self.signal, 1.0)
+
+        for sample_format in ('int16', 'int24'):
+            dtype, full_scale, _ = SAMPLE_FORMATS[sample_format]
+            framer = AnalysisFramer(48000, 256, 1024, sample_format=sample_format)
+            frames = framer.process(np.round(self.signal * (full_scale - 1)).astype(dtype), 1.0)
+
+            # В буфере лежат сырые целые, во float переводится только читаемое окно
+            self.assertEqual(framer.ring_buffer.data.dtype, dtype)
+            window = framer.ring_buffer.read_float(1024, 512)
+            self.assertEqual(window.dtype, np.float32)
+            np.testing.assert_allclose(window, self.signal[1024:1536], atol=1e-4)
+
+            self.assertEqual(len(frames), len(float_frames))
+            np.testing.assert_allclose([f[2] for f in frames], [f[2] for f in float_frames], rtol=1e-3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import tempfile
+import shutil
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from audio_assets import read_wav, read_wav_rate, write_wav, resample, prepare_sample
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+class TestAudioAssets(unittest.TestCase):
+    """Тесты для загрузки и ресемплирования звуков."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Очистка после каждого теста."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_read_bundled_samples(self):
+        """Тест чтения звуков проекта (float32 и 16-битный PCM)."""
+        for name in ('metronome.wav', 'tack.wav'):
+            data, sample_rate = read_wav(os.path.join(PROJECT_DIR, name))
+            self.assertEqual(sample_rate, 44100)
+            self.assertEqual(read_wav_rate(os.path.join(PROJECT_DIR, name)), 44100)
+            self.assertEqual(data.dtype, np.float32)
+            self.assertGreater(len(data), 0)
+            self.assertLessEqual(float(np.max(np.abs(data))), 1.0)
+
+    def test_resample_preserves_frequency(self):
+        """Тест сохранения частоты тона при ресемплировании 44.1 -> 48 кГц."""
+        t = np.arange(4410) / 44100.0
+        tone = np.sin(2 * np.pi * 1000 * t).astype(np.float32)
+
+        result = resample(tone, 44100, 48000)
+        self.assertEqual(len(result), 4800)
+
+        spectrum = np.abs(np.fft.rfft(result * np.hanning(len(result))))
+        peak_hz = np.argmax(spectrum) * 48000 / len(result)
+        self.assertAlmostEqual(peak_hz, 1000, delta=10)
+
+    def test_prepare_sample_caches_result(self):
+        """Тест однократного ресемплирования с кешем."""
+        source = os.path.join(self.tmp_dir, 'click.wav')
+        write_wav(source, np.zeros(441, dtype=np.float32), 44100)
+        cache_dir = os.path.join(self.tmp_dir, 'cache')
+
+        # Частота совпадает - используется исходный файл
+        self.assertEqual(prepare_sample(source, 44100, cache_dir), source)
+
+        prepared = prepare_sample(source, 48000, cache_dir)
+        self.assertNotEqual(prepared, source)
+        data, sample_rate = read_wav(prepared)
+        self.assertEqual(sample_rate, 48000)
+        self.assertEqual(len(data), 480)
+
+        # Повторный вызов не перезаписывает кеш и не декодирует исходный файл
+        mtime = os.path.getmtime(prepared)
+        with patch('audio_assets.read_wav') as mock_read:
+            self.assertEqual(prepare_sample(source, 48000, cache_dir), prepared)
+            self.assertEqual(prepare_sample(source, 44100, cache_dir), source)
+        mock_read.assert_not_called()
+        self.assertEqual(os.path.getmtime(prepared), mtime)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,11 +5,14 @@ import queue
 import time
 import sys
 import os
+import tempfile
+import shutil
 
 # Добавляем корневую директорию проекта в sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from audio_processor import AudioProcessor
+from clocks import VirtualClock
 
 class TestAudioProcessor(unittest.TestCase):
     """Тесты для класса AudioProcessor."""
@@ -130,5 +133,157 @@ class TestAudioProcessor(unittest.TestCase):
                 self.assertEqual(args[0], timestamp)  # Первый аргумент - timestamp
                 self.assertEqual(args[1], 0.5)  # Второй аргумент - амплитуда (rms)
 
+    def test_idle_mode(self):
+        """Тест режима простоя: только индикатор уровня до появления сигнала."""
+        block = np.zeros(512, dtype=np.float32)
+        self.audio_processor.channels = 1
+        self.audio_processor.idle_timeout = 0.0
+        self.audio_processor._process_block(block.tobytes(), len(block))
+        self.assertTrue(self.audio_processor.idle)
+
+        # В простое блоки не попадают в очередь
+        depth = self.audio_processor.audio_queue.qsize()
+        self.audio_processor._process_block(block.tobytes(), len(block))
+        self.assertEqual(self.audio_processor.audio_queue.qsize(), depth)
+
+        # Громкий блок выводит из простоя и обрабатывается полностью
+        self.audio_processor.idle_timeout = 10.0
+        loud = np.full(512, 0.5, dtype=np.float32)
+        self.audio_processor._process_block(loud.tobytes(), len(loud))
+        self.assertFalse(self.audio_processor.idle)
+        self.assertGreater(self.audio_processor.audio_queue.qsize(), depth)
+
+    def test_virtual_clock_session(self):
+        """Тест длинного занятия на виртуальных часах: время onset - время в сигнале."""
+        clock = VirtualClock(start=1000.0)
+        processor = AudioProcessor(callback=self.mock_callback, threshold=0.2, clock=clock)
+        processor.channels = 1
+        processor.sample_rate = 48000
+        processor._reset_analysis()
+        
+        # 10 минут блоками по 480 сэмплов (10 мс), щелчок в середине каждой секунды
+        silence = np.zeros(480, dtype=np.float32)
+        click = np.full(480, 0.5, dtype=np.float32)
+        for number in range(600 * 100):
+            clock.advance(0.01)
+            block = click if number % 100 == 50 else silence
+            processor._process_block(block.tobytes(), len(block))
+            if number % 100 == 99:
+                processor.process_pending()
+        
+        self.assertEqual(self.mock_callback.call_count, 600)
+        onset_times = np.array([call.args[0] for call in self.mock_callback.call_args_list])
+        delays = onset_times - (1000.5 + np.arange(600))
+        # Окно становится громким в пределах блока щелчка и шага анализа после него
+        self.assertTrue(np.all(delays > 0))
+        self.assertTrue(np.all(delays < (480 + 256) / 48000))
+        self.assertEqual(processor.audio_queue.qsize(), 0)
+
+    @patch('audio_processor.threading.Thread')
+    def test_recording_survives_restart(self, mock_thread):
+        """Тест: смена размера буфера не прерывает запись, пауза заполняется тишиной."""
+        clock = VirtualClock(start=500.0)
+        processor = AudioProcessor(threshold=0.2, clock=clock)
+        processor.current_device_info = {'name': 'Test', 'index': 0, 'maxInputChannels': 1,
+                                         'defaultSampleRate': 48000}
+        processor.start()
+        self.assertEqual(processor.sample_rate, 48000)
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'session.wav')
+            recorder = processor.start_recording(path)
+            block = np.full(2400, 0.5, dtype=np.float32)
+            
+            def feed(seconds):
+                for _ in range(int(seconds * 20)):
+                    clock.advance(0.05)
+                    processor._process_block(block.tobytes(), len(block))
+            
+            feed(1.0)
+            # Автоподбор меняет размер буфера посреди записи; перезапуск длится полсекунды
+            processor.set_buffer_size(256)
+            clock.advance(0.5)
+            feed(1.0)
+            self.assertIs(processor.recorder, recorder)
+            
+            # Смена формата меняет параметры файла: запись продолжается во второй части
+            processor.set_sample_format('int16')
+            self.assertIsNot(processor.recorder, recorder)
+            self.assertEqual(processor.recorder.path, os.path.join(temp_dir, 'session_2.wav'))
+            self.assertEqual(processor.recorder.sample_format, 'int16')
+            self.assertFalse(recorder.is_recording)
+            self.assertEqual(processor.stop_recording().sample_format, 'int16')
+            
+            with open(path, 'rb') as f:
+                f.seek(44)
+                recorded = np.frombuffer(f.read(), dtype=np.float32)
+            self.assertEqual(len(recorded), 2.5 * 48000)
+            np.testing.assert_array_equal(recorded[:48000], 0.5)
+            np.testing.assert_array_equal(recorded[48000:72000], 0.0)
+            np.testing.assert_array_equal(recorded[72000:], 0.5)
+            self.assertEqual(recorder.dropped_frames, 0)
+        finally:
+            processor.stop()
+            shutil.rmtree(temp_dir)
+
+    @patch('audio_processor.threading.Thread')
+    def test_recording_follows_monitoring_rate(self, mock_thread):
+        """Тест: дуплексный мониторинг на другой частоте переводит запись в новую часть."""
+        clock = VirtualClock(start=500.0)
+        processor = AudioProcessor(threshold=0.2, clock=clock)
+        processor.current_device_info = {'name': 'Test', 'index': 0, 'maxInputChannels': 1,
+                                         'defaultSampleRate': 48000}
+        # Вывод того же устройства работает только на 44100 Гц
+        self.mock_pyaudio_instance.is_format_supported.side_effect = \
+            lambda rate, **kwargs: 'output_device' not in kwargs or rate == 44100
+        self.mock_pyaudio_instance.get_default_output_device_info.return_value = {
+            'name': 'Test', 'index': 0, 'maxOutputChannels': 2, 'defaultSampleRate': 44100}
+        processor.start()
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'session.wav')
+            recorder = processor.start_recording(path)
+            
+            def feed(seconds):
+                block = np.full(processor.sample_rate // 20, 0.5, dtype=np.float32)
+                for _ in range(int(seconds * 20)):
+                    clock.advance(0.05)
+                    processor._process_block(block.tobytes(), len(block))
+            
+            feed(0.5)
+            processor.start_monitoring()
+            self.assertEqual(processor.sample_rate, 44100)
+            self.assertEqual(processor.recorder.path, os.path.join(temp_dir, 'session_2.wav'))
+            self.assertEqual(processor.recorder.sample_rate, 44100)
+            second = processor.recorder
+            feed(0.5)
+            
+            processor.stop_monitoring()
+            self.assertEqual(processor.sample_rate, 48000)
+            self.assertEqual(processor.recorder.path, os.path.join(temp_dir, 'session_3.wav'))
+            # Каждая часть записана целиком на своей частоте
+            self.assertEqual(recorder.frames_written, 24000)
+            self.assertEqual(second.frames_written, 22050)
+        finally:
+            processor.stop()
+            processor.stop_recording()
+            shutil.rmtree(temp_dir)
+
+    def test_realtime_only_for_callback_thread(self):
+        """Тест: SCHED_FIFO и отдельное ядро только у callback, анализ - nice на остальных ядрах."""
+        processor = self.audio_processor
+        processor.audio_cpus, processor.processing_cpus = {3}, {0, 1, 2}
+        with patch('audio_processor.realtime.set_thread_realtime', return_value='SCHED_FIFO:70') as fifo, \
+                patch('audio_processor.realtime.set_thread_nice', return_value='nice:-10') as nice, \
+                patch('audio_processor.realtime.pin_thread', side_effect=lambda cpus: str(sorted(cpus))):
+            processor._configure_thread('audio')
+            processor._configure_thread('processing')
+        self.assertEqual(fifo.call_count, 1)
+        self.assertEqual(nice.call_count, 1)
+        self.assertEqual(processor.metrics.info['realtime.audio_thread'], 'SCHED_FIFO:70, ядра: [3]')
+        self.assertEqual(processor.metrics.info['realtime.processing_thread'], 'nice:-10, ядра: [0, 1, 2]')
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,110 @@
+import unittest
+import tempfile
+import shutil
+import json
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from audio_assets import write_wav
+from audio_analysis import AnalysisFramer
+from batch_analysis import detect_onsets, analyze_file, analyze_batch, write_reports
+
+SAMPLE_RATE = 48000
+
+def make_take(onset_times, duration=5.0):
+    """Запись с короткими щелчками в заданные моменты"""
+    rng = np.random.default_rng(1)
+    data = (0.005 * rng.standard_normal(int(duration * SAMPLE_RATE))).astype(np.float32)
+    for onset in onset_times:
+        start = int(onset * SAMPLE_RATE)
+        data[start:start + 960] += 0.5 * np.exp(-np.arange(960) / 300.0)
+    return data
+
+class TestBatchAnalysis(unittest.TestCase):
+    """Тесты для пакетного анализа записей."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.tmp_dir = tempfile.mkdtemp()
+        # 120 BPM, четверти с 0.5 сек; каждая вторая нота сыграна на 80 мс позже
+        self.onsets = [0.5 + 0.5 * number + (0.08 if number % 2 else 0.0) for number in range(8)]
+
+    def tearDown(self):
+        """Очистка после каждого теста."""
+        shutil.rmtree(self.tmp_dir)
+
+    def write_take(self, name, onsets, metadata=None):
+        """WAV и, если нужно, JSON с метаданными рядом"""
+        path = os.path.join(self.tmp_dir, name)
+        write_wav(path, make_take(onsets), SAMPLE_RATE)
+        if metadata is not None:
+            with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+                json.dump(metadata, f)
+        return path
+
+    def test_onsets_match_live_pipeline(self):
+        """Тест совпадения обнаружения в файле с потоковым анализом окнами."""
+        data = make_take(self.onsets)
+        framer = AnalysisFramer(SAMPLE_RATE, 256, 1024, buffer_seconds=1.0)
+        live = []
+        last = -1.0
+        for start in range(0, len(data), 512):
+            block = data[start:start + 512]
+            for _, frame_time, rms in framer.process(block, (start + len(block)) / SAMPLE_RATE):
+                if rms > 0.1 and frame_time - last > 0.1:
+                    live.append(frame_time)
+                    last = frame_time
+
+        offline = detect_onsets(data, SAMPLE_RATE)
+        self.assertEqual(len(offline), len(self.onsets))
+        np.testing.assert_allclose(offline, live)
+
+    def test_file_scored_against_pattern(self):
+        """Тест оценки записи по темпу и паттерну из JSON рядом с файлом."""
+        path = self.write_take('take.wav', self.onsets, {'bpm': 120, 'pattern': 'quarters', 'start': 0.5})
+        result = analyze_file(path, {'tolerance': 0.1})
+
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['total_hits'], 8)
+        self.assertEqual(result['accurate_hits'], 4)
+        self.assertAlmostEqual(result['accuracy'], 0.5)
+        # Обнаружение запаздывает меньше чем на шаг анализа, опоздания - на 80 мс
+        self.assertGreater(result['mean_offset_ms'], 40)
+        self.assertLess(result['mean_offset_ms'], 40 + 1000 * 256 / SAMPLE_RATE)
+
+    def test_batch_with_events_and_missing_tempo(self):
+        """Тест пула процессов, долей из записи занятия и отчета с ошибками."""
+        on_time = [0.5 + 0.5 * number for number in range(8)]
+        recorded = self.write_take('recorded.wav', on_time)
+        with open(os.path.join(self.tmp_dir, 'recorded.events.csv'), 'w') as f:
+            f.write('kind,time,value\n')
+            f.writelines(f'beat,{0.5 + 0.5 * number:.6f},0.0\n' for number in range(8))
+        no_tempo = self.write_take('no_tempo.wav', on_time)
+        late = self.write_take('late.wav', self.onsets, {'bpm': 120, 'start': 0.5})
+
+        paths = [late, no_tempo, recorded]
+        results, aggregate = analyze_batch(paths, {'tolerance': 0.1}, workers=2)
+        self.assertEqual([result['file'] for result in results], paths)
+        self.assertIn('темп', results[1]['error'])
+        self.assertAlmostEqual(results[2]['bpm'], 120.0)
+        self.assertEqual(results[2]['accuracy'], 1.0)
+
+        self.assertEqual(aggregate['ok'], 2)
+        self.assertEqual(aggregate['failed'], 1)
+        self.assertEqual(aggregate['total_hits'], 16)
+        self.assertAlmostEqual(aggregate['accuracy'], 0.75)
+        self.assertEqual(aggregate['by_bpm']['120']['files'], 2)
+
+        base = os.path.join(self.tmp_dir, 'report')
+        write_reports(results, aggregate, base)
+        with open(base + '.json') as f:
+            self.assertEqual(json.load(f)['aggregate']['ok'], 2)
+        with open(base + '.csv') as f:
+            self.assertEqual(len(f.read().splitlines()), 4)
+
+if __name__ == '__main__':
+    unittest.main()
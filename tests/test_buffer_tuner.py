@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from buffer_tuner import BufferSizeTuner
+
+SAMPLE_RATE = 48000
+
+class TestBufferSizeTuner(unittest.TestCase):
+    """Тесты для автоподбора размера буфера."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.tuner = BufferSizeTuner(window_seconds=1.0, warmup_seconds=0.1,
+                                     windows_to_decrease=3, windows_to_stable=4, retry_windows=10)
+
+    def run_window(self, load, status=0):
+        """Прогон одного окна с заданной нагрузкой callback и решение по нему"""
+        budget = self.tuner.block_size / SAMPLE_RATE
+        calls = int(1.2 / budget) + 1
+        for _ in range(calls):
+            self.tuner.record(load * budget, budget, status)
+        return self.tuner.evaluate()
+
+    def test_starts_small_and_steps_up_on_overload(self):
+        """Тест шага вверх при перегрузке и xrun."""
+        self.assertEqual(self.tuner.block_size, 64)
+        self.assertEqual(self.run_window(0.9), 128)
+        # Один флаг xrun в окне - тоже шаг вверх
+        self.assertEqual(self.run_window(0.3, status=1), 256)
+
+    def test_hysteresis_before_stepping_down(self):
+        """Тест шага вниз только после нескольких спокойных окон."""
+        self.tuner.reset(512)
+        self.assertIsNone(self.run_window(0.1))
+        self.assertIsNone(self.run_window(0.1))
+        # Среднее окно прерывает серию спокойных
+        self.assertIsNone(self.run_window(0.5))
+        self.assertIsNone(self.run_window(0.1))
+        self.assertIsNone(self.run_window(0.1))
+        self.assertEqual(self.run_window(0.1), 256)
+
+    def test_failed_size_not_retried_and_stable_reported(self):
+        """Тест запрета возврата к проблемному размеру и признака стабильности."""
+        self.assertEqual(self.run_window(0.9), 128)
+        # Размер 64 заблокирован, поэтому спокойные окна не уводят вниз
+        for _ in range(4):
+            self.assertIsNone(self.run_window(0.1))
+        self.assertTrue(self.tuner.stable)
+        self.assertEqual(self.tuner.block_size, 128)
+
+if __name__ == '__main__':
+    unittest.main()
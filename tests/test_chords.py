@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from audio_processor import AudioProcessor
+from chords import ChordRecognizer, CHORD_NAMES, CHORD_TEMPLATES
+from clocks import VirtualClock
+
+SAMPLE_RATE = 48000
+
+# Аккорды в открытых позициях (MIDI струн, от низкой к высокой)
+VOICINGS = {
+    'C': (48, 52, 55, 60, 64),
+    'G': (43, 47, 50, 55, 59, 67),
+    'Am': (45, 52, 57, 60, 64),
+    'Em': (40, 47, 52, 55, 59, 64),
+    'Dm': (50, 57, 62, 65),
+    'E7': (40, 47, 50, 56, 59, 64),
+    'A7': (45, 52, 55, 61, 64),
+    'D7': (50, 57, 60, 66)
+}
+
+def strum(midis, count, rng):
+    """Бой по струнам: каждая струна с затухающими обертонами и случайными фазами, плюс шум"""
+    times = np.arange(count) / SAMPLE_RATE
+    signal = np.zeros(count)
+    for midi in midis:
+        frequency = 440.0 * 2.0 ** ((midi - 69) / 12.0)
+        for k in range(1, 8):
+            signal += np.sin(2 * np.pi * frequency * k * times + rng.uniform(0, 2 * np.pi)) / k
+    signal *= 0.1 * np.exp(-times * 3.0)
+    return (signal + 0.005 * rng.normal(size=count)).astype(np.float32)
+
+class TestChordTemplates(unittest.TestCase):
+    """Тесты для шаблонов аккордов."""
+
+    def test_templates(self):
+        """Тест названий и нормировки шаблонов мажора, минора и септаккорда."""
+        self.assertEqual(CHORD_TEMPLATES.shape, (36, 12))
+        self.assertEqual(len(CHORD_NAMES), 36)
+        self.assertTrue(np.allclose(np.linalg.norm(CHORD_TEMPLATES, axis=1), 1.0))
+        self.assertEqual(CHORD_NAMES[0], 'C')
+        self.assertEqual(CHORD_NAMES[12 + 9], 'Am')
+        self.assertEqual(CHORD_NAMES[24 + 7], 'G7')
+        # До мажор: до, ми, соль
+        self.assertEqual(list(np.flatnonzero(CHORD_TEMPLATES[0])), [0, 4, 7])
+        self.assertEqual(list(np.flatnonzero(CHORD_TEMPLATES[24 + 7])), [2, 5, 7, 11])
+
+class TestChordRecognizer(unittest.TestCase):
+    """Тесты для распознавания аккорда по окну."""
+
+    def test_recognize_voicings(self):
+        """Тест: аккорды в открытых позициях распознаются, тишина - нет."""
+        rng = np.random.default_rng(3)
+        recognizer = ChordRecognizer(SAMPLE_RATE)
+        for name, midis in VOICINGS.items():
+            chord, confidence = recognizer.recognize(strum(midis, recognizer.frame_size, rng))
+            self.assertEqual(chord, name)
+            self.assertGreater(confidence, 0.8)
+            # Матричное сходство совпадает с косинусом хромы и каждого шаблона
+            direct = [np.dot(template, recognizer.chroma) for template in CHORD_TEMPLATES]
+            self.assertTrue(np.allclose(recognizer.scores, direct, atol=1e-5))
+
+        self.assertIsNone(recognizer.recognize(np.zeros(recognizer.frame_size, dtype=np.float32)))
+
+class TestOnsetChord(unittest.TestCase):
+    """Тесты для аккорда удара по окну после onset."""
+
+    def test_chord_for_each_onset(self):
+        """Тест: аккорд каждого удара приходит в chord_callback со временем его onset."""
+        with patch('audio_processor.pyaudio.PyAudio'):
+            clock = VirtualClock(start=20.0)
+            processor = AudioProcessor(threshold=0.05, clock=clock)
+        processor.channels = 1
+        processor.sample_rate = SAMPLE_RATE
+        processor._reset_analysis()
+        processor.set_chord_recognition(True)
+        results = []
+        processor.chord_callback = lambda timestamp, chord, confidence: results.append((timestamp, chord))
+
+        # Аккорды раз в секунду; быстрое затухание - по одному onset на аккорд
+        rng = np.random.default_rng(5)
+        names = ('C', 'Am', 'E7')
+        length = SAMPLE_RATE // 4
+        decay = np.exp(-np.arange(length) / SAMPLE_RATE * 20.0).astype(np.float32)
+        signal = np.zeros(SAMPLE_RATE * 4, dtype=np.float32)
+        for number, name in enumerate(names):
+            start = SAMPLE_RATE * (number + 1)
+            signal[start:start + length] = strum(VOICINGS[name], length, rng) * decay
+
+        for start in range(0, len(signal), 480):
+            clock.advance(0.01)
+            block = signal[start:start + 480]
+            processor._process_block(block.tobytes(), len(block))
+            processor.process_pending()
+
+        self.assertEqual([chord for _, chord in results], list(names))
+        onset_times = np.array([timestamp for timestamp, _ in results])
+        self.assertTrue(np.all(np.abs(onset_times - (21.0 + np.arange(len(names)))) < 0.02))
+
+        processor.set_chord_recognition(False)
+        self.assertIsNone(processor.chord_recognizer)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from unittest.mock import MagicMock
+import contextlib
+import io
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from clocks import VirtualClock
+from rhythm_analyzer import RhythmAnalyzer, DEVIATION_HISTORY
+from rhythm_patterns import PatternSchedule, get_pattern
+
+def load_trainer_widget():
+    """RhythmTrainerWidget с настоящим Kivy (None, если Kivy замокан другими тестами или недоступен)"""
+    if isinstance(sys.modules.get('kivy'), MagicMock):
+        return None
+    try:
+        os.environ.setdefault('KIVY_NO_ARGS', '1')
+        from main import RhythmTrainerWidget
+    except ImportError:
+        return None
+    return RhythmTrainerWidget
+
+class TestClocks(unittest.TestCase):
+    """Тесты для виртуальных часов и моделирования занятий."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.clock = VirtualClock(start=1000.0, frame_interval=0.01)
+
+    def test_virtual_events_order_and_cancel(self):
+        """Тест порядка событий, триггеров, интервалов и отмены."""
+        calls = []
+        self.clock.schedule_once(lambda dt: calls.append(('once', self.clock.time(), dt)), 0.25)
+        ticks = self.clock.schedule_interval(lambda dt: calls.append(('tick', self.clock.time(), dt)), 0.1)
+        trigger = self.clock.create_trigger(lambda dt: calls.append(('frame', self.clock.time(), dt)))
+        trigger()
+        trigger()  # Повторный вызов до срабатывания ничего не делает
+
+        self.clock.advance(0.3)
+        self.assertEqual([call[0] for call in calls], ['frame', 'tick', 'tick', 'once'])
+        self.assertAlmostEqual(calls[0][1], 1000.01)
+        self.assertAlmostEqual(calls[2][1], 1000.2)
+        self.assertAlmostEqual(calls[2][2], 0.1)
+        self.assertAlmostEqual(self.clock.time(), 1000.3)
+
+        # Отмена интервала и остановка по возврату False
+        self.clock.unschedule(ticks)
+        count = [0]
+        def limited(dt):
+            count[0] += 1
+            return count[0] < 3
+        self.clock.schedule_interval(limited, 0)
+        self.clock.advance(1.0)
+        self.assertEqual(count[0], 3)
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(self.clock.pending, 0)
+
+    def test_analyzer_two_hour_session(self):
+        """Тест двухчасового занятия анализатора по расписанию паттерна."""
+        analyzer = RhythmAnalyzer(tolerance=0.1, clock=self.clock)
+        analyzer.start()
+        schedule = PatternSchedule(get_pattern('quarters'), 120, self.clock.time() + 1.0)
+        analyzer.set_schedule(schedule)
+
+        # Удар на каждую ноту: каждый пятый - на 40 мс позже (0.08 доли), каждый седьмой - на 80 мс
+        times, _, _ = schedule.notes_between(self.clock.time(), self.clock.time() + 7200.0)
+        offsets = np.where(np.arange(len(times)) % 7 == 3, 0.08, np.where(np.arange(len(times)) % 5 == 1, 0.04, 0.0))
+        for hit_time in (times + offsets).tolist():
+            self.clock.schedule_once(lambda dt, hit_time=hit_time: analyzer.analyze_hit(hit_time),
+                                     hit_time - self.clock.time())
+        self.clock.advance(7201.0)
+
+        stats = analyzer.get_stats()
+        self.assertEqual(stats['total_hits'], len(times))
+        self.assertEqual(stats['total_hits'] - stats['accurate_hits'], int(np.sum(offsets > 0.05)))
+        self.assertAlmostEqual(analyzer.last_beat_time, 1000.0)
+        # Хранятся только последние отклонения, среднее - по всем ударам
+        self.assertEqual(len(analyzer.deviations), DEVIATION_HISTORY)
+        self.assertAlmostEqual(stats['avg_deviation'], np.mean(offsets) / schedule.beat_duration, places=6)
+
+    def test_trainer_two_hour_session(self):
+        """Тест двухчасового занятия тренажера с синтетическими ударами за секунды."""
+        widget_class = load_trainer_widget()
+        if widget_class is None:
+            self.skipTest("Kivy или PyAudio недоступны")
+
+        clock = VirtualClock(start=1000.0, frame_interval=0.5)
+        trainer = widget_class(clock=clock, size=(400, 600))
+        trainer.hit_sound_enabled = False
+        trainer.metronome_sound_enabled = False
+        trainer.bpm = 120
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            trainer.start_training()
+            times, _, _ = trainer.schedule.notes_between(clock.time(), clock.time() + 7200.0)
+            for hit_time in times.tolist():
+                clock.schedule_once(lambda dt, hit_time=hit_time: trainer.on_audio_detected(hit_time + 0.01, 0.5),
+                                    hit_time - clock.time())
+            clock.advance(7200.0)
+            trainer.stop_training()
+
+        stats = trainer.rhythm_analyzer.get_stats()
+        self.assertEqual(stats['total_hits'], len(times))
+        self.assertEqual(stats['accuracy'], 1.0)
+        # Ноты за пределами экрана удаляются, кадры идут все два часа
+        self.assertLess(len(trainer.notes), 10)
+        self.assertGreaterEqual(trainer.frame_dispatcher.frames, 7200.0 / 0.5 - 1)
+
+if __name__ == '__main__':
+    unittest.main()
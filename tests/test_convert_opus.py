@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import numpy as np
+import tempfile
+import shutil
+import wave
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from convert_opus import (collect_sources, convert_batch, target_path, load_manifest,
+                          default_sample_rate, FALLBACK_SAMPLE_RATE)
+
+def write_test_wav(path, sample_rate=22050, duration=0.1):
+    """Создает короткий моно WAV с синусом 440 Гц"""
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    samples = (0.5 * np.sin(2 * np.pi * 440 * t) * 32767).astype(np.int16)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+
+class TestConvertOpus(unittest.TestCase):
+    """Тесты для пакетной конвертации аудио-файлов."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.src_dir = os.path.join(self.tmp_dir, 'src')
+        self.out_dir = os.path.join(self.tmp_dir, 'out')
+        os.makedirs(os.path.join(self.src_dir, 'clicks'))
+        write_test_wav(os.path.join(self.src_dir, 'clicks', 'tack.wav'))
+        write_test_wav(os.path.join(self.src_dir, 'click.wav'))
+        with open(os.path.join(self.src_dir, 'notes.txt'), 'w') as f:
+            f.write('не аудио')
+        self.manifest_path = os.path.join(self.out_dir, '.convert_manifest.json')
+
+    def tearDown(self):
+        """Очистка после каждого теста."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_collect_sources(self):
+        """Тест сбора файлов из директорий и glob-шаблонов."""
+        sources = collect_sources([self.src_dir])
+        self.assertEqual([os.path.basename(s) for s in sources], ['click.wav', 'tack.wav'])
+
+        # Glob-шаблон и повтор того же файла не дают дубликатов
+        pattern = os.path.join(self.src_dir, '*.wav')
+        sources = collect_sources([pattern, os.path.join(self.src_dir, 'click.wav')])
+        self.assertEqual(len(sources), 1)
+
+    def test_convert_to_npy_with_resampling(self):
+        """Тест конвертации в npy с ресемплированием до частоты движка."""
+        sources = collect_sources([self.src_dir])
+        stats = convert_batch(sources, output_format='npy', sample_rate=44100,
+                              output_dir=self.out_dir, manifest_path=self.manifest_path,
+                              workers=1)
+
+        self.assertEqual(stats['converted'], 2)
+        self.assertEqual(stats['failed'], 0)
+
+        # Результат открывается как memory-mapped массив float32
+        data = np.load(target_path(sources[0], 'npy', self.out_dir), mmap_mode='r')
+        self.assertEqual(data.dtype, np.float32)
+        self.assertAlmostEqual(data.shape[0], 4410, delta=2)
+        self.assertLessEqual(float(np.max(np.abs(data))), 1.0)
+
+    def test_manifest_skips_unchanged_files(self):
+        """Тест пропуска неизмененных файлов по манифесту."""
+        sources = collect_sources([self.src_dir])
+        convert_batch(sources, output_format='wav', sample_rate=44100, output_dir=self.out_dir,
+                      manifest_path=self.manifest_path, workers=1)
+        self.assertEqual(len(load_manifest(self.manifest_path)), 2)
+
+        # Повторный запуск ничего не конвертирует
+        stats = convert_batch(sources, output_format='wav', sample_rate=44100, output_dir=self.out_dir,
+                              manifest_path=self.manifest_path, workers=1)
+        self.assertEqual(stats['converted'], 0)
+        self.assertEqual(stats['skipped'], 2)
+
+        # Изменение содержимого файла приводит к повторной конвертации
+        write_test_wav(sources[0], duration=0.2)
+        stats = convert_batch(sources, output_format='wav', sample_rate=44100, output_dir=self.out_dir,
+                              manifest_path=self.manifest_path, workers=1)
+        self.assertEqual(stats['converted'], 1)
+        self.assertEqual(stats['skipped'], 1)
+
+        # Смена частоты дискретизации тоже требует конвертации
+        stats = convert_batch(sources, output_format='wav', sample_rate=48000,
+                              output_dir=self.out_dir, manifest_path=self.manifest_path,
+                              workers=1)
+        self.assertEqual(stats['converted'], 2)
+
+    def test_same_names_in_subdirectories(self):
+        """Тест: одноименные файлы из поддиректорий не перезаписывают друг друга (в пуле процессов)."""
+        write_test_wav(os.path.join(self.src_dir, 'tack.wav'), duration=0.2)
+        sources = collect_sources([self.src_dir])
+        stats = convert_batch(sources, output_format='npy', sample_rate=22050,
+                              output_dir=self.out_dir, manifest_path=self.manifest_path,
+                              workers=2)
+
+        self.assertEqual(stats['converted'], 3)
+        self.assertEqual(stats['failed'], 0)
+        short = np.load(os.path.join(self.out_dir, 'clicks', 'tack.npy'))
+        long = np.load(os.path.join(self.out_dir, 'tack.npy'))
+        self.assertEqual((len(short), len(long)), (2205, 4410))
+        self.assertEqual(len({entry['target'] for entry in load_manifest(self.manifest_path).values()}), 3)
+
+        # Файлы с одним именем и разными расширениями в одной директории - ошибка
+        write_test_wav(os.path.join(self.src_dir, 'tack.aiff'))
+        with self.assertRaises(ValueError):
+            convert_batch(collect_sources([self.src_dir]), output_format='npy', sample_rate=22050,
+                          output_dir=self.out_dir, workers=2)
+
+    def test_default_sample_rate_from_input_device(self):
+        """Тест: частота по умолчанию - родная частота устройства ввода, без PyAudio - запасная."""
+        pyaudio = MagicMock()
+        pyaudio.PyAudio.return_value.get_default_input_device_info.return_value = {'defaultSampleRate': 96000.0}
+        with patch.dict(sys.modules, {'pyaudio': pyaudio}):
+            self.assertEqual(default_sample_rate(), 96000)
+        with patch.dict(sys.modules, {'pyaudio': None}):
+            self.assertEqual(default_sample_rate(), FALLBACK_SAMPLE_RATE)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import MagicMock
+import threading
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from frame_dispatcher import FrameDispatcher, EVENT_ONSET, EVENT_LEVEL
+
+class FakeClock:
+    """Часы с ручным запуском кадров вместо Kivy Clock"""
+    def __init__(self):
+        self.trigger = MagicMock()
+        self.callback = None
+
+    def create_trigger(self, callback, timeout=0, interval=False):
+        self.callback = callback
+        return self.trigger
+
+class TestFrameDispatcher(unittest.TestCase):
+    """Тесты для покадрового диспетчера интерфейса."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.clock = FakeClock()
+        self.dispatcher = FrameDispatcher(capacity=8, clock=self.clock)
+        self.onsets = []
+        self.levels = []
+        self.dispatcher.register(EVENT_ONSET, lambda t, v: self.onsets.append((t, v)))
+        self.dispatcher.register(EVENT_LEVEL, lambda t, v: self.levels.append(v), coalesce=True)
+
+    def frame(self):
+        """Один кадр"""
+        self.clock.callback(1 / 60)
+
+    def test_events_drained_once_per_frame(self):
+        """Тест разбора всех событий за кадр и объединения снимков уровня."""
+        self.dispatcher.post(EVENT_ONSET, 1.0, 0.5)
+        for level in (0.1, 0.2, 0.3):
+            self.dispatcher.post(EVENT_LEVEL, 1.0, level)
+        thread = threading.Thread(target=self.dispatcher.post, args=(EVENT_ONSET, 2.0, 0.7))
+        thread.start()
+        thread.join()
+
+        # Часы запускаются один раз, несмотря на несколько событий
+        self.assertEqual(self.clock.trigger.call_count, 1)
+        self.assertEqual(self.onsets, [])
+
+        self.frame()
+        self.assertEqual(self.onsets, [(1.0, 0.5), (2.0, 0.7)])
+        self.assertEqual(self.levels, [0.3])
+
+    def test_sleeps_when_nothing_animates(self):
+        """Тест остановки часов, когда анимировать нечего."""
+        remaining = [2]
+        def animate(dt):
+            remaining[0] -= 1
+            return remaining[0] > 0
+        self.dispatcher.add_frame_callback(animate)
+
+        self.dispatcher.wake()
+        self.frame()
+        self.assertTrue(self.dispatcher.is_awake)
+        self.frame()
+        self.assertFalse(self.dispatcher.is_awake)
+        self.clock.trigger.cancel.assert_called_once()
+
+        # Новое событие будит диспетчер
+        self.dispatcher.post(EVENT_LEVEL, 3.0, 0.1)
+        self.assertTrue(self.dispatcher.is_awake)
+        self.assertEqual(self.clock.trigger.call_count, 2)
+
+    def test_overflow_drops_oldest_events(self):
+        """Тест переполнения буфера событий."""
+        for number in range(10):
+            self.dispatcher.post(EVENT_ONSET, float(number), 0.0)
+        self.assertEqual(self.dispatcher.dropped, 2)
+
+        self.frame()
+        self.assertEqual([t for t, _ in self.onsets], [float(n) for n in range(2, 10)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from clocks import VirtualClock
+from groove_analysis import GrooveProfile, GROOVE_BINS, histogram_edges
+from rhythm_analyzer import RhythmAnalyzer
+from rhythm_patterns import PatternSchedule, get_pattern
+
+class TestGrooveAnalysis(unittest.TestCase):
+    """Тесты для анализа отклонений по позициям в такте."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.clock = VirtualClock(start=1000.0)
+        self.analyzer = RhythmAnalyzer(tolerance=0.1, clock=self.clock)
+        self.analyzer.start()
+        self.rng = np.random.default_rng(0)
+
+    def test_incremental_matches_vectorised(self):
+        """Тест совпадения поударного накопления с векторным пересчетом и прямым расчетом."""
+        offsets = get_pattern('sixteenths').offsets
+        slots = self.rng.integers(0, len(offsets), 2000)
+        deviations = self.rng.normal(0.02, 0.1, 2000)
+
+        profile = GrooveProfile(offsets)
+        for slot, deviation in zip(slots.tolist(), deviations.tolist()):
+            profile.add(slot, deviation)
+        recomputed = GrooveProfile.from_hits(offsets, slots, deviations)
+
+        np.testing.assert_array_equal(profile.counts, recomputed.counts)
+        np.testing.assert_allclose(profile.means, recomputed.means, atol=1e-12)
+        np.testing.assert_allclose(profile.deviations_std, recomputed.deviations_std, atol=1e-12)
+        np.testing.assert_array_equal(profile.histogram, recomputed.histogram)
+
+        slot = int(slots[0])
+        selected = deviations[slots == slot]
+        self.assertAlmostEqual(profile.means[slot], np.mean(selected))
+        self.assertAlmostEqual(profile.deviations_std[slot], np.std(selected, ddof=1))
+        # Крайние корзины собирают отклонения за пределами диапазона
+        expected, _ = np.histogram(np.clip(selected, -0.2499, 0.2499), bins=histogram_edges())
+        np.testing.assert_array_equal(profile.histogram[slot], expected)
+        self.assertEqual(profile.histogram.shape, (len(offsets), GROOVE_BINS))
+
+    def test_rushed_beat_and_swing(self):
+        """Тест: систематическая спешка на четвертой доле и фактический свинг видны по позициям."""
+        schedule = PatternSchedule(get_pattern('eighths'), 120, self.clock.time())
+        self.analyzer.set_schedule(schedule)
+        times, _, indices = schedule.notes_between(self.clock.time(), self.clock.time() + 120.0)
+
+        # Слабые доли сыграны со свингом 2:1, четвертая доля - на 0.1 доли раньше, плюс разброс
+        slots = indices % 8
+        shifts = np.where(slots % 2 == 1, 1.0 / 6.0, 0.0) + np.where(slots == 6, -0.1, 0.0)
+        hits = times + (shifts + self.rng.normal(0.0, 0.01, len(times))) * schedule.beat_duration
+        for hit_time in hits.tolist():
+            self.analyzer.analyze_hit(hit_time)
+
+        groove = self.analyzer.groove
+        view = groove.view()
+        self.assertEqual([row['bias'] for row in view if row['offset'] in (0.0, 1.0, 2.0, 3.0)],
+                         [None, None, None, 'early'])
+        self.assertTrue(all(row['bias'] == 'late' for row in view if row['offset'] % 1.0))
+        self.assertAlmostEqual(view[6]['mean'], -0.1, delta=0.01)
+        # Свинг считается по сыгранным длительностям: спешка на четвертой доле укорачивает
+        # восьмую перед ней и удлиняет восьмую после нее
+        expected = (2.0 + 2.0 + (2.0 / 3.0) / (1.0 / 3.0 - 0.1) + (2.0 / 3.0 + 0.1) / (1.0 / 3.0)) / 4.0
+        self.assertAlmostEqual(groove.swing_ratio(), expected, delta=0.05)
+        self.assertIn('РАНО', '\n'.join(groove.summary_lines(schedule.beat_duration)))
+
+        # Новое расписание того же паттерна сохраняет профиль, другой паттерн - сбрасывает
+        self.analyzer.set_schedule(PatternSchedule(get_pattern('eighths'), 100, self.clock.time()))
+        self.assertEqual(self.analyzer.groove.total_hits, len(times))
+        self.analyzer.set_schedule(PatternSchedule(get_pattern('swing_eighths'), 100, self.clock.time()))
+        self.assertEqual(self.analyzer.groove.total_hits, 0)
+
+    def test_schedule_recompute_matches_analyzer(self):
+        """Тест: векторный пересчет записанного занятия совпадает с накоплением анализатора."""
+        schedule = PatternSchedule(get_pattern('swing_eighths'), 97, self.clock.time() + 0.5)
+        self.analyzer.set_schedule(schedule)
+        hits = np.sort(self.rng.uniform(self.clock.time(), self.clock.time() + 60.0, 500))
+        for hit_time in hits.tolist():
+            self.analyzer.analyze_hit(hit_time)
+
+        recomputed = GrooveProfile.from_schedule(schedule, hits)
+        np.testing.assert_array_equal(recomputed.counts, self.analyzer.groove.counts)
+        np.testing.assert_allclose(recomputed.means, self.analyzer.groove.means, atol=1e-9)
+        np.testing.assert_array_equal(recomputed.histogram, self.analyzer.groove.histogram)
+
+        # Векторный поиск ближайших нот совпадает с поштучным
+        indices, note_times, offsets = schedule.nearest_notes(hits)
+        for hit_time, index, offset in zip(hits.tolist(), indices.tolist(), offsets.tolist()):
+            expected_index, _, expected_offset = schedule.nearest_note(hit_time)
+            self.assertEqual(index, expected_index)
+            self.assertAlmostEqual(offset, expected_offset)
+
+if __name__ == '__main__':
+    unittest.main()
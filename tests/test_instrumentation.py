@@ -0,0 +1,85 @@
+import unittest
+import tempfile
+import shutil
+import json
+import csv
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import instrumentation
+from instrumentation import LatencyHistogram, PipelineMetrics
+
+class TestInstrumentation(unittest.TestCase):
+    """Тесты для метрик задержек и джиттера."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Очистка после каждого теста."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_histogram_percentiles(self):
+        """Тест оценки перцентилей по логарифмическим корзинам."""
+        histogram = LatencyHistogram()
+        for _ in range(99):
+            histogram.record(0.001)
+        histogram.record(0.05)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.max, 0.05)
+        # Ширина корзины - 1/20 порядка, т.е. около 12%
+        self.assertAlmostEqual(histogram.percentile(50), 0.001, delta=0.00013)
+        self.assertAlmostEqual(histogram.percentile(100), 0.05, delta=0.006)
+
+    def test_histogram_out_of_range(self):
+        """Тест значений за пределами диапазона корзин."""
+        histogram = LatencyHistogram(min_value=1e-3, max_value=1.0)
+        histogram.record(0.0)
+        histogram.record(5.0)
+        self.assertEqual(histogram.counts[0], 1)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertEqual(histogram.percentile(100), 5.0)
+
+    def test_record_status_flags(self):
+        """Тест подсчета флагов xrun."""
+        metrics = PipelineMetrics()
+        metrics.record_status(2)
+        metrics.record_status(2 | 4)
+        self.assertEqual(metrics.counters['xrun.input_overflow'], 2)
+        self.assertEqual(metrics.counters['xrun.output_underflow'], 1)
+
+    def test_export(self):
+        """Тест экспорта метрик в JSON и CSV."""
+        metrics = PipelineMetrics()
+        metrics.record(instrumentation.CALLBACK_DURATION, 0.0004)
+        metrics.record(instrumentation.QUEUE_DEPTH, 3)
+        metrics.set_info('block_size', 128)
+        metrics.increment('xrun.input_overflow')
+
+        json_path = os.path.join(self.tmp_dir, 'metrics.json')
+        csv_path = os.path.join(self.tmp_dir, 'metrics.csv')
+        metrics.export_json(json_path)
+        metrics.export_csv(csv_path)
+
+        with open(json_path) as f:
+            data = json.load(f)
+        self.assertEqual(data['info']['block_size'], 128)
+        self.assertEqual(data['histograms'][instrumentation.CALLBACK_DURATION]['count'], 1)
+
+        with open(csv_path) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][0], 'metric')
+        self.assertEqual({row[0] for row in rows[1:]},
+                         {instrumentation.CALLBACK_DURATION, instrumentation.QUEUE_DEPTH,
+                          'xrun.input_overflow'})
+
+        # Сводка для панели содержит все метрики
+        self.assertEqual(len(metrics.summary_lines()), 3)
+
+if __name__ == '__main__':
+    unittest.main()
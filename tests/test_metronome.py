@@ -24,6 +24,7 @@ sys.modules['kivy.uix.relativelayout'] = MagicMock()
 sys.modules['kivy.uix.widget'] = MagicMock()
 sys.modules['kivy.clock'] = MagicMock()
 sys.modules['kivy.graphics'] = MagicMock()
+sys.modules['kivy.graphics.texture'] = MagicMock()
 sys.modules['kivy.core.audio'] = MagicMock()
 
 # Теперь импортируем модули из main.py
@@ -0,0 +1,105 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from monitoring_bridge import MonitoringBridge
+
+class TestMonitoringBridge(unittest.TestCase):
+    """Тесты для моста мониторинга между разными устройствами."""
+
+    def run_clocks(self, bridge, drift_ppm, seconds, block_size=256, signal=None):
+        """
+        Прогон потоков ввода и вывода с независимыми генераторами
+
+        Returns:
+            tuple: (заполнение перед каждым чтением, склеенный вывод)
+        """
+        input_interval = block_size / (bridge.input_rate * (1 + drift_ppm * 1e-6))
+        output_interval = block_size / bridge.output_rate
+        if signal is None:
+            signal = np.zeros(int(seconds * bridge.input_rate * 1.01) + block_size, dtype=np.float32)
+
+        input_time = output_time = 0.0
+        position = 0
+        fills, output = [], []
+        while output_time < seconds:
+            if input_time <= output_time:
+                bridge.write(signal[position:position + block_size])
+                position += block_size
+                input_time += input_interval
+            else:
+                fills.append(bridge.fill)
+                output.append(bridge.read(block_size).copy())
+                output_time += output_interval
+        return np.array(fills), np.concatenate(output)
+
+    def test_latency_stays_bounded_with_drift(self):
+        """Тест постоянной задержки при расхождении генераторов в обе стороны."""
+        for drift_ppm in (300, -300):
+            bridge = MonitoringBridge(48000, block_size=256, target_latency=0.01)
+            fills, _ = self.run_clocks(bridge, drift_ppm, seconds=120)
+
+            self.assertEqual(bridge.underruns, 0)
+            self.assertEqual(bridge.overruns, 0)
+            # После установления задержка держится около цели с точностью до блока
+            settled = fills[len(fills) // 2:]
+            self.assertLess(np.max(np.abs(settled - bridge.target_fill)), 2 * 256)
+            # Интегральная составляющая компенсирует дрейф в нужную сторону
+            self.assertEqual(np.sign(bridge.integral), np.sign(drift_ppm))
+
+    def test_rate_conversion_preserves_pitch(self):
+        """Тест вывода на другой частоте без изменения высоты звука."""
+        bridge = MonitoringBridge(44100, 48000, block_size=256)
+        t = np.arange(5 * 44100) / 44100.0
+        tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+        _, output = self.run_clocks(bridge, 0, seconds=4, signal=tone)
+
+        tail = output[-48000:]
+        spectrum = np.abs(np.fft.rfft(tail * np.hanning(len(tail))))
+        self.assertAlmostEqual(np.argmax(spectrum) * 48000 / len(tail), 440, delta=2)
+
+    def test_underrun_recovers_after_refill(self):
+        """Тест восстановления после пропуска данных ввода."""
+        bridge = MonitoringBridge(48000, block_size=128)
+        block = np.ones(128, dtype=np.float32)
+        for _ in range(8):
+            bridge.write(block)
+        self.assertTrue(np.all(bridge.read(128) == 1.0))
+
+        # Ввод остановился - вывод опустошает буфер и переходит на тишину
+        for _ in range(8):
+            output = bridge.read(128)
+        self.assertEqual(bridge.underruns, 1)
+        self.assertTrue(np.all(output == 0.0))
+
+        for _ in range(8):
+            bridge.write(block)
+        self.assertTrue(np.all(bridge.read(128) == 1.0))
+
+    def test_overrun_resync_in_output_thread(self):
+        """Тест: при переполнении поток ввода только считает его, позицию сбрасывает read."""
+        bridge = MonitoringBridge(48000, block_size=128, buffer_seconds=0.1)
+        ramp = np.arange(128, dtype=np.float32)
+        for _ in range(8):
+            bridge.write(ramp)
+        bridge.read(128)
+        position = bridge.read_position
+
+        # Вывод остановился, ввод переполняет буфер
+        for number in range(100):
+            bridge.write(ramp + number)
+        self.assertGreater(bridge.overruns, 0)
+        self.assertEqual(bridge.read_position, position)
+
+        output = bridge.read(128)
+        self.assertEqual(bridge.underruns, 0)
+        self.assertAlmostEqual(bridge.fill, bridge.target_fill - 128 * bridge.ratio, delta=1.0)
+        # Вывод - свежие сэмплы, а не перезаписанные
+        self.assertGreaterEqual(output.min(), 90.0)
+
+if __name__ == '__main__':
+    unittest.main()
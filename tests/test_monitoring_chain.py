@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import instrumentation
+from instrumentation import PipelineMetrics
+from monitoring_chain import BlockBiquad, MonitoringChain, biquad_coefficients, db_to_gain
+
+SAMPLE_RATE = 48000
+
+def direct_form_1(x, coefficients):
+    """Эталонная фильтрация по сэмплам"""
+    b0, b1, b2, a1, a2 = coefficients
+    y = np.zeros(len(x))
+    x1 = x2 = y1 = y2 = 0.0
+    for n, value in enumerate(x):
+        y[n] = b0 * value + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2
+        x2, x1 = x1, value
+        y2, y1 = y1, y[n]
+    return y
+
+class TestMonitoringChain(unittest.TestCase):
+    """Тесты для цепочки эффектов мониторинга."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.metrics = PipelineMetrics()
+
+    def test_block_biquad_matches_direct_form(self):
+        """Тест совпадения блочного фильтра с поэлементной рекурсией при разных размерах блоков."""
+        coefficients = biquad_coefficients('peaking', 800.0, 0.9, 6.0, SAMPLE_RATE)
+        signal = np.random.default_rng(0).uniform(-0.5, 0.5, 3000).astype(np.float32)
+        expected = direct_form_1(signal.astype(np.float64), coefficients)
+
+        # Блоки длиннее куска фильтра тоже обрабатываются целиком
+        biquad = BlockBiquad(coefficients, chunk=48)
+        out = np.empty(256, dtype=np.float32)
+        result = []
+        start = 0
+        sizes = [1, 1, 256, 7, 128, 2, 64, 255]
+        while start < len(signal):
+            size = sizes[len(result)] if len(result) < len(sizes) else 100
+            block = signal[start:start + size]
+            result.append(biquad.process(block, out).copy())
+            start += len(block)
+
+        np.testing.assert_allclose(np.concatenate(result), expected, atol=1e-4)
+
+    def test_gate_closes_and_reopens(self):
+        """Тест закрытия гейта на тишине с плавным спадом и открытия на ударе."""
+        chain = MonitoringChain(SAMPLE_RATE, effects={'gate_threshold_db': -40.0, 'soft_clip': False})
+        quiet = np.full(480, db_to_gain(-60.0), dtype=np.float32)
+        loud = np.full(480, 0.5, dtype=np.float32)
+
+        np.testing.assert_allclose(chain.process(loud), loud)
+        # 50 мс удержания, затем 50 мс плавного закрытия блоками по 10 мс
+        outputs = [chain.process(quiet).copy() for _ in range(12)]
+        np.testing.assert_allclose(outputs[3], quiet)
+        ramp = outputs[5]
+        self.assertLess(ramp[-1], ramp[0])
+        self.assertTrue(np.all(np.diff(ramp) <= 0))
+        self.assertFalse(np.any(outputs[-1]))
+
+        # Открывается за один блок
+        opened = chain.process(loud)
+        self.assertAlmostEqual(float(opened[-1]), 0.5, places=5)
+
+    def test_interleave_formats_and_metrics(self):
+        """Тест вывода во всех форматах и метрик обработки."""
+        block = np.array([0.5, -1.0, 0.25, 2.0], dtype=np.float32)
+        for sample_format, dtype, expected in [('float32', np.float32, [0.5, -1.0, 0.25, 2.0]),
+                                               ('int16', np.int16, [16384, -32768, 8192, 32767])]:
+            chain = MonitoringChain(SAMPLE_RATE, output_channels=2, sample_format=sample_format)
+            data = np.frombuffer(chain.interleave(block), dtype=dtype).reshape(-1, 2)
+            np.testing.assert_array_equal(data[:, 0], expected)
+            np.testing.assert_array_equal(data[:, 1], expected)
+
+        chain = MonitoringChain(SAMPLE_RATE, output_channels=1, sample_format='int24')
+        data = np.frombuffer(chain.interleave(block), dtype=np.uint8).reshape(-1, 3)
+        values = (data[:, 2].astype(np.int8).astype(np.int32) << 16) | (data[:, 1].astype(np.int32) << 8) | data[:, 0]
+        np.testing.assert_array_equal(values, [1 << 22, -(1 << 23), 1 << 21, (1 << 23) - 1])
+
+        chain = MonitoringChain(SAMPLE_RATE, max_block=256, effects={'bass_db': 6.0, 'treble_db': -3.0},
+                                volume=0.5, metrics=self.metrics)
+        samples = np.full(256, 1 << 14, dtype=np.int16)
+        processed = chain.process(samples, full_scale=float(1 << 15))
+        self.assertEqual(processed.dtype, np.float32)
+        self.assertTrue(np.all(np.abs(processed) <= 0.5))
+        self.assertEqual(self.metrics.histogram(instrumentation.MONITOR_DSP).count, 1)
+        self.assertIn(instrumentation.MONITOR_DSP_LOAD, self.metrics.gauges)
+        # Результат - срез заранее выделенного буфера
+        self.assertTrue(np.shares_memory(processed, chain._buffer) or np.shares_memory(processed, chain._spare))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from audio_processor import AudioProcessor
+from clocks import VirtualClock
+from pentatonic import (PentatonicTrainer, BOXES, DEGREES, POSITIONS, BOX_COUNT, MAX_FRET,
+                        STANDARD_TUNING, frequency_to_midi)
+
+SAMPLE_RATE = 48000
+# Длина щипка: короче интервала между onset, чтобы каждый дал одно событие
+PLUCK_LENGTH = SAMPLE_RATE // 10
+
+def midi_frequency(midi):
+    """Частота ноты MIDI"""
+    return 440.0 * 2.0 ** ((midi - 69) / 12.0)
+
+def pluck(frequency, count):
+    """Щипок струны: основная частота с обертонами и затуханием"""
+    times = np.arange(count) / SAMPLE_RATE
+    signal = sum(np.sin(2 * np.pi * frequency * k * times) / k for k in range(1, 6))
+    return (0.5 * signal * np.exp(-times * 30.0)).astype(np.float32)
+
+class TestPentatonicTables(unittest.TestCase):
+    """Тесты для таблиц ступеней и позиций пентатоники."""
+
+    def test_boxes_and_lookup(self):
+        """Тест первой позиции ля минора и таблиц для всех тональностей."""
+        # Ля минор, первая позиция: 5-8, 5-7, 5-7, 5-7, 5-8, 5-8
+        frets = [fret for _, _, fret in BOXES[9][0]]
+        self.assertEqual(frets, [5, 8, 5, 7, 5, 7, 5, 7, 5, 8, 5, 8])
+        self.assertEqual(POSITIONS[9][0][45], ((0, 5),))
+        self.assertEqual(POSITIONS[9][0][47], ())
+        self.assertEqual(frequency_to_midi(110.0), 45)
+
+        for key in range(12):
+            for box in range(BOX_COUNT):
+                notes = BOXES[key][box]
+                midis = [midi for midi, _, _ in notes]
+                self.assertEqual(midis, sorted(midis))
+                for midi, string, fret in notes:
+                    self.assertTrue(0 <= fret <= MAX_FRET)
+                    self.assertEqual(STANDARD_TUNING[string] + fret, midi)
+                    self.assertGreaterEqual(DEGREES[key, midi], 0)
+                    self.assertIn((string, fret), POSITIONS[key][box][midi])
+            # Пять ступеней в каждой октаве
+            self.assertEqual(np.count_nonzero(DEGREES[key, 48:60] >= 0), 5)
+
+        # Ступени ля минора: ля - 1, до - b3, ми - 5; си не из гаммы
+        self.assertEqual(DEGREES[9, 57], 0)
+        self.assertEqual(DEGREES[9, 60], 1)
+        self.assertEqual(DEGREES[9, 64], 3)
+        self.assertEqual(DEGREES[9, 59], -1)
+
+class TestPentatonicTrainer(unittest.TestCase):
+    """Тесты для оценки ударов упражнением."""
+
+    def test_judge_timing_and_note(self):
+        """Тест оценки времени и высоты удара и продвижения по позиции."""
+        clock = VirtualClock(start=100.0)
+        trainer = PentatonicTrainer(key=9, box=0, clock=clock)
+        self.assertIsNone(trainer.judge(100.0, 110.0))
+        trainer.start(120)
+
+        # Верная нота вовремя (ля второй октавы на 5 ладу шестой струны)
+        result = trainer.judge(100.5, midi_frequency(45) * 1.01)
+        self.assertTrue(result['correct'])
+        self.assertTrue(result['on_time'])
+        self.assertEqual(result['positions'], ((0, 5),))
+        self.assertEqual(trainer.expected[0], 48)
+
+        # Нота из гаммы, но не та, и не вовремя: упражнение ждет ту же ноту
+        result = trainer.judge(100.7, midi_frequency(50))
+        self.assertFalse(result['correct'])
+        self.assertTrue(result['in_scale'])
+        self.assertFalse(result['on_time'])
+        self.assertEqual(trainer.expected[0], 48)
+
+        # Нота не из гаммы и удар без высоты
+        self.assertFalse(trainer.judge(101.5, midi_frequency(47))['in_scale'])
+        self.assertIsNone(trainer.judge(102.0, None)['played'])
+
+        stats = trainer.get_stats()
+        self.assertEqual(stats['total_hits'], 4)
+        self.assertAlmostEqual(stats['note_accuracy'], 0.25)
+        self.assertAlmostEqual(stats['timing_accuracy'], 0.75)
+        self.assertAlmostEqual(stats['perfect'], 0.25)
+        self.assertEqual(len(trainer.summary_lines()), 4)
+
+        # Проход вверх и вниз без повтора крайних нот
+        self.assertEqual(len(trainer.sequence), 22)
+        self.assertEqual(trainer.sequence[11], 72)
+        self.assertEqual(trainer.sequence[-1], 48)
+
+class TestOnsetPitch(unittest.TestCase):
+    """Тесты для высоты удара по окну после onset."""
+
+    def test_pitch_for_each_onset(self):
+        """Тест: высота каждого щипка приходит в pitch_callback со временем его onset."""
+        with patch('audio_processor.pyaudio.PyAudio'):
+            clock = VirtualClock(start=50.0)
+            processor = AudioProcessor(threshold=0.05, clock=clock)
+        processor.channels = 1
+        processor.sample_rate = SAMPLE_RATE
+        processor._reset_analysis()
+        processor.set_pitch_tracking(True)
+        results = []
+        processor.pitch_callback = lambda timestamp, frequency, clarity: results.append((timestamp, frequency))
+
+        # Короткие щипки нот первой позиции ля минора раз в полсекунды, блоками по 480 сэмплов
+        notes = (45, 48, 50, 52, 55)
+        signal = np.zeros(SAMPLE_RATE * 3, dtype=np.float32)
+        for number, midi in enumerate(notes):
+            start = SAMPLE_RATE // 2 * (number + 1)
+            signal[start:start + PLUCK_LENGTH] = pluck(midi_frequency(midi), PLUCK_LENGTH)
+        for start in range(0, len(signal), 480):
+            clock.advance(0.01)
+            block = signal[start:start + 480]
+            processor._process_block(block.tobytes(), len(block))
+            processor.process_pending()
+
+        self.assertEqual(len(results), len(notes))
+        onset_times = np.array([timestamp for timestamp, _ in results])
+        self.assertTrue(np.all(np.abs(onset_times - (50.5 + 0.5 * np.arange(len(notes)))) < 0.02))
+        self.assertEqual([frequency_to_midi(frequency) for _, frequency in results], list(notes))
+
+        processor.set_pitch_tracking(False)
+        self.assertIsNone(processor.pitch_detector)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import MagicMock
+import contextlib
+import io
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pitch import PitchDetector, note_from_frequency
+from ring_buffer import AudioRingBuffer
+
+SAMPLE_RATE = 48000
+
+def plucked(frequency, count, rng):
+    """Струна: слабая основная частота, убывающие обертоны со случайными фазами и шум"""
+    times = np.arange(count) / SAMPLE_RATE
+    signal = sum((0.3 / k if k > 1 else 0.1) * np.sin(2 * np.pi * frequency * k * times + rng.uniform(0, 2 * np.pi))
+                 for k in range(1, 9))
+    return (signal + 0.01 * rng.normal(size=count)).astype(np.float32)
+
+def direct_difference(frame, window, max_lag):
+    """Разностная функция YIN по определению, O(n^2)"""
+    frame = frame.astype(np.float64)
+    return np.array([np.sum((frame[:window] - frame[lag:lag + window]) ** 2) for lag in range(max_lag + 1)])
+
+def load_tuner_display():
+    """TunerDisplay с настоящим Kivy (None, если Kivy замокан другими тестами или недоступен)"""
+    if isinstance(sys.modules.get('kivy'), MagicMock):
+        return None
+    try:
+        os.environ.setdefault('KIVY_NO_ARGS', '1')
+        with contextlib.redirect_stderr(io.StringIO()):
+            from main import TunerDisplay
+    except ImportError:
+        return None
+    return TunerDisplay
+
+class TestPitch(unittest.TestCase):
+    """Тесты для определения высоты тона."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.detector = PitchDetector(SAMPLE_RATE)
+        self.rng = np.random.default_rng(0)
+
+    def test_open_strings_within_a_cent(self):
+        """Тест: открытые струны (и си семиструнной) определяются с точностью до цента."""
+        strings = {'B1': 61.74, 'E2': 82.41, 'A2': 110.0, 'D3': 146.83, 'G3': 196.0, 'B3': 246.94, 'E4': 329.63}
+        for expected, frequency in strings.items():
+            result = self.detector.detect(plucked(frequency, self.detector.frame_size, self.rng))
+            self.assertIsNotNone(result, expected)
+            name, octave, cents = note_from_frequency(result[0])
+            self.assertEqual(f"{name}{octave}", expected)
+            self.assertLess(abs(1200 * np.log2(result[0] / frequency)), 1.0, expected)
+            self.assertGreater(result[1], 0.9)
+
+        # Расстроенная струна и другой строй ля
+        name, _, cents = note_from_frequency(110.0 * 2 ** (-12 / 1200))
+        self.assertEqual((name, round(cents)), ('A', -12))
+        self.assertEqual(note_from_frequency(432.0, reference=432.0)[:2], ('A', 4))
+
+        # Тишина и шум без периода
+        self.assertIsNone(self.detector.detect(np.zeros(self.detector.frame_size, dtype=np.float32)))
+        self.assertIsNone(self.detector.detect(self.rng.normal(0, 0.1, self.detector.frame_size).astype(np.float32)))
+
+    def test_fft_difference_matches_direct(self):
+        """Тест: разностная функция через БПФ совпадает с прямым расчетом."""
+        frame = plucked(146.83, self.detector.frame_size, self.rng)
+        self.detector.detect(frame)
+        expected = direct_difference(frame, self.detector.window, self.detector.max_lag)
+        np.testing.assert_allclose(self.detector._difference, expected, rtol=1e-6, atol=1e-6)
+
+    def test_ring_update_and_display(self):
+        """Тест чтения из кольцевого буфера входа и показа нот в тюнере."""
+        ring = AudioRingBuffer(4 * SAMPLE_RATE, np.int16, 32768.0)
+        self.assertIsNone(self.detector.update(ring))
+        ring.write(np.round(plucked(110.0 * 2 ** (7 / 1200), SAMPLE_RATE, self.rng) * 32767).astype(np.int16))
+        frequency, _ = self.detector.update(ring)
+        self.assertAlmostEqual(note_from_frequency(frequency)[2], 7.0, delta=1.0)
+        # Новых сэмплов нет - повторного расчета нет
+        self.assertIsNone(self.detector.update(ring))
+
+        display_class = load_tuner_display()
+        if display_class is None:
+            self.skipTest("Kivy или PyAudio недоступны")
+        display = display_class()
+        display.ring_source = lambda: (ring, SAMPLE_RATE)
+        for _ in range(3):
+            ring.write(np.round(plucked(82.41, 1600, self.rng) * 32767).astype(np.int16))
+            display.refresh(0)
+        self.assertTrue(display.text.startswith('E2'))
+        self.assertLess(abs(display.cents), 5.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+import gc
+import weakref
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import realtime
+from realtime import GCController
+from instrumentation import PipelineMetrics
+
+class Cycle:
+    """Объект со ссылкой на себя - собирается только полной сборкой"""
+    def __init__(self):
+        self.self = self
+
+class TestRealtime(unittest.TestCase):
+    """Тесты для режима реального времени."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.threshold = gc.get_threshold()
+        self.metrics = PipelineMetrics()
+        self.controller = GCController(self.metrics)
+
+    def tearDown(self):
+        """Очистка после каждого теста."""
+        self.controller.disable()
+        gc.set_threshold(*self.threshold)
+
+    def test_gc_collections_deferred_during_run(self):
+        """Тест откладывания полных сборок до паузы между подходами."""
+        # Без включения режима поведение GC не меняется
+        self.controller.begin_run()
+        self.assertEqual(gc.get_threshold(), self.threshold)
+
+        self.controller.enable()
+        self.assertGreater(gc.get_freeze_count(), 0)
+        self.assertEqual(self.metrics.info['realtime.gc'], 'freeze+deferred')
+
+        self.controller.begin_run()
+        self.assertEqual(gc.get_threshold()[2], realtime.DEFERRED_GEN2_THRESHOLD)
+        gc.collect(0)
+        self.assertIn('gc.pause.gen0', self.metrics.histograms)
+
+        # Циклы занятия, ставшие мусором после паузы, собираются: повторной заморозки нет
+        frozen = gc.get_freeze_count()
+        session = [Cycle() for _ in range(3)]
+        self.controller.end_run()
+        self.assertEqual(gc.get_threshold(), self.threshold)
+        self.assertIn('gc.idle_collect_ms', self.metrics.gauges)
+        self.assertEqual(gc.get_freeze_count(), frozen)
+        refs = [weakref.ref(cycle) for cycle in session]
+        del session
+        gc.collect()
+        self.assertEqual([ref() for ref in refs], [None] * 3)
+
+        self.controller.disable()
+        self.assertEqual(gc.get_freeze_count(), 0)
+        self.assertEqual(self.metrics.info['realtime.gc'], 'default')
+
+    def test_priority_falls_back_without_permissions(self):
+        """Тест отката к обычному планированию без прав на реальное время."""
+        with patch('realtime.is_supported', return_value=True), \
+                patch('realtime.os.sched_setscheduler', create=True, side_effect=PermissionError), \
+                patch('realtime.os.sched_param', create=True), \
+                patch('realtime.os.setpriority', create=True) as mock_setpriority:
+            self.assertEqual(realtime.set_thread_realtime(), f'nice:{realtime.FALLBACK_NICE}')
+
+            mock_setpriority.side_effect = PermissionError
+            self.assertEqual(realtime.set_thread_realtime(), 'SCHED_OTHER')
+
+    def test_affinity_plan_separates_audio_and_ui(self):
+        """Тест разделения ядер между аудио и интерфейсом."""
+        with patch('realtime.INITIAL_CPUS', [0, 1, 2, 3]):
+            audio_cpus, ui_cpus = realtime.plan_affinity()
+        self.assertEqual(audio_cpus, {3})
+        self.assertEqual(ui_cpus, {0, 1, 2})
+
+        with patch('realtime.INITIAL_CPUS', [0]):
+            self.assertEqual(realtime.plan_affinity(), (None, None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rhythm_patterns import PATTERNS, PatternSchedule, compile_pattern, get_pattern
+from rhythm_analyzer import RhythmAnalyzer
+
+class TestRhythmPatterns(unittest.TestCase):
+    """Тесты для компиляции и расписания ритмических паттернов."""
+
+    def test_all_builtin_patterns_compile(self):
+        """Тест компиляции всех встроенных паттернов."""
+        for key in PATTERNS:
+            pattern = get_pattern(key)
+            self.assertGreater(pattern.notes_per_bar, 0)
+            self.assertTrue(np.all(np.diff(pattern.offsets) > 0))
+
+    def test_swing_and_rests(self):
+        """Тест свинга и пауз."""
+        pattern = compile_pattern({
+            'meter': (2, 4),
+            'layers': [{'steps': 'Xx.x', 'swing': 2.0 / 3.0}]
+        })
+        np.testing.assert_allclose(pattern.offsets, [0.0, 2.0 / 3.0, 1.0 + 2.0 / 3.0])
+        np.testing.assert_array_equal(pattern.accents, [True, False, False])
+
+    def test_odd_meter_and_polyrhythm(self):
+        """Тест нечетного размера и наложения слоев."""
+        seven = get_pattern('seven_eight')
+        self.assertAlmostEqual(seven.bar_beats, 3.5)
+        self.assertEqual(len(seven.beat_offsets), 7)
+
+        # 3 на 2: общая первая доля объединяется в одну ноту с акцентом
+        poly = get_pattern('polyrhythm_3_2')
+        np.testing.assert_allclose(poly.offsets, [0.0, 2.0 / 3.0, 1.0, 4.0 / 3.0])
+        self.assertTrue(poly.accents[0])
+
+    def test_notes_between(self):
+        """Тест генерации нот для окна упреждения."""
+        schedule = PatternSchedule(get_pattern('eighths'), 120, 10.0)
+        times, accents, indices = schedule.notes_between(10.0, 12.0)
+
+        # Такт 4/4 при 120 BPM длится 2 секунды, в нем 8 восьмых
+        np.testing.assert_allclose(times, 10.0 + np.arange(8) * 0.25)
+        np.testing.assert_array_equal(indices, np.arange(8))
+        self.assertTrue(accents[0] and not accents[1])
+
+        # Соседние окна не пересекаются и не теряют ноты
+        first, _, _ = schedule.notes_between(9.0, 11.1)
+        second, _, _ = schedule.notes_between(11.1, 12.0)
+        np.testing.assert_allclose(np.concatenate([first, second]), times)
+
+    def test_nearest_note_and_tempo_change(self):
+        """Тест поиска ближайшей ноты и смены темпа."""
+        schedule = PatternSchedule(get_pattern('quarters'), 60, 0.0)
+        index, note_time, deviation = schedule.nearest_note(4.9)
+        self.assertEqual(index, 5)
+        self.assertAlmostEqual(deviation, -0.1)
+
+        # Смена темпа сохраняет позицию в такте
+        schedule.set_tempo(120, 2.0)
+        index, note_time, _ = schedule.nearest_note(2.5)
+        self.assertEqual(index, 3)
+        self.assertAlmostEqual(note_time, 2.5)
+
+    def test_rhythm_analyzer_uses_schedule(self):
+        """Тест анализа попаданий по расписанию паттерна."""
+        analyzer = RhythmAnalyzer(tolerance=0.1)
+        analyzer.start()
+        analyzer.set_schedule(PatternSchedule(get_pattern('eighths'), 60, 100.0))
+
+        is_accurate, deviation = analyzer.analyze_hit(100.52)
+        self.assertTrue(is_accurate)
+        self.assertAlmostEqual(deviation, 0.02)
+
+        is_accurate, _ = analyzer.analyze_hit(100.75)
+        self.assertFalse(is_accurate)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import sqlite3
+import tempfile
+import shutil
+import time
+import sys
+import os
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from session_history import SessionHistory, session_day
+
+DAY = 86400.0
+
+class TestSessionHistory(unittest.TestCase):
+    """Тесты для истории занятий."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.history = SessionHistory(':memory:')
+        # Полдень, чтобы смещение на дни не зависело от часового пояса
+        self.now = time.mktime((2026, 10, 19, 12, 0, 0, 0, 0, -1))
+
+    def tearDown(self):
+        """Очистка после каждого теста."""
+        self.history.close()
+
+    def save(self, started_at, bpm, offsets, tolerance=0.02):
+        """Занятие с ударами через секунду и заданными отклонениями"""
+        hits = [(started_at + number, offset, abs(offset) <= tolerance, bpm)
+                for number, offset in enumerate(offsets)]
+        return self.history.save_session(started_at, started_at + len(hits), 'quarters', bpm, hits)
+
+    def test_rollups_accumulate_per_day_and_tempo(self):
+        """Тест накопления сводок по дням и темпам."""
+        self.save(self.now, 120, [0.01, -0.01, 0.05])
+        self.save(self.now + 60, 120, [0.0, 0.03])
+        self.save(self.now + 120, 80, [0.01])
+
+        rows = self.history.connection.execute(
+            'SELECT bpm, sessions, total_hits, accurate_hits FROM rollups WHERE day = ? ORDER BY bpm',
+            (session_day(self.now),)).fetchall()
+        self.assertEqual(rows, [(80, 1, 1, 1), (120, 2, 5, 3)])
+
+        sessions = self.history.recent_sessions()
+        self.assertEqual(len(sessions), 3)
+        self.assertEqual(sessions[0]['bpm'], 80)
+        self.assertEqual(sessions[1]['total_hits'], 2)
+
+    def test_accuracy_trend_filters_days_and_tempo(self):
+        """Тест тренда точности по дням с фильтром по темпу и глубине истории."""
+        self.save(self.now - 100 * DAY, 130, [0.0] * 4)  # Старше 90 дней
+        self.save(self.now - 2 * DAY, 140, [0.0, 0.05])
+        self.save(self.now - 2 * DAY, 100, [0.05] * 3)   # Медленнее 120 BPM
+        self.save(self.now, 120, [0.01, 0.03, 0.03, 0.03])
+
+        trend = self.history.accuracy_trend(days=90, min_bpm=120, now=self.now)
+        self.assertEqual([row['day'] for row in trend],
+                         [session_day(self.now - 2 * DAY), session_day(self.now)])
+        self.assertEqual(trend[0]['total_hits'], 2)
+        self.assertAlmostEqual(trend[0]['accuracy'], 0.5)
+        self.assertAlmostEqual(trend[1]['accuracy'], 0.25)
+        self.assertAlmostEqual(trend[1]['avg_offset'], 0.025)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        """Тест совпадения пересчитанных сводок с накопленными."""
+        for number in range(5):
+            self.save(self.now - number * DAY, 100 + 10 * (number % 2), [0.01 * number, -0.02, 0.04])
+        query = 'SELECT * FROM rollups ORDER BY day, bpm'
+        incremental = self.history.connection.execute(query).fetchall()
+
+        self.history.rebuild_rollups()
+        rebuilt = self.history.connection.execute(query).fetchall()
+        self.assertEqual(len(rebuilt), len(incremental))
+        for row, expected in zip(rebuilt, incremental):
+            self.assertEqual(row[:5], expected[:5])
+            self.assertAlmostEqual(row[5], expected[5])
+            self.assertAlmostEqual(row[6], expected[6])
+
+    def test_hit_chords_and_migration(self):
+        """Тест сохранения аккордов ударов и перехода базы первой версии на новую схему."""
+        hits = [(self.now + number, 0.0, True, 90) for number in range(4)]
+        chords = {self.now: ('G', 0.9), self.now + 1: ('C', 0.8), self.now + 3: ('G', 0.7)}
+        session_id = self.history.save_session(self.now, self.now + 4, 'strum', 90, hits, chords)
+        rows = self.history.session_chords(session_id)
+        self.assertEqual([(row['chord'], row['hits']) for row in rows], [('G', 2), ('C', 1)])
+        self.assertAlmostEqual(rows[0]['avg_confidence'], 0.8)
+        # Удар без аккорда сохраняется с пустым аккордом
+        missing = self.history.connection.execute(
+            'SELECT COUNT(*) FROM hits WHERE session_id = ? AND chord IS NULL', (session_id,)).fetchone()[0]
+        self.assertEqual(missing, 1)
+
+        # Старая база: таблица ударов без столбцов аккорда
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'history.db')
+            connection = sqlite3.connect(path)
+            connection.execute('CREATE TABLE hits (session_id INTEGER NOT NULL, time REAL NOT NULL, '
+                               'deviation REAL NOT NULL, accurate INTEGER NOT NULL, bpm INTEGER NOT NULL)')
+            connection.execute('PRAGMA user_version=1')
+            connection.commit()
+            connection.close()
+
+            history = SessionHistory(path)
+            session_id = history.save_session(self.now, self.now + 4, 'strum', 90, hits, chords)
+            self.assertEqual(len(history.session_chords(session_id)), 2)
+            self.assertEqual(history.connection.execute('PRAGMA user_version').fetchone()[0], 2)
+            history.close()
+        finally:
+            shutil.rmtree(temp_dir)
+
+if __name__ == '__main__':
+    unittest.main()
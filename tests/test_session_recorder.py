@@ -0,0 +1,121 @@
+import unittest
+import tempfile
+import shutil
+import wave
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from session_recorder import SessionRecorder, WAV_HEADER_SIZE
+
+SAMPLE_RATE = 8000
+BLOCK_SIZE = 128
+
+class TestSessionRecorder(unittest.TestCase):
+    """Тесты для записи занятия на диск."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'session.wav')
+
+    def tearDown(self):
+        """Очистка после каждого теста."""
+        shutil.rmtree(self.temp_dir)
+
+    def feed(self, recorder, samples):
+        """Подача сэмплов блоками, как из audio_callback"""
+        step = BLOCK_SIZE * recorder.channels
+        for start in range(0, len(samples), step):
+            block = samples[start:start + step]
+            recorder.write(block, 100.0 + (start + len(block)) / recorder.channels / SAMPLE_RATE)
+
+    def test_wav_roundtrip_with_events(self):
+        """Тест записи WAV и событий со временем от начала записи."""
+        recorder = SessionRecorder(self.path, SAMPLE_RATE, sample_format='int16', writer_interval=0.01)
+        recorder.start()
+        samples = (np.arange(SAMPLE_RATE) % 1000 - 500).astype(np.int16)
+        self.feed(recorder, samples)
+        recorder.add_event('beat', 100.5)
+        recorder.add_event('onset', 100.52, 0.3)
+        recorder.stop()
+
+        with wave.open(self.path, 'rb') as f:
+            self.assertEqual(f.getframerate(), SAMPLE_RATE)
+            self.assertEqual(f.getsampwidth(), 2)
+            recorded = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        np.testing.assert_array_equal(recorded, samples)
+
+        with open(recorder.events_path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], 'kind,time,value')
+        kind, event_time, value = lines[2].split(',')
+        self.assertEqual(kind, 'onset')
+        self.assertAlmostEqual(float(event_time), 0.52, places=5)
+        self.assertAlmostEqual(float(value), 0.3)
+
+    def test_memmap_multichannel_truncated_on_stop(self):
+        """Тест записи всех каналов в заранее выделенный файл и обрезки при остановке."""
+        recorder = SessionRecorder(self.path, SAMPLE_RATE, channels=2, sample_format='int24',
+                                   mode='memmap', max_seconds=10.0, writer_interval=0.01)
+        recorder.start()
+        self.assertGreaterEqual(os.path.getsize(self.path), WAV_HEADER_SIZE + 10 * SAMPLE_RATE * 2 * 3)
+
+        samples = np.empty(2 * SAMPLE_RATE, dtype=np.int32)
+        samples[0::2] = np.arange(SAMPLE_RATE) * 100
+        samples[1::2] = -np.arange(SAMPLE_RATE) * 100
+        self.feed(recorder, samples)
+        recorder.stop()
+
+        self.assertEqual(os.path.getsize(self.path), WAV_HEADER_SIZE + SAMPLE_RATE * 2 * 3)
+        with wave.open(self.path, 'rb') as f:
+            self.assertEqual(f.getnchannels(), 2)
+            self.assertEqual(f.getsampwidth(), 3)
+            raw = np.frombuffer(f.readframes(f.getnframes()), dtype=np.uint8).reshape(-1, 3)
+        decoded = (raw[:, 2].astype(np.int8).astype(np.int32) << 16) | (raw[:, 1].astype(np.int32) << 8) | raw[:, 0]
+        np.testing.assert_array_equal(decoded, samples)
+
+    def test_writer_overrun_keeps_timeline(self):
+        """Тест замены потерянных сэмплов тишиной при отставании потока записи."""
+        recorder = SessionRecorder(self.path, SAMPLE_RATE, buffer_seconds=0.5, writer_interval=60.0)
+        recorder.start()
+        # Поток записи спит, а звука приходит больше емкости буфера
+        self.feed(recorder, np.ones(SAMPLE_RATE, dtype=np.float32))
+        recorder.stop()
+
+        self.assertEqual(recorder.frames_written, SAMPLE_RATE)
+        self.assertEqual(recorder.dropped_frames, SAMPLE_RATE // 2)
+        with open(self.path, 'rb') as f:
+            f.seek(WAV_HEADER_SIZE)
+            recorded = np.frombuffer(f.read(), dtype=np.float32)
+        np.testing.assert_array_equal(recorded[:SAMPLE_RATE // 2], 0.0)
+        np.testing.assert_array_equal(recorded[SAMPLE_RATE // 2:], 1.0)
+
+    def test_pauses_fill_gaps(self):
+        """Тест: каждая пауза входа заполняется тишиной один раз, сколько бы их ни было."""
+        recorder = SessionRecorder(self.path, SAMPLE_RATE, sample_format='int16', writer_interval=0.01)
+        recorder.start()
+        ones = np.ones(SAMPLE_RATE, dtype=np.int16)
+        # Секунда звука, секунда паузы - трижды
+        for second in (0, 2, 4):
+            if second:
+                recorder.pause()
+                # Блоки во время паузы (поток на старых параметрах) не записываются
+                recorder.write(ones[:BLOCK_SIZE], 100.0 + second - 0.5)
+                recorder.resume()
+            for start in range(0, SAMPLE_RATE, BLOCK_SIZE):
+                recorder.write(ones[start:start + BLOCK_SIZE],
+                               100.0 + second + (start + BLOCK_SIZE) / SAMPLE_RATE)
+        recorder.stop()
+
+        with wave.open(self.path, 'rb') as f:
+            recorded = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        self.assertEqual(len(recorded), 5 * SAMPLE_RATE)
+        self.assertEqual(recorder.dropped_frames, 0)
+        np.testing.assert_array_equal(recorded.reshape(5, SAMPLE_RATE).max(axis=1), [1, 0, 1, 0, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from clocks import VirtualClock
+from soak_harness import SyntheticGuitar, MetronomeProbe, check_limits, run_soak, DEFAULT_LIMITS
+
+def pipeline_available():
+    """Прогон возможен с настоящим Kivy и PyAudio"""
+    if isinstance(sys.modules.get('kivy'), MagicMock):
+        return False
+    try:
+        import pyaudio
+        import kivy
+    except ImportError:
+        return False
+    return True
+
+def make_sample(time, rss_mb=100.0, objects=1000, queue_depth=1, canvas=20, drift=10.0):
+    """Снимок состояния для проверки границ"""
+    return {'time': time, 'rss_mb': rss_mb, 'objects': objects, 'queue_depth': queue_depth,
+            'canvas_instructions': canvas, 'notes': 3, 'metronome_drift_ms': drift,
+            'total_hits': 0, 'accuracy': 1.0}
+
+class TestSoakHarness(unittest.TestCase):
+    """Тесты для длительного прогона с проверкой роста памяти."""
+
+    def test_limits_growth_after_warmup(self):
+        """Тест роста от первого снимка после прогрева и нарушений границ."""
+        samples = [make_sample(0, rss_mb=50.0, objects=100),
+                   make_sample(60, rss_mb=100.0, objects=1000),
+                   make_sample(120, rss_mb=110.0, objects=1200, queue_depth=150),
+                   make_sample(180, rss_mb=105.0, objects=1100, canvas=500)]
+        peaks, violations = check_limits(samples, DEFAULT_LIMITS, warmup=60)
+        self.assertAlmostEqual(peaks['rss_growth_mb'], 10.0)
+        self.assertEqual(peaks['object_growth'], 200)
+        self.assertEqual(len(violations), 2)
+        self.assertTrue(violations[0].startswith('queue_depth'))
+        self.assertTrue(violations[1].startswith('canvas_instructions'))
+
+        # Без границы величина не проверяется
+        _, violations = check_limits(samples, dict(DEFAULT_LIMITS, queue_depth=None, canvas_instructions=None), 60)
+        self.assertEqual(violations, [])
+
+    def test_synthetic_signal_and_metronome_probe(self):
+        """Тест щелчков на стыке блоков и отклонения щелчков метронома от сетки."""
+        guitar = SyntheticGuitar(1000, 100, start_time=10.0)
+        guitar.add_hit(10.19)  # Щелчок начинается за 10 сэмплов до конца второго блока
+        blocks = [guitar.next_block().copy() for _ in range(3)]
+        signal = np.concatenate(blocks)
+        self.assertEqual(int(np.argmax(signal)), 190)
+        np.testing.assert_allclose(signal[190:220] - guitar.noise[190:220], guitar.click[:30], atol=1e-6)
+        self.assertEqual(len(guitar.hits), 1)
+        guitar.next_block()
+        self.assertEqual(len(guitar.hits), 0)
+
+        clock = VirtualClock(start=100.0)
+        probe = MetronomeProbe(clock)
+        probe.set_grid(100.0, 0.5)
+        clock.advance(0.51)
+        probe.play()
+        clock.advance(0.5)
+        probe.play()
+        self.assertAlmostEqual(probe.take_drift(), 0.01)
+        self.assertEqual(probe.take_drift(), 0.0)
+        self.assertEqual(probe.clicks, 2)
+
+    def test_lagging_processing_stays_bounded(self):
+        """Тест прогона с отстающим потоком обработки: очередь и canvas не растут."""
+        if not pipeline_available():
+            self.skipTest("Kivy или PyAudio недоступны")
+
+        report = run_soak(hours=0.05, sample_interval=20.0, warmup=20.0, processing_interval=7.0,
+                          frame_interval=0.05, limits={'metronome_drift_ms': 55.0})
+        self.assertEqual(report['violations'], [])
+        self.assertEqual(len(report['samples']), 9)
+        self.assertGreater(report['counters']['queue.dropped'], 0)
+        self.assertLessEqual(report['peaks']['queue_depth'], DEFAULT_LIMITS['queue_depth'])
+        self.assertEqual(report['stats']['accuracy'], 1.0)
+        self.assertGreater(report['metronome_clicks'], 300)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import MagicMock
+import contextlib
+import io
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import instrumentation
+from instrumentation import PipelineMetrics
+from ring_buffer import AudioRingBuffer
+from spectrum import SpectrumAnalyzer, spectrogram_palette, SPECTRUM_MIN_DB, SPECTROGRAM_HISTORY
+
+SAMPLE_RATE = 48000
+
+def load_spectrum_view():
+    """SpectrumView с настоящим Kivy (None, если Kivy замокан другими тестами или недоступен)"""
+    if isinstance(sys.modules.get('kivy'), MagicMock):
+        return None
+    try:
+        os.environ.setdefault('KIVY_NO_ARGS', '1')
+        with contextlib.redirect_stderr(io.StringIO()):
+            from main import SpectrumView
+    except ImportError:
+        return None
+    return SpectrumView
+
+class TestSpectrum(unittest.TestCase):
+    """Тесты для анализатора спектра."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.analyzer = SpectrumAnalyzer(SAMPLE_RATE)
+        times = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        # 375 Гц попадает точно в бин БПФ на 4096 точек при 48 кГц
+        self.sine = (0.5 * np.sin(2 * np.pi * 375.0 * times)).astype(np.float32)
+
+    def test_sine_peak_and_formats(self):
+        """Тест уровня и полосы пика синусоиды для буферов float32 и int16."""
+        ring = AudioRingBuffer(4 * SAMPLE_RATE)
+        ring.write(self.sine)
+        self.assertTrue(self.analyzer.update(ring))
+        # Новых сэмплов нет - спектр не пересчитывается
+        self.assertFalse(self.analyzer.update(ring))
+
+        peak = int(np.argmax(self.analyzer.levels))
+        self.assertAlmostEqual(float(self.analyzer.levels[peak]), 20 * np.log10(0.5), delta=0.1)
+        self.assertLess(abs(np.log2(self.analyzer.band_freqs[peak] / 375.0)), 0.05)
+        self.assertLess(float(np.median(self.analyzer.levels)), -60.0)
+
+        int_ring = AudioRingBuffer(4 * SAMPLE_RATE, np.int16, 32768.0)
+        int_ring.write(np.round(self.sine * 32768.0).astype(np.int16))
+        analyzer = SpectrumAnalyzer(SAMPLE_RATE)
+        analyzer.update(int_ring)
+        np.testing.assert_allclose(analyzer.levels[peak - 3:peak + 4], self.analyzer.levels[peak - 3:peak + 4], atol=0.05)
+
+        # Короче окна БПФ - не считается
+        self.assertFalse(SpectrumAnalyzer(SAMPLE_RATE).update(AudioRingBuffer(4 * SAMPLE_RATE)))
+
+    def test_reuses_buffers_and_palette(self):
+        """Тест: результаты пишутся в заранее выделенные массивы, цвета - по палитре уровней."""
+        levels = self.analyzer.levels
+        column = self.analyzer.column
+        self.analyzer.analyze(self.sine[:self.analyzer.size])
+        self.assertIs(self.analyzer.analyze(np.zeros(self.analyzer.size, dtype=np.float32)), levels)
+        self.assertIs(self.analyzer.column, column)
+
+        palette = spectrogram_palette()
+        self.assertEqual(palette.shape, (256, 4))
+        np.testing.assert_array_equal(column, np.broadcast_to(palette[0], column.shape))
+        np.testing.assert_array_equal(levels, np.full(len(levels), -180.0, dtype=np.float32))
+
+        self.analyzer.analyze(self.sine[:self.analyzer.size])
+        peak = int(np.argmax(levels))
+        expected = palette[int((levels[peak] - SPECTRUM_MIN_DB) * 255.0 / -SPECTRUM_MIN_DB)]
+        np.testing.assert_array_equal(column[peak], expected)
+
+    def test_spectrum_view_scrolls_texture(self):
+        """Тест панели: столбец за кадр, прокрутка координат текстуры и метрика кадра."""
+        view_class = load_spectrum_view()
+        if view_class is None:
+            self.skipTest("Kivy или PyAudio недоступны")
+
+        metrics = PipelineMetrics()
+        view = view_class(metrics)
+        ring = AudioRingBuffer(4 * SAMPLE_RATE)
+        view.ring_source = lambda: (ring, SAMPLE_RATE)
+        for block in range(10):
+            ring.write(self.sine[block * 1600:(block + 1) * 1600])
+            view.refresh(0)
+        view.refresh(0)  # Без новых сэмплов кадр пропускается
+
+        # Первые два блока короче окна БПФ
+        self.assertEqual(metrics.histogram(instrumentation.UI_SPECTRUM).count, 8)
+        self.assertAlmostEqual(view.image.tex_coords[0], 8 / SPECTROGRAM_HISTORY)
+        self.assertEqual(len(view.line.points), 2 * view.analyzer.bands)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tempo_tracker import TempoTracker, MIN_CONFIDENCE, PENDING_FRAMES
+
+FRAME_RATE = 48000 / 256
+
+def synthetic_session(onsets, duration, seed=0):
+    """RMS окон анализа для ударов в моменты onsets: быстрая атака и спад на фоне шума"""
+    frames = int(duration * FRAME_RATE)
+    envelope = np.full(frames, 0.01)
+    decay = 0.5 * np.exp(-np.arange(20) / 5.0)
+    for onset in onsets:
+        index = int(onset * FRAME_RATE)
+        tail = envelope[index:index + len(decay)]
+        tail += decay[:len(tail)]
+    envelope += 0.005 * np.random.default_rng(seed).random(frames)
+    return envelope
+
+def play(tracker, envelope, onsets):
+    """Подача кадров и ударов в трекер; список всех оценок"""
+    estimates = []
+    onset_index = 0
+    for frame, rms in enumerate(envelope.tolist()):
+        tracker.add_frame(rms)
+        timestamp = frame / FRAME_RATE
+        while onset_index < len(onsets) and onsets[onset_index] <= timestamp:
+            tracker.add_onset(onsets[onset_index])
+            onset_index += 1
+        if frame % 4 == 0:
+            estimate = tracker.update(timestamp)
+            if estimate is not None:
+                estimates.append(estimate)
+    return estimates
+
+class TestTempoTracker(unittest.TestCase):
+    """Тесты для оценки темпа свободной игры."""
+
+    def test_steady_tempo(self):
+        """Тест оценки ровного темпа во всем диапазоне без ошибок на октаву."""
+        for bpm in (45, 60, 90, 120, 150, 200):
+            tracker = TempoTracker(FRAME_RATE)
+            onsets = np.arange(0.3, 19.5, 60.0 / bpm).tolist()
+            estimates = play(tracker, synthetic_session(onsets, 20.0), onsets)
+
+            estimate = estimates[-1]
+            self.assertAlmostEqual(estimate['bpm'], bpm, delta=1.0, msg=f"{bpm} BPM")
+            self.assertEqual(estimate['status'], 'steady')
+            self.assertGreater(estimate['stability'], 0.8)
+            self.assertGreaterEqual(estimate['confidence'], MIN_CONFIDENCE)
+
+    def test_acceleration_is_rushing(self):
+        """Тест: постепенное ускорение дает отрицательное отклонение и статус 'rushing'."""
+        onsets = []
+        timestamp = 0.3
+        while timestamp < 39.5:
+            onsets.append(timestamp)
+            bpm = 100.0 if timestamp < 10.0 else 100.0 + 12.0 * min(1.0, (timestamp - 10.0) / 30.0)
+            timestamp += 60.0 / bpm
+        tracker = TempoTracker(FRAME_RATE)
+        estimates = play(tracker, synthetic_session(onsets, 40.0), onsets)
+
+        steady = [estimate for estimate in estimates if 8.0 < estimate['time'] < 10.0]
+        self.assertTrue(all(estimate['status'] == 'steady' for estimate in steady))
+        late = [estimate for estimate in estimates if estimate['time'] > 25.0]
+        self.assertTrue(all(estimate['deviation'] < 0 for estimate in late))
+        self.assertIn('rushing', [estimate['status'] for estimate in late])
+        self.assertGreater(late[-1]['bpm'], 105.0)
+
+    def test_incremental_acf_matches_direct(self):
+        """Тест совпадения инкрементальной автокорреляции с прямым расчетом и пропуска переполнения."""
+        tracker = TempoTracker(FRAME_RATE, window_seconds=2.0, min_bpm=60.0, max_bpm=200.0)
+        rms = np.random.default_rng(1).random(3 * tracker.window)
+        for value in rms.tolist():
+            tracker.add_frame(value)
+            if tracker._pending_write % 100 == 0:
+                tracker.update(0.0)
+        tracker.update(0.0)
+
+        strength = np.maximum(0.0, np.diff(np.concatenate([[0.0], rms])))
+        window = strength[-tracker.window:]
+        history = strength[-tracker.window - tracker.lag_count:]
+        expected = np.array([np.dot(window, history[tracker.lag_count - lag:len(history) - lag])
+                             for lag in range(tracker.lag_count)])
+        np.testing.assert_allclose(tracker._acf, expected, rtol=1e-8, atol=1e-8)
+        self.assertAlmostEqual(tracker._window_sum, float(np.sum(window)))
+
+        # Отставший поток обработки читает только последние PENDING_FRAMES кадров
+        frames = tracker._frames
+        for _ in range(PENDING_FRAMES + 10):
+            tracker.add_frame(0.0)
+        tracker.update(0.0)
+        self.assertEqual(tracker._frames, frames + PENDING_FRAMES)
+
+if __name__ == '__main__':
+    unittest.main()
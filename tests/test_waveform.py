@@ -0,0 +1,158 @@
+import unittest
+from unittest.mock import MagicMock
+import contextlib
+import io
+import sys
+import os
+import numpy as np
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from clocks import VirtualClock
+from ring_buffer import AudioRingBuffer
+from waveform import WaveformPyramid, MarkerTrack
+
+SAMPLE_RATE = 48000
+
+def load_waveform_view():
+    """WaveformView с настоящим Kivy (None, если Kivy замокан другими тестами или недоступен)"""
+    if isinstance(sys.modules.get('kivy'), MagicMock):
+        return None
+    try:
+        os.environ.setdefault('KIVY_NO_ARGS', '1')
+        with contextlib.redirect_stderr(io.StringIO()):
+            from main import WaveformView
+    except ImportError:
+        return None
+    return WaveformView
+
+class TestWaveform(unittest.TestCase):
+    """Тесты для пирамиды волны и дорожек отметок."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.signal = np.random.default_rng(0).normal(0.0, 0.3, SAMPLE_RATE * 20).astype(np.float32)
+
+    def test_envelope_matches_direct_minmax(self):
+        """Тест: огибающая любого масштаба совпадает с прямым min/max по границам значений уровня."""
+        pyramid = WaveformPyramid.from_samples(self.signal, SAMPLE_RATE)
+        for start, end, columns in [(0, len(self.signal), 640), (1000, 9000, 800), (12345, 812345, 333)]:
+            minimums, maximums = pyramid.envelope(start, end, columns)
+
+            # Уровень не шире столбца, поэтому каждый столбец - целые значения этого уровня
+            per_column = (end - start) / columns
+            block = max(size for size, _, _ in pyramid.levels if size <= max(per_column, pyramid.base_block))
+            edges = np.floor((start + np.arange(columns + 1) * per_column) / block).astype(np.int64) * block
+            for column in (0, columns // 2, columns - 1):
+                stop = max(edges[column + 1], edges[column] + block)
+                window = self.signal[edges[column]:stop]
+                self.assertAlmostEqual(float(minimums[column]), float(window.min()), places=6)
+                self.assertAlmostEqual(float(maximums[column]), float(window.max()), places=6)
+
+        # Вне истории - нули
+        minimums, maximums = pyramid.envelope(-SAMPLE_RATE, 0, 100)
+        self.assertFalse(np.any(minimums) or np.any(maximums))
+
+    def test_incremental_from_ring(self):
+        """Тест: дочитывание из кольцевого буфера блоками совпадает с построением по всей записи."""
+        ring = AudioRingBuffer(SAMPLE_RATE, np.int16, 32768.0)
+        samples = np.round(self.signal * 32767.0).clip(-32768, 32767).astype(np.int16)
+        live = WaveformPyramid(SAMPLE_RATE, history_seconds=30.0)
+        sizes = np.random.default_rng(1).integers(1, 2000, len(samples) // 1000)
+        position = 0
+        for size in sizes.tolist():
+            block = samples[position:position + size]
+            ring.write(block)
+            position += len(block)
+            live.update_from_ring(ring, position / SAMPLE_RATE)
+        reference = WaveformPyramid.from_samples(samples[:position] / np.float32(32768.0), SAMPLE_RATE)
+
+        self.assertEqual(live.position, position)
+        for (_, live_min, live_max), (_, ref_min, ref_max) in zip(live.levels, reference.levels):
+            self.assertEqual(live_min.write_index, ref_min.write_index)
+            count = min(live_min.write_index, ref_min.capacity, live_min.capacity)
+            np.testing.assert_array_equal(live_min.latest(count), ref_min.latest(count))
+            np.testing.assert_array_equal(live_max.latest(count), ref_max.latest(count))
+        self.assertAlmostEqual(live.time_to_index(position / SAMPLE_RATE - 1.0), position - SAMPLE_RATE)
+
+        # Отставание больше буфера заполняется тишиной, новый буфер читается с начала
+        ring.write(np.ones(3 * SAMPLE_RATE, dtype=np.int16))
+        live.update_from_ring(ring, 0.0)
+        self.assertEqual(live.position, position + 3 * SAMPLE_RATE)
+        minimums, maximums = live.envelope(position, position + 2 * SAMPLE_RATE, 10)
+        self.assertFalse(np.any(maximums[1:-1]))
+        replaced = AudioRingBuffer(SAMPLE_RATE)
+        replaced.write(np.zeros(100, dtype=np.float32))
+        live.update_from_ring(replaced, 0.0)
+        self.assertEqual(live.position, position + 3 * SAMPLE_RATE + 100)
+
+    def test_markers_and_view(self):
+        """Тест отсортированных отметок и отрисовки волны с отметками в окне."""
+        track = MarkerTrack(capacity=8)
+        track.extend([1.0, 2.0, 3.0])
+        track.add(2.5)  # Раньше последней - пропускается
+        for timestamp in (4.0, 5.0, 6.0, 7.0, 8.0, 9.0):
+            track.add(timestamp)
+        self.assertEqual(len(track), 8)
+        np.testing.assert_array_equal(track.between(2.5, 6.5), [3.0, 4.0, 5.0, 6.0])
+
+        view_class = load_waveform_view()
+        if view_class is None:
+            self.skipTest("Kivy или PyAudio недоступны")
+
+        clock = VirtualClock(start=100.0)
+        view = view_class(clock=clock, size=(400, 80))
+        ring = AudioRingBuffer(4 * SAMPLE_RATE)
+        view.ring_source = lambda: (ring, SAMPLE_RATE)
+        view.beat_source = lambda start, end: np.arange(np.ceil(start * 2) / 2, end, 0.5)
+        for block in range(200):
+            ring.write(self.signal[block * 480:(block + 1) * 480])
+            clock.advance(0.01)
+            if block % 50 == 0:
+                view.add_onset(clock.time())
+        view.refresh(0)
+
+        # По два вершины на столбец, 4 удара и 10 долей за 5 секунд окна
+        self.assertEqual(len(view.wave_mesh.vertices), 400 * 2 * 4)
+        self.assertEqual(len(view.onset_mesh.indices), 2 * 4)
+        self.assertEqual(len(view.beat_mesh.indices), 2 * 10)
+
+        # Правый край привязан ко времени последнего блока, а не к текущему времени
+        clock.advance(0.05)
+        ring.write(self.signal[:480])
+        view.block_source = lambda: (ring.write_index, 102.0)
+        view.refresh(0)
+        self.assertEqual(view.pyramid.anchor_time, 102.0)
+        self.assertEqual(view.pyramid.position, 201 * 480)
+
+    def test_recording_markers(self):
+        """Тест: длинная запись сохраняет все отметки, живые удары поверх записи не добавляются."""
+        view_class = load_waveform_view()
+        if view_class is None:
+            self.skipTest("Kivy или PyAudio недоступны")
+
+        view = view_class(clock=VirtualClock(start=100.0), size=(400, 80))
+        # Запись длиннее емкости живой дорожки отметок
+        onsets = np.arange(8000) * 0.5
+        pyramid = WaveformPyramid.from_samples(np.zeros(4000 * 100, dtype=np.float32), 100)
+        view.show_recording(pyramid, onsets, onsets[::2])
+        self.assertEqual(len(view.recorded_onsets), 8000)
+
+        view.add_onset(150.0)
+        self.assertEqual(len(view.onsets), 0)
+
+        # Окно на начало записи: 10 ударов и 5 долей за первые 5 секунд
+        view.view_end = 5.0
+        view.seconds = 5.0
+        view.refresh(0)
+        self.assertEqual(len(view.onset_mesh.indices), 2 * 10)
+        self.assertEqual(len(view.beat_mesh.indices), 2 * 5)
+
+        view.show_live()
+        self.assertIsNone(view.recorded_onsets)
+        view.add_onset(150.0)
+        self.assertEqual(len(view.onsets), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,278 @@
+import csv
+import math
+import os
+
+import numpy as np
+
+from audio_assets import read_wav
+from ring_buffer import AudioRingBuffer
+
+# Сэмплов в одном значении нижнего уровня пирамиды
+WAVEFORM_BASE_BLOCK = 64
+# Сколько секунд живого входа хранит пирамида
+WAVEFORM_HISTORY = 120.0
+# Емкость дорожки отметок (onset, доли) - последние значения
+MARKER_CAPACITY = 4096
+
+class WaveformPyramid:
+    """
+    Пирамида минимумов и максимумов сигнала для отрисовки волны в любом масштабе
+
+    Уровень 0 хранит min/max каждых WAVEFORM_BASE_BLOCK сэмплов, каждый следующий
+    уровень - min/max пар значений предыдущего. Уровни дополняются по мере
+    поступления сэмплов (векторно, без пересчета истории) и хранятся в кольцевых
+    буферах, поэтому память ограничена окном history_seconds. Для отрисовки
+    выбирается уровень, у которого на столбец пикселей приходится от одного до
+    двух значений, - стоимость O(пикселей) при любом масштабе и длине записи.
+
+    Сэмплы адресуются абсолютным индексом с момента сброса (как в AudioRingBuffer).
+    """
+    def __init__(self, sample_rate, history_seconds=WAVEFORM_HISTORY, base_block=WAVEFORM_BASE_BLOCK):
+        """
+        Args:
+            sample_rate: Частота дискретизации (Гц)
+            history_seconds: Сколько секунд сигнала хранится
+            base_block: Сэмплов в значении нижнего уровня
+        """
+        self.sample_rate = float(sample_rate)
+        self.base_block = int(base_block)
+        history = max(self.base_block, int(math.ceil(history_seconds * self.sample_rate)))
+
+        # Уровни: (сэмплов в значении, минимумы, максимумы); верхний - хотя бы из двух значений
+        self.levels = []
+        block = self.base_block
+        while True:
+            capacity = -(-history // block) + 1
+            self.levels.append((block, AudioRingBuffer(capacity), AudioRingBuffer(capacity)))
+            if capacity <= 3:
+                break
+            block *= 2
+
+        # Сэмплы недостроенного значения нижнего уровня
+        self._partial = np.zeros(self.base_block, dtype=np.float32)
+        # Больше этого блоки записываются частями, чтобы уровни успевали прочитать пары
+        self._chunk = self.base_block * max(1, (self.levels[0][1].capacity - 1) // 2)
+        self._scratch = None
+        self.reset()
+
+    def reset(self):
+        """Сброс истории"""
+        for _, minimums, maximums in self.levels:
+            minimums.reset()
+            maximums.reset()
+        self._partial_count = 0
+        self.position = 0           # Абсолютный индекс следующего сэмпла
+        self.anchor_time = None     # Время сэмпла anchor_index (для перевода времени в индексы)
+        self.anchor_index = 0
+        self._ring = None           # Кольцевой буфер-источник и позиция чтения из него
+        self._ring_index = 0
+
+    @classmethod
+    def from_samples(cls, samples, sample_rate, start_time=0.0, base_block=WAVEFORM_BASE_BLOCK):
+        """Пирамида записанного сигнала целиком (start_time - время первого сэмпла)"""
+        pyramid = cls(sample_rate, len(samples) / float(sample_rate), base_block)
+        pyramid.append(samples)
+        pyramid.anchor_time = start_time
+        return pyramid
+
+    @property
+    def history(self):
+        """Количество сэмплов, которые хранит нижний уровень"""
+        block, minimums, _ = self.levels[0]
+        return (minimums.capacity - 1) * block
+
+    def append(self, samples):
+        """Добавление сэмплов (float, амплитуда в диапазоне [-1, 1])"""
+        samples = np.asarray(samples, dtype=np.float32)
+        for start in range(0, len(samples), self._chunk):
+            self._append_chunk(samples[start:start + self._chunk])
+
+    def _append_chunk(self, samples):
+        block = self.base_block
+        used = 0
+        # Дополняем недостроенное значение
+        if self._partial_count:
+            used = min(len(samples), block - self._partial_count)
+            self._partial[self._partial_count:self._partial_count + used] = samples[:used]
+            self._partial_count += used
+            if self._partial_count == block:
+                self._push_base(self._partial[None, :])
+                self._partial_count = 0
+
+        # Целые значения - одним векторным проходом
+        whole = (len(samples) - used) // block
+        if whole:
+            self._push_base(samples[used:used + whole * block].reshape(whole, block))
+            used += whole * block
+
+        rest = len(samples) - used
+        if rest:
+            self._partial[:rest] = samples[used:]
+            self._partial_count = rest
+        self.position += len(samples)
+
+    def _push_base(self, blocks):
+        """Новые значения нижнего уровня и достройка верхних уровней по готовым парам"""
+        _, minimums, maximums = self.levels[0]
+        minimums.write(blocks.min(axis=1))
+        maximums.write(blocks.max(axis=1))
+
+        for (_, lower_min, lower_max), (_, upper_min, upper_max) in zip(self.levels, self.levels[1:]):
+            first = 2 * upper_min.write_index
+            pairs = (lower_min.write_index - first) // 2
+            if pairs <= 0:
+                break
+            upper_min.write(lower_min.read(first, 2 * pairs).reshape(pairs, 2).min(axis=1))
+            upper_max.write(lower_max.read(first, 2 * pairs).reshape(pairs, 2).max(axis=1))
+
+    def update_from_ring(self, ring, timestamp, end=None):
+        """
+        Дочитывание новых сэмплов из кольцевого буфера анализа
+
+        Новый буфер (перезапуск потока) читается с самого старого сэмпла; если буфер
+        обогнал чтение, пропущенные сэмплы заполняются тишиной, чтобы время на волне
+        не сдвигалось.
+
+        Args:
+            ring: AudioRingBuffer входа
+            timestamp: Время сэмпла end - 1 (последнего дочитываемого)
+            end: Абсолютный индекс конца дочитываемых сэмплов (по умолчанию - все записанные)
+        """
+        if ring is not self._ring or ring.write_index < self._ring_index:
+            self._ring = ring
+            self._ring_index = ring.oldest_index
+
+        end = ring.write_index if end is None else min(end, ring.write_index)
+        if end < self._ring_index:
+            return
+        start = max(self._ring_index, ring.oldest_index)
+        gap = min(start - self._ring_index, self.history)
+        if gap > 0:
+            self.append(np.zeros(gap, dtype=np.float32))
+        if end > start:
+            if self._scratch is None or len(self._scratch) < ring.capacity:
+                self._scratch = np.empty(ring.capacity, dtype=np.float32)
+            self.append(ring.read_float(start, end - start, out=self._scratch))
+        self._ring_index = end
+
+        self.anchor_time = timestamp
+        self.anchor_index = self.position
+
+    def time_to_index(self, timestamp):
+        """Абсолютный индекс сэмпла для момента времени"""
+        if self.anchor_time is None:
+            return 0.0
+        return self.anchor_index + (timestamp - self.anchor_time) * self.sample_rate
+
+    def envelope(self, start, end, columns):
+        """
+        Минимум и максимум сигнала для каждого из columns столбцов интервала [start, end)
+
+        Args:
+            start: Абсолютный индекс первого сэмпла (может быть дробным)
+            end: Абсолютный индекс конца интервала
+            columns: Количество столбцов (пикселей)
+
+        Returns:
+            tuple: (minimums, maximums) - массивы float32 длины columns;
+                столбцы без данных (вне истории) равны нулю
+        """
+        minimums_out = np.zeros(columns, dtype=np.float32)
+        maximums_out = np.zeros(columns, dtype=np.float32)
+        if columns <= 0 or end <= start:
+            return minimums_out, maximums_out
+
+        # Самый грубый уровень, у которого значение не шире столбца
+        per_column = (end - start) / columns
+        level = 0
+        while level + 1 < len(self.levels) and self.levels[level + 1][0] <= per_column:
+            level += 1
+        block, minimums, maximums = self.levels[level]
+
+        # Границы столбцов в значениях уровня; пустой столбец берет одно значение
+        edges = np.floor((start + np.arange(columns + 1) * per_column) / block).astype(np.int64)
+        first = edges[:-1]
+        last = np.maximum(edges[1:], first + 1)
+        valid = np.flatnonzero((first >= minimums.oldest_index) & (first < minimums.write_index))
+        if len(valid) == 0:
+            return minimums_out, maximums_out
+
+        # Один непрерывный срез уровня и свертка по столбцам
+        origin = first[valid[0]]
+        stop = min(last[valid[-1]], minimums.write_index)
+        offsets = first[valid] - origin
+        minimums_out[valid] = np.minimum.reduceat(minimums.read(origin, stop - origin), offsets)
+        maximums_out[valid] = np.maximum.reduceat(maximums.read(origin, stop - origin), offsets)
+        return minimums_out, maximums_out
+
+def markers_between(times, start, end):
+    """Отметки отсортированного массива в интервале [start, end) - срез без копирования"""
+    first, last = np.searchsorted(times, (start, end))
+    return times[first:last]
+
+class MarkerTrack:
+    """
+    Отсортированная дорожка отметок времени (onset, доли метронома)
+
+    Хранит последние capacity отметок в зеркальном кольцевом буфере: окно видимых
+    отметок находится бинарным поиском по непрерывному срезу. Добавляет отметки
+    один поток, читать можно из другого. Для живого входа; отметки записанного
+    занятия целиком хранятся обычным отсортированным массивом (markers_between).
+    """
+    def __init__(self, capacity=MARKER_CAPACITY):
+        self._times = AudioRingBuffer(capacity, dtype=np.float64)
+        self._value = np.empty(1)
+
+    def reset(self):
+        """Удаление всех отметок"""
+        self._times.reset()
+
+    def __len__(self):
+        return min(self._times.write_index, self._times.capacity)
+
+    def add(self, timestamp):
+        """Новая отметка; отметки раньше последней пропускаются, чтобы дорожка оставалась отсортированной"""
+        if self._times.write_index and timestamp < self._times.latest(1)[0]:
+            return
+        self._value[0] = timestamp
+        self._times.write(self._value)
+
+    def extend(self, timestamps):
+        """Добавление отсортированного массива отметок (например, onset записи)"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if self._times.write_index:
+            timestamps = timestamps[timestamps >= self._times.latest(1)[0]]
+        self._times.write(timestamps)
+
+    def between(self, start, end):
+        """Отметки в интервале [start, end) - срез без копирования"""
+        return markers_between(self._times.latest(len(self)), start, end)
+
+def load_recording(path, channel=0):
+    """
+    Пирамида и отметки записанного занятия
+
+    Отметки берутся из CSV событий рядом с записью (onset и доли метронома); если его
+    нет, удары находятся тем же детектором, что в пакетном анализе.
+
+    Returns:
+        tuple: (pyramid, onsets, beats) - WaveformPyramid и отсортированные массивы
+            времен (сек от начала записи)
+    """
+    data, sample_rate = read_wav(path)
+    if data.ndim > 1:
+        data = data[:, min(channel, data.shape[1] - 1)]
+    pyramid = WaveformPyramid.from_samples(data, sample_rate)
+
+    events = {'onset': [], 'beat': []}
+    events_path = os.path.splitext(path)[0] + '.events.csv'
+    if os.path.exists(events_path):
+        with open(events_path, 'r') as f:
+            for row in csv.DictReader(f):
+                if row['kind'] in events:
+                    events[row['kind']].append(float(row['time']))
+    else:
+        from batch_analysis import detect_onsets
+        events['onset'] = detect_onsets(data, sample_rate)
+
+    return pyramid, np.sort(events['onset']), np.sort(events['beat'])